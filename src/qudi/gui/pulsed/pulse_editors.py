@@ -217,7 +217,6 @@ class BlockEditorTableModel(QtCore.QAbstractTableModel):
             return None
 
         if role == self.pulseBlockRole:
-            self._pulse_block.refresh_parameters()
             return self._pulse_block
         if role == self.analogChannelSetRole:
             return self._pulse_block.analog_channels
@@ -338,7 +337,10 @@ class BlockEditorTableModel(QtCore.QAbstractTableModel):
         elif role == self.analogParameterRole and isinstance(data, dict):
             col_offset = 4 if self.digital_channels else 3
             chnl = self.analog_channels[(index.column() - col_offset) // 2]
-            self._pulse_block[index.row()].pulse_function[chnl].__init__(**data)
+            # Elements in a PulseBlock are frozen, replace the element by an edited copy
+            new_elem = self._pulse_block[index.row()].copy()
+            new_elem.pulse_function[chnl] = type(new_elem.pulse_function[chnl])(**data)
+            self._pulse_block[index.row()] = new_elem
         elif role == self.pulseBlockRole and isinstance(data, PulseBlock):
             self._pulse_block = copy.deepcopy(data)
             self._pulse_block.name = 'EDITOR CONTAINER'
@@ -430,6 +430,7 @@ class PulsedMeasurementGui(GuiBase):
     def _connect_logic_signals(self):
         # Connect update signals from pulsed_master_logic
         self.pulsedmasterlogic().sigMeasurementDataUpdated.connect(self.measurement_data_updated)
+        self.pulsedmasterlogic().sigAltDataUpdated.connect(self.alt_data_updated)
         self.pulsedmasterlogic().sigTimerUpdated.connect(self.measurement_timer_updated)
         self.pulsedmasterlogic().sigFitUpdated.connect(self.fit_data_updated)
         self.pulsedmasterlogic().sigMeasurementStatusUpdated.connect(self.measurement_status_updated)
@@ -591,6 +592,7 @@ class PulsedMeasurementGui(GuiBase):
     def _disconnect_logic_signals(self):
         # Disconnect update signals from pulsed_master_logic
         self.pulsedmasterlogic().sigMeasurementDataUpdated.disconnect()
+        self.pulsedmasterlogic().sigAltDataUpdated.disconnect()
         self.pulsedmasterlogic().sigTimerUpdated.disconnect()
         self.pulsedmasterlogic().sigFitUpdated.disconnect()
         self.pulsedmasterlogic().sigMeasurementStatusUpdated.disconnect()
@@ -2493,6 +2495,17 @@ class PulsedMeasurementGui(GuiBase):
         self.update_laser_data()
         return
 
+    @QtCore.Slot()
+    def alt_data_updated(self):
+        """
+        Update the secondary plot with alternative data computed in the background.
+        """
+        signal_alt_data = self.pulsedmasterlogic().signal_alt_data
+        self.second_plot_image.setData(x=signal_alt_data[0], y=signal_alt_data[1])
+        if signal_alt_data.shape[0] > 2:
+            self.second_plot_image2.setData(x=signal_alt_data[0], y=signal_alt_data[2])
+        return
+
     @QtCore.Slot(str, object, bool)
     def fit_data_updated(self, fit_config, result, use_alternative_data):
         """
@@ -173,6 +173,12 @@ class Scan1DWidget(_BaseScanWidget):
         # Set data
         self._update_scan_data(update_range=update_range)
 
+    def update_scan_data_lines(self, line_start: int, line_stop: int) -> None:
+        """ Redraw after the lines [line_start, line_stop) of the displayed ScanData changed
+        in-place. A 1D scan consists of a single line, so the whole curve is redrawn.
+        """
+        self._update_scan_data(update_range=False)
+
     @QtCore.Slot(dict)
     def _markers_changed(self, markers) -> None:
         position = markers[self.plot_widget.SelectionMode.X][0]
@@ -311,6 +317,16 @@ class Scan2DWidget(_BaseScanWidget):
         # Set data
         self._update_scan_data()
 
+    def update_scan_data_lines(self, line_start: int, line_stop: int) -> None:
+        """ Redraw after the lines [line_start, line_stop) of the displayed ScanData changed
+        in-place. Image extent and view range are left untouched.
+        """
+        current_channel = self.channel_selection_combobox.currentText()
+        if (self._scan_data is None) or (self._scan_data.data is None) \
+                or (current_channel not in self._scan_data.settings.channels) or line_stop <= line_start:
+            return
+        self.image_widget.set_image(self._scan_data.data[current_channel])
+
     @QtCore.Slot(dict)
     def _region_changed(self, regions) -> None:
         center = regions[self.image_widget.SelectionMode.XY][0][0]
@@ -32,7 +32,7 @@ import qudi.util.uic as uic
 from qudi.core.connector import Connector
 from qudi.core.statusvariable import StatusVar
 from qudi.core.configoption import ConfigOption
-from qudi.interface.scanning_probe_interface import ScanData
+from qudi.interface.scanning_probe_interface import ScanData, ScanDataSlab
 from qudi.core.module import GuiBase
 
 from qudi.gui.scanning.tilt_correction_dockwidget import TiltCorrectionDockWidget
@@ -163,6 +163,9 @@ class ScannerGui(GuiBase):
         self._optimizer_id = 0
         self._optimizer_state = {'is_running': False}
         self._n_save_tasks = 0
+        # Scan data of the running scan, updated in-place from the slabs emitted by the logic
+        self._live_scan_data: Optional[ScanData] = None
+        self._live_back_scan_data: Optional[ScanData] = None
         return
 
     def on_activate(self):
@@ -236,6 +239,9 @@ class ScannerGui(GuiBase):
             self.update_scanner_settings_from_logic, QtCore.Qt.QueuedConnection
         )
         self._scanning_logic().sigScanStateChanged.connect(self.scan_state_updated, QtCore.Qt.QueuedConnection)
+        self._scanning_logic().sigScanDataSlabUpdated.connect(
+            self.scan_data_slab_updated, QtCore.Qt.QueuedConnection
+        )
         self._data_logic().sigHistoryScanDataRestored.connect(self._update_from_history, QtCore.Qt.QueuedConnection)
         self._optimize_logic().sigOptimizeStateChanged.connect(self.optimize_state_updated, QtCore.Qt.QueuedConnection)
         self.sigOptimizerSettingsChanged.connect(
@@ -312,6 +318,7 @@ class ScannerGui(GuiBase):
         self._mw.action_utility_zoom.toggled.disconnect()
         self._scanning_logic().sigScannerTargetChanged.disconnect(self.scanner_target_updated)
         self._scanning_logic().sigScanStateChanged.disconnect(self.scan_state_updated)
+        self._scanning_logic().sigScanDataSlabUpdated.disconnect(self.scan_data_slab_updated)
         self._scanning_logic().sigScanSettingsChanged.disconnect(self.update_scanner_settings_from_logic)
         self._optimize_logic().sigOptimizeStateChanged.disconnect(self.optimize_state_updated)
         self._optimize_logic().sigOptimizeSequenceDimensionsChanged.disconnect(self._init_optimizer_dockwidget)
@@ -757,6 +764,12 @@ class ScannerGui(GuiBase):
             self._toggle_enable_actions(not is_running, exclude_action=self._mw.action_optimize_position)
         self._toggle_enable_scan_crosshairs(not is_running)
         self.scanner_control_dockwidget.setEnabled(not is_running)
+        if is_running:
+            self._live_scan_data = scan_data
+            self._live_back_scan_data = back_scan_data
+        else:
+            self._live_scan_data = None
+            self._live_back_scan_data = None
         if not is_running and scan_data is None:
             # scan could not be started due to some error
             for dockwidget in {**self.scan_2d_dockwidgets, **self.scan_1d_dockwidgets}.values():
@@ -800,6 +813,26 @@ class ScannerGui(GuiBase):
                     dockwidget.scan_widget.toggle_scan_button.setChecked(is_running)
                     self._update_scan_data(scan_data, back_scan_data)
 
+    def scan_data_slab_updated(self, slab: ScanDataSlab, caller_id: UUID):
+        """
+        Write the lines acquired since the last poll into the scan data of the running scan and
+        only redraw the affected plot.
+
+        @param ScanDataSlab slab: changed scan data lines
+        @param UUID caller_id: ID of the module that started the scan
+        """
+        scan_data = self._live_scan_data
+        if scan_data is None:
+            return
+        slab.write_into(scan_data, self._live_back_scan_data)
+        if caller_id is self._optimizer_id:
+            self.scan_state_updated(True, scan_data, self._live_back_scan_data, caller_id)
+            return
+        axes = scan_data.settings.axes
+        dockwidget = self.scan_2d_dockwidgets.get(axes, self.scan_1d_dockwidgets.get(axes, None))
+        if dockwidget is not None:
+            dockwidget.scan_widget.update_scan_data_lines(slab.line_start, slab.line_stop)
+
     @QtCore.Slot(bool, dict, object)
     def optimize_state_updated(self, is_running, optimal_position=None, fit_data=None):
         self._optimizer_state['is_running'] = is_running
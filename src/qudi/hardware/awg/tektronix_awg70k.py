@@ -23,6 +23,8 @@ If not, see <https://www.gnu.org/licenses/>.
 
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 try:
     import pyvisa as visa
 except ImportError:
@@ -35,6 +37,7 @@ from qudi.core.configoption import ConfigOption
 from qudi.util.paths import get_appdata_dir
 from qudi.util.helpers import natural_sort
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.interface.pulser_interface import RunLengthWaveform
 
 
 class AWG70K(PulserInterface):
@@ -53,6 +56,8 @@ class AWG70K(PulserInterface):
             # ftp_root_dir: 'C:\\inetpub\\ftproot' # optional, root directory on AWG device
             # ftp_login: 'anonymous' # optional, the username for ftp login
             # ftp_passwd: 'anonymous@' # optional, the password for ftp login
+            # ftp_upload_workers: 4 # optional, max. number of parallel FTP uploads
+            # ftp_block_size: 1048576 # optional, block size in bytes for FTP uploads
 
     """
 
@@ -66,6 +71,8 @@ class AWG70K(PulserInterface):
     _ftp_dir = ConfigOption(name='ftp_root_dir', default='C:\\inetpub\\ftproot', missing='warn')
     _username = ConfigOption(name='ftp_login', default='anonymous', missing='warn')
     _password = ConfigOption(name='ftp_passwd', default='anonymous@', missing='warn')
+    _ftp_upload_workers = ConfigOption(name='ftp_upload_workers', default=4, missing='nothing')
+    _ftp_block_size = ConfigOption(name='ftp_block_size', default=1048576, missing='nothing')
 
     # translation dict from qudi trigger descriptor to device command
     __event_triggers = {'OFF': 'OFF', 'A': 'ATR', 'B': 'BTR', 'INT': 'INT'}
@@ -86,6 +93,10 @@ class AWG70K(PulserInterface):
         self.__min_waveform_length = 0
         self.__max_waveform_length = 0
         self.__installed_options = list()
+        # Number of samples already written to each WFMX file that is currently being assembled
+        self.__wfmx_write_offsets = dict()
+        # Serializes SCPI access of the upload workers and the waveform encoding
+        self.__scpi_lock = threading.Lock()
         return
 
     def on_activate(self):
@@ -276,6 +287,8 @@ class AWG70K(PulserInterface):
             constraints.sequence_option = SequenceOption.OPTIONAL
         else:
             constraints.sequence_option = SequenceOption.NON
+        # Marker bytes are created from run-length encoded digital samples
+        constraints.run_length_waveforms = True
 
         # FIXME: additional constraint really necessary?
         constraints.dac_resolution = {'min': 8, 'max': 10, 'step': 1, 'unit': 'bit'}
@@ -326,7 +339,7 @@ class AWG70K(PulserInterface):
                                     voltage samples.
         @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
                                      values are 1D numpy arrays of type bool containing the marker
-                                     states.
+                                     states. Can also be a RunLengthWaveform with the digital runs.
         @param bool is_first_chunk: Flag indicating if it is the first chunk to write.
                                     If True this method will create a new empty wavveform.
                                     If False the samples are appended to the existing waveform.
@@ -339,6 +352,9 @@ class AWG70K(PulserInterface):
                              created waveform names
         """
         waveforms = list()
+        run_length_digital = isinstance(digital_samples, RunLengthWaveform)
+        digital_channels = digital_samples.digital_channels if run_length_digital else set(
+            digital_samples)
 
         # Sanity checks
         if len(analog_samples) == 0:
@@ -358,77 +374,113 @@ class AWG70K(PulserInterface):
         active_analog = natural_sort(chnl for chnl in active_channels if chnl.startswith('a'))
 
         # Sanity check of channel numbers
-        if active_channels != set(analog_samples.keys()).union(set(digital_samples.keys())):
+        if active_channels != set(analog_samples.keys()).union(digital_channels):
             self.log.error('Mismatch of channel activation and sample array dimensions for '
                            'waveform creation.\nChannel activation is: {0}\nSample arrays have: '
                            ''.format(active_channels,
-                                     set(analog_samples.keys()).union(set(digital_samples.keys()))))
+                                     set(analog_samples.keys()).union(digital_channels)))
             return -1, waveforms
 
         # Write waveforms. One for each analog channel.
-        for a_ch in active_analog:
-            # Get the integer analog channel number
-            a_ch_num = int(a_ch.split('ch')[-1])
-            # Get the digital channel specifiers belonging to this analog channel markers
-            mrk_ch_1 = 'd_ch{0:d}'.format(a_ch_num * 2 - 1)
-            mrk_ch_2 = 'd_ch{0:d}'.format(a_ch_num * 2)
-
-            start = time.time()
-            # Encode marker information in an array of bytes (uint8). Avoid intermediate copies!!!
-            if mrk_ch_1 in digital_samples and mrk_ch_2 in digital_samples:
-                mrk_bytes = digital_samples[mrk_ch_2].view('uint8')
-                tmp_bytes = digital_samples[mrk_ch_1].view('uint8')
-                np.left_shift(mrk_bytes, 1, out=mrk_bytes)
-                np.add(mrk_bytes, tmp_bytes, out=mrk_bytes)
-            elif mrk_ch_1 in digital_samples:
-                mrk_bytes = digital_samples[mrk_ch_1].view('uint8')
-            else:
-                mrk_bytes = None
-            self.log.debug('Prepare digital channel data: {0}'.format(time.time()-start))
-
-            # Create waveform name string
-            wfm_name = '{0}_ch{1:d}'.format(name, a_ch_num)
-
-            # Check if waveform already exists and delete if necessary.
-            if wfm_name in self.get_waveform_names():
-                self.delete_waveform(wfm_name)
-
-            # Write WFMX file for waveform
-            start = time.time()
-            self._write_wfmx(filename=wfm_name,
-                             analog_samples=analog_samples[a_ch],
-                             marker_bytes=mrk_bytes,
-                             is_first_chunk=is_first_chunk,
-                             is_last_chunk=is_last_chunk,
-                             total_number_of_samples=total_number_of_samples)
-            self.log.debug('Write WFMX file: {0}'.format(time.time() - start))
-
-            # transfer waveform to AWG and load into workspace
-            start = time.time()
-            self._send_file(filename=wfm_name + '.wfmx')
-            self.log.debug('Send WFMX file: {0}'.format(time.time() - start))
-
-            start = time.time()
+        # Finished WFMX files are uploaded by a pool of FTP workers while the next channel is
+        # encoded. Each worker loads its file into the workspace as soon as the upload has
+        # finished, so the device is busy loading while the remaining channels are still being
+        # encoded and transferred.
+        uploads = list()
+        with ThreadPoolExecutor(max_workers=max(1, min(len(active_analog),
+                                                       self._ftp_upload_workers))) as executor:
+            for a_ch in active_analog:
+                # Get the integer analog channel number
+                a_ch_num = int(a_ch.split('ch')[-1])
+                # Get the digital channel specifiers belonging to this analog channel markers
+                mrk_ch_1 = 'd_ch{0:d}'.format(a_ch_num * 2 - 1)
+                mrk_ch_2 = 'd_ch{0:d}'.format(a_ch_num * 2)
+
+                start = time.time()
+                # Encode marker information in an array of bytes (uint8). Avoid intermediate copies!!!
+                if run_length_digital and mrk_ch_1 in digital_channels:
+                    mrk_bytes = self._run_length_marker_bytes(digital_samples, mrk_ch_1, mrk_ch_2)
+                elif run_length_digital:
+                    mrk_bytes = None
+                elif mrk_ch_1 in digital_samples and mrk_ch_2 in digital_samples:
+                    mrk_bytes = digital_samples[mrk_ch_2].view('uint8')
+                    tmp_bytes = digital_samples[mrk_ch_1].view('uint8')
+                    np.left_shift(mrk_bytes, 1, out=mrk_bytes)
+                    np.add(mrk_bytes, tmp_bytes, out=mrk_bytes)
+                elif mrk_ch_1 in digital_samples:
+                    mrk_bytes = digital_samples[mrk_ch_1].view('uint8')
+                else:
+                    mrk_bytes = None
+                self.log.debug('Prepare digital channel data: {0}'.format(time.time()-start))
+
+                # Create waveform name string
+                wfm_name = '{0}_ch{1:d}'.format(name, a_ch_num)
+
+                # Check if waveform already exists and delete if necessary.
+                if is_first_chunk:
+                    with self.__scpi_lock:
+                        if wfm_name in self.get_waveform_names():
+                            self.delete_waveform(wfm_name)
+
+                # Write WFMX file for waveform
+                start = time.time()
+                if self._write_wfmx(filename=wfm_name,
+                                    analog_samples=analog_samples[a_ch],
+                                    marker_bytes=mrk_bytes,
+                                    is_first_chunk=is_first_chunk,
+                                    is_last_chunk=is_last_chunk,
+                                    total_number_of_samples=total_number_of_samples) < 0:
+                    return -1, waveforms
+                self.log.debug('Write WFMX file: {0}'.format(time.time() - start))
+
+                # The WFMX file is only complete after the last chunk has been written
+                if is_last_chunk:
+                    uploads.append(
+                        (wfm_name, executor.submit(self._upload_and_load_wfmx, wfm_name))
+                    )
+                # Append created waveform name to waveform list
+                waveforms.append(wfm_name)
+
+            # Transfer waveforms to AWG and load into workspace
+            if uploads:
+                start = time.time()
+                timeout_old = self.awg.timeout
+                # increase this time so that there is no timeout for loading longer sequences
+                # which might take some minutes
+                self.awg.timeout = 5e6
+                try:
+                    for wfm_name, upload in uploads:
+                        if upload.result() < 0:
+                            self.log.error('Upload of WFMX file "{0}" to AWG failed.'
+                                           ''.format(wfm_name))
+                            return -1, waveforms
+                    # the answer of the *opc-query is received as soon as the loading is finished
+                    opc = int(self.query('*OPC?'))
+                    # Just to make sure
+                    while not set(name for name, _ in uploads).issubset(
+                            self.get_waveform_names()):
+                        time.sleep(0.25)
+                finally:
+                    # reset the timeout
+                    self.awg.timeout = timeout_old
+                self.log.debug('Send and load WFMX files into workspace: {0}'
+                               ''.format(time.time() - start))
+        return len(analog_samples[active_analog[0]]), waveforms
+
+    def _upload_and_load_wfmx(self, wfm_name):
+        """ Upload a WFMX file to the AWG and open it in the workspace. Runs in the upload
+        workers of write_waveform.
+
+        @param str wfm_name: name of the waveform (WFMX file name without extension)
+
+        @return int: error code (0: OK, -1: upload failed)
+        """
+        if self._send_file(wfm_name + '.wfmx') < 0:
+            return -1
+        with self.__scpi_lock:
             self.write('MMEM:OPEN "{0}"'.format(os.path.join(
                 self._ftp_dir, self.ftp_working_dir, wfm_name + '.wfmx')))
-            # Wait for everything to complete
-            timeout_old = self.awg.timeout
-            # increase this time so that there is no timeout for loading longer sequences
-            # which might take some minutes
-            self.awg.timeout = 5e6
-            # the answer of the *opc-query is received as soon as the loading is finished
-            opc = int(self.query('*OPC?'))
-            # Just to make sure
-            while wfm_name not in self.get_waveform_names():
-                time.sleep(0.25)
-
-            # reset the timeout
-            self.awg.timeout = timeout_old
-            self.log.debug('Load WFMX file into workspace: {0}'.format(time.time() - start))
-
-            # Append created waveform name to waveform list
-            waveforms.append(wfm_name)
-        return total_number_of_samples, waveforms
+        return 0
 
     def write_sequence(self, name, sequence_parameter_list):
         """
@@ -1572,9 +1624,28 @@ class AWG70K(PulserInterface):
             ftp.login(user=self._username, passwd=self._password)
             ftp.cwd(self.ftp_working_dir)
             with open(filepath, 'rb') as file:
-                ftp.storbinary('STOR ' + filename, file)
+                ftp.storbinary('STOR ' + filename, file, blocksize=self._ftp_block_size)
         return 0
 
+    @staticmethod
+    def _run_length_marker_bytes(digital_samples, marker_1, marker_2):
+        """
+        Creates the marker byte array of an analog channel from run-length encoded digital samples.
+        Marker 1 is encoded in bit 0 and marker 2 in bit 1.
+
+        @param RunLengthWaveform digital_samples: digital runs of the chunk to write
+        @param str marker_1: generic digital channel name of the first marker
+        @param str marker_2: generic digital channel name of the second marker (optional channel)
+
+        @return numpy.ndarray: uint8 array of marker bytes with one byte per sample
+        """
+        markers = [chnl for chnl in (marker_1, marker_2) if chnl in digital_samples.digital_states]
+        run_lengths, states = digital_samples.merged_digital_runs(markers)
+        run_bytes = states[marker_1].astype('uint8')
+        if marker_2 in states:
+            run_bytes |= states[marker_2].astype('uint8') << 1
+        return np.repeat(run_bytes, run_lengths)
+
     def _write_wfmx(self, filename, analog_samples, marker_bytes, is_first_chunk, is_last_chunk,
                     total_number_of_samples):
         """
@@ -1597,58 +1668,51 @@ class AWG70K(PulserInterface):
         @param is_last_chunk: bool, indicates if the current chunk is the last
                               write to this file.
 
-        @return list: the list contains the string names of the created files for the passed
-                      presampled arrays
+        @return int: error code (0: OK, -1: error)
         """
-        # The memory overhead of the tmp file write/read process in bytes. Only used if wfmx file is
-        # written in chunks in order to avoid excessive memory usage.
-        tmp_bytes_overhead = 16777216  # 16 MB
-
         if not filename.endswith('.wfmx'):
             filename += '.wfmx'
         wfmx_path = os.path.join(self._tmp_work_dir, filename)
-        tmp_path = os.path.join(self._tmp_work_dir, 'digital_tmp.bin')
 
-        # if it is the first chunk, create the .WFMX file with header.
+        # The file layout is: header, all analog samples (4 bytes each, np.float32), all marker
+        # samples (1 byte each, np.uint8). Since the total number of samples is known in advance,
+        # each chunk is written directly to its final position in the file. This avoids buffering
+        # the marker data of previous chunks in a temporary file.
         if is_first_chunk:
             # create header
-            header = self._create_xml_header(total_number_of_samples, marker_bytes is not None)
-            # write header
+            header = self._create_xml_header(total_number_of_samples,
+                                             marker_bytes is not None).encode('utf8')
+            # write header and preallocate the file for the entire waveform
+            file_size = len(header) + 4 * total_number_of_samples
+            if marker_bytes is not None:
+                file_size += total_number_of_samples
             with open(wfmx_path, 'wb') as wfmxfile:
-                wfmxfile.write(header.encode('utf8'))
-            # Check if a tmp digital samples file is present and delete it if necessary.
-            if os.path.isfile(tmp_path):
-                os.remove(tmp_path)
-
-        # append analog samples to the .WFMX file.
-        # Write digital samples in temporary file if not the entire samples are passed at once.
-        with open(wfmx_path, 'ab') as wfmxfile:
-            # append analog samples in binary format. One sample is 4 bytes (np.float32).
-            wfmxfile.write(analog_samples)
+                wfmxfile.write(header)
+                wfmxfile.truncate(file_size)
+            self.__wfmx_write_offsets[filename] = (len(header), 0)
+
+        try:
+            header_length, sample_offset = self.__wfmx_write_offsets[filename]
+        except KeyError:
+            self.log.error('Unable to append chunk to WFMX file "{0}". First chunk has not been '
+                           'written.'.format(filename))
+            return -1
+        chunk_length = len(analog_samples)
 
-        # Write digital samples to tmp file if chunkwise writing is used and it's not the last chunk
-        if not is_last_chunk and marker_bytes is not None:
-            with open(tmp_path, 'ab') as tmp_file:
-                tmp_file.write(marker_bytes)
-
-        # If this is the last chunk, write digital samples from tmp file to wfmx file (if present)
-        # and also append the currently passed digital samples to wfmx file.
-        # Read from tmp file in chunks of tmp_bytes_overhead in order to avoid too much memory
-        # overhead.
-        if is_last_chunk and marker_bytes is not None:
-            with open(wfmx_path, 'ab') as wfmxfile:
-                # Copy over digital samples from tmp file. Delete tmp file afterwards.
-                if os.path.isfile(tmp_path):
-                    with open(tmp_path, 'rb') as tmp_file:
-                        while True:
-                            tmp = tmp_file.read(tmp_bytes_overhead)
-                            if not tmp:
-                                break
-                            wfmxfile.write(tmp)
-                    os.remove(tmp_path)
-                # Append current digital samples array to wfmx file
+        with open(wfmx_path, 'r+b') as wfmxfile:
+            # write analog samples in binary format. One sample is 4 bytes (np.float32).
+            wfmxfile.seek(header_length + 4 * sample_offset)
+            wfmxfile.write(analog_samples)
+            # write marker samples behind all analog samples. One sample is 1 byte (np.uint8).
+            if marker_bytes is not None:
+                wfmxfile.seek(header_length + 4 * total_number_of_samples + sample_offset)
                 wfmxfile.write(marker_bytes)
-        return
+
+        if is_last_chunk:
+            del self.__wfmx_write_offsets[filename]
+        else:
+            self.__wfmx_write_offsets[filename] = (header_length, sample_offset + chunk_length)
+        return 0
 
     def _create_xml_header(self, number_of_samples, markers_active):
         """
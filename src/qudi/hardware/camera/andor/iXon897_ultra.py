@@ -144,6 +144,7 @@ class IxonUltra(CameraInterface):
     _trigger_mode = _default_trigger_mode
     _scans = 1 #TODO get from camera
     _acquiring = False
+    _last_read_image = 0
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -290,6 +291,25 @@ class IxonUltra(CameraInterface):
         self._cur_image = image_array
         return image_array
 
+    def get_new_frames(self):
+        """ Return all frames acquired since the last call from the circular buffer of the camera.
+
+        @return tuple(numpy array, int): stack of images and the number of frames overwritten in
+                                         the circular buffer before they could be read
+        """
+        if self._acquisition_mode != 'RUN_TILL_ABORT' or self._read_mode != 'IMAGE':
+            return super().get_new_frames()
+        first, last = self._get_number_new_images()
+        first = max(first, self._last_read_image + 1)
+        if last < first:
+            return np.empty((0, self._width, self._height)), 0
+        missed = max(0, first - self._last_read_image - 1)
+        # _get_images is only reliable for single images
+        frames = np.stack([np.reshape(self._get_images(index, index, 1), (self._width, self._height))
+                           for index in range(first, last + 1)])
+        self._last_read_image = last
+        return frames, missed
+
     def set_exposure(self, exposure):
         """ Set the exposure time in seconds
 
@@ -423,6 +443,8 @@ class IxonUltra(CameraInterface):
         return ERROR_DICT[error_code]
 
     def _start_acquisition(self):
+        # image indices of the circular buffer restart with every acquisition
+        self._last_read_image = 0
         error_code = self.dll.StartAcquisition()
         self.dll.WaitForAcquisition()
         return ERROR_DICT[error_code]
@@ -30,6 +30,7 @@ import numpy as np
 from qudi.util.helpers import natural_sort
 from qudi.core.configoption import ConfigOption
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.interface.pulser_interface import RunLengthWaveform
 
 
 class DTG5334(PulserInterface):
@@ -217,6 +218,8 @@ class DTG5334(PulserInterface):
             {'d_ch1', 'd_ch2', 'd_ch3', 'd_ch4', 'd_ch5', 'd_ch6', 'd_ch7', 'd_ch8'})
         constraints.activation_config = activation_conf
         constraints.sequence_option = SequenceOption.FORCED
+        # Run-length encoded digital samples are expanded channel by channel during the transfer
+        constraints.run_length_waveforms = True
         return constraints
 
     def pulser_on(self):
@@ -487,7 +490,7 @@ class DTG5334(PulserInterface):
                                     voltage samples.
         @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
                                      values are 1D numpy arrays of type bool containing the marker
-                                     states.
+                                     states. Can also be a RunLengthWaveform with the digital runs.
         @param bool is_first_chunk: Flag indicating if it is the first chunk to write.
                                     If True this method will create a new empty wavveform.
                                     If False the samples are appended to the existing waveform.
@@ -505,7 +508,12 @@ class DTG5334(PulserInterface):
             return -1, []
 
         min_samples = 960
-        longest_channel = max([len(v) for k, v in digital_samples.items()])
+        if isinstance(digital_samples, RunLengthWaveform):
+            digital_channels = digital_samples.digital_channels
+            longest_channel = digital_samples.number_of_samples
+        else:
+            digital_channels = set(digital_samples)
+            longest_channel = max([len(v) for k, v in digital_samples.items()])
         print('Loading block with', longest_channel, 'samples')
         if longest_channel < min_samples:
             self.log.error('Minimum waveform length for DTG5334 series is {0} samples.\n'
@@ -520,12 +528,12 @@ class DTG5334(PulserInterface):
         print(active_digital)
 
         # Sanity check of channel numbers
-        if set(active_digital) != set(digital_samples.keys()):
+        if set(active_digital) != digital_channels:
             self.log.error(
                 'Mismatch of channel activation and sample array dimensions for direct '
                 'write.\nChannel activation is: {}.\n'
                 'Sample arrays have: {}.'
-                ''.format(active_digital, list(digital_samples.keys())))
+                ''.format(active_digital, list(digital_channels)))
             return -1, []
 
         self._block_new(name, longest_channel)
@@ -694,8 +702,14 @@ class DTG5334(PulserInterface):
         written = []
         self.dtg.write('BLOC:SEL "{0}"'.format(name))
 
-        for ch, data in sorted(digital_samples.items()):
-            written.append(self._channel_write_binary(ch, data))
+        if isinstance(digital_samples, RunLengthWaveform):
+            # expand only one channel at a time
+            for ch in sorted(digital_samples.digital_channels):
+                run_lengths, states = digital_samples.merged_digital_runs([ch])
+                written.append(self._channel_write_binary(ch, np.repeat(states[ch], run_lengths)))
+        else:
+            for ch, data in sorted(digital_samples.items()):
+                written.append(self._channel_write_binary(ch, data))
 
         self.dtg.query('*OPC?')
         return written
@@ -41,6 +41,7 @@ class CameraDummy(CameraInterface):
             # resolution: (1280, 720)
             exposure: 0.1
             gain: 1.0
+            frame_buffer_size: 16  # number of live frames kept until read
     """
 
     _support_live = ConfigOption('support_live', True)
@@ -51,6 +52,11 @@ class CameraDummy(CameraInterface):
     _acquiring = False
     _exposure = ConfigOption('exposure', .1)
     _gain = ConfigOption('gain', 1.)
+    _frame_buffer_size = ConfigOption('frame_buffer_size', 16)
+
+    _live_start = 0
+    _frames_read = 0
+    _frame_bank = None
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -91,6 +97,8 @@ class CameraDummy(CameraInterface):
         if self._support_live:
             self._live = True
             self._acquiring = False
+            self._live_start = time.perf_counter()
+            self._frames_read = 0
 
     def start_single_acquisition(self):
         """ Start a single acquisition
@@ -123,6 +131,24 @@ class CameraDummy(CameraInterface):
         data = np.random.random(self._resolution)*self._exposure*self._gain
         return data.transpose()
 
+    def get_new_frames(self):
+        """ Return all frames acquired since the last call during a live acquisition, oldest first.
+        Frames are taken every exposure time. Only the last frame_buffer_size frames are kept.
+
+        @return tuple(numpy array, int): stack of images and the number of frames discarded
+        """
+        if not self._live:
+            return super().get_new_frames()
+        if self._frame_bank is None or self._frame_bank.shape[1:] != tuple(self._resolution)[::-1]:
+            # generating random images at high frame rates is too slow, so cycle through a few
+            self._frame_bank = np.random.random((8, *self._resolution)).transpose(0, 2, 1).copy()
+        produced = int((time.perf_counter() - self._live_start) / self._exposure)
+        new = produced - self._frames_read
+        missed = max(0, new - self._frame_buffer_size)
+        indices = np.arange(self._frames_read + missed, produced) % len(self._frame_bank)
+        self._frames_read = produced
+        return self._frame_bank[indices] * self._exposure * self._gain, missed
+
     def set_exposure(self, exposure):
         """ Set the exposure time in seconds
 
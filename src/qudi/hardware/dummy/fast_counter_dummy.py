@@ -26,6 +26,7 @@ import numpy as np
 
 from qudi.core.configoption import ConfigOption
 from qudi.interface.fast_counter_interface import FastCounterInterface
+from qudi.util.histogram_buffer import HistogramBuffer
 
 
 class FastCounterDummy(FastCounterInterface):
@@ -38,12 +39,26 @@ class FastCounterDummy(FastCounterInterface):
         options:
             gated: False
             #load_trace: None # path to the saved dummy trace
-
+            #synthesize_trace: False # accumulate laser pulses instead of loading the trace
+            #laser_pulses: 10 # number of laser pulses per record (ungated) or gates (gated)
+            #laser_length: 3e-6 # length of each laser pulse in s
+            #count_rate: 2e5 # fluorescence count rate at the start of each laser pulse in 1/s
+            #dark_count_rate: 1e3 # background count rate in 1/s
+            #sweeps_per_update: 1000 # sweeps accumulated per call to get_data_trace
+
+    With synthesize_trace the timetrace is accumulated in place in a memory-mapped
+    HistogramBuffer, also available through get_histogram_buffer.
     """
 
     # config option
     _gated = ConfigOption('gated', False, missing='warn')
     trace_path = ConfigOption('load_trace', None)
+    _synthesize_trace = ConfigOption('synthesize_trace', False)
+    _laser_pulses = ConfigOption('laser_pulses', 10)
+    _laser_length = ConfigOption('laser_length', 3e-6)
+    _count_rate = ConfigOption('count_rate', 2e5)
+    _dark_count_rate = ConfigOption('dark_count_rate', 1e3)
+    _sweeps_per_update = ConfigOption('sweeps_per_update', 1000)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -60,12 +75,19 @@ class FastCounterDummy(FastCounterInterface):
         self.statusvar = 0
         self._binwidth = 1
         self._gate_length_bins = 8192
+        self._number_of_gates = 0
+        self._histogram_buffer = None
+        self._increments = list()
+        self._update_index = 0
         return
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
         self.statusvar = -1
+        if self._histogram_buffer is not None:
+            self._histogram_buffer.close()
+            self._histogram_buffer = None
         return
 
     def get_constraints(self):
@@ -129,9 +151,63 @@ class FastCounterDummy(FastCounterInterface):
         self._gate_length_bins = int(np.rint(record_length_s / bin_width_s))
         actual_binwidth = self._binwidth * 1000 / 950e9
         actual_length = self._gate_length_bins * actual_binwidth
+        self._number_of_gates = number_of_gates
+        if self._synthesize_trace:
+            self._init_synthesized_trace()
         self.statusvar = 1
         return actual_binwidth, actual_length, number_of_gates
 
+    def _init_synthesized_trace(self):
+        """ Allocate the histogram buffer and precompute the counts added per update.
+
+        Each laser pulse starts with count_rate and decays to 70 % of it (100 ns time constant).
+        Ungated records contain laser_pulses equally spaced pulses, gated records one pulse per
+        gate.
+        """
+        if self._histogram_buffer is not None:
+            self._histogram_buffer.close()
+        if self._gated:
+            number_of_gates = self._number_of_gates if self._number_of_gates else self._laser_pulses
+            shape = (number_of_gates, self._gate_length_bins)
+        else:
+            shape = (self._gate_length_bins,)
+        self._histogram_buffer = HistogramBuffer.create(shape)
+
+        # expected counts per bin and sweep
+        bin_width = self.get_binwidth()
+        times = np.arange(self._gate_length_bins) * bin_width
+        rate = np.full(self._gate_length_bins, self._dark_count_rate, dtype=float)
+        if self._gated:
+            starts = [0.1 * self._gate_length_bins * bin_width]
+        else:
+            period = self._gate_length_bins * bin_width / self._laser_pulses
+            starts = np.arange(self._laser_pulses) * period + 0.1 * period
+        for start in starts:
+            in_pulse = (times >= start) & (times < start + self._laser_length)
+            decay = np.exp(-(times[in_pulse] - start) / 100e-9)
+            rate[in_pulse] += self._count_rate * (0.7 + 0.3 * decay)
+        expected = np.broadcast_to(rate * bin_width * self._sweeps_per_update, shape)
+
+        # alternate between a few noise realizations to accumulate in place without allocations
+        rng = np.random.default_rng()
+        self._increments = [rng.poisson(expected).astype('int32') for _ in range(2)]
+        self._update_index = 0
+        return
+
+    def _update_synthesized_trace(self):
+        """ Accumulate sweeps_per_update sweeps into the histogram buffer while running. """
+        if self.statusvar != 2 or not self._increments:
+            return
+        buffer = self._histogram_buffer
+        sweeps = (buffer.elapsed_sweeps or 0) + self._sweeps_per_update
+        record_length = self._gate_length_bins * self.get_binwidth()
+        if self._gated:
+            record_length *= buffer.shape[0]
+        with buffer.writing(elapsed_sweeps=sweeps, elapsed_time=sweeps * record_length) as hist:
+            hist += self._increments[self._update_index]
+        self._update_index = (self._update_index + 1) % len(self._increments)
+        return
+
 
     def get_status(self):
         """ Receives the current status of the Fast Counter and outputs it as
@@ -148,6 +224,11 @@ class FastCounterDummy(FastCounterInterface):
     def start_measure(self):
         time.sleep(1)
         self.statusvar = 2
+        if self._synthesize_trace:
+            if self._histogram_buffer is None:
+                self._init_synthesized_trace()
+            self._histogram_buffer.clear()
+            return 0
         try:
             self._count_data = np.loadtxt(self.trace_path, dtype='int64')
         except:
@@ -217,12 +298,27 @@ class FastCounterDummy(FastCounterInterface):
 
         If the hardware does not support these features, the values should be None
         """
+        if self._synthesize_trace and self._histogram_buffer is not None:
+            self._update_synthesized_trace()
+            count_data, info_dict = self._histogram_buffer.snapshot()
+            del info_dict['sequence']
+            return count_data, info_dict
 
         # include an artificial waiting time
         time.sleep(0.5)
         info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
         return self._count_data, info_dict
 
+    def get_histogram_buffer(self):
+        """ Memory-mapped buffer the synthesized timetrace is accumulated into.
+
+        @return HistogramBuffer: buffer with the current timetrace, None without synthesize_trace
+        """
+        if not self._synthesize_trace:
+            return None
+        self._update_synthesized_trace()
+        return self._histogram_buffer
+
     def get_frequency(self):
         freq = 950.
         time.sleep(0.5)
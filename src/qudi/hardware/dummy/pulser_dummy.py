@@ -31,6 +31,7 @@ from qudi.util.datastorage import get_timestamp_filename, create_dir_for_file
 from qudi.util.helpers import natural_sort
 from qudi.util.yaml import yaml_dump
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.interface.pulser_interface import RunLengthWaveform
 
 
 class PulserDummy(PulserInterface):
@@ -44,12 +45,24 @@ class PulserDummy(PulserInterface):
 
     pulser_dummy:
         module.Class: 'pulser_dummy.PulserDummy'
+        options:
+            # optional synthetic transfer speed profile to emulate the upload of a real device
+            transfer_speed_profile:
+                write_overhead: 5e-3  # s per write_waveform call
+                write_speed: 200e6  # samples/s per waveform
+                load_overhead: 1e-3  # s per load_waveform call
+                load_speed: 2e9  # samples/s
+                jitter: 0.05  # relative standard deviation of the transfer times
+                outlier_probability: 0.05  # probability of an additional delay
+                outlier_factor: 5  # transfer time factor of delayed transfers
 
     """
 
     activation_config = StatusVar(default=None)
     force_sequence_option = ConfigOption('force_sequence_option', default=False)
     save_samples = ConfigOption('save_samples', default=False)
+    run_length_waveforms = ConfigOption('run_length_waveforms', default=False)
+    transfer_speed_profile = ConfigOption('transfer_speed_profile', default=None)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -84,6 +97,10 @@ class PulserDummy(PulserInterface):
 
         self.current_status = 0    # that means off, not running.
 
+        # Number of samples per written waveform and random generator for the transfer profile
+        self._waveform_lengths = dict()
+        self._transfer_rng = numpy.random.default_rng()
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -227,6 +244,7 @@ class PulserDummy(PulserInterface):
         constraints.activation_config = activation_config
 
         constraints.sequence_option = SequenceOption.FORCED if self.force_sequence_option else SequenceOption.OPTIONAL
+        constraints.run_length_waveforms = bool(self.run_length_waveforms)
 
         return constraints
 
@@ -282,6 +300,10 @@ class PulserDummy(PulserInterface):
         """
         waveforms = list()
 
+        # Digital runs passed on by write_run_length_waveform
+        if isinstance(digital_samples, RunLengthWaveform):
+            digital_samples = digital_samples.expand()[1]
+
         # Sanity checks
         if len(analog_samples) > 0:
             number_of_samples = len(analog_samples[list(analog_samples)[0]])
@@ -309,15 +331,22 @@ class PulserDummy(PulserInterface):
         # Simulate a 1Gbit/s transfer speed. Assume each analog waveform sample is 5 bytes large
         # (4 byte float and 1 byte marker bitmask). Assume each digital waveform sample is 1 byte.
 
+        # A configured transfer_speed_profile replaces the 1Gbit/s transfer.
+        if self.transfer_speed_profile:
+            channels = analog_samples if len(analog_samples) > 0 else digital_samples
+            self._simulate_transfer('write', number_of_samples * len(channels))
+
         if not self.save_samples:
             if len(analog_samples) > 0:
                 for chnl in analog_samples:
                     waveforms.append(name + chnl[1:])
-                    time.sleep(number_of_samples * 5 * 8 / 1024 ** 3)
+                    if not self.transfer_speed_profile:
+                        time.sleep(number_of_samples * 5 * 8 / 1024 ** 3)
             else:
                 for chnl in digital_samples:
                     waveforms.append(name + chnl[1:])
-                    time.sleep(number_of_samples * 8 / 1024 ** 3)
+                    if not self.transfer_speed_profile:
+                        time.sleep(number_of_samples * 8 / 1024 ** 3)
         else:
             dt = datetime.datetime.now()
 
@@ -344,10 +373,50 @@ class PulserDummy(PulserInterface):
             self.log.debug(f'Saving {name} took {datetime.datetime.now() - dt}')
 
         self.waveform_set.update(waveforms)
+        for waveform in waveforms:
+            if is_first_chunk:
+                self._waveform_lengths[waveform] = 0
+            self._waveform_lengths[waveform] = self._waveform_lengths.get(waveform, 0) + \
+                number_of_samples
 
         self.log.info('Waveforms with nametag "{0}" directly written on dummy pulser.'.format(name))
         return number_of_samples, waveforms
 
+    def write_run_length_waveform(self, name, waveform):
+        """
+        Write a new waveform given as run-length encoded RunLengthWaveform instance on the device
+        memory.
+
+        @param str name: the name of the waveform to be created
+        @param RunLengthWaveform waveform: the run-length encoded waveform to write
+
+        @return (int, list): Number of samples written (-1 indicates failed process) and list of
+                             created waveform names
+        """
+        # Samples need to be expanded anyway in order to save them to file
+        if self.save_samples:
+            return super().write_run_length_waveform(name, waveform)
+
+        if waveform.analog_channels:
+            channels = waveform.analog_channels
+        elif waveform.digital_channels:
+            channels = waveform.digital_channels
+        else:
+            self.log.error('No analog or digital channels in run-length waveform passed to dummy '
+                           'pulser.')
+            return -1, list()
+
+        # Simulate a 1Gbit/s transfer speed. Assume each run is 8 bytes (run length) plus 1 byte
+        # per channel state.
+        waveforms = [name + chnl[1:] for chnl in natural_sort(channels)]
+        bytes_per_run = 8 + len(waveform.analog_channels) + len(waveform.digital_channels)
+        time.sleep(waveform.number_of_runs * bytes_per_run * 8 / 1024 ** 3)
+
+        self.waveform_set.update(waveforms)
+        self.log.info('Run-length encoded waveforms with nametag "{0}" directly written on dummy '
+                      'pulser.'.format(name))
+        return waveform.number_of_samples, waveforms
+
     def write_sequence(self, name, sequence_parameter_list):
         """
         Write a new sequence on the device memory.
@@ -496,6 +565,9 @@ class PulserDummy(PulserInterface):
                                    ''.format(channel))
                     return self.current_loaded_assets
             new_loaded_assets[channel] = waveform
+        if self.transfer_speed_profile:
+            self._simulate_transfer('load', sum(self._waveform_lengths.get(waveform, 0)
+                                                for waveform in new_loaded_assets.values()))
         self.current_loaded_assets = new_loaded_assets
         return self.get_loaded_assets()[0]
 
@@ -959,6 +1031,20 @@ class PulserDummy(PulserInterface):
                       'complicated for me :D !'.format(question))
         return 'I am a dummy!'
 
+    def _simulate_transfer(self, task, number_of_samples):
+        """ Sleep for the duration of a transfer according to the transfer_speed_profile.
+
+        @param str task: 'write' or 'load'
+        @param int number_of_samples: number of samples transferred (summed over all waveforms)
+        """
+        profile = self.transfer_speed_profile
+        duration = profile.get(task + '_overhead', 0) + \
+            number_of_samples / profile.get(task + '_speed', numpy.inf)
+        duration *= max(1 + profile.get('jitter', 0) * self._transfer_rng.standard_normal(), 0)
+        if self._transfer_rng.random() < profile.get('outlier_probability', 0):
+            duration *= profile.get('outlier_factor', 1)
+        time.sleep(duration)
+
     def reset(self):
         """ Reset the device.
 
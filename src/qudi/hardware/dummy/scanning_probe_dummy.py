@@ -31,6 +31,7 @@ from qudi.util.constraints import ScalarConstraint
 from qudi.interface.scanning_probe_interface import (
     ScanningProbeInterface,
     ScanData,
+    ScanDataSlab,
     ScanConstraints,
     ScannerAxis,
     ScannerChannel,
@@ -785,6 +786,19 @@ class ScanningProbeDummyBare(ScanningProbeInterface):
                 return None
             return self._back_scan_data.copy()
 
+    def get_scan_data_slab(self, line_start: int = 0) -> Optional[ScanDataSlab]:
+        """Retrieve the scan data lines acquired since slow axis line <line_start>."""
+        with self._thread_lock:
+            if self._scan_data is None:
+                return None
+            line_stop = -(-self.__last_forward_pixel // self._scan_data.settings.resolution[0])
+            if self._back_scan_data is not None:
+                back_line_stop = -(-self.__last_backward_pixel // self._back_scan_data.settings.resolution[0])
+                line_stop = max(line_stop, back_line_stop)
+            return ScanDataSlab.from_scan_data(
+                self._scan_data, self._back_scan_data, line_start, max(line_start, line_stop)
+            )
+
     def __start_timer(self):
         """
         Offload __update_timer.start() from the caller to the module's thread.
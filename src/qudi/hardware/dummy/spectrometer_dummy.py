@@ -19,6 +19,7 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+from qudi.core.configoption import ConfigOption
 from qudi.interface.spectrometer_interface import SpectrometerInterface
 
 from time import strftime, localtime
@@ -36,9 +37,13 @@ class SpectrometerDummy(SpectrometerInterface):
 
     spectrometer_dummy:
         module.Class: 'spectrometer.spectrometer_dummy.SpectrometerInterfaceDummy'
+        options:
+            exposure_time: 0.5 # optional, initial simulated exposure time in seconds
 
     """
 
+    _initial_exposure = ConfigOption(name='exposure_time', default=0.5, missing='nothing')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._exposure = 0.5
@@ -46,7 +51,7 @@ class SpectrometerDummy(SpectrometerInterface):
     def on_activate(self):
         """ Activate module.
         """
-        pass
+        self._exposure = float(self._initial_exposure)
 
     def on_deactivate(self):
         """ Deactivate module.
@@ -29,6 +29,7 @@ import numpy as np
 
 from qudi.core.configoption import ConfigOption
 from qudi.interface.fast_counter_interface import FastCounterInterface
+from qudi.util.histogram_buffer import HistogramBuffer
 
 
 """
@@ -185,7 +186,15 @@ class FastComtec(FastCounterInterface):
         #this variable has to be added because there is no difference
         #in the fastcomtec it can be on "stopped" or "halt"
         self.stopped_or_halt = "stopped"
-        self.timetrace_tmp = []
+        # persistent DLL target (uint32) and int64 accumulation buffers, reused by every readout
+        self._dll_buffer = None
+        self._dll_pointer = None
+        self._histogram_buffer = None
+        # running offset of a paused gated measurement (restarted by continue_measure)
+        self._offset = None
+        self._offset_sweeps = 0
+        self._offset_time = 0.
+        self._last_sweeps = None
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -201,6 +210,11 @@ class FastComtec(FastCounterInterface):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._histogram_buffer is not None:
+            self._histogram_buffer.close()
+            self._histogram_buffer = None
+        self._dll_buffer = None
+        self._dll_pointer = None
         return
 
     def get_constraints(self):
@@ -280,6 +294,7 @@ class FastComtec(FastCounterInterface):
             self.set_length(no_of_bins)
 
         self.set_cycles(number_of_gates)
+        self._reset_offset()
 
         return self.get_binwidth(), self.get_length() * self.get_binwidth(), number_of_gates
 
@@ -316,6 +331,7 @@ class FastComtec(FastCounterInterface):
 
     def start_measure(self):
         """Start the measurement. """
+        self._last_sweeps = None
         status = self.dll.Start(0)
         while self.get_status() != 2:
             time.sleep(0.05)
@@ -327,8 +343,7 @@ class FastComtec(FastCounterInterface):
         status = self.dll.Halt(0)
         while self.get_status() != 1:
             time.sleep(0.05)
-        if self.gated:
-            self.timetrace_tmp = []
+        self._reset_offset()
         return status
 
     def pause_measure(self):
@@ -339,7 +354,13 @@ class FastComtec(FastCounterInterface):
             time.sleep(0.05)
 
         if self.gated:
-            self.timetrace_tmp = self.get_data_trace()
+            # the gated measurement is restarted on continue, keep the counts as running offset
+            buffer = self._read_histogram(force=True)
+            if self._offset is None or self._offset.shape != buffer.shape:
+                self._offset = np.empty(buffer.shape, dtype='int64')
+            np.copyto(self._offset, buffer.histogram)
+            self._offset_sweeps = buffer.elapsed_sweeps
+            self._offset_time = buffer.elapsed_time
         return status
 
     def continue_measure(self):
@@ -380,42 +401,91 @@ class FastComtec(FastCounterInterface):
         If the counter is UNgated it will return a 1D-numpy-array with returnarray[timebin_index]
         If the counter is gated it will return a 2D-numpy-array with returnarray[gate_index, timebin_index]
 
+        The returned array is a view of the persistent accumulation buffer and is overwritten by
+        the next readout. Copy it to keep it.
+
           @return arrray: Time trace.
         """
-        setting = AcqSettings()
-        self.dll.GetSettingData(ctypes.byref(setting), 0)
-        N = setting.range
+        buffer = self._read_histogram()
+        info_dict = {'elapsed_sweeps': buffer.elapsed_sweeps,
+                     'elapsed_time': buffer.elapsed_time}
+        return buffer.histogram, info_dict
 
-        status = AcqStatus()
-        self.dll.GetStatusData(ctypes.byref(status), 0)
-        elapsed_sweeps = status.stevents
-        elapsed_time = status.runtime
+    def get_histogram_buffer(self):
+        """ Memory-mapped buffer holding the current timetrace. The card is read out only if
+        new sweeps have arrived since the last readout, otherwise only the elapsed time of the
+        buffer is updated (its histogram and sequence number stay unchanged).
 
-        info_dict = {'elapsed_sweeps': elapsed_sweeps,
-                     'elapsed_time': elapsed_time}
+        @return HistogramBuffer: buffer with the current timetrace
+        """
+        return self._read_histogram()
 
-        if self.is_gated():
-            bsetting=BOARDSETTING()
-            self.dll.GetMCSSetting(ctypes.byref(bsetting), 0)
-            H = bsetting.cycles
-            if H==0:
-                H=1
-            data = np.empty((H, int(N / H)), dtype=np.uint32)
+    def _read_histogram(self, force=False):
+        """ Read the histogram from the card into the persistent buffers.
 
-        else:
-            data = np.empty((N,), dtype=np.uint32)
+        The DLL writes into a persistent uint32 array, which is converted in place into the int64
+        histogram buffer (adding the running offset of a paused gated measurement).
 
-        p_type_ulong = ctypes.POINTER(ctypes.c_uint32)
-        ptr = data.ctypes.data_as(p_type_ulong)
-        self.dll.LVGetDat(ptr, 0)
-        time_trace = np.int64(data)
+        @param bool force: read out the card even if no new sweeps have arrived
 
-        if self.gated and self.timetrace_tmp != []:
-            time_trace = time_trace + self.timetrace_tmp
+        @return HistogramBuffer: buffer with the current timetrace
+        """
+        setting = AcqSettings()
+        self.dll.GetSettingData(ctypes.byref(setting), 0)
+        N = setting.range
+        if self.is_gated():
+            bsetting = BOARDSETTING()
+            self.dll.GetMCSSetting(ctypes.byref(bsetting), 0)
+            H = max(bsetting.cycles, 1)
+            shape = (H, N // H)
+        else:
+            shape = (N,)
 
-        info_dict = {'elapsed_sweeps': elapsed_sweeps,
-                     'elapsed_time': elapsed_time}
-        return time_trace, info_dict
+        status = AcqStatus()
+        self.dll.GetStatusData(ctypes.byref(status), 0)
+        elapsed_sweeps = int(status.stevents) + self._offset_sweeps
+        elapsed_time = status.runtime + self._offset_time
+
+        buffer = self._get_buffers(N, shape)
+        if not force and elapsed_sweeps == self._last_sweeps:
+            # the histogram is unchanged, but the measurement time keeps running
+            buffer.set_elapsed_time(elapsed_time)
+            return buffer
+
+        self.dll.LVGetDat(self._dll_pointer, 0)
+        data = self._dll_buffer[:buffer.histogram.size].reshape(shape)
+        with buffer.writing(elapsed_sweeps=elapsed_sweeps, elapsed_time=elapsed_time) as histogram:
+            if self._offset is not None and self._offset.shape == shape:
+                np.add(self._offset, data, out=histogram)
+            else:
+                np.copyto(histogram, data)
+        self._last_sweeps = elapsed_sweeps
+        return buffer
+
+    def _get_buffers(self, number_of_bins, shape):
+        """ (Re-)allocate the DLL target and histogram buffers if the dimensions changed.
+
+        @param int number_of_bins: number of bins written by the DLL
+        @param tuple shape: shape of the timetrace
+
+        @return HistogramBuffer: buffer with the given shape
+        """
+        if self._dll_buffer is None or self._dll_buffer.size != number_of_bins:
+            self._dll_buffer = np.zeros(number_of_bins, dtype=np.uint32)
+            self._dll_pointer = self._dll_buffer.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32))
+            self._last_sweeps = None
+        if self._histogram_buffer is None or self._histogram_buffer.shape != shape:
+            if self._histogram_buffer is not None:
+                self._histogram_buffer.close()
+            self._histogram_buffer = HistogramBuffer.create(shape)
+            self._last_sweeps = None
+        return self._histogram_buffer
+
+    def _reset_offset(self):
+        self._offset = None
+        self._offset_sweeps = 0
+        self._offset_time = 0.
+        self._last_sweeps = None
 
 
     # =========================================================================
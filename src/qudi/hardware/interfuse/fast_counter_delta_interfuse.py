@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Interfuse wrapping any fast counter to transfer its timetraces as compressed differences, e.g. to
+a PulsedMeasurementLogic running on another computer via a qudi remote module connection.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from qudi.core.configoption import ConfigOption
+from qudi.core.connector import Connector
+from qudi.util.mutex import Mutex
+from qudi.util.histogram_transfer import HistogramDeltaEncoder
+from qudi.interface.fast_counter_interface import FastCounterInterface
+
+
+class FastCounterDeltaInterfuse(FastCounterInterface):
+    """
+    Passes all calls on to the connected fast counter. In addition, get_data_trace_delta returns
+    the timetrace as compressed difference to the previously transferred one, which is rebuilt by
+    a qudi.util.histogram_transfer.HistogramDeltaDecoder on the receiving side. The
+    PulsedMeasurementLogic uses it automatically if the connected fast counter provides
+    get_data_trace_delta.
+
+    Run this module on the computer of the fast counter and connect the logic to it remotely.
+
+    Example config for copy-paste:
+
+    fast_counter_delta:
+        module.Class: 'interfuse.fast_counter_delta_interfuse.FastCounterDeltaInterfuse'
+        allow_remote: True
+        options:
+            compression: 'zlib'  # optional, 'none', 'zlib', 'lz4' (package lz4) or 'zstd' (package zstandard)
+            compression_level: 1  # optional
+        connect:
+            fastcounter: 'fastcounter_dummy'
+    """
+
+    _fastcounter = Connector(name='fastcounter', interface='FastCounterInterface')
+
+    _compression = ConfigOption(name='compression', default='zlib')
+    _compression_level = ConfigOption(name='compression_level', default=None)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoder = None
+        self._thread_lock = Mutex()
+
+    def on_activate(self):
+        self._encoder = HistogramDeltaEncoder(compression=self._compression,
+                                              level=self._compression_level)
+
+    def on_deactivate(self):
+        self._encoder = None
+
+    def get_constraints(self):
+        return self._fastcounter().get_constraints()
+
+    def configure(self, bin_width_s, record_length_s, number_of_gates=0):
+        return self._fastcounter().configure(bin_width_s, record_length_s, number_of_gates)
+
+    def get_status(self):
+        return self._fastcounter().get_status()
+
+    def start_measure(self):
+        return self._fastcounter().start_measure()
+
+    def stop_measure(self):
+        return self._fastcounter().stop_measure()
+
+    def pause_measure(self):
+        return self._fastcounter().pause_measure()
+
+    def continue_measure(self):
+        return self._fastcounter().continue_measure()
+
+    def is_gated(self):
+        return self._fastcounter().is_gated()
+
+    def get_binwidth(self):
+        return self._fastcounter().get_binwidth()
+
+    def get_data_trace(self):
+        return self._fastcounter().get_data_trace()
+
+    def get_data_trace_delta(self, decoder_sequence=None):
+        """ Polls the current timetrace data from the fast counter and encodes it as difference to
+        the timetrace sent before.
+
+        @param int decoder_sequence: sequence number of the last packet applied by the receiver
+                                     (HistogramDeltaDecoder.sequence). A full timetrace is sent if
+                                     it does not match the last packet sent.
+
+        @return tuple(tuple, int, float): packet for HistogramDeltaDecoder.decode, elapsed sweeps
+                                          and elapsed time (None if not supported by the hardware)
+        """
+        data = self._fastcounter().get_data_trace()
+        if isinstance(data, tuple) and len(data) == 2:
+            data, info_dict = data
+        else:
+            info_dict = dict()
+        if not isinstance(info_dict, dict):
+            info_dict = dict()
+        with self._thread_lock:
+            packet = self._encoder.encode(data, decoder_sequence)
+        # builtin types only, so that the result is transferred by value to remote callers
+        elapsed_sweeps = info_dict.get('elapsed_sweeps')
+        elapsed_time = info_dict.get('elapsed_time')
+        return (packet,
+                None if elapsed_sweeps is None else int(elapsed_sweeps),
+                None if elapsed_time is None else float(elapsed_time))
@@ -36,7 +36,14 @@ class Lecroy(ScopeInterface):
     getDataBytes(channel="C1", block="DAT1"): binary data download, 8-bit
     getDataWords(channel="C1", block="DAT1"): binary data download, 16-bit
     getDataFloats(channel="C1", block="DAT1"): unit, vertical data (downloads 16-bit binary)
+    getSegmentFloats(channels=("C1",), block="DAT1"): unit, vertical data of sequence mode
+        segments for several channels
     getHorProperties(channel="C1") : returns (unit, offset, interval) in time dir. 
+    clearVerticalCache(channel=None) : forget cached vertical gain, offset and unit
+
+    Vertical gain, offset and unit are cached per channel. The cache of a channel is cleared
+    whenever a setting command for that channel is sent through send(). Call clearVerticalCache
+    after changing channel settings on the front panel.
 
     Example config for copy-paste:
 
@@ -64,6 +71,10 @@ class Lecroy(ScopeInterface):
 
         #locking for thread safety
         self.threadlock = Mutex()
+        # cached (VERTUNIT, VERTICAL_GAIN, VERTICAL_OFFSET) per channel
+        self._vertical_cache = dict()
+        # current data format set by CFMT
+        self._comm_format = None
 
 
     def on_activate(self):
@@ -117,6 +128,47 @@ class Lecroy(ScopeInterface):
                 raise RuntimeError("could not write the data block, returned {}".format(xferd))
             byteindx += xferd
 
+        # a new channel setting invalidates the cached vertical properties of that channel
+        prefix, sep, _ = message.partition(":")
+        if sep and "?" not in message:
+            self._vertical_cache.pop(prefix.strip().upper(), None)
+
+    def clearVerticalCache(self, channel=None):
+        """ Forget the cached vertical gain, offset and unit of channel (or of all channels
+        if channel is None), e.g. after channel settings were changed on the front panel.
+        """
+        if channel is None:
+            self._vertical_cache.clear()
+        else:
+            self._vertical_cache.pop(channel.upper(), None)
+
+    def __setCommFormat(self, comm_format):
+        """ Set the data format for waveform transfers (CFMT) unless already set.
+        Gain and offset depend on the format, so the cache is cleared on changes.
+        """
+        if comm_format != self._comm_format:
+            self.send("CFMT {}".format(comm_format))
+            self.send("CORD LO") #<LSB><MSB>
+            self._comm_format = comm_format
+            self._vertical_cache.clear()
+
+    def __recvExact(self, length):
+        """ Receive exactly length bytes from socket LeCroy.s
+        """
+        buffer = bytearray(length)
+        self.__recvInto(memoryview(buffer))
+        return bytes(buffer)
+
+    def __recvInto(self, view):
+        """ Fill the writable memoryview from socket LeCroy.s without intermediate copies
+        """
+        received = 0
+        while received < len(view):
+            xferd = self.s.recv_into(view[received:])
+            if xferd == 0:
+                raise ConnectionError("connection closed by the oscilloscope")
+            received += xferd
+
 
     def __translate(self, data):
         """ Takes the device header (data) and finds the flag and data length 
@@ -135,7 +187,7 @@ class Lecroy(ScopeInterface):
         Receive a 8-byte header from socket LeCroy.s
         translate it and return the (eofflag, datalen)
         """
-        data = self.s.recv(8)
+        data = self.__recvExact(8)
         return self.__translate(data)
 
     def readAll(self):
@@ -143,12 +195,11 @@ class Lecroy(ScopeInterface):
         1) Get header from device (flag, len)
         2) receive len bytes and decode it
         returns the flag of the last transmission frame and complete data string in ascii
-        NB! assumes all data frame transfers can be done in one go
         """
         dtstr = ""
         while True:
             flg, lnt = self.__getHeader() # find how 
-            dtstr += self.s.recv(lnt).decode('ascii') # gather data
+            dtstr += self.__recvExact(lnt).decode('ascii') # gather data
             if flg != self.LECROY_DATA_FLAG: # data flag 0x80
                 break
         return flg, dtstr
@@ -162,23 +213,20 @@ class Lecroy(ScopeInterface):
         data type "DAT1" for first block or "DAT2" for second (special, look at doc.)
         returns list of values in 8-bit signed precision
         """
-        self.send("CFMT DEF9,BYTE,BIN") # by 1 byte, binary
+        self.__setCommFormat("DEF9,BYTE,BIN") # by 1 byte, binary
         # gets all the data of specified block on specified channel (waveform)
         self.send("{}:WF? {}".format(channel, block)) 
-        self.s.recv(38) # two data lines with headers 2*(8+11) characters
+        self.__recvExact(38) # two data lines with headers 2*(8+11) characters
         dta = b""
         while True:
-            dta1 = b""
             flg, aln = self.__getHeader()
             if flg != self.LECROY_DATA_FLAG:
-                en = self.s.recv(aln)
+                en = self.__recvExact(aln)
                 if en != b'\n':
                     print("unexpected return, instead newline got {} \n next length was {}, flag {}".format(en, aln, flg))
                 break
             # loop until all aln data is transferred
-            while len(dta1) < aln:
-                dta1 += self.s.recv(aln-len(dta1))
-            dta += dta1
+            dta += self.__recvExact(aln)
         #aa = [struct.unpack("b", ov) for ov in dta]
         aa = [iup for iup in struct.iter_unpack("b", dta)]
         return aa
@@ -186,57 +234,81 @@ class Lecroy(ScopeInterface):
     
     def getDataWords(self, channel="C1", block="DAT1"):
         """
-        return data in tuple of word values (-32768 to 32767)
+        return data in numpy array of word values (-32768 to 32767)
         Reads header, and double checks:
         1: that the data stream ended correctly (!LECROY_DATA_FLAG flag with "\n" end),
         2: length of the byte vector matches the specified length in the header
         channel : "C1" or "C2"
         block : "DAT1" (mostly), or "DAT2"
         
-        returns list of values (16-bit signed)
+        returns numpy array of values (16-bit signed)
         """
 
-        self.send("CFMT DEF9,WORD,BIN") # by 2-byte word
+        self.__setCommFormat("DEF9,WORD,BIN") # by 2-byte word
         self.send("{}:WF? {}".format(channel, block)) # gets all the data on C2 waveform data
-        self.send("CORD LO") #<LSB><MSB> 
         # rethead : first 10 bytes ascii string (like response)
         # followed by #9 xxxx xxxxx where x are 9 numbers to give len. of bin. blck
         # so ... #9002000004 means 2000004 bytes in binary array
         # or in our (2-byte word) case 1 000 002 numbers
-        rethead = self.s.recv(38) # two data lines with headers 2*(8+11) characters
+        rethead = self.__recvExact(38) # two data lines with headers 2*(8+11) characters
         
         if rethead[-11:-9] != b'#9':
             # we are not in a correct place, abort!
             raise RuntimeError("incorrectly returned header")
-        # get the number of bytes expected by conv to str, lstrip leading 0
-        exp_bytes = int(rethead[-9:].decode('ascii').lstrip("0")) # check later
+        # get the number of bytes expected
+        exp_bytes = int(rethead[-9:].decode('ascii'))
         if (exp_bytes % 2) != 0:
             # incorrect, should be an even number of bytes
             raise RuntimeError("odd number of bytes expected")
 
-        # accumulate the data from the socket
-        dta = b"" # bytes data accumulator
+        # receive the data blocks from the socket directly into the preallocated buffer
+        dta = bytearray(exp_bytes)
+        view = memoryview(dta)
+        received = 0
         while True:
-            dta1 = b"" # local accumulator (smaller chunks)
             flg, alen = self.__getHeader() # flg=LECROY_DATA_FLAG : more data coming
             if flg != self.LECROY_DATA_FLAG:
                 # no more data expected
-                en = self.s.recv(alen)
+                en = self.__recvExact(alen)
                 # does it end correctly
                 if en != b'\n':
                     print("unexpected return, instead newline got {} \n next length was {}, flag {}".format(en, alen, flg))
                 break
-            # loop until all alen data is transferred
-            while len(dta1) < alen:
-                dta1 += self.s.recv(alen-len(dta1))
-            dta += dta1 # if the local accum. is done, only then append
+            if received + alen > exp_bytes:
+                raise AssertionError("Expected {} bytes, got at least {}".format(exp_bytes,
+                                                                                 received + alen))
+            self.__recvInto(view[received:received + alen])
+            received += alen
 
         # we have byte values now
         # check if the length is correct
-        if len(dta) != exp_bytes:
-            raise AssertionError("Expected {} bytes, got {}".format(exp_bytes,
-                                                                    len(dta)))        
-        return struct.unpack('<{}h'.format(len(dta)//2), dta)
+        if received != exp_bytes:
+            raise AssertionError("Expected {} bytes, got {}".format(exp_bytes, received))
+        return np.frombuffer(dta, dtype='<i2')
+
+    def __inspect(self, channel, name):
+        """ Return the value of a waveform descriptor entry as string
+        """
+        self.send('{}:INSPECT? "{}"'.format(channel, name))
+        r1, r2 = self.readAll()
+        return r2.split(":")[-1].split('"\n')[0].strip(" ")
+
+    def __getVerticalProperties(self, channel):
+        """ Return (VERTUNIT, VERTICAL_GAIN, VERTICAL_OFFSET), cached until the channel
+        settings change
+        """
+        key = channel.upper()
+        if key not in self._vertical_cache:
+            # get vertical offset
+            VOS = float(self.__inspect(channel, "VERTICAL_OFFSET"))
+            # get vertical gain
+            VG = float(self.__inspect(channel, "VERTICAL_GAIN"))
+            # get vertical unit
+            self.send('{}:INSPECT? "VERTUNIT"'.format(channel))
+            r1, r2 = self.readAll()
+            VERTUNIT = r2.split("Unit Name = ")[-1].split('"\n')[0]
+            self._vertical_cache[key] = (VERTUNIT, VG, VOS)
+        return self._vertical_cache[key]
 
     def getDataFloats(self, channel="C1", block="DAT1"):
         """
@@ -247,21 +319,32 @@ class Lecroy(ScopeInterface):
         DAT2 is used to hold the results of processing functions (extrema, FFT, etc.)
         returns (VERTUNIT, array) : properly scaled numpy array of vertical value data
         """
-        word_values = np.array(self.getDataWords(channel=channel, block=block))
-        # get vertical offset
-        self.send('{}:INSPECT? "VERTICAL_OFFSET"'.format(channel))
-        r1, r2 = self.readAll()
-        VOS = float(r2.split(":")[-1].split('"\n')[0].strip(" "))
-        # get vertical gain
-        self.send('{}:INSPECT? "VERTICAL_GAIN"'.format(channel))
-        r1, r2 = self.readAll()
-        VG = float(r2.split(":")[-1].split('"\n')[0].strip(" "))
-        # get vertical unit
-        self.send('{}:INSPECT? "VERTUNIT"'.format(channel))
-        r1, r2 = self.readAll()
-        VERTUNIT = r2.split("Unit Name = ")[-1].split('"\n')[0]
+        word_values = self.getDataWords(channel=channel, block=block)
+        VERTUNIT, VG, VOS = self.__getVerticalProperties(channel)
         # value = VERT_GAIN * data - VERT_OFFSET
-        return (VERTUNIT, VG*np.array(word_values, dtype=np.float64) - VOS)
+        data = word_values.astype(np.float64)
+        data *= VG
+        data -= VOS
+        return (VERTUNIT, data)
+
+    def getSegmentFloats(self, channels=("C1",), block="DAT1"):
+        """
+        return the segments of a sequence mode acquisition in measured units for several
+        channels, read one channel after the other
+        channels : iterable of "C1", "C2", ...
+        block : "DAT1" (mostly), or "DAT2"
+        returns dict {channel: (VERTUNIT, array)} with 2D arrays (segment, point)
+        """
+        result = dict()
+        for channel in channels:
+            unit, data = self.getDataFloats(channel=channel, block=block)
+            # the number of segments depends on the timebase settings, so it is not cached
+            segments = max(1, int(float(self.__inspect(channel, "SUBARRAY_COUNT"))))
+            if data.size % segments != 0:
+                raise RuntimeError("{} points can not be split into {} segments".format(data.size,
+                                                                                      segments))
+            result[channel] = (unit, data.reshape(segments, -1))
+        return result
 
     def getHorProperties(self, channel="C1"):
         """
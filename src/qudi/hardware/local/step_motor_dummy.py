@@ -20,60 +20,96 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import time
+import numpy as np
+
 from qudi.core.configoption import ConfigOption
 from qudi.core.module import Base
 
-import pyvisa as visa
 
 class StepMotor(Base):
-    """ Designed for driving a servo motor through Arduino.
+    """ Dummy of the step motor driver. Simulates the motor positions, the time needed to move
+    and a coupling efficiency landscape depending on the motor positions, e.g. to benchmark beam
+    alignment routines.
 
-    See [arduino-python3 Command API] & [arduino-libraries/Servo] for details.
+    The coupling efficiency is a Gaussian of the motor positions. Channels 0 and 2 as well as 1
+    and 3 are correlated like the two mirrors of a beam walk.
 
     Example config for copy-paste:
 
-    StepMotor:
-        module.Class: 'local.step_motor.StepMotor'
+    StepMotor_dummy:
+        module.Class: 'local.step_motor_dummy.StepMotor'
+        options:
+            number_of_channels: 5
+            velocity: 2000  # in steps per second
+            coupling_center: [60, -40, 30, 50, -120]  # motor positions of the maximum coupling
+            coupling_width: [150, 150, 150, 150, 450]  # width of the Gaussian in steps
+            coupling_correlation: 0.6  # correlation of channel 0, 2 and 1, 3
+            noise: 0.005  # relative noise of the coupling efficiency
 
     """
 
-
+    _number_of_channels = ConfigOption('number_of_channels', 5)
+    _velocity = ConfigOption('velocity', 2000.)
+    _coupling_center = ConfigOption('coupling_center', [60, -40, 30, 50, -120])
+    _coupling_width = ConfigOption('coupling_width', [150, 150, 150, 150, 450])
+    _coupling_correlation = ConfigOption('coupling_correlation', 0.6)
+    _noise = ConfigOption('noise', 0.005)
 
     def on_activate(self):
-        pass
+        self._positions = np.zeros(self._number_of_channels)
+        self.move_count = 0
+        width = np.asarray(self._coupling_width, dtype=float)
+        correlation = np.eye(self._number_of_channels)
+        for i, j in ((0, 2), (1, 3)):
+            if j < self._number_of_channels:
+                correlation[i, j] = correlation[j, i] = self._coupling_correlation
+        # inverse covariance of the Gaussian coupling landscape
+        self._coupling_precision = np.linalg.inv(correlation * np.outer(width, width))
 
     def on_deactivate(self):
         pass
 
-    
     def get_constraints(self):
-        pass
+        return {'number_of_channels': self._number_of_channels}
 
     def move_rel(self, motor_channel=None, degree=None):
-        pass
+        """ Move a motor by degree steps. Blocks for the simulated duration of the move.
+        """
+        time.sleep(abs(degree) / self._velocity)
+        self._positions[motor_channel] += degree
+        self.move_count += 1
 
-    
     def move_abs(self, motor_channel=None, degree=None):
-        pass
-
+        self.move_rel(motor_channel, degree - self._positions[motor_channel])
 
     def abort(self):
         pass
 
-
-    def get_pos(self):
-        pass
-
+    def get_pos(self, motor_channel=None):
+        if motor_channel is None:
+            return self._positions.copy()
+        return self._positions[motor_channel]
 
     def get_status(self):
-        pass
+        return 0
+
     def calibrate(self):
-        pass
+        self._positions[:] = 0
+
     def get_velocity(self):
-        pass
-    def set_velocity(self):
-        pass
+        return self._velocity
+
+    def set_velocity(self, velocity=None):
+        if velocity is not None:
+            self._velocity = velocity
+
+    def get_coupling_efficiency(self):
+        """ Simulated coupling efficiency (0 to 1) at the current motor positions.
+        """
+        deviation = self._positions - np.asarray(self._coupling_center, dtype=float)
+        efficiency = np.exp(-0.5 * deviation @ self._coupling_precision @ deviation)
+        return efficiency * (1 + self._noise * np.random.standard_normal())
 
     def _attach(self):
         pass
- 
@@ -1,11 +1,28 @@
 # Modified from (c) 2020-2021, ETH Zurich, Power Electronic Systems Laboratory, T. Guillod
 
-import socket
+import asyncio
+import itertools
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future
 from qudi.core.configoption import ConfigOption
 from qudi.core.module import Base
 
+
+_Request = namedtuple('_Request', ['request_id', 'data', 'future', 'expects_response'])
+
+
 class TCPClient(Base):
     """
+    Pipelined TCP client for line based (e.g. SCPI like) instruments.
+
+    The connection is served by an asyncio event loop running in its own thread, so sending a
+    command never blocks the calling thread. Each request gets an ID and a future. Responses are
+    matched to queries in the order the queries were sent, so many queries can be in flight at
+    once. Small commands queued at the same time are written to the socket in one go. If an
+    established connection drops, the client reconnects automatically. Queries in flight at that
+    moment fail with a ConnectionError, while requests not yet sent are sent after reconnecting.
+
         fugsource_tcp_client:
         module.Class: 'local.tcpclient.TCP_client.TCPClient'
         options:
@@ -14,7 +31,7 @@ class TCPClient(Base):
             timeout: 0.01
             buffer: 1024
 
-        
+
         newfocus_8752_tcp_client:
         module.Class: 'local.tcpclient.TCP_client.TCPClient'
         options:
@@ -22,85 +39,245 @@ class TCPClient(Base):
             port: 23
             timeout: 0.1
             buffer: 1024
+            terminator: "\n"  # optional, delimiter of the messages
+            connect_timeout: 5  # optional, in seconds
+            reconnect_interval: 1  # optional, in seconds
+            max_batch_size: 4096  # optional, maximum number of bytes sent in one write
+            line_limit: 1048576  # optional, maximum length of a received message in bytes
     """
     # config options
     _ip = ConfigOption('ip', missing='error')
     _port = ConfigOption('port', missing='error')
     _timeout = ConfigOption('timeout', missing='error')
-    _buffer = ConfigOption('buffer', missing='error')
+    # receive size of the previous blocking client, unused and kept for existing configurations
+    _buffer = ConfigOption('buffer', default=1024)
+    _terminator = ConfigOption('terminator', default='\n')
+    _connect_timeout = ConfigOption('connect_timeout', default=5.)
+    _reconnect_interval = ConfigOption('reconnect_interval', default=1.)
+    _max_batch_size = ConfigOption('max_batch_size', default=4096)
+    _line_limit = ConfigOption('line_limit', default=2 ** 20)
 
     def on_activate(self):
         self._connected = False
-        self.connect()
-        
+        self._connection_task = None
+        self._request_ids = itertools.count()
+        # only accessed from the event loop thread
+        self._outbox = deque()
+        self._in_flight = deque()
+        self._outbox_event = None
+        # lines not claimed by a query, see receive()
+        self._received = deque(maxlen=10000)
+        self._received_condition = threading.Condition()
 
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever,
+                                             name='{0}-event-loop'.format(self.module_name),
+                                             daemon=True)
+        self._loop_thread.start()
+        self.connect()
 
     def on_deactivate(self):
         self.disconnect()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+
+    @property
+    def connected(self):
+        return self._connected
 
     def connect(self):
         """
-        Connect to the power source and set the timeout of the connection.
+        Connect to the device and keep the connection alive until disconnect() is called.
         """
-        if not self._connected:
-            self.link = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.link.connect((self._ip, self._port))
-            self.link.settimeout(self._timeout)
-            self._connected = True
+        if self._connection_task is None:
+            asyncio.run_coroutine_threadsafe(self._connect(), self._loop).result()
 
     def disconnect(self):
         """
-        Close the connection.
+        Close the connection. Requests not answered yet fail with a ConnectionError.
         """
-        if self._connected:
-            self.data_buffer = ''
-            self.link.close()
-            self.link = None
-            self._connected = False
+        if self._connection_task is not None:
+            asyncio.run_coroutine_threadsafe(self._disconnect(), self._loop).result()
+        with self._received_condition:
+            self._received.clear()
 
-    def start_command(self):
+    def write(self, msg):
         """
-        Clear the buffer for starting a new command.
+        Queue a command that has no response. The terminator is appended if missing.
+
+        @param str msg: command
+        @return Future: resolves to None once the command has been sent
         """
+        return self._submit(self._frame(msg), expects_response=False)
 
-        self._receive_bytes()
-        self.data_buffer = ''
+    def query(self, msg):
+        """
+        Queue a command and return a future for its response line. The terminator is appended if
+        missing.
 
-    def send_byte(self, msg):
+        @param str msg: command
+        @return Future: resolves to the response without terminator
         """
-        Send a byte to the power source.
+        return self._submit(self._frame(msg), expects_response=True)
+
+    def start_command(self):
         """
+        Clear the buffer for starting a new command. Stale lines still arriving within timeout
+        are discarded as well.
+        """
+        with self._received_condition:
+            self._received_condition.wait_for(lambda: len(self._received) > 0, self._timeout)
+            self._received.clear()
 
+    def send_byte(self, msg):
+        """
+        Send a raw message to the device and wait until it has been sent (at most connect_timeout).
+        Unlike write(), this blocks and raises on failure, e.g. for callers that reconnect on errors.
+        """
+        future = self._submit(msg.encode(), expects_response=False)
         try:
-            self.link.send(msg.encode())
+            future.result(self._connect_timeout)
         except Exception:
+            # do not send the message later on, e.g. after a reconnect
+            future.cancel()
             raise ValueError("send fail")
 
     def receive(self):
         """
-        Get responses from the power source where the newline is the delimiter.
+        Get the lines received from the device that were not claimed by a query. Waits up to
+        timeout for the first line.
+
+        @return list: received lines without terminator
         """
+        with self._received_condition:
+            self._received_condition.wait_for(lambda: len(self._received) > 0, self._timeout)
+            response = list(self._received)
+            self._received.clear()
+        return response
 
-        response = []
-        buffer_new = self._receive_bytes()
-        for char in buffer_new:
-            if char == '\n':
-                response.append(self.data_buffer)
-                self.data_buffer = ''
-            else:
-                self.data_buffer += char
+    def _frame(self, msg):
+        if not msg.endswith(self._terminator):
+            msg += self._terminator
+        return msg.encode()
 
-        return response
+    def _submit(self, data, expects_response):
+        future = Future()
+        future.request_id = next(self._request_ids)
+        self._loop.call_soon_threadsafe(
+            self._enqueue, _Request(future.request_id, data, future, expects_response)
+        )
+        return future
+
+    def _enqueue(self, request):
+        if self._connection_task is None:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(ConnectionError(
+                    'Request {0:d} failed. Not connected to {1}:{2}.'.format(
+                        request.request_id, self._ip, self._port)))
+            return
+        self._outbox.append(request)
+        self._outbox_event.set()
+
+    def _fail_requests(self, requests, reason):
+        while requests:
+            request = requests.popleft()
+            if request.future.done():
+                continue
+            if request.future.running() or request.future.set_running_or_notify_cancel():
+                request.future.set_exception(ConnectionError(
+                    'Request {0:d} failed. {1}'.format(request.request_id, reason)))
+
+    async def _open_connection(self):
+        return await asyncio.wait_for(
+            asyncio.open_connection(self._ip, self._port, limit=int(self._line_limit)),
+            self._connect_timeout
+        )
 
-    def _receive_bytes(self):
+    async def _connect(self):
+        reader, writer = await self._open_connection()
+        self._outbox_event = asyncio.Event()
+        self._connected = True
+        self._connection_task = asyncio.ensure_future(self._serve(reader, writer))
+
+    async def _disconnect(self):
+        task = self._connection_task
+        self._connection_task = None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        self._fail_requests(self._in_flight, 'Disconnected.')
+        self._fail_requests(self._outbox, 'Disconnected.')
+
+    async def _serve(self, reader, writer):
         """
-        Get bytes from the power sources.
+        Serve the connection and reconnect whenever it drops.
         """
+        while True:
+            tasks = [asyncio.ensure_future(self._read_responses(reader)),
+                     asyncio.ensure_future(self._write_requests(writer))]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                error = next(iter(done)).exception() or EOFError()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                writer.close()
+                self._connected = False
+            self._fail_requests(self._in_flight, 'Connection lost.')
+            self.log.warning('Connection to {0}:{1} lost ({2!r}). Reconnecting.'.format(
+                self._ip, self._port, error))
+            while True:
+                await asyncio.sleep(self._reconnect_interval)
+                try:
+                    reader, writer = await self._open_connection()
+                except (OSError, asyncio.TimeoutError):
+                    continue
+                break
+            self._connected = True
+            self.log.info('Reconnected to {0}:{1}.'.format(self._ip, self._port))
 
-        try:
+    async def _write_requests(self, writer):
+        while True:
+            if not self._outbox:
+                self._outbox_event.clear()
+                await self._outbox_event.wait()
+            # batch all small requests queued in the meantime into a single write
+            batch = list()
+            size = 0
+            while self._outbox and (not batch or
+                                    size + len(self._outbox[0].data) <= self._max_batch_size):
+                request = self._outbox.popleft()
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                batch.append(request)
+                size += len(request.data)
+            if not batch:
+                continue
+            writer.write(b''.join(request.data for request in batch))
+            self._in_flight.extend(request for request in batch if request.expects_response)
             try:
-                return self.link.recv(self._buffer).decode()
-            except socket.timeout:
-                return ''
-        except Exception:
-            raise ValueError("receive fail")
\ No newline at end of file
+                await writer.drain()
+            except BaseException:
+                self._fail_requests(deque(request for request in batch
+                                          if not request.expects_response), 'Connection lost.')
+                raise
+            for request in batch:
+                if not request.expects_response:
+                    request.future.set_result(None)
+
+    async def _read_responses(self, reader):
+        terminator = self._terminator.encode()
+        while True:
+            line = await reader.readuntil(terminator)
+            line = line[:-len(terminator)].decode().rstrip('\r')
+            if self._in_flight:
+                request = self._in_flight.popleft()
+                if not request.future.done():
+                    request.future.set_result(line)
+            else:
+                with self._received_condition:
+                    self._received.append(line)
+                    self._received_condition.notify_all()
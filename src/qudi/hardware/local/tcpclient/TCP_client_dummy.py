@@ -1,63 +1,106 @@
 # Modified from (c) 2020-2021, ETH Zurich, Power Electronic Systems Laboratory, T. Guillod
 
-import socket
+import asyncio
+import threading
 from qudi.core.configoption import ConfigOption
-from qudi.core.module import Base
+from qudi.hardware.local.tcpclient import TCP_client
 
-class TCPClient(Base):
+
+class TCPStandInServer:
     """
-        fugsource_tcp_client:
-        module.Class: 'local.tcpclient.TCP_client.TCPClient'
-        options:
-            ip: '10.140.0.211'
-            port: 2101
-            timeout: 0.01
-            buffer: 1024
+    Local asyncio TCP server standing in for a line based instrument. Every line ending with "?"
+    is a query and echoed back after response_delay seconds, all other lines are commands without
+    response. Runs its own event loop thread.
     """
-    # config options
-    _ip = ConfigOption('ip', missing='error')
-    _port = ConfigOption('port', missing='error')
-    _timeout = ConfigOption('timeout', missing='error')
-    _buffer = ConfigOption('buffer', missing='error')
 
-    def on_activate(self):
-        """
-        Connect to the power source and set the timeout of the connection.
-        """
+    def __init__(self, host='127.0.0.1', port=0, terminator='\n', response_delay=0.):
+        self.host = host
+        self.port = port
+        self.terminator = terminator.encode()
+        self.response_delay = response_delay
+        self.received_lines = 0
+        self._writers = set()
+        self._server = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='tcp-stand-in-server',
+                                        daemon=True)
 
-        pass
+    def start(self):
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle_client, self.host, self.port), self._loop
+        ).result()
+        self.port = self._server.sockets[0].getsockname()[1]
 
-    def on_deactivate(self):
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def drop_connections(self):
         """
-        Close the connection.
+        Close all client connections, e.g. to test the reconnect of the client.
         """
+        for writer in list(self._writers):
+            self._loop.call_soon_threadsafe(writer.close)
 
-        pass
+    async def _close(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
 
-    def start_command(self):
-        """
-        Clear the buffer for starting a new command.
-        """
+    async def _handle_client(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readuntil(self.terminator)
+                self.received_lines += 1
+                if line.rstrip(b'\r\n').endswith(b'?'):
+                    if self.response_delay > 0:
+                        await asyncio.sleep(self.response_delay)
+                    writer.write(line)
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
 
-        pass
 
-    def send_byte(self, msg):
-        """
-        Send a byte to the power source.
-        """
+class TCPClient(TCP_client.TCPClient):
+    """
+    TCP client connected to a local stand-in server, e.g. to benchmark the latency and throughput
+    of the client.
 
-        pass
+        tcp_client_dummy:
+        module.Class: 'local.tcpclient.TCP_client_dummy.TCPClient'
+        options:
+            timeout: 0.01
+            response_delay: 0  # optional, delay of the stand-in server before each response
+    """
+    # config options
+    _ip = ConfigOption('ip', default='127.0.0.1')
+    _port = ConfigOption('port', default=0)
+    _timeout = ConfigOption('timeout', default=0.01)
+    _response_delay = ConfigOption('response_delay', default=0.)
 
-    def receive(self):
+    def on_activate(self):
         """
-        Get responses from the power source where the newline is the delimiter.
+        Start the stand-in server and connect to it.
         """
+        self.server = TCPStandInServer(host=self._ip,
+                                       port=self._port,
+                                       terminator=self._terminator,
+                                       response_delay=self._response_delay)
+        self.server.start()
+        self._port = self.server.port
+        super().on_activate()
 
-        pass
-
-    def _receive_bytes(self):
+    def on_deactivate(self):
         """
-        Get bytes from the power sources.
+        Close the connection and stop the stand-in server.
         """
-
-        pass
\ No newline at end of file
+        super().on_deactivate()
+        self.server.stop()
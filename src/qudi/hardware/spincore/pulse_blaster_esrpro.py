@@ -1326,6 +1326,9 @@ class PulseBlasterESRPRO(SwitchInterface, PulserInterface):
                                               'd_ch21'})
 
         constraints.activation_config = activation_config
+        # The device is programmed with a list of pulse durations anyway, so run-length encoded
+        # waveforms can be converted without expanding them.
+        constraints.run_length_waveforms = True
 
         return constraints
 
@@ -1819,6 +1822,63 @@ class PulseBlasterESRPRO(SwitchInterface, PulserInterface):
 
         return chunk_length, [self._current_pb_waveform_name]
 
+    def write_run_length_waveform(self, name, waveform):
+        """ Write a new waveform given as run-length encoded RunLengthWaveform instance.
+
+        @param str name: the name of the waveform to be created
+        @param RunLengthWaveform waveform: the run-length encoded waveform to write
+
+        @return (int, list): number of samples written (-1 indicates failed
+                             process) and list of created waveform names.
+
+        The runs are directly converted to a pulse blaster sequence without
+        creating the sample arrays.
+        """
+        waveform = netobtain(waveform)
+
+        if waveform.analog_channels:
+            self.log.error('PulseBlaster is purely digital and does not '
+                           'support waveform generation with analog samples.')
+            return -1, list()
+
+        if not waveform.digital_channels or waveform.number_of_samples == 0:
+            return super().write_run_length_waveform(name, waveform)
+
+        run_lengths, digital_states = waveform.merged_digital_runs()
+        chan = list(digital_states)
+        chan.sort()
+        self._current_activation_config = chan
+
+        pb_sequence_list = list()
+        for index, run_length in enumerate(run_lengths):
+            active_channels = [int(ch_name.replace('d_ch', '')) - 1 for ch_name in chan if
+                               digital_states[ch_name][index]]
+            pb_sequence_list.append({'active_channels': active_channels,
+                                     'length': run_length * self.GRAN_MIN})
+            # increase length by 1%, to remove the ambiguity for the comparison
+            if index < len(run_lengths) - 1 and \
+                    pb_sequence_list[-1]['length'] * 1.01 < self.LEN_MIN:
+                self.log.warning('Current waveform contains a pulse of '
+                                 'length {0:.2f}ns, which is smaller '
+                                 'than the minimal allowed length of '
+                                 '{1:.2f}ns! Pulse sequence might '
+                                 'most probably look unexpected. '
+                                 'Increase the length of the smallest '
+                                 'pulse!'
+                                 ''.format(pb_sequence_list[-1]['length'] * 1e9,
+                                           self.LEN_MIN * 1e9))
+
+        self._current_pb_waveform_theoretical = pb_sequence_list
+        self._current_pb_waveform_name = name
+        self._current_pb_waveform = self._correct_sequence_for_delays(
+            self._current_pb_waveform_theoretical)
+        self.write_pulse_form(self._current_pb_waveform)
+        self.log.debug('Run-length encoded waveform written in PulseBlaster with name "{0}" '
+                       'and a total length of {1} sequence '
+                       'entries.'.format(self._current_pb_waveform_name,
+                                          len(self._current_pb_waveform)))
+        return waveform.number_of_samples, [self._current_pb_waveform_name]
+
     def _convert_sample_to_pb_sequence(self, digital_samples):
         """ Helper method to create a pulse blaster sequence.
 
@@ -20,6 +20,7 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import numpy as np
 from abc import abstractmethod
 from qudi.core.module import Base
 
@@ -129,3 +130,19 @@ class CameraInterface(Base):
         @return bool: ready ?
         """
         pass
+
+    def get_new_frames(self):
+        """ Return all frames acquired since the last call during a live acquisition, oldest first.
+        Hardware without an internal frame buffer only returns the last acquired image, or an empty
+        stack if it is the same image as in the previous call.
+
+        @return tuple(numpy array, int): stack of images in format [image, [row], [row]...] and
+                                         the number of frames the hardware discarded before they
+                                         could be read
+        """
+        image = np.asarray(self.get_acquired_data())
+        last_image = getattr(self, '_last_new_frame', None)
+        if last_image is not None and np.array_equal(last_image, image):
+            return np.empty((0, *image.shape), dtype=image.dtype), 0
+        self._last_new_frame = image.copy()
+        return image[np.newaxis], 0
@@ -175,3 +175,16 @@ class FastCounterInterface(Base):
         If the hardware does not support these features, the values should be None
         """
         pass
+
+    def get_histogram_buffer(self):
+        """ Optional memory-mapped buffer the fast counter accumulates the timetrace into.
+
+        Hardware supporting it returns a qudi.util.histogram_buffer.HistogramBuffer with the same
+        shape and info as the array returned by get_data_trace. The logic then reads views of the
+        histogram instead of a new array per call. Calling this method is also the time for the
+        hardware to bring the buffer up to date, if it is not updated continuously.
+        The buffer may change with each call to configure.
+
+        @return HistogramBuffer: buffer with the current timetrace, None if not supported
+        """
+        return None
@@ -20,6 +20,7 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import numpy as np
 from enum import Enum
 from abc import abstractmethod
 from qudi.core.module import Base
@@ -45,6 +46,9 @@ class PulserInterface(Base):
             level jumps and loops to create complex sequence with a limited device memory.
     """
 
+    # Maximum number of samples expanded at once by the default write_run_length_waveform
+    _run_length_chunk_samples = 2 ** 20
+
     @abstractmethod
     def get_constraints(self):
         """
@@ -443,7 +447,9 @@ class PulserInterface(Base):
                                     voltage samples normalized to half Vpp (between -1 and 1).
         @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
                                      values are 1D numpy arrays of type bool containing the marker
-                                     states.
+                                     states. If PulserConstraints.run_length_waveforms is True,
+                                     this can be a RunLengthWaveform holding the digital runs of
+                                     all channels instead (see write_run_length_waveform).
         @param bool is_first_chunk: Flag indicating if it is the first chunk to write.
                                     If True this method will create a new empty wavveform.
                                     If False the samples are appended to the existing waveform.
@@ -457,6 +463,42 @@ class PulserInterface(Base):
         """
         pass
 
+    def write_run_length_waveform(self, name, waveform):
+        """
+        Write a new waveform given as run-length encoded RunLengthWaveform instance on the device
+        memory.
+
+        Only called by the logic if PulserConstraints.run_length_waveforms is True. Devices natively
+        operating on run-length or block based patterns should override this method. The default
+        implementation expands the analog channels in chunks of at most _run_length_chunk_samples
+        samples and passes them on to write_waveform, so the memory used does not grow with the
+        waveform length. The digital channels of each chunk are passed on run-length encoded as
+        RunLengthWaveform, to be converted into the hardware representation by write_waveform.
+
+        @param str name: the name of the waveform to be created
+        @param RunLengthWaveform waveform: the run-length encoded waveform to write
+
+        @return (int, list): Number of samples written (-1 indicates failed process) and list of
+                             created waveform names
+        """
+        written_samples = 0
+        written_waveforms = list()
+        total_number_of_samples = waveform.number_of_samples
+        for analog_samples, digital_samples, is_first_chunk, is_last_chunk in waveform.iter_chunks(
+                self._run_length_chunk_samples, expand_digital=False):
+            chunk_samples, waveforms = self.write_waveform(
+                name=name,
+                analog_samples=analog_samples,
+                digital_samples=digital_samples,
+                is_first_chunk=is_first_chunk,
+                is_last_chunk=is_last_chunk,
+                total_number_of_samples=total_number_of_samples)
+            if chunk_samples < 0:
+                return -1, written_waveforms
+            written_samples += chunk_samples
+            written_waveforms.extend(wfm for wfm in waveforms if wfm not in written_waveforms)
+        return written_samples, written_waveforms
+
     @abstractmethod
     def write_sequence(self, name, sequence_parameters):
         """
@@ -579,3 +621,196 @@ class PulserConstraints:
 
         self.activation_config = dict()
         self.sequence_option = SequenceOption.OPTIONAL
+        # Flag indicating if the device accepts RunLengthWaveform instances via
+        # write_run_length_waveform without expanding them into fully sampled arrays.
+        # Unless write_run_length_waveform is overridden, write_waveform then receives the digital
+        # samples of each chunk as RunLengthWaveform instead of a dict of bool arrays.
+        self.run_length_waveforms = False
+
+
+class RunLengthWaveform:
+    """
+    Run-length encoded waveform container with lazy expansion into sample arrays.
+
+    The waveform is a sequence of runs. During a run all digital channels are constant and each
+    analog channel is described by a sampling function object (any object providing a
+    "get_samples(time_array)" method, e.g. from SamplingFunctions) or None for 0 V.
+    Analog samples are normalized by analog_scale (i.e. half Vpp) upon expansion.
+
+    Sample times of a run are calculated as (time_offset_bins + arange(run_length)) / sample_rate.
+    Waveforms without analog channels (e.g. from digital_runs) hold the digital samples of a chunk
+    passed on to write_waveform.
+    """
+
+    def __init__(self, run_lengths, sample_rate, digital_states=None, analog_functions=None,
+                 analog_scale=None, time_offset_bins=None):
+        """
+        @param numpy.ndarray run_lengths: 1D integer array with the number of samples of each run
+        @param float sample_rate: sample rate in Hz used to calculate the time base of analog runs
+        @param dict digital_states: keys are the generic digital channel names (i.e. 'd_ch1') and
+                                    values are 1D bool arrays containing the state of each run
+        @param dict analog_functions: keys are the generic analog channel names (i.e. 'a_ch1') and
+                                      values are sequences of sampling function objects (or None)
+                                      for each run
+        @param dict analog_scale: keys are the generic analog channel names and values are the
+                                  scaling factors (i.e. half Vpp) to normalize analog samples with.
+                                  Defaults to 1 for each channel.
+        @param numpy.ndarray time_offset_bins: 1D integer array with the time offset in bins of the
+                                               first sample of each run. Defaults to the start
+                                               index of each run (rotating frame).
+        """
+        self.run_lengths = np.asarray(run_lengths, dtype='int64')
+        self.sample_rate = float(sample_rate)
+        self.digital_states = dict() if digital_states is None else {
+            chnl: np.asarray(states, dtype=bool) for chnl, states in digital_states.items()
+        }
+        self.analog_functions = dict() if analog_functions is None else {
+            chnl: tuple(functions) for chnl, functions in analog_functions.items()
+        }
+        self.analog_scale = {chnl: 1. for chnl in self.analog_functions}
+        if analog_scale is not None:
+            self.analog_scale.update(analog_scale)
+
+        self.run_starts = np.zeros(len(self.run_lengths) + 1, dtype='int64')
+        np.cumsum(self.run_lengths, out=self.run_starts[1:])
+        if time_offset_bins is None:
+            self.time_offset_bins = self.run_starts[:-1]
+        else:
+            self.time_offset_bins = np.asarray(time_offset_bins, dtype='int64')
+
+        for states in self.digital_states.values():
+            if len(states) != len(self.run_lengths):
+                raise ValueError('Number of digital states does not match the number of runs.')
+        for functions in self.analog_functions.values():
+            if len(functions) != len(self.run_lengths):
+                raise ValueError('Number of analog functions does not match the number of runs.')
+        if len(self.time_offset_bins) != len(self.run_lengths):
+            raise ValueError('Number of time offsets does not match the number of runs.')
+
+    @property
+    def number_of_samples(self):
+        return int(self.run_starts[-1])
+
+    @property
+    def number_of_runs(self):
+        return len(self.run_lengths)
+
+    @property
+    def analog_channels(self):
+        return set(self.analog_functions)
+
+    @property
+    def digital_channels(self):
+        return set(self.digital_states)
+
+    def merged_digital_runs(self, channels=None):
+        """ Merge consecutive runs with identical digital states, ignoring analog channels.
+        Runs of zero length are dropped.
+
+        @param iterable channels: generic digital channel names to merge the runs of. Defaults to
+                                  all digital channels.
+
+        @return (numpy.ndarray, dict): merged run lengths and digital states per channel
+        """
+        if channels is None:
+            channels = self.digital_states
+        non_empty = np.flatnonzero(self.run_lengths)
+        states = {chnl: self.digital_states[chnl][non_empty] for chnl in channels}
+        if len(non_empty) == 0:
+            return self.run_lengths[non_empty], states
+        changed = np.zeros(len(non_empty), dtype=bool)
+        changed[0] = True
+        for chnl_states in states.values():
+            changed[1:] |= chnl_states[1:] != chnl_states[:-1]
+        starts = np.flatnonzero(changed)
+        lengths = np.diff(np.append(self.run_starts[non_empty[starts]], self.number_of_samples))
+        return lengths, {chnl: chnl_states[starts] for chnl, chnl_states in states.items()}
+
+    def _run_range(self, start, stop):
+        """ Find the runs overlapping the sample range [start, stop).
+
+        @return (int, int, int, numpy.ndarray): clipped start and stop, index of the first run and
+                                                run boundaries relative to start
+        """
+        stop = self.number_of_samples if stop is None else min(stop, self.number_of_samples)
+        start = max(0, min(start, stop))
+        first_run = max(int(np.searchsorted(self.run_starts, start, side='right')) - 1, 0)
+        last_run = int(np.searchsorted(self.run_starts, stop, side='left'))
+        # clip run boundaries to the requested range
+        bounds = np.clip(self.run_starts[first_run:last_run + 1], start, stop) - start
+        return start, stop, first_run, bounds
+
+    def digital_runs(self, start=0, stop=None):
+        """ Get the digital runs of the sample range [start, stop) without expanding them.
+
+        @param int start: index of the first sample
+        @param int stop: index after the last sample. Defaults to the waveform end.
+
+        @return RunLengthWaveform: waveform containing only the digital channels of the range
+        """
+        start, stop, first_run, bounds = self._run_range(start, stop)
+        last_run = first_run + len(bounds) - 1
+        return RunLengthWaveform(
+            run_lengths=np.diff(bounds),
+            sample_rate=self.sample_rate,
+            digital_states={chnl: states[first_run:last_run]
+                            for chnl, states in self.digital_states.items()})
+
+    def expand(self, start=0, stop=None):
+        """ Expand the sample range [start, stop) into fully sampled arrays.
+
+        @param int start: index of the first sample to expand
+        @param int stop: index after the last sample to expand. Defaults to the waveform end.
+
+        @return (dict, dict): analog samples (float32) and digital samples (bool) per channel as
+                              expected by PulserInterface.write_waveform
+        """
+        start, stop, first_run, bounds = self._run_range(start, stop)
+        last_run = first_run + len(bounds) - 1
+        lengths = np.diff(bounds)
+
+        digital_samples = {
+            chnl: np.repeat(states[first_run:last_run], lengths)
+            for chnl, states in self.digital_states.items()
+        }
+        return self._expand_analog(start, stop, first_run, bounds), digital_samples
+
+    def _expand_analog(self, start, stop, first_run, bounds):
+        """ Expand the analog channels of a sample range found by _run_range.
+        """
+        analog_samples = dict()
+        for chnl, functions in self.analog_functions.items():
+            samples = np.zeros(stop - start, dtype='float32')
+            scale = self.analog_scale[chnl]
+            for run, (run_start, run_stop) in enumerate(zip(bounds[:-1], bounds[1:]),
+                                                        first_run):
+                func = functions[run]
+                if func is None or run_stop == run_start:
+                    continue
+                skip = run_start + start - self.run_starts[run]
+                time_arr = (self.time_offset_bins[run] + skip + np.arange(
+                    run_stop - run_start, dtype='float64')) / self.sample_rate
+                samples[run_start:run_stop] = func.get_samples(time_arr) / scale
+            analog_samples[chnl] = samples
+        return analog_samples
+
+    def iter_chunks(self, chunk_length, expand_digital=True):
+        """ Lazily expand the waveform in chunks of at most chunk_length samples.
+
+        @param int chunk_length: maximum number of samples per chunk
+        @param bool expand_digital: if False, the digital samples of each chunk are yielded as
+                                    RunLengthWaveform (see digital_runs) instead of bool arrays
+
+        @return generator: yields tuples (analog_samples, digital_samples, is_first_chunk,
+                           is_last_chunk)
+        """
+        total = self.number_of_samples
+        chunk_length = max(1, int(chunk_length))
+        for start in range(0, total, chunk_length):
+            stop = min(start + chunk_length, total)
+            if expand_digital:
+                analog_samples, digital_samples = self.expand(start, stop)
+            else:
+                analog_samples = self._expand_analog(*self._run_range(start, stop))
+                digital_samples = self.digital_runs(start, stop)
+            yield analog_samples, digital_samples, start == 0, stop == total
@@ -393,6 +393,89 @@ class ScanData:
         return
 
 
+@dataclass(frozen=True)
+class ScanDataSlab:
+    """
+    Slow axis lines [line_start, line_stop) of forward (and backward) scan data that changed since
+    a previous poll. Channel arrays are slices along the last (slow) axis of the full data arrays.
+    1D scans consist of a single line.
+    """
+    line_start: int
+    line_stop: int
+    data: Dict[str, np.ndarray]
+    back_data: Optional[Dict[str, np.ndarray]] = None
+
+    @staticmethod
+    def number_of_lines(scan_data: ScanData) -> int:
+        """ Number of slow axis lines of a scan. """
+        resolution = scan_data.settings.resolution
+        return resolution[-1] if len(resolution) > 1 else 1
+
+    @classmethod
+    def lines_acquired(cls, scan_data: ScanData, line_start: int = 0) -> int:
+        """ Slow axis line to stop at (exclusive) to include all lines holding acquired data,
+        i.e. data that is not NaN any more. Lines are expected to be acquired in order.
+
+        @param ScanData scan_data: scan data to check
+        @param int line_start: first slow axis line to check
+
+        @return int: index after the last line with acquired data, line_start if there is none
+        """
+        if scan_data is None or not scan_data.data:
+            return line_start
+        if scan_data.settings.scan_dimension < 2:
+            return 1
+        line_stop = line_start
+        for arr in scan_data.data.values():
+            acquired = ~np.isnan(arr[..., line_start:]).all(axis=tuple(range(arr.ndim - 1)))
+            if acquired.any():
+                line_stop = max(line_stop, line_start + int(np.flatnonzero(acquired)[-1]) + 1)
+        return line_stop
+
+    @staticmethod
+    def _slice(array: np.ndarray, line_start: int, line_stop: int) -> np.ndarray:
+        if array.ndim < 2:
+            return array
+        return array[..., line_start:line_stop]
+
+    @classmethod
+    def from_scan_data(cls, scan_data: ScanData, back_scan_data: Optional[ScanData] = None,
+                       line_start: int = 0, line_stop: Optional[int] = None) -> 'ScanDataSlab':
+        """ Copy lines [line_start, line_stop) out of full ScanData instances.
+
+        @param ScanData scan_data: forward scan data to copy the lines from
+        @param ScanData back_scan_data: optional backward scan data to copy the lines from
+        @param int line_start: first slow axis line to copy
+        @param int line_stop: slow axis line to stop at (exclusive). Defaults to the last line.
+
+        @return ScanDataSlab: slab with copies of the requested lines
+        """
+        if line_stop is None:
+            line_stop = cls.number_of_lines(scan_data)
+        if scan_data.settings.scan_dimension < 2:
+            line_start, line_stop = 0, 1
+        data = {ch: cls._slice(arr, line_start, line_stop).copy()
+                for ch, arr in scan_data.data.items()}
+        if back_scan_data is None or back_scan_data.data is None:
+            back_data = None
+        else:
+            back_data = {ch: cls._slice(arr, line_start, line_stop).copy()
+                         for ch, arr in back_scan_data.data.items()}
+        return cls(line_start=line_start, line_stop=line_stop, data=data, back_data=back_data)
+
+    def write_into(self, scan_data: ScanData, back_scan_data: Optional[ScanData] = None) -> None:
+        """ Write the lines of this slab in-place into the data arrays of full ScanData instances.
+
+        @param ScanData scan_data: forward scan data to update
+        @param ScanData back_scan_data: optional backward scan data to update
+        """
+        for target, source in ((scan_data, self.data), (back_scan_data, self.back_data)):
+            if target is None or target.data is None or source is None:
+                continue
+            for ch, arr in target.data.items():
+                self._slice(arr, self.line_start, self.line_stop)[...] = source[ch]
+
+
 @dataclass(frozen=True)
 class ScanImage:
     """
@@ -608,6 +691,26 @@ class ScanningProbeInterface(Base):
         """
         pass
 
+    def get_scan_data_slab(self, line_start: int = 0) -> Optional[ScanDataSlab]:
+        """ Retrieve the scan data lines that changed since the slow axis line <line_start>.
+        Returns None if no scan data is available.
+
+        The default implementation copies the lines from <line_start> up to the last line holding
+        acquired (not NaN) data out of get_scan_data and get_back_scan_data. Hardware keeping track
+        of its acquisition progress can override this to avoid checking the data.
+
+        @param int line_start: first slow axis line the caller has not received completely yet
+
+        @return ScanDataSlab: changed scan data lines
+        """
+        scan_data = self.get_scan_data()
+        if scan_data is None or scan_data.data is None:
+            return None
+        back_scan_data = self.get_back_scan_data()
+        line_stop = max(ScanDataSlab.lines_acquired(scan_data, line_start),
+                        ScanDataSlab.lines_acquired(back_scan_data, line_start))
+        return ScanDataSlab.from_scan_data(scan_data, back_scan_data, line_start, line_stop)
+
     @abstractmethod
     def emergency_stop(self) -> None:
         """
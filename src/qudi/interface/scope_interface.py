@@ -61,14 +61,14 @@ class ScopeInterface(Base):
     @abstractmethod
     def getDataWords(self, channel="C1", block="DAT1"):
         """
-        return data in tuple of word values (-32768 to 32767)
+        return data in numpy array of word values (-32768 to 32767)
         Reads header, and double checks:
         1: that the data stream ended correctly (!LECROY_DATA_FLAG flag with "\n" end),
         2: length of the byte vector matches the specified length in the header
         channel : "C1" or "C2"
         block : "DAT1" (mostly), or "DAT2"
         
-        returns list of values (16-bit signed)
+        returns numpy array of values (16-bit signed)
         """
         pass
 
@@ -84,6 +84,23 @@ class ScopeInterface(Base):
         """
         pass
 
+    def getSegmentFloats(self, channels=("C1",), block="DAT1"):
+        """
+        return the segments of a sequence mode acquisition in measured units for several
+        channels, read one channel after the other
+        channels : iterable of "C1", "C2", ...
+        block : "DAT1" (mostly), or "DAT2"
+        returns dict {channel: (VERTUNIT, array)} with 2D arrays (segment, point)
+
+        The default implementation reads each channel with getDataFloats and returns it as a
+        single segment. Override it for scopes supporting sequence mode.
+        """
+        result = dict()
+        for channel in channels:
+            unit, data = self.getDataFloats(channel=channel, block=block)
+            result[channel] = (unit, data.reshape(1, -1))
+        return result
+
     @abstractmethod
     def getHorProperties(self, channel="C1"):
         """
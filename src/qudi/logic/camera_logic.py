@@ -20,6 +20,8 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
+import time
 import datetime
 import numpy as np
 import matplotlib.pyplot as plt
@@ -27,10 +29,52 @@ import matplotlib as mpl
 from PySide2 import QtCore
 from qudi.core.connector import Connector
 from qudi.core.configoption import ConfigOption
-from qudi.util.mutex import RecursiveMutex
+from qudi.util.mutex import Mutex, RecursiveMutex
 from qudi.core.module import LogicBase
 
 
+class CameraFrameWorker(QtCore.QObject):
+    """ Helper class acquiring video frames in a separate thread.
+
+    Frames are written into the ring buffer of the logic, so neither the logic thread nor a slow
+    GUI can hold up the acquisition.
+    """
+
+    # signal to notify the parent class about new frames in the ring buffer
+    sig_frames_available = QtCore.Signal()
+    sig_finished = QtCore.Signal()
+
+    def __init__(self, parentclass):
+        super().__init__()
+
+        # remember the reference to the parent class to access functions and settings
+        self._parentclass = parentclass
+
+    def run(self, live, period):
+        """ Acquire frames until stopped by the parent class.
+
+        @param bool live: use the live acquisition of the camera instead of single acquisitions
+        @param float period: time in seconds between two frame readouts
+        """
+        try:
+            camera = self._parentclass._camera()
+            while not self._parentclass._stop_requested:
+                start = time.perf_counter()
+                if live:
+                    frames, missed = camera.get_new_frames()
+                else:
+                    camera.start_single_acquisition()
+                    frames, missed = np.asarray(camera.get_acquired_data())[np.newaxis], 0
+                if len(frames) > 0 or missed > 0:
+                    self._parentclass._store_frames(frames, missed)
+                    self.sig_frames_available.emit()
+                time.sleep(max(0., period - (time.perf_counter() - start)))
+        except:
+            self._parentclass.log.exception('Error during video acquisition:')
+        finally:
+            self.sig_finished.emit()
+
+
 class CameraLogic(LogicBase):
     """ Logic class for controlling a camera.
 
@@ -42,6 +86,9 @@ class CameraLogic(LogicBase):
             camera: camera_dummy
         options:
             minimum_exposure_time: 0.05
+            frame_buffer_size: 32  # optional, number of video frames kept in memory
+            max_display_rate: 20  # optional, maximum number of frames per second sent to the GUI
+            frame_stack_size: 0  # optional, number of video frames kept in a memory-mapped stack
     """
 
     # declare connectors
@@ -50,19 +97,37 @@ class CameraLogic(LogicBase):
     _minimum_exposure_time = ConfigOption(name='minimum_exposure_time',
                                           default=0.05,
                                           missing='warn')
+    _frame_buffer_size = ConfigOption(name='frame_buffer_size', default=32)
+    _max_display_rate = ConfigOption(name='max_display_rate', default=20.)
+    _frame_stack_size = ConfigOption(name='frame_stack_size', default=0)
 
     # signals
     sigFrameChanged = QtCore.Signal(object)
     sigAcquisitionFinished = QtCore.Signal()
+    _sig_start_worker = QtCore.Signal(bool, float)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__timer = None
         self._thread_lock = RecursiveMutex()
+        self._frame_lock = Mutex()
         self._exposure = -1
         self._gain = -1
         self._last_frame = None
 
+        self._worker_thread = None
+        self._worker = None
+        self._stop_requested = True
+        self._frame_buffer = None
+        self._frame_stack = None
+        self._frame_stack_index = 0
+        self._frame_stack_count = 0
+        self._acquired_frames = 0
+        self._missed_frames = 0
+        self._displayed_frames = 0
+        self._last_displayed = 0
+        self._last_display_time = 0
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -70,20 +135,82 @@ class CameraLogic(LogicBase):
         self._exposure = camera.get_exposure()
         self._gain = camera.get_gain()
 
+        # throttles the frames sent to the GUI during video acquisition
         self.__timer = QtCore.QTimer()
         self.__timer.setSingleShot(True)
-        self.__timer.timeout.connect(self.__acquire_video_frame)
+        self.__timer.timeout.connect(self.__display_latest_frame)
+
+        # create an independent thread for video acquisition
+        self._worker_thread = QtCore.QThread()
+        self._worker = CameraFrameWorker(self)
+        self._worker.moveToThread(self._worker_thread)
+        self._sig_start_worker.connect(self._worker.run, QtCore.Qt.QueuedConnection)
+        self._worker.sig_frames_available.connect(self.__frames_available,
+                                                  QtCore.Qt.QueuedConnection)
+        self._worker.sig_finished.connect(self.__video_finished, QtCore.Qt.QueuedConnection)
+        self._worker_thread.start()
 
     def on_deactivate(self):
         """ Perform required deactivation. """
+        self._stop_requested = True
+        self._worker_thread.quit()
+        self._worker_thread.wait()
+        self._sig_start_worker.disconnect()
+        self._worker.sig_frames_available.disconnect()
+        self._worker.sig_finished.disconnect()
+        if self.module_state() == 'locked':
+            self._camera().stop_acquisition()
+            self.module_state.unlock()
         self.__timer.stop()
         self.__timer.timeout.disconnect()
         self.__timer = None
+        self._frame_buffer = None
+        self._frame_stack = None
 
     @property
     def last_frame(self):
         return self._last_frame
 
+    @property
+    def frame_buffer(self):
+        """ Last frame_buffer_size video frames in chronological order.
+
+        @return numpy.ndarray: 3D array (frames, rows, columns) or None if no video was recorded
+        """
+        with self._frame_lock:
+            if self._frame_buffer is None:
+                return None
+            size = self._frame_buffer.shape[0]
+            if self._acquired_frames < size:
+                return np.array(self._frame_buffer[:self._acquired_frames])
+            return np.roll(self._frame_buffer, -(self._acquired_frames % size), axis=0)
+
+    @property
+    def frame_stack(self):
+        """ Video frames recorded to the memory-mapped stack in chronological order. Only the last
+        frame_stack_size frames are kept.
+
+        @return numpy.ndarray: 3D array (frames, rows, columns) or None if disabled
+        """
+        with self._frame_lock:
+            if self._frame_stack is None:
+                return None
+            if self._frame_stack_count < self._frame_stack.shape[0]:
+                return np.array(self._frame_stack[:self._frame_stack_count])
+            return np.roll(self._frame_stack, -self._frame_stack_index, axis=0)
+
+    @property
+    def frame_counters(self):
+        """ Frame statistics of the current or last video acquisition.
+
+        @return dict: number of acquired, displayed and missed frames. Missed frames were
+                      discarded by the camera before they could be read.
+        """
+        with self._frame_lock:
+            return {'acquired': self._acquired_frames,
+                    'displayed': self._displayed_frames,
+                    'missed': self._missed_frames}
+
     def set_exposure(self, time):
         """ Set exposure time of camera """
         with self._thread_lock:
@@ -143,36 +270,115 @@ class CameraLogic(LogicBase):
                 self.module_state.lock()
                 exposure = max(self._exposure, self._minimum_exposure_time)
                 camera = self._camera()
-                if camera.support_live_acquisition():
+                live = camera.support_live_acquisition()
+                with self._frame_lock:
+                    self._acquired_frames = 0
+                    self._missed_frames = 0
+                    self._displayed_frames = 0
+                    self._last_displayed = 0
+                    self._frame_stack_index = 0
+                    self._frame_stack_count = 0
+                self._last_display_time = 0
+                self._stop_requested = False
+                if live:
                     camera.start_live_acquisition()
+                    # read out the frame buffer of the camera about once per frame
+                    self._sig_start_worker.emit(True, exposure)
                 else:
-                    camera.start_single_acquisition()
-                self.__timer.start(1000 * exposure)
+                    self._sig_start_worker.emit(False, exposure)
             else:
                 self.log.error('Unable to start video acquisition. Acquisition still in progress.')
 
     def _stop_video(self):
-        """ Stop the data recording loop.
+        """ Stop the data recording loop. The acquisition finishes asynchronously, see
+        sigAcquisitionFinished.
         """
         with self._thread_lock:
             if self.module_state() == 'locked':
-                self.__timer.stop()
-                self._camera().stop_acquisition()
-                self.module_state.unlock()
-                self.sigAcquisitionFinished.emit()
+                self._stop_requested = True
 
-    def __acquire_video_frame(self):
-        """ Execute step in the data recording loop: save one of each control and process values
+    def _store_frames(self, frames, missed):
+        """ Write newly acquired frames into the ring buffer and the memory-mapped stack (if
+        enabled). Called from the worker thread.
+
+        @param numpy.ndarray frames: 3D array (frames, rows, columns), oldest frame first
+        @param int missed: number of frames discarded by the camera before the given frames
         """
+        with self._frame_lock:
+            self._missed_frames += missed
+            if len(frames) == 0:
+                return
+            if self._frame_buffer is None or self._frame_buffer.shape[1:] != frames.shape[1:] or \
+                    self._frame_buffer.dtype != frames.dtype:
+                self._frame_buffer = np.empty((max(1, int(self._frame_buffer_size)),
+                                               *frames.shape[1:]),
+                                              dtype=frames.dtype)
+                self._acquired_frames = self._last_displayed = 0
+            size = self._frame_buffer.shape[0]
+            # frames exceeding the ring buffer would be overwritten right away
+            self._acquired_frames += max(0, len(frames) - size)
+            for frame in frames[-size:]:
+                self._frame_buffer[self._acquired_frames % size] = frame
+                self._acquired_frames += 1
+            self._store_stack_frames(frames)
+
+    def _store_stack_frames(self, frames):
+        if self._frame_stack_size <= 0:
+            return
+        if self._frame_stack is None or self._frame_stack.shape[1:] != frames.shape[1:]:
+            os.makedirs(self.module_default_data_dir, exist_ok=True)
+            self._frame_stack = np.lib.format.open_memmap(
+                os.path.join(self.module_default_data_dir, 'camera_frame_stack.npy'),
+                mode='w+',
+                dtype=np.float64,
+                shape=(int(self._frame_stack_size), *frames.shape[1:])
+            )
+            self._frame_stack_index = 0
+            self._frame_stack_count = 0
+        for frame in frames[-self._frame_stack.shape[0]:]:
+            self._frame_stack[self._frame_stack_index] = frame
+            self._frame_stack_index = (self._frame_stack_index + 1) % self._frame_stack.shape[0]
+        self._frame_stack_count = min(self._frame_stack_count + len(frames),
+                                      self._frame_stack.shape[0])
+
+    def __frames_available(self):
+        """ Schedule the display of the latest frame, at most max_display_rate times per second.
+        """
+        if self.__timer.isActive():
+            return
+        delay = self._last_display_time + 1 / self._max_display_rate - time.perf_counter()
+        self.__timer.start(max(0, int(round(1000 * delay))))
+
+    def __display_latest_frame(self):
+        """ Send the latest frame of the ring buffer to the GUI. Older frames are skipped.
+        """
+        with self._frame_lock:
+            if self._frame_buffer is None or self._last_displayed == self._acquired_frames:
+                return
+            size = self._frame_buffer.shape[0]
+            self._last_frame = self._frame_buffer[(self._acquired_frames - 1) % size].copy()
+            self._last_displayed = self._acquired_frames
+            self._displayed_frames += 1
+        self._last_display_time = time.perf_counter()
+        self.sigFrameChanged.emit(self._last_frame)
+
+    def __video_finished(self):
+        if self.__timer is None:
+            # module has been deactivated in the meantime
+            return
         with self._thread_lock:
-            camera = self._camera()
-            self._last_frame = camera.get_acquired_data()
-            self.sigFrameChanged.emit(self._last_frame)
+            self.__timer.stop()
+            self.__display_latest_frame()
+            self._camera().stop_acquisition()
+            counters = self.frame_counters
+            self.log.debug('Video acquisition finished: {0[acquired]:d} frames acquired, '
+                           '{0[displayed]:d} displayed, {0[missed]:d} missed.'.format(counters))
+            if counters['missed'] > 0:
+                self.log.warning('{0:d} video frames were discarded by the camera before they '
+                                 'could be read.'.format(counters['missed']))
             if self.module_state() == 'locked':
-                exposure = max(self._exposure, self._minimum_exposure_time)
-                self.__timer.start(1000 * exposure)
-                if not camera.support_live_acquisition():
-                    camera.start_single_acquisition()  # the hardware has to check it's not busy
+                self.module_state.unlock()
+            self.sigAcquisitionFinished.emit()
 
     def create_tag(self, time_stamp):
         return f"{time_stamp}_captured_frame"
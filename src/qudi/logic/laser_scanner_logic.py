@@ -30,6 +30,7 @@ import numpy as np
 import time
 
 from qudi.core.connector import Connector
+from qudi.core.configoption import ConfigOption
 from qudi.core.statusvariable import StatusVar
 from qudi.util.mutex import RecursiveMutex
 from qudi.core.module import LogicBase
@@ -57,6 +58,11 @@ class LaserScannerLogic(LogicBase):
     resolution = StatusVar('resolution', 500)
     _scan_speed = StatusVar('scan_speed', 10)
     _static_v = StatusVar('goto_voltage', 5)
+    # maximum number of up/down scan line pairs written into a single hardware buffer
+    _max_lines_per_buffer = ConfigOption('max_lines_per_buffer', default=10, missing='nothing')
+    # maximum duration of a hardware buffer in s. A stop request takes effect when the current
+    # buffer is finished, so this limits the stop latency (to at least one line pair).
+    _max_buffer_duration = ConfigOption('max_buffer_duration', default=1, missing='nothing')
 
     sigChangeVoltage = QtCore.Signal(float)
     sigVoltageChanged = QtCore.Signal(float)
@@ -84,6 +90,12 @@ class LaserScannerLogic(LogicBase):
         self.plot_y = []
         self.plot_y2 = []
 
+        # cache of generated voltage ramps
+        self._ramp_cache = dict()
+        # hardware time spent in scan_line and total time since the first line of a scan
+        self._line_hardware_time = 0.
+        self._scan_start_time = 0.
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -111,8 +123,6 @@ class LaserScannerLogic(LogicBase):
         # Initialization of internal counter for scanning
         self._scan_counter_up = 0
         self._scan_counter_down = 0
-        # Keep track of scan direction
-        self.upwards_scan = True
 
         # calculated number of points in a scan, depends on speed and max step size
         self._num_of_steps = 50  # initialising.  This is calculated for a given ramp.
@@ -269,7 +279,6 @@ class LaserScannerLogic(LogicBase):
         """
 
         self.current_position = self._scanning_device.get_scanner_position()
-        print(self.current_position)
 
         if v_min is not None:
             self.scan_range[0] = v_min
@@ -282,13 +291,17 @@ class LaserScannerLogic(LogicBase):
 
         self._scan_counter_up = 0
         self._scan_counter_down = 0
-        self.upwards_scan = True
 
         # TODO: Generate Ramps
         self._upwards_ramp = self._generate_ramp(v_min, v_max, self._scan_speed)
         self._downwards_ramp = self._generate_ramp(v_max, v_min, self._scan_speed)
+        # One up- and downwards ramp pair. Several of these pairs are written into a single
+        # continuously clocked hardware buffer.
+        self._round_trip_ramp = np.hstack((self._upwards_ramp, self._downwards_ramp))
 
         self._initialise_data_matrix(len(self._upwards_ramp[3]))
+        self._line_hardware_time = 0.
+        self._scan_start_time = time.perf_counter()
 
         # Lock and set up scanner
         returnvalue = self._initialise_scanner()
@@ -319,11 +332,13 @@ class LaserScannerLogic(LogicBase):
                 self.module_state.unlock()
 
     def _do_next_line(self):
-        """ If stopRequested then finish the scan, otherwise perform next repeat of the scan line
+        """ If stopRequested then finish the scan, otherwise perform the next repeats of the scan
+        line. Several up- and downwards scan line pairs are scanned in a single hardware call,
+        limited by max_lines_per_buffer and max_buffer_duration.
         """
         # stops scanning
         if self.stopRequested or self._scan_counter_down >= self.number_of_repeats:
-            print(self.current_position)
+            self._log_dead_time()
             self._goto_during_scan(self._static_v)
             self._close_scanner()
             self.sigScanFinished.emit()
@@ -333,22 +348,38 @@ class LaserScannerLogic(LogicBase):
             # move from current voltage to start of scan range.
             self._goto_during_scan(self.scan_range[0])
 
-        if self.upwards_scan:
-            counts = self._scan_line(self._upwards_ramp)
-            self.scan_matrix[self._scan_counter_up] = counts
-            self.plot_y += counts
-            self._scan_counter_up += 1
-            self.upwards_scan = False
-        else:
-            counts = self._scan_line(self._downwards_ramp)
-            self.scan_matrix2[self._scan_counter_down] = counts
-            self.plot_y2 += counts
-            self._scan_counter_down += 1
-            self.upwards_scan = True
+        line_length = self._upwards_ramp.shape[1]
+        pairs_per_duration = int(self._max_buffer_duration * self._clock_frequency /
+                                 self._round_trip_ramp.shape[1])
+        num_pairs = min(self.number_of_repeats - self._scan_counter_down,
+                        max(1, min(int(self._max_lines_per_buffer), pairs_per_duration)))
+
+        start = time.perf_counter()
+        counts = self._scan_line(np.tile(self._round_trip_ramp, num_pairs))
+        self._line_hardware_time += time.perf_counter() - start
+
+        # demultiplex the counts into up- and downwards scan lines
+        counts = np.reshape(counts, (num_pairs, 2, line_length))
+        up_rows = slice(self._scan_counter_up, self._scan_counter_up + num_pairs)
+        down_rows = slice(self._scan_counter_down, self._scan_counter_down + num_pairs)
+        self.scan_matrix[up_rows] = counts[:, 0]
+        self.scan_matrix2[down_rows] = counts[:, 1]
+        self.plot_y += counts[:, 0].sum(axis=0)
+        self.plot_y2 += counts[:, 1].sum(axis=0)
+        self._scan_counter_up += num_pairs
+        self._scan_counter_down += num_pairs
 
         self.sigUpdatePlots.emit()
         self.sigScanNextLine.emit()
 
+    def _log_dead_time(self):
+        """ Log the average time per scan line not spent scanning in hardware. """
+        lines = self._scan_counter_up + self._scan_counter_down
+        if lines > 0:
+            dead_time = time.perf_counter() - self._scan_start_time - self._line_hardware_time
+            self.log.debug('Average dead time between scan lines: {0:.3f} ms'
+                           ''.format(1e3 * dead_time / lines))
+
     def _generate_ramp(self, voltage1, voltage2, speed):
         """Generate a ramp vrom voltage1 to voltage2 that
         satisfies the speed, step, smoothing_steps parameters.  Smoothing_steps=0 means that the
@@ -358,6 +389,28 @@ class LaserScannerLogic(LogicBase):
 
         @param float voltage2: voltage at end of ramp.
         """
+        # Put the voltage ramp into a scan line for the hardware (4-dimension)
+        spatial_pos = tuple(self._scanning_device.get_scanner_position()[:3])
+
+        key = (voltage1, voltage2, speed, self._clock_frequency, self._smoothing_steps,
+               spatial_pos)
+        scan_line = self._ramp_cache.get(key)
+        if scan_line is not None:
+            return scan_line
+
+        ramp = self._generate_voltage_ramp(voltage1, voltage2, speed)
+        scan_line = np.empty((4, len(ramp)))
+        scan_line[:3] = np.asarray(spatial_pos)[:, np.newaxis]
+        scan_line[3] = ramp
+
+        # keep the cache small, only a few ramps are in use at any time
+        if len(self._ramp_cache) >= 16:
+            self._ramp_cache.clear()
+        self._ramp_cache[key] = scan_line
+        return scan_line
+
+    def _generate_voltage_ramp(self, voltage1, voltage2, speed):
+        """ Calculate the 1D voltage ramp for _generate_ramp. """
 
         # It is much easier to calculate the smoothed ramp for just one direction (upwards),
         # and then to reverse it if a downwards ramp is required.
@@ -372,12 +425,9 @@ class LaserScannerLogic(LogicBase):
             linear_v_step = speed / self._clock_frequency
             smoothing_range = self._smoothing_steps + 1
 
-            # Sanity check in case the range is too short
-
-            # The voltage range covered while accelerating in the smoothing steps
-            v_range_of_accel = sum(
-                n * linear_v_step / smoothing_range for n in range(0, smoothing_range)
-                )
+            # The voltage range covered while accelerating in the smoothing steps,
+            # i.e. the sum of n * linear_v_step / smoothing_range for n < smoothing_range
+            v_range_of_accel = linear_v_step * (smoothing_range - 1) / 2
 
             # Obtain voltage bounds for the linear part of the ramp
             v_min_linear = v_min + v_range_of_accel
@@ -388,19 +438,17 @@ class LaserScannerLogic(LogicBase):
                     'Voltage ramp too short to apply the '
                     'configured smoothing_steps. A simple linear ramp '
                     'was created instead.')
-                num_of_linear_steps = np.rint((v_max - v_min) / linear_v_step)
+                num_of_linear_steps = int(np.rint((v_max - v_min) / linear_v_step))
                 ramp = np.linspace(v_min, v_max, num_of_linear_steps)
 
             else:
 
-                num_of_linear_steps = np.rint((v_max_linear - v_min_linear) / linear_v_step)
+                num_of_linear_steps = int(np.rint((v_max_linear - v_min_linear) / linear_v_step))
 
-                # Calculate voltage step values for smooth acceleration part of ramp
-                smooth_curve = np.array(
-                    [sum(
-                        n * linear_v_step / smoothing_range for n in range(1, N)
-                        ) for N in range(1, smoothing_range)
-                    ])
+                # Calculate voltage step values for smooth acceleration part of ramp, i.e. the
+                # cumulative sum of n * linear_v_step / smoothing_range for n < N
+                steps = np.arange(self._smoothing_steps)
+                smooth_curve = steps * (steps + 1) / 2 * linear_v_step / smoothing_range
 
                 accel_part = v_min + smooth_curve
                 decel_part = v_max - smooth_curve[::-1]
@@ -412,18 +460,7 @@ class LaserScannerLogic(LogicBase):
         # Reverse if downwards ramp is required
         if voltage2 < voltage1:
             ramp = ramp[::-1]
-
-        # Put the voltage ramp into a scan line for the hardware (4-dimension)
-        spatial_pos = self._scanning_device.get_scanner_position()
-
-        scan_line = np.vstack((
-            np.ones((len(ramp), )) * spatial_pos[0],
-            np.ones((len(ramp), )) * spatial_pos[1],
-            np.ones((len(ramp), )) * spatial_pos[2],
-            ramp
-            ))
-
-        return scan_line
+        return ramp
 
     def _scan_line(self, line_to_scan=None):
         """do a single voltage scan from voltage1 to voltage2
@@ -1,5 +1,7 @@
 # Modified from (c) 2019, Robert Kauffman
+import math
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 from qudi.core.connector import Connector
 from qudi.core.statusvariable import StatusVar
@@ -10,6 +12,36 @@ from qudi.util.mutex import Mutex
 import time
 
 
+def _quadratic_design(u, full):
+    """ Design matrix of a quadratic model in the coordinates u (points, dimensions). The model
+    contains all mixed terms if full is True, otherwise only the squares.
+    """
+    dims = u.shape[1]
+    columns = [np.ones(len(u))] + [u[:, i] for i in range(dims)]
+    if full:
+        columns += [u[:, i] * u[:, j] for i in range(dims) for j in range(i, dims)]
+    else:
+        columns += [u[:, i] ** 2 for i in range(dims)]
+    return np.column_stack(columns)
+
+
+def _quadratic_gradient_hessian(coefficients, dims, full):
+    """ Gradient and Hessian at the origin of a quadratic model fitted with _quadratic_design.
+    """
+    gradient = coefficients[1:dims + 1]
+    hessian = np.zeros((dims, dims))
+    index = dims + 1
+    if full:
+        for i in range(dims):
+            for j in range(i, dims):
+                hessian[i, j] += coefficients[index]
+                hessian[j, i] += coefficients[index]
+                index += 1
+    else:
+        hessian[np.diag_indices(dims)] = 2 * coefficients[index:]
+    return gradient, hessian
+
+
 class autoalignmentLogic(LogicBase):
 
     """
@@ -21,12 +53,29 @@ class autoalignmentLogic(LogicBase):
             # timetaggerlogic: 'timetaggerlogic'
         options:
             timetagger_read_channel: 'APDset2'
+            averaging_time: 1  # optional, time in seconds the time series trace is averaged
+            settling_time: 0.1  # optional, time in seconds to wait after a move before averaging
+            concurrent_moves: True  # optional, move axes on different drivers at the same time
+            evaluation_cache_lifetime: 60  # optional, time in seconds read outs are reused
+            backlash_factors:  # optional, calibration of negative steps
+                x1: 1.3
+                y1: 1.34
+                x2: 1.19
+                y2: 1.23
+                z: 1.2
     """
     # connector
     pmc = Connector(interface='NF8752Logic')
     thorlabspm1 = Connector(interface = "ThorlabsPM", optional=True)
     _time_series_logic_con = Connector(interface='TimeSeriesReaderLogic', optional = True)
     _timetagger_read_channel = ConfigOption('timetagger_read_channel', missing='info')
+    _averaging_time = ConfigOption('averaging_time', default=1.)
+    _settling_time = ConfigOption('settling_time', default=0.1)
+    _concurrent_moves = ConfigOption('concurrent_moves', default=True)
+    _evaluation_cache_lifetime = ConfigOption('evaluation_cache_lifetime', default=60.)
+    _backlash_factors = ConfigOption('backlash_factors',
+                                     default={'x1': 1.3, 'y1': 1.34, 'x2': 1.19, 'y2': 1.23,
+                                              'z': 1.2})
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -49,10 +98,16 @@ class autoalignmentLogic(LogicBase):
         #The length of optimization time in seconds. 
         self.timeout = 100
         self._current_position = [0,0,0,0,0]
+        self._last_move_time = 0
+        # read outs of visited positions {position: (time, value)}
+        self._evaluation_cache = dict()
+        self.evaluation_count = 0
+        self._move_executor = ThreadPoolExecutor(max_workers=len(self.motor_alphabet))
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        self._move_executor.shutdown()
         if self._tlpm is not None:
             self._tlpm.disconnect()
 
@@ -60,26 +115,23 @@ class autoalignmentLogic(LogicBase):
         """ Read the output of powermeter or timetagger counter.
         """
         if self._tlpm is not None:
-            # power measurement
-            power_measurements = []
-            count = 0 
-            while count < self.num_samples:
-                power_measurements.append(self._tlpm.get_power())
-                count+=1
-                tools.delay(500)
-            power_measurements = np.array(power_measurements)
+            # power measurement once the settling time after the last move has passed
+            remaining = self._last_move_time + self._settling_time - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            power_measurements = np.array([self._tlpm.get_power() for _ in range(self.num_samples)])
             value = np.mean(power_measurements)
         else:
-            power_measurements = []
-            count = 0 
-            while count < self.num_samples:
-                data_time, data = self._time_series_logic.trace_data
-                power_measurements.append(data[self._timetagger_read_channel][-1])
-                count+=1
-                tools.delay(1100)
-            power_measurements = np.array(power_measurements)
-            value = np.mean(power_measurements)
-
+            # average the latest window of the time series trace once it was fully recorded
+            # after the last move
+            remaining = self._last_move_time + self._settling_time + self._averaging_time \
+                        - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            data_time, data = self._time_series_logic.trace_data
+            window = max(1, int(round(self._averaging_time * self._time_series_logic.data_rate)))
+            value = np.mean(data[self._timetagger_read_channel][-window:])
+        self.evaluation_count += 1
         return value
 
     def move_motors_abs(self, position):
@@ -90,44 +142,77 @@ class autoalignmentLogic(LogicBase):
         if len(position) != self.motor_number:
             self.log.error('position dimension doesnt match motor list dimension.')
             return
-        # if 'z' in motor_list
-        if len(position) > 4:
-            # move z axis
-            steps_z = position[self.channel_codes['z']] - self._current_position[self.channel_codes['z']]
-            if steps_z < 0:
-                steps_z = steps_z *1.20 # calibrate the backlash
-            self._pmc.move_rel(steps=steps_z, axis= 'z',vel=self._vel, acc=self._acc)
-
-        # move 'x1' and 'x2'
-        steps_x1 = position[self.channel_codes['x1']] - self._current_position[self.channel_codes['x1']]
-        if steps_x1 < 0:
-            steps_x1 = steps_x1 *1.3 # calibrate the backlash
-        self._pmc.move_rel(steps=steps_x1, axis= 'x1',vel=self._vel, acc=self._acc)
-
-        steps_x2 = position[self.channel_codes['x2']] - self._current_position[self.channel_codes['x2']]
-        if steps_x2 < 0:
-            steps_x2 = steps_x2 *1.19 # calibrate the backlash
-        self._pmc.move_rel(steps=steps_x2, axis= 'x2',vel=self._vel, acc=self._acc)
-
-
-        # move 'y1' and 'y2'
-        steps_y1 = position[self.channel_codes['y1']] - self._current_position[self.channel_codes['y1']]
-        if steps_y1 < 0:
-            steps_y1 = steps_y1 *1.34 # calibrate the backlash
-        self._pmc.move_rel(steps=steps_y1, axis= 'y1',vel=self._vel, acc=self._acc)
-
-        steps_y2 = position[self.channel_codes['y2']] - self._current_position[self.channel_codes['y2']]
-        if steps_y2 < 0:
-            steps_y2 = steps_y2 *1.23 # calibrate the backlash
-        self._pmc.move_rel(steps=steps_y2, axis= 'y2',vel=self._vel, acc=self._acc)
-
+        steps = dict()
+        for motor in self.motor_list:
+            step = position[self.channel_codes[motor]] - self._current_position[self.channel_codes[motor]]
+            if step < 0:
+                step = step * self._backlash_factors[motor] # calibrate the backlash
+            if int(step) != 0:
+                steps[motor] = step
+        self._move_motors_rel(steps)
         self._current_position = list(position)
         output = self.read_output()
         return output
-    
+
+    def _motor_driver(self, motor):
+        """ Driver channel of a motor. Only one motor per driver can move at a time.
+        """
+        axis_codes = getattr(self._pmc, 'axis_codes', None)
+        if axis_codes is None:
+            return motor
+        return math.ceil(axis_codes[motor] / 3)
+
+    def _move_motors_rel(self, steps):
+        """ Move the motors by the given steps. Motors on different drivers are moved at the same
+        time, motors sharing a driver one after another. The controller logic serializes the
+        commands of concurrent moves.
+        """
+        groups = dict()
+        for motor, step in steps.items():
+            groups.setdefault(self._motor_driver(motor), list()).append((motor, step))
+
+        def move_group(group):
+            for motor, step in group:
+                self._pmc.move_rel(steps=step, axis=motor, vel=self._vel, acc=self._acc)
+
+        if self._concurrent_moves and len(groups) > 1:
+            futures = [self._move_executor.submit(move_group, group) for group in groups.values()]
+            for future in futures:
+                future.result()
+        else:
+            for group in groups.values():
+                move_group(group)
+        self._last_move_time = time.perf_counter()
+
+    def evaluate_positions(self, positions):
+        """
+        Return the read out at each of the positions. Positions are rounded to full steps. Read outs
+        of positions visited within evaluation_cache_lifetime are reused, the other positions are
+        visited in nearest neighbour order starting from the current position.
+        """
+        keys = [tuple(int(round(x)) for x in position) for position in positions]
+        now = time.perf_counter()
+        pending = [key for key in dict.fromkeys(keys)
+                   if key not in self._evaluation_cache
+                   or now - self._evaluation_cache[key][0] > self._evaluation_cache_lifetime]
+        current = np.asarray(self._current_position[:len(self.motor_list)])
+        while pending:
+            key = min(pending, key=lambda k: np.abs(np.asarray(k) - current).sum())
+            pending.remove(key)
+            self._evaluation_cache[key] = (time.perf_counter(), self.move_motors_abs(list(key)))
+            current = np.asarray(key)
+        return [self._evaluation_cache[key][1] for key in keys]
+
+    def evaluate(self, position):
+        """
+        Return the read out at the position, see evaluate_positions.
+        """
+        return self.evaluate_positions([position])[0]
+
     def define_home(self):
         self.motor_number = len(self.motor_list)
         self._current_position = list([0]*self.motor_number)
+        self._evaluation_cache.clear()
 
     def randomize_initial_simplex(self,simplex_range):
         """
@@ -142,11 +227,8 @@ class autoalignmentLogic(LogicBase):
             self.log.error('Need at least 2 axises for optimization.')
             return
         motor_position = [0]*self.motor_number
-        output = self.read_output()
         simplex = []
-        output_simplex = []
         simplex.append(motor_position)
-        output_simplex.append(output)
         # we need to measure motor_number + 1 positions
 
         for i in range(self.motor_number):
@@ -154,9 +236,8 @@ class autoalignmentLogic(LogicBase):
             for motor in self.motor_list:
                 position = np.random.randint(low=-(simplex_range[motor]/2), high=(simplex_range[motor]/2))
                 motor_position.append(position)
-            output = self.move_motors_abs(motor_position)
             simplex.append(motor_position)
-            output_simplex.append(output)
+        output_simplex = self.evaluate_positions(simplex)
 
         #Orders simplex positions from least to greatest output.
         sorted_output_simplex, sorted_simplex = zip(*sorted(zip(output_simplex,simplex)))
@@ -175,7 +256,7 @@ class autoalignmentLogic(LogicBase):
         self.log.info(f'centroid_position= {centroid_position}')
         reflection_position = centroid_position + 1*(centroid_position-worst_position)
         # move motors to the reflection position
-        reflection_output = self.move_motors_abs(reflection_position)
+        reflection_output = self.evaluate(reflection_position)
         # if the reflection point is within the rest output_simplex range, accept the reflection.
         if sorted_output_simplex[1] < reflection_output <= sorted_output_simplex[-1]:
             sorted_simplex[0] = list(reflection_position)
@@ -183,7 +264,7 @@ class autoalignmentLogic(LogicBase):
         # if reflection was very good, try expanding further
         elif reflection_output > sorted_output_simplex[-1]:
             expansion_position = centroid_position + 2 * (reflection_position - centroid_position)
-            expansion_output = self.move_motors_abs(expansion_position)
+            expansion_output = self.evaluate(expansion_position)
             # Keep whichever is better
             if reflection_output > expansion_output:
                 sorted_simplex[0] = list(reflection_position)
@@ -194,7 +275,7 @@ class autoalignmentLogic(LogicBase):
         # if reflection is not so good but better than the worst, try outside contraction
         elif sorted_output_simplex[0] < reflection_output <= sorted_output_simplex[1]:
             contraction_position = centroid_position + 0.5 * (reflection_position - centroid_position)
-            contraction_output = self.move_motors_abs(contraction_position)
+            contraction_output = self.evaluate(contraction_position)
             # if contraction output is better than the reflection output, keep it. Otherwise shrink step: all new simplex positions shrunk toward the current best position
             if contraction_output > reflection_output:
                 sorted_simplex[0] = list(contraction_position)
@@ -202,11 +283,11 @@ class autoalignmentLogic(LogicBase):
             else:
                 for i in range(self.motor_number):
                     sorted_simplex[i] = list(np.asarray(sorted_simplex[-1]) + 0.5 * (np.asarray(sorted_simplex[i]) - np.asarray(sorted_simplex[-1])))
-                    sorted_output_simplex[i] = self.move_motors_abs(sorted_simplex[i])
+                sorted_output_simplex[:self.motor_number] = self.evaluate_positions(sorted_simplex[:self.motor_number])
         # if the reflection is worse than the worst, try inside contraction
         else:
             contraction_position = centroid_position + 0.5 * (worst_position - centroid_position)
-            contraction_output = self.move_motors_abs(contraction_position)
+            contraction_output = self.evaluate(contraction_position)
             # if contraction output is better than the worst output, keep it. Otherwise shrink step: all new simplex positions shrunk toward the current best position
             if contraction_output > sorted_output_simplex[0]:
                 sorted_simplex[0] = list(contraction_position)
@@ -214,7 +295,7 @@ class autoalignmentLogic(LogicBase):
             else:
                 for i in range(self.motor_number):
                     sorted_simplex[i] = list(np.asarray(sorted_simplex[-1]) + 0.5 * (np.asarray(sorted_simplex[i]) - np.asarray(sorted_simplex[-1])))
-                    sorted_output_simplex[i] = self.move_motors_abs(sorted_simplex[i])
+                sorted_output_simplex[:self.motor_number] = self.evaluate_positions(sorted_simplex[:self.motor_number])
         final_output_simplex, final_simplex = zip(*sorted(zip(sorted_output_simplex,sorted_simplex)))
         return list(final_simplex), list(final_output_simplex)
     
@@ -467,4 +548,75 @@ class autoalignmentLogic(LogicBase):
         self.correct_hysteresis()
         self.log.info('Local Max Achieved.')
         final_output = self.read_output()
-        self.log.info(f'Final power ={final_output}')
\ No newline at end of file
+        self.log.info(f'Final power ={final_output}')
+
+    def optimize_surrogate(self, initial_step=None, min_step=2, max_evaluations=100):
+        """
+        Maximize the output with a quadratic surrogate model in a trust region, starting at the
+        current position. The model is fitted to the logarithm of the output, so a Gaussian
+        coupling efficiency is described exactly and the maximum is usually found with far fewer
+        read outs than with the downhill simplex.
+
+        @param dict initial_step: initial trust region size in steps per motor, defaults to a tenth
+                                  of full_simplex_range
+        @param float min_step: stop once the trust region is smaller than this for all motors
+        @param int max_evaluations: maximum number of read outs
+
+        @return tuple(list, float): best position and the output there
+        """
+        if initial_step is None:
+            initial_step = {k: v/10 for k, v in self.full_simplex_range.items()}
+        self.motor_number = len(self.motor_list)
+        dims = self.motor_number
+        radius = np.array([initial_step[motor] for motor in self.motor_list], dtype=float)
+        max_radius = np.array([self.full_simplex_range[motor] for motor in self.motor_list],
+                              dtype=float)
+        center = np.round(self._current_position[:dims]).astype(int)
+        # Initial design: center, steps along each axis in both directions and along each pair of
+        # axes. These are just enough positions to fit the full quadratic model.
+        offsets = np.round(radius * np.eye(dims)).astype(int)
+        positions = [center] + [center + sign * offsets[i] for i in range(dims) for sign in (1, -1)]
+        positions += [center + offsets[i] + offsets[j] for i in range(dims)
+                      for j in range(i + 1, dims)]
+        # evaluated positions and read outs of this run
+        outputs = self.evaluate_positions(positions)
+        evaluations = len(positions)
+        best = int(np.argmax(outputs))
+        while evaluations < max_evaluations and np.any(radius >= min_step):
+            points = np.asarray(positions, dtype=float)
+            values = np.asarray(outputs, dtype=float)
+            log_values = np.log(np.clip(values, 1e-6 * np.abs(values).max() + 1e-300, None))
+            scaled = (points - points[best]) / radius
+            # fit the points close to the best one, the model is only valid locally
+            distance = np.abs(scaled).max(axis=1)
+            full = len(points) >= 1 + dims + dims * (dims + 1) // 2
+            parameters = 1 + dims + dims * (dims + 1) // 2 if full else 1 + 2 * dims
+            selection = np.argsort(distance)[:2 * parameters]
+            design = _quadratic_design(scaled[selection], full)
+            coefficients = np.linalg.lstsq(design, log_values[selection], rcond=None)[0]
+            gradient, hessian = _quadratic_gradient_hessian(coefficients, dims, full)
+            if np.all(np.linalg.eigvalsh(hessian) < 0):
+                step = np.clip(-np.linalg.solve(hessian, gradient), -1, 1)
+            else:
+                step = gradient / max(np.abs(gradient).max(), 1e-300)
+            predicted = gradient @ step + 0.5 * step @ hessian @ step
+            candidate = np.round(points[best] + step * radius).astype(int)
+            if any(np.array_equal(candidate, position) for position in positions) or predicted <= 0:
+                radius *= 0.5
+                continue
+            output = self.evaluate(candidate)
+            evaluations += 1
+            positions.append(candidate)
+            outputs.append(output)
+            actual = np.log(max(output, 1e-300)) - log_values[best]
+            ratio = actual / predicted
+            if output > outputs[best]:
+                best = len(outputs) - 1
+            if ratio > 0.75 and np.abs(step).max() > 0.9:
+                radius = np.minimum(2 * radius, max_radius)
+            elif ratio < 0.25:
+                radius *= 0.5
+        best_position = [int(x) for x in positions[best]]
+        self.log.info(f'Surrogate optimization: best position = {best_position}, '
+                      f'output = {outputs[best]}, {evaluations} evaluations')
+        return best_position, self.move_motors_abs(best_position)
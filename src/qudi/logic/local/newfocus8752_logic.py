@@ -2,6 +2,7 @@
 
 from qudi.core.connector import Connector
 from qudi.core.module import LogicBase
+from qudi.util.mutex import RecursiveMutex
 import math
 import time
 
@@ -17,6 +18,9 @@ class NF8752Logic(LogicBase):
 
     def on_activate(self):
         self._tcpclient = self.tcpclient()
+        # Commands of one axis (channel selection, settings and move) must not interleave with
+        # commands of other threads, since all go through the same TCP client.
+        self._thread_lock = RecursiveMutex()
         # nf8752 drives motors with driver channel + motor channel. To simplify assigning driver channels and motor channels for each picomotor.
         # We define axis codes. The driver channel is calculated as the ceiling of the axis code divided by 3,
         # the motor channel is the remainder of the axis code divided by 3. 
@@ -34,17 +38,17 @@ class NF8752Logic(LogicBase):
     def send(self, cmd):
         """Send a command to the picomotor driver."""
         # reset the buffer
-
-        try:
-            self._tcpclient.start_command()
-            line = cmd + '\r\n'
-            self._tcpclient.send_byte(line)
-        except:
-            self._tcpclient.disconnect()
-            self._tcpclient.connect()
-            self._tcpclient.start_command()
-            line = cmd + '\r\n'
-            self._tcpclient.send_byte(line)
+        with self._thread_lock:
+            try:
+                self._tcpclient.start_command()
+                line = cmd + '\r\n'
+                self._tcpclient.send_byte(line)
+            except:
+                self._tcpclient.disconnect()
+                self._tcpclient.connect()
+                self._tcpclient.start_command()
+                line = cmd + '\r\n'
+                self._tcpclient.send_byte(line)
 
     def readlines(self):
         """Read response from picomotor driver."""
@@ -94,13 +98,14 @@ class NF8752Logic(LogicBase):
         Moves the specified axis to its limit
         :param direction: 'forward' or 'reverse', if we want to find the forward or reverse limit.
         """
-        self.set_axis(axis, vel=vel, acc=acc)
+        with self._thread_lock:
+            self.set_axis(axis, vel=vel, acc=acc)
 
-        if direction == 'forward':
-            cmd = 'fli {driver}'.format(driver=f'a{math.ceil(self.axis_codes[axis]/3)}')
-        elif direction == 'reverse':
-            cmd = 'rli {driver}'.format(driver=f'a{math.ceil(self.axis_codes[axis]/3)}')
-        return self.send(cmd)
+            if direction == 'forward':
+                cmd = 'fli {driver}'.format(driver=f'a{math.ceil(self.axis_codes[axis]/3)}')
+            elif direction == 'reverse':
+                cmd = 'rli {driver}'.format(driver=f'a{math.ceil(self.axis_codes[axis]/3)}')
+            return self.send(cmd)
 
     def move_rel(self, steps, axis, vel=100, acc=500, go=True):
         """
@@ -111,13 +116,15 @@ class NF8752Logic(LogicBase):
         """
 
         steps = int(steps)
-        self.set_axis(axis, vel=vel, acc=acc)
         cmd = 'rel {driver}={steps}'.format(
             driver=f'a{math.ceil(self.axis_codes[axis]/3)}', steps=steps)
         if go:
             cmd = cmd + ' g'
         delay = math.ceil(abs(steps/vel))
-        self.send(cmd)
+        # other threads may send commands while this axis is moving
+        with self._thread_lock:
+            self.set_axis(axis, vel=vel, acc=acc)
+            self.send(cmd)
         time.sleep(delay+0.5)
 
     def go(self):
@@ -27,6 +27,7 @@ import matplotlib.pyplot as plt
 from PySide2 import QtCore
 
 from qudi.util.datafitting import FitContainer, FitConfigurationsModel
+from qudi.util.sweep_buffer import SweepBuffer
 from qudi.core.module import LogicBase
 from qudi.util.mutex import RecursiveMutex
 from qudi.util.units import ScaledFloat
@@ -50,6 +51,7 @@ class OdmrLogic(LogicBase):
             data_scanner: <data_scanner_name>
         options:
             default_scan_mode: 'JUMP_LIST'  # optional
+            max_raw_data_bytes: 1e9  # optional, memory limit of the raw data (null: no limit)
     """
 
     # declare connectors
@@ -61,6 +63,7 @@ class OdmrLogic(LogicBase):
     _default_scan_mode = ConfigOption(name='default_scan_mode',
                                       default='JUMP_LIST',
                                       constructor=lambda x: SamplingOutputMode[x.upper()])
+    _max_raw_data_bytes = ConfigOption(name='max_raw_data_bytes', default=1e9)
 
     # declare status variables
     _cw_frequency = StatusVar(name='cw_frequency', default=2870e6)
@@ -121,7 +124,7 @@ class OdmrLogic(LogicBase):
         self._fit_container = None
         self._fit_config_model = None
 
-        self._raw_data = None
+        self._sweep_buffer = None
         self._signal_data = None
         self._frequency_data = None
         self._fit_results = None
@@ -193,41 +196,23 @@ class OdmrLogic(LogicBase):
         """ Initializing the ODMR data arrays (signal and raw data matrix). """
         self._frequency_data = [np.linspace(*r) for r in self._scan_frequency_ranges]
 
-        self._raw_data = dict()
-        self._fit_results = dict()
-        self._signal_data = dict()
         estimated_samples = self._run_time * self._data_rate
         samples_per_line = sum(freq_range[-1] for freq_range in self._scan_frequency_ranges)
         # Add 5% Safety; Minimum of 1 line
         self.__estimated_lines = max(1, int(1.05 * estimated_samples / samples_per_line))
-        for channel in self._scanner._channel_labelsandunits.keys():
-            self._raw_data[channel] = [
-                np.full((freq_arr.size, self.__estimated_lines), np.nan) for freq_arr in
-                self._frequency_data
-            ]
-            self._signal_data[channel] = [
-                np.zeros(freq_arr.size) for freq_arr in self._frequency_data
-            ]
-            self._fit_results[channel] = [None] * len(self._frequency_data)
+        # All channels and ranges in one lines x channels x points array
+        self._sweep_buffer = SweepBuffer(self._scanner._channel_labelsandunits.keys(),
+                                         [freq_arr.size for freq_arr in self._frequency_data],
+                                         lines=self.__estimated_lines,
+                                         max_bytes=self._max_raw_data_bytes)
+        self._signal_data = self._sweep_buffer.split(self._sweep_buffer.mean())
+        self._fit_results = {channel: [None] * len(self._frequency_data) for channel in
+                             self._sweep_buffer.channels}
 
     def _calculate_signal_data(self):
-        for channel, raw_data_list in self._raw_data.items():
-            for range_index, raw_data in enumerate(raw_data_list):
-                masked_raw_data = np.ma.masked_invalid(raw_data)
-                if masked_raw_data.compressed().size == 0:
-                    arr_size = self._frequency_data[range_index].size
-                    self._signal_data[channel][range_index] = np.zeros(arr_size)
-                elif self._scans_to_average > 0:
-                    self._signal_data[channel][range_index] = np.mean(
-                        masked_raw_data[:, :self._scans_to_average],
-                        axis=1
-                    ).compressed()
-                    if self._signal_data[channel][range_index].size == 0:
-                        arr_size = self._frequency_data[range_index].size
-                        self._signal_data[channel][range_index] = np.zeros(arr_size)
-                else:
-                    self._signal_data[channel][range_index] = np.mean(masked_raw_data,
-                                                                      axis=1).compressed()
+        # One reduction over all channels and ranges, split into views afterwards
+        signal = self._sweep_buffer.mean(self._scans_to_average)
+        self._signal_data = self._sweep_buffer.split(signal)
 
     @property
     def fit_config_model(self):
@@ -255,7 +240,15 @@ class OdmrLogic(LogicBase):
 
     @property
     def raw_data(self):
-        return self._raw_data.copy()
+        with self._threadlock:
+            sweep_buffer = self._sweep_buffer
+            if sweep_buffer.lines == 0:
+                # a line of NaN to display before the first sweep
+                return sweep_buffer.split(
+                    np.full((1, len(sweep_buffer.channels), sweep_buffer.points), np.nan)
+                )
+            # copy, the sweep buffer moves the stored lines when making room for new ones
+            return sweep_buffer.split(sweep_buffer.data.copy())
 
     @property
     def frequency_data(self):
@@ -661,33 +654,15 @@ class OdmrLogic(LogicBase):
                 self.stop_odmr_scan()
                 return
 
-            # Add new count data to raw_data array and append if array is too small
-            current_line_buffer_size = next(iter(self._raw_data.values()))[0].shape[1]
-            if self._elapsed_sweeps == current_line_buffer_size:
-                self.log.debug(f'extending data grid for sweep number {self._elapsed_sweeps}')
-                expand_arrays = tuple(np.full((r[-1], self.__estimated_lines), np.nan) for r in
-                                      self._scan_frequency_ranges)
-                self._raw_data = {
-                    ch: [np.concatenate((r, expand_arrays[ii]), axis=0) for ii, r in
-                         enumerate(range_list)] for ch, range_list in self._raw_data.items()
-                }
+            # Add new count data as newest line of the raw data (grows the buffer if needed)
+            self._sweep_buffer.add_line(new_counts)
+            if self._sweep_buffer.sweeps - self._sweep_buffer.lines == 1:
                 self.log.warning(
-                    'raw data scan line buffer was not big enough for the entire measurement. '
-                    'Buffer will be expanded.\nOld line buffer size was {0:d}, new line buffer '
-                    'size is {1:d}.'.format(current_line_buffer_size,
-                                            current_line_buffer_size + self.__estimated_lines)
+                    'Raw data reached the memory limit of {0:.3g} bytes ({1:d} scan lines). The '
+                    'oldest scan lines are discarded, the signal is still averaged over all '
+                    'sweeps.'.format(self._max_raw_data_bytes, self._sweep_buffer.max_lines)
                 )
 
-            # shift data in the array "up" and add new data at the "bottom"
-            for ch, range_list in enumerate(self._raw_data.values()):
-                start = 0
-                for range_index, range_params in enumerate(self._scan_frequency_ranges):
-                    range_list[range_index] = np.roll(range_list[range_index], 1, axis=1)
-                    self.test1 = ch
-                    tmp = list(new_counts[ch][start:start + range_params[-1]])
-                    range_list[range_index][0:len(tmp), 0] = tmp
-                    start += range_params[-1]
-
             # Calculate averaged signal
             self._calculate_signal_data()
 
@@ -733,6 +708,7 @@ class OdmrLogic(LogicBase):
                     'Microwave Scan Power (dBm)': self._scan_power,
                     'Approx. Run Time (s)': self._elapsed_time,
                     'Number of Frequency Sweeps (#)': self._elapsed_sweeps,
+                    'Number of Stored Frequency Sweeps (#)': self._sweep_buffer.lines,
                     'Start Frequencies (Hz)': tuple(rng[0] for rng in self._scan_frequency_ranges),
                     'Stop Frequencies (Hz)': tuple(rng[1] for rng in self._scan_frequency_ranges),
                     'Step sizes (Hz)': tuple(rng[2] for rng in self._scan_frequency_ranges),
@@ -761,10 +737,9 @@ class OdmrLogic(LogicBase):
 
         @param str channel: The channel name for which to join the raw data
         """
-        channel_data = self._raw_data[channel]
-        # Filter raw data to get rid of invalid values (nan or inf)
-        joined_data = np.concatenate([raw[:, :self._elapsed_sweeps] for raw in channel_data],
-                                     axis=0)
+        # all ranges of a channel are next to each other in the sweep buffer
+        channel_index = self._sweep_buffer.channels.index(channel)
+        joined_data = self._sweep_buffer.data[:, channel_index, :].T
         # add frequency data as first column
         return np.column_stack((np.concatenate(self._frequency_data), joined_data))
 
@@ -789,7 +764,7 @@ class OdmrLogic(LogicBase):
             # Save raw data in a separate file per data channel
             data_storage = TextDataStorage(root_dir=self.module_default_data_dir,
                                            column_formats='.15e')
-            for channel, range_data in self._raw_data.items():
+            for channel in self._sweep_buffer.channels:
                 metadata['Channel Name'] = channel
                 column_headers = self._get_raw_column_headers(channel)
                 nametag = f'{tag}ODMR_{channel}_raw'
@@ -806,7 +781,7 @@ class OdmrLogic(LogicBase):
                 # Save plot images if required. This takes by far the most time to complete.
                 if self._save_thumbnails:
                     fig_path_stump = file_path.rsplit('_raw.', 1)[0] + '_range'
-                    for range_index, _ in enumerate(range_data):
+                    for range_index, _ in enumerate(self._frequency_data):
                         fig = self._draw_figure(channel, range_index)
                         fig_path = f'{fig_path_stump}{range_index:d}'
                         data_storage.save_thumbnail(fig, file_path=fig_path)
@@ -836,7 +811,7 @@ class OdmrLogic(LogicBase):
         """
         freq_data = self._frequency_data[range_index]
         signal_data = self._signal_data[channel][range_index]
-        raw_data = self._raw_data[channel][range_index][:, :self._elapsed_sweeps]
+        raw_data = self.raw_data[channel][range_index]
         fit_result = self._fit_results[channel][range_index]
         if fit_result is not None:
             fit_x, fit_y = fit_result[1].high_res_best_fit
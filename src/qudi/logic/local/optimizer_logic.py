@@ -26,7 +26,9 @@ import time
 from qudi.core.module import LogicBase
 from qudi.core.connector import Connector
 from qudi.core.statusvariable import StatusVar
+from qudi.core.configoption import ConfigOption
 from qudi.util.mutex import Mutex
+from qudi.util.peak_estimators import estimate_gaussian_peak_2d
 
 
 class OptimizerLogic(LogicBase):
@@ -38,6 +40,10 @@ class OptimizerLogic(LogicBase):
     confocalscanner1 = Connector(interface='ConfocalScannerInterface')
     fitlogic = Connector(interface='FitLogic')
 
+    # config options
+    _fast_peak_estimation = ConfigOption('fast_peak_estimation', True)
+    _peak_estimation_min_snr = ConfigOption('peak_estimation_min_snr', 10.)
+
     # declare status vars
     _clock_frequency = StatusVar('clock_frequency', 50)
     return_slowness = StatusVar(default=20)
@@ -380,14 +386,27 @@ class OptimizerLogic(LogicBase):
         xy_fit_data = self.xy_refocus_image[:, :, 3+self.opt_channel].ravel()
         axes = np.empty((len(self._X_values) * len(self._Y_values), 2))
         axes = (fit_x.flatten(), fit_y.flatten())
-        result_2D_gaus = self._fit_logic.make_twoDgaussian_fit(
-            xy_axes=axes,
-            data=xy_fit_data,
-            estimator=self._fit_logic.estimate_twoDgaussian_MLE
-        )
+        result_2D_gaus = None
+        if self._fast_peak_estimation:
+            # refocus image rows run along y
+            result_2D_gaus = estimate_gaussian_peak_2d(
+                self._X_values,
+                self._Y_values,
+                self.xy_refocus_image[:, :, 3+self.opt_channel].T,
+                min_snr=self._peak_estimation_min_snr
+            )
+        if result_2D_gaus is None:
+            result_2D_gaus = self._fit_logic.make_twoDgaussian_fit(
+                xy_axes=axes,
+                data=xy_fit_data,
+                estimator=self._fit_logic.estimate_twoDgaussian_MLE
+            )
+            fit_success = result_2D_gaus.success
+        else:
+            fit_success = True
         # print(result_2D_gaus.fit_report())
 
-        if result_2D_gaus.success is False:
+        if fit_success is False:
             self.log.error('Error: 2D Gaussian Fit was not successfull!.')
             print('2D gaussian fit not successfull')
             self.optim_pos_x = self._initial_pos_x
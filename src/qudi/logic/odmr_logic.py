@@ -26,7 +26,9 @@ import datetime
 import matplotlib.pyplot as plt
 from PySide2 import QtCore
 
-from qudi.util.datafitting import FitContainer, FitConfigurationsModel
+from qudi.util.datafitting import FitContainer, FitConfigurationsModel, get_all_fit_models
+from qudi.util.fit_dispatcher import FitDispatcher
+from qudi.util.sweep_buffer import SweepBuffer
 from qudi.core.module import LogicBase
 from qudi.util.mutex import RecursiveMutex
 from qudi.util.units import ScaledFloat
@@ -50,6 +52,9 @@ class OdmrLogic(LogicBase):
             data_scanner: <data_scanner_name>
         options:
             default_scan_mode: 'JUMP_LIST'  # optional
+            fit_processes: 0  # optional, number of fit worker processes (0: fit in the logic thread, null: CPU count)
+            fit_change_threshold: 1e-3  # optional, relative signal change to repeat auto fits
+            max_raw_data_bytes: 1e9  # optional, memory limit of the raw data (null: no limit)
     """
 
     # declare connectors
@@ -61,6 +66,9 @@ class OdmrLogic(LogicBase):
     _default_scan_mode = ConfigOption(name='default_scan_mode',
                                       default='JUMP_LIST',
                                       constructor=lambda x: SamplingOutputMode[x.upper()])
+    _fit_processes = ConfigOption(name='fit_processes', default=0)
+    _fit_change_threshold = ConfigOption(name='fit_change_threshold', default=1e-3)
+    _max_raw_data_bytes = ConfigOption(name='max_raw_data_bytes', default=1e9)
 
     # declare status variables
     _cw_frequency = StatusVar(name='cw_frequency', default=2870e6)
@@ -73,9 +81,12 @@ class OdmrLogic(LogicBase):
     _data_rate = StatusVar(name='data_rate', default=200)
     _oversampling_factor = StatusVar(name='oversampling_factor', default=1)
     _fit_configs = StatusVar(name='fit_configs', default=None)
+    _auto_fit = StatusVar(name='auto_fit', default=False)
 
     # Internal signals
     _sigNextLine = QtCore.Signal()
+    # future, fit config, channel, range, generation
+    _sigFitFinished = QtCore.Signal(object, str, str, int, int)
 
     # Update signals, e.g. for GUI module
     sigScanParametersUpdated = QtCore.Signal(dict)
@@ -119,8 +130,13 @@ class OdmrLogic(LogicBase):
         self._start_time = 0.0
         self._fit_container = None
         self._fit_config_model = None
+        self._fit_dispatcher = None
+        # fit configurations repeated after each scan line, by (channel, range_index)
+        self._auto_fit_configs = dict()
+        # incremented when fit results are cleared to discard results of running fits
+        self._fit_generation = 0
 
-        self._raw_data = None
+        self._sweep_buffer = None
         self._signal_data = None
         self._frequency_data = None
         self._fit_results = None
@@ -152,6 +168,9 @@ class OdmrLogic(LogicBase):
         self._fit_config_model = FitConfigurationsModel(parent=self)
         self._fit_config_model.load_configs(self._fit_configs)
         self._fit_container = FitContainer(parent=self, config_model=self._fit_config_model)
+        self._fit_dispatcher = FitDispatcher(max_workers=self._fit_processes,
+                                             change_threshold=self._fit_change_threshold)
+        self._auto_fit_configs = dict()
 
         # Elapsed measurement time and number of sweeps
         self._elapsed_time = 0.0
@@ -164,14 +183,17 @@ class OdmrLogic(LogicBase):
 
         # Connect signals
         self._sigNextLine.connect(self._scan_odmr_line, QtCore.Qt.QueuedConnection)
+        self._sigFitFinished.connect(self._fit_finished, QtCore.Qt.QueuedConnection)
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
         # Stop measurement if it is still running
         self._sigNextLine.disconnect()
+        self._sigFitFinished.disconnect()
         if self.module_state() == 'locked':
             self.stop_odmr_scan()
+        self._fit_dispatcher.shutdown()
 
     @_fit_configs.representer
     def __repr_fit_configs(self, value):
@@ -190,41 +212,32 @@ class OdmrLogic(LogicBase):
         """ Initializing the ODMR data arrays (signal and raw data matrix). """
         self._frequency_data = [np.linspace(*r) for r in self._scan_frequency_ranges]
 
-        self._raw_data = dict()
-        self._fit_results = dict()
-        self._signal_data = dict()
         estimated_samples = self._run_time * self._data_rate
         samples_per_line = sum(freq_range[-1] for freq_range in self._scan_frequency_ranges)
         # Add 5% Safety; Minimum of 1 line
         self.__estimated_lines = max(1, int(1.05 * estimated_samples / samples_per_line))
-        for channel in self._data_scanner().constraints.channel_names:
-            self._raw_data[channel] = [
-                np.full((freq_arr.size, self.__estimated_lines), np.nan) for freq_arr in
-                self._frequency_data
-            ]
-            self._signal_data[channel] = [
-                np.zeros(freq_arr.size) for freq_arr in self._frequency_data
-            ]
-            self._fit_results[channel] = [None] * len(self._frequency_data)
+        # All channels and ranges in one lines x channels x points array
+        self._sweep_buffer = SweepBuffer(self._data_scanner().constraints.channel_names,
+                                         [freq_arr.size for freq_arr in self._frequency_data],
+                                         lines=self.__estimated_lines,
+                                         max_bytes=self._max_raw_data_bytes)
+        self._signal_data = self._sweep_buffer.split(self._sweep_buffer.mean())
+        self._fit_results = {channel: [None] * len(self._frequency_data) for channel in
+                             self._sweep_buffer.channels}
+
+        # discard running fits and the warm starts of previous data
+        self._fit_generation += 1
+        self._fit_dispatcher.reset()
+        self._auto_fit_configs = {
+            (channel, range_index): fit_config for (channel, range_index), fit_config in
+            self._auto_fit_configs.items()
+            if channel in self._fit_results and range_index < len(self._frequency_data)
+        }
 
     def _calculate_signal_data(self):
-        for channel, raw_data_list in self._raw_data.items():
-            for range_index, raw_data in enumerate(raw_data_list):
-                masked_raw_data = np.ma.masked_invalid(raw_data)
-                if masked_raw_data.compressed().size == 0:
-                    arr_size = self._frequency_data[range_index].size
-                    self._signal_data[channel][range_index] = np.zeros(arr_size)
-                elif self._scans_to_average > 0:
-                    self._signal_data[channel][range_index] = np.mean(
-                        masked_raw_data[:, :self._scans_to_average],
-                        axis=1
-                    ).compressed()
-                    if self._signal_data[channel][range_index].size == 0:
-                        arr_size = self._frequency_data[range_index].size
-                        self._signal_data[channel][range_index] = np.zeros(arr_size)
-                else:
-                    self._signal_data[channel][range_index] = np.mean(masked_raw_data,
-                                                                      axis=1).compressed()
+        # One reduction over all channels and ranges, split into views afterwards
+        signal = self._sweep_buffer.mean(self._scans_to_average)
+        self._signal_data = self._sweep_buffer.split(signal)
 
     @property
     def fit_config_model(self):
@@ -238,6 +251,22 @@ class OdmrLogic(LogicBase):
     def fit_results(self):
         return self._fit_results.copy()
 
+    @property
+    def auto_fit(self):
+        return self._auto_fit
+
+    @auto_fit.setter
+    def auto_fit(self, enabled):
+        self.set_auto_fit(enabled)
+
+    def set_auto_fit(self, enabled):
+        """ Repeat the last fit of each channel and range after every scan line. The fits run in
+        the background and are skipped if the signal changed less than fit_change_threshold.
+
+        @param bool enabled: auto fit on or off
+        """
+        self._auto_fit = bool(enabled)
+
     @property
     def data_constraints(self):
         return self._data_scanner().constraints
@@ -252,7 +281,15 @@ class OdmrLogic(LogicBase):
 
     @property
     def raw_data(self):
-        return self._raw_data.copy()
+        with self._threadlock:
+            sweep_buffer = self._sweep_buffer
+            if sweep_buffer.lines == 0:
+                # a line of NaN to display before the first sweep
+                return sweep_buffer.split(
+                    np.full((1, len(sweep_buffer.channels), sweep_buffer.points), np.nan)
+                )
+            # copy, the sweep buffer moves the stored lines when making room for new ones
+            return sweep_buffer.split(sweep_buffer.data.copy())
 
     @property
     def frequency_data(self):
@@ -557,7 +594,9 @@ class OdmrLogic(LogicBase):
             self._sigNextLine.emit()
 
     def clear_all_fits(self):
-        for channel, range_data in self._raw_data.items():
+        self._fit_generation += 1
+        self._fit_dispatcher.reset()
+        for channel, range_data in self._fit_results.items():
             for range_index, _ in enumerate(range_data):
                 self._fit_results[channel][range_index] = None
                 self.sigFitUpdated.emit(self._fit_results[channel][range_index], channel, range_index)
@@ -629,34 +668,19 @@ class OdmrLogic(LogicBase):
                 self.stop_odmr_scan()
                 return
 
-            # Add new count data to raw_data array and append if array is too small
-            current_line_buffer_size = next(iter(self._raw_data.values()))[0].shape[1]
-            if self._elapsed_sweeps == current_line_buffer_size:
-                self.log.debug(f'extending data grid for sweep number {self._elapsed_sweeps}')
-                expand_arrays = tuple(np.full((r[-1], self.__estimated_lines), np.nan) for r in
-                                      self._scan_frequency_ranges)
-                self._raw_data = {
-                    ch: [np.concatenate((r, expand_arrays[ii]), axis=0) for ii, r in
-                         enumerate(range_list)] for ch, range_list in self._raw_data.items()
-                }
+            # Add new count data as newest line of the raw data (grows the buffer if needed)
+            self._sweep_buffer.add_line([new_counts[ch] for ch in self._sweep_buffer.channels])
+            if self._sweep_buffer.sweeps - self._sweep_buffer.lines == 1:
                 self.log.warning(
-                    'raw data scan line buffer was not big enough for the entire measurement. '
-                    'Buffer will be expanded.\nOld line buffer size was {0:d}, new line buffer '
-                    'size is {1:d}.'.format(current_line_buffer_size,
-                                            current_line_buffer_size + self.__estimated_lines)
+                    'Raw data reached the memory limit of {0:.3g} bytes ({1:d} scan lines). The '
+                    'oldest scan lines are discarded, the signal is still averaged over all '
+                    'sweeps.'.format(self._max_raw_data_bytes, self._sweep_buffer.max_lines)
                 )
 
-            # shift data in the array "up" and add new data at the "bottom"
-            for ch, range_list in self._raw_data.items():
-                start = 0
-                for range_index, range_params in enumerate(self._scan_frequency_ranges):
-                    range_list[range_index] = np.roll(range_list[range_index], 1, axis=1)
-                    tmp = new_counts[ch][start:start + range_params[-1]]
-                    range_list[range_index][0:len(tmp), 0] = tmp
-                    start += range_params[-1]
-
             # Calculate averaged signal
             self._calculate_signal_data()
+            if self._auto_fit:
+                self._dispatch_auto_fits()
 
             # Update elapsed time/sweeps
             self._elapsed_sweeps += 1
@@ -674,10 +698,10 @@ class OdmrLogic(LogicBase):
     @QtCore.Slot(str, str, int)
     def do_fit(self, fit_config, channel, range_index):
         """
-        Execute the currently configured fit on the measurement data. Optionally on passed data
+        Execute the currently configured fit on the measurement data, starting from the estimator
+        of the fit configuration. The fit is repeated after each scan line if auto fit is enabled.
         """
-        if fit_config != 'No Fit' and fit_config not in self._fit_config_model.configuration_names:
-            self.log.error(f'Unknown fit configuration "{fit_config}" encountered.')
+        if not self._set_fit_config(fit_config, channel, range_index):
             return
 
         x_data = self._frequency_data[range_index]
@@ -689,6 +713,90 @@ class OdmrLogic(LogicBase):
             self.log.exception('Data fitting failed:')
             return
 
+        if fit_result is not None:
+            # following auto fits start from this result
+            self._fit_dispatcher.record((channel, range_index), fit_config, x_data, y_data,
+                                        fit_result)
+            self._fit_results[channel][range_index] = (fit_config, fit_result)
+        else:
+            self._fit_results[channel][range_index] = None
+        self.sigFitUpdated.emit(self._fit_results[channel][range_index], channel, range_index)
+
+    def do_fit_async(self, fit_config, channel, range_index):
+        """
+        Start the fit of the measurement data in a worker process, starting from the estimator of
+        the fit configuration. The result is published through sigFitUpdated.
+
+        @return Future: future of the fit result, None if no fit has been started
+        """
+        if not self._set_fit_config(fit_config, channel, range_index):
+            return None
+        if fit_config == 'No Fit':
+            self._fit_results[channel][range_index] = None
+            self.sigFitUpdated.emit(None, channel, range_index)
+            return None
+        return self._submit_fit(fit_config, channel, range_index, force=True, warm_start=False)
+
+    def _set_fit_config(self, fit_config, channel, range_index):
+        """ Remember the fit configuration of a channel and range for auto fits.
+
+        @return bool: False for unknown fit configurations
+        """
+        if fit_config != 'No Fit' and fit_config not in self._fit_config_model.configuration_names:
+            self.log.error(f'Unknown fit configuration "{fit_config}" encountered.')
+            return False
+
+        if fit_config == 'No Fit':
+            self._auto_fit_configs.pop((channel, range_index), None)
+            self._fit_dispatcher.reset((channel, range_index))
+        else:
+            self._auto_fit_configs[(channel, range_index)] = fit_config
+        return True
+
+    def _dispatch_auto_fits(self):
+        for (channel, range_index), fit_config in self._auto_fit_configs.items():
+            self._submit_fit(fit_config, channel, range_index)
+
+    def _submit_fit(self, fit_config, channel, range_index, force=False, warm_start=True):
+        config = self._fit_config_model.get_configuration_by_name(fit_config)
+        model = get_all_fit_models()[config.model]()
+        x_data = self._frequency_data[range_index]
+        y_data = self._signal_data[channel][range_index]
+        try:
+            future = self._fit_dispatcher.submit((channel, range_index),
+                                                 fit_config,
+                                                 model,
+                                                 config.estimator,
+                                                 config.custom_parameters,
+                                                 x_data,
+                                                 y_data,
+                                                 force=force,
+                                                 warm_start=warm_start)
+        except:
+            self.log.exception('Data fitting failed:')
+            return None
+        if future is not None:
+            generation = self._fit_generation
+            future.add_done_callback(
+                lambda f: self._sigFitFinished.emit(f, fit_config, channel, range_index, generation)
+            )
+        return future
+
+    @QtCore.Slot(object, str, str, int, int)
+    def _fit_finished(self, future, fit_config, channel, range_index, generation):
+        """ Publish the result of a fit with the configuration it was submitted with, unless the
+        fit results or the fit of this channel and range have been cleared meanwhile.
+        """
+        if generation != self._fit_generation or future.cancelled():
+            return
+        if (channel, range_index) not in self._auto_fit_configs:
+            return
+        try:
+            fit_result = future.result()
+        except:
+            self.log.exception('Data fitting failed:')
+            return
+
         if fit_result is not None:
             self._fit_results[channel][range_index] = (fit_config, fit_result)
         else:
@@ -700,6 +808,7 @@ class OdmrLogic(LogicBase):
                     'Microwave Scan Power (dBm)': self._scan_power,
                     'Approx. Run Time (s)': self._elapsed_time,
                     'Number of Frequency Sweeps (#)': self._elapsed_sweeps,
+                    'Number of Stored Frequency Sweeps (#)': self._sweep_buffer.lines,
                     'Start Frequencies (Hz)': tuple(rng[0] for rng in self._scan_frequency_ranges),
                     'Stop Frequencies (Hz)': tuple(rng[1] for rng in self._scan_frequency_ranges),
                     'Step sizes (Hz)': tuple(rng[2] for rng in self._scan_frequency_ranges),
@@ -729,10 +838,9 @@ class OdmrLogic(LogicBase):
 
         @param str channel: The channel name for which to join the raw data
         """
-        channel_data = self._raw_data[channel]
-        # Filter raw data to get rid of invalid values (nan or inf)
-        joined_data = np.concatenate([raw[:, :self._elapsed_sweeps] for raw in channel_data],
-                                     axis=0)
+        # all ranges of a channel are next to each other in the sweep buffer
+        channel_index = self._sweep_buffer.channels.index(channel)
+        joined_data = self._sweep_buffer.data[:, channel_index, :].T
         # add frequency data as first column
         return np.column_stack((np.concatenate(self._frequency_data), joined_data))
 
@@ -757,7 +865,7 @@ class OdmrLogic(LogicBase):
             # Save raw data in a separate file per data channel
             data_storage = TextDataStorage(root_dir=self.module_default_data_dir,
                                            column_formats='.15e')
-            for channel, range_data in self._raw_data.items():
+            for channel in self._sweep_buffer.channels:
                 metadata['Channel Name'] = channel
                 column_headers = self._get_raw_column_headers(channel)
                 nametag = f'{tag}ODMR_{channel}_raw'
@@ -774,7 +882,7 @@ class OdmrLogic(LogicBase):
                 # Save plot images if required. This takes by far the most time to complete.
                 if self._save_thumbnails:
                     fig_path_stump = file_path.rsplit('_raw.', 1)[0] + '_range'
-                    for range_index, _ in enumerate(range_data):
+                    for range_index, _ in enumerate(self._frequency_data):
                         fig = self._draw_figure(channel, range_index)
                         fig_path = f'{fig_path_stump}{range_index:d}'
                         data_storage.save_thumbnail(fig, file_path=fig_path)
@@ -804,7 +912,7 @@ class OdmrLogic(LogicBase):
         """
         freq_data = self._frequency_data[range_index]
         signal_data = self._signal_data[channel][range_index]
-        raw_data = self._raw_data[channel][range_index][:, :self._elapsed_sweeps]
+        raw_data = self.raw_data[channel][range_index]
         fit_result = self._fit_results[channel][range_index]
         if fit_result is not None:
             fit_x, fit_y = fit_result[1].high_res_best_fit
@@ -23,18 +23,95 @@ import os
 import sys
 import inspect
 import importlib
+import numpy as np
+from collections import deque
 
 from qudi.util.helpers import natural_sort, iter_modules_recursive
 
 
+class LaserWindowStatistics:
+    """
+    Running statistics of the counts per laser pulse within one analysis window.
+
+    The fast counter data is accumulated over all sweeps. Each update takes the current window sums
+    together with the number of elapsed sweeps and treats the counts added since the previous
+    update as one observation of the counts per sweep, weighted with the number of sweeps in
+    between (weighted Welford algorithm). An update therefore costs the same no matter how many
+    sweeps have been accumulated, and no earlier data needs to be kept.
+    """
+    # Minimum number of updates before the variance is considered meaningful
+    min_updates = 3
+
+    def __init__(self, number_of_lasers):
+        self.reset(number_of_lasers)
+
+    def reset(self, number_of_lasers):
+        self.sums = np.zeros(number_of_lasers, dtype='int64')
+        self.sweeps = 0
+        self.updates = 0
+        self._mean = np.zeros(number_of_lasers, dtype=float)
+        self._m2 = np.zeros(number_of_lasers, dtype=float)
+
+    def update(self, sums, sweeps):
+        """
+        Add the counts accumulated since the last update. The statistics restart if the counts or
+        sweeps went back, i.e. if a new measurement has been started.
+
+        @param numpy.ndarray sums: accumulated counts per laser pulse within the window
+        @param int sweeps: number of sweeps the accumulated counts were acquired in
+        """
+        sums = np.asarray(sums)
+        if sums.shape != self.sums.shape or sweeps < self.sweeps or np.any(sums < self.sums):
+            self.reset(sums.size)
+        new_sweeps = sweeps - self.sweeps
+        if new_sweeps <= 0:
+            return
+        counts_per_sweep = (sums - self.sums) / new_sweeps
+        delta = counts_per_sweep - self._mean
+        self._mean += delta * (new_sweeps / sweeps)
+        self._m2 += new_sweeps * delta * (counts_per_sweep - self._mean)
+        self.sums = sums.copy()
+        self.sweeps = sweeps
+        self.updates += 1
+
+    @property
+    def mean(self):
+        """ Mean counts per sweep and laser pulse. """
+        return self._mean.copy()
+
+    @property
+    def variance(self):
+        """ Variance of the counts per sweep and laser pulse estimated from the scatter between the
+        updates. NaN before the second update.
+        """
+        if self.updates < 2:
+            return np.full(self._m2.shape, np.nan)
+        return self._m2 / (self.updates - 1)
+
+    @property
+    def sum_variance(self):
+        """ Variance of the accumulated counts per laser pulse. """
+        return self.sweeps * self.variance
+
+
 class PulseAnalyzerBase:
     """
     All analyzer classes to import from must inherit exclusively from this base class.
     This base class enables analyzer classes masked read-only access to settings from
     PulsedMeasurementLogic.
 
+    Analysis methods built on window_sums support streaming statistics: the PulseAnalyzer can keep
+    running statistics for each window and replace the Poisson variance of the counts by the one
+    observed between the analysis ticks.
+
     See BasicPulseAnalyzer class for an example usage.
     """
+    # Dictionary of LaserWindowStatistics by (start_bin, end_bin) and the number of sweeps of the
+    # laser data handed over by the PulseAnalyzer while the selected analysis method is running.
+    # None if no statistics are collected.
+    _window_statistics = None
+    _window_sweeps = 0
+
     def __init__(self, pulsedmeasurementlogic):
         self.__pulsedmeasurementlogic = pulsedmeasurementlogic
 
@@ -54,10 +131,42 @@ class PulseAnalyzerBase:
     def fast_counter_settings(self):
         return self.__pulsedmeasurementlogic.fast_counter_settings
 
+    @property
+    def elapsed_sweeps(self):
+        return self.__pulsedmeasurementlogic.elapsed_sweeps
+
     @property
     def log(self):
         return self.__pulsedmeasurementlogic.log
 
+    def window_sums(self, laser_data, start_bin, end_bin):
+        """
+        Sum up the counts of each laser pulse within a window of time bins.
+
+        The variance of the sums follows Poisson statistics unless the PulseAnalyzer collects
+        window statistics and enough analysis ticks have been seen. Then it is the variance
+        observed between the ticks.
+
+        @param 2D numpy.ndarray laser_data: the laser pulses, dim 0: laser pulse; dim 1: time bin
+        @param int start_bin: first bin of the window
+        @param int end_bin: bin after the last bin of the window
+
+        @return numpy.ndarray, numpy.ndarray, int: counts per laser pulse within the window, their
+                                                   variance and the number of bins in the window
+        """
+        window = laser_data[:, start_bin:end_bin]
+        sums = window.sum(axis=1)
+        variance = sums.astype(float)
+        if self._window_statistics is not None and self._window_sweeps > 0:
+            statistics = self._window_statistics.get((start_bin, end_bin))
+            if statistics is None:
+                statistics = LaserWindowStatistics(sums.size)
+                self._window_statistics[(start_bin, end_bin)] = statistics
+            statistics.update(sums, self._window_sweeps)
+            if statistics.updates >= statistics.min_updates:
+                variance = statistics.sum_variance
+        return sums, variance, window.shape[1]
+
 
 class PulseAnalyzer(PulseAnalyzerBase):
     """
@@ -77,6 +186,12 @@ class PulseAnalyzer(PulseAnalyzerBase):
        default data type.
     8) The keyword "method" must not be used in the analysis method parameters
 
+    If enabled in PulsedMeasurementLogic, the PulseAnalyzer keeps running statistics for all
+    windows summed up via window_sums (empirical_analysis_errors) and a bounded history of the
+    signal of the counts added during each analysis tick (analysis_history_length). If the fast
+    counter does not report the elapsed sweeps, the number of analysed laser data is used instead,
+    i.e. the counts added between two analysis ticks count as one sweep.
+
     See BasicPulseAnalyzer class for an example usage.
     """
 
@@ -91,6 +206,14 @@ class PulseAnalyzer(PulseAnalyzerBase):
         # Currently selected analysis method
         self._current_analysis_method = None
 
+        # Streaming statistics of the analysis windows and per tick signal history
+        self._empirical_errors = bool(pulsedmeasurementlogic.empirical_analysis_errors)
+        self._window_statistics = dict()
+        self._signal_history = deque(maxlen=max(0, int(pulsedmeasurementlogic.analysis_history_length)))
+        self._previous_laser_data = None
+        self._analysed_traces = 0
+        self._sweeps_fallback_logged = False
+
         # import analysis modules from default namespace package
         # "qudi.logic.pulsed.pulsed_analysis_methods"
         try:
@@ -232,7 +355,77 @@ class PulseAnalyzer(PulseAnalyzerBase):
         analysis_method = self._analysis_methods[self._current_analysis_method]
 
         kwargs = self._get_analysis_method_kwargs(analysis_method)
-        return analysis_method(laser_data=laser_data, **kwargs)
+        if not self._empirical_errors and not self._signal_history.maxlen:
+            return analysis_method(laser_data=laser_data, **kwargs)
+
+        sweeps = self.__get_sweeps()
+        if self._signal_history.maxlen:
+            self.__record_signal_history(analysis_method, laser_data, kwargs, sweeps)
+        if not self._empirical_errors:
+            return analysis_method(laser_data=laser_data, **kwargs)
+
+        # Hand the window statistics to the analyzer instance only for this call
+        analyzer = analysis_method.__self__
+        analyzer._window_statistics = self._window_statistics
+        analyzer._window_sweeps = sweeps
+        try:
+            return analysis_method(laser_data=laser_data, **kwargs)
+        finally:
+            analyzer._window_statistics = None
+            analyzer._window_sweeps = 0
+
+    @property
+    def signal_history(self):
+        """
+        Signal of the counts added during each of the last analysis ticks, e.g. to diagnose drifts
+        during a measurement. Empty unless analysis_history_length is set in the logic.
+
+        @return list: tuples (elapsed sweeps, signal array) in chronological order
+        """
+        return list(self._signal_history)
+
+    def reset_statistics(self):
+        """
+        Discard the window statistics and the signal history, e.g. when a new measurement starts.
+        """
+        self._window_statistics = dict()
+        self._signal_history.clear()
+        self._previous_laser_data = None
+        self._analysed_traces = 0
+
+    def __get_sweeps(self):
+        """
+        Number of sweeps of the laser data to analyse. Falls back to the number of analysed laser
+        data if the fast counter does not report the elapsed sweeps.
+        """
+        self._analysed_traces += 1
+        sweeps = self.elapsed_sweeps
+        if sweeps is not None and sweeps > 0:
+            return sweeps
+        if not self._sweeps_fallback_logged:
+            self._sweeps_fallback_logged = True
+            self.log.info('Fast counter does not report the elapsed sweeps. Analysis statistics '
+                          'count the analysed laser data instead.')
+        return self._analysed_traces
+
+    def __record_signal_history(self, analysis_method, laser_data, kwargs, sweeps):
+        """
+        Analyse the counts added since the last tick and append the result to the signal history.
+        """
+        previous = self._previous_laser_data
+        self._previous_laser_data = laser_data.copy()
+        if previous is None or previous.shape != laser_data.shape:
+            increment = laser_data
+        else:
+            increment = laser_data - previous
+            if np.any(increment < 0):
+                # new measurement with the same shape
+                self._signal_history.clear()
+                increment = laser_data
+        if not increment.any():
+            return
+        signal, _ = analysis_method(laser_data=increment, **kwargs)
+        self._signal_history.append((sweeps, np.array(signal, dtype=float)))
 
     def _get_analysis_method_kwargs(self, method):
         """
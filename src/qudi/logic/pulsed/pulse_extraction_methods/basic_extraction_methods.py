@@ -55,24 +55,18 @@ class BasicPulseExtractor(PulseExtractorBase):
         # sum up all gated timetraces to ease flank detection
         timetrace_sum = np.sum(count_data, 0)
 
-        # apply gaussian filter to remove noise and compute the gradient of the timetrace sum
-        try:
-            conv = ndimage.filters.gaussian_filter1d(timetrace_sum.astype(float), conv_std_dev)
-        except:
-            conv = np.zeros(timetrace_sum.size)
-        try:
-            conv_deriv = np.gradient(conv)
-        except:
-            conv_deriv = np.zeros(conv.size)
+        # find the steepest rising and falling slope of the gaussian filtered timetrace sum
+        flanks = self._find_gated_flanks(timetrace_sum.astype(float), conv_std_dev)
 
+        # If gaussian smoothing or derivative failed, no flanks are found.
+        # Return only zeros to indicate a failed pulse extraction.
         # get indices of rising and falling flank
-        rising_ind, falling_ind = sorted([int(np.clip(conv_deriv.argmax() - flank_width, 0, len(timetrace_sum))),
-                                          int(np.clip(conv_deriv.argmin() + flank_width, 0, len(timetrace_sum)))
+        max_ind, min_ind = (0, 0) if flanks is None else flanks
+        rising_ind, falling_ind = sorted([int(np.clip(max_ind - flank_width, 0, len(timetrace_sum))),
+                                          int(np.clip(min_ind + flank_width, 0, len(timetrace_sum)))
                                           ])
 
-        # If gaussian smoothing or derivative failed, the returned array only contains zeros.
-        # Check for that and return also only zeros to indicate a failed pulse extraction.
-        if len(conv_deriv.nonzero()[0]) == 0:
+        if flanks is None:
             laser_arr = np.zeros(count_data.shape, dtype='int64')
         else:
             # slice the data array to cut off anything but laser pulses
@@ -84,6 +78,28 @@ class BasicPulseExtractor(PulseExtractorBase):
 
         return return_dict
 
+    def _find_gated_flanks(self, timetrace, conv_std_dev):
+        """ Indices of the maximum and minimum of the derivative of the gaussian filtered
+        timetrace.
+
+        @param numpy.ndarray timetrace: 1D float array
+        @param float conv_std_dev: standard deviation of the gaussian filter
+
+        @return tuple(int, int): indices of the rising and falling flank or None if failed
+        """
+        # apply gaussian filter to remove noise and compute the gradient of the timetrace
+        try:
+            conv = ndimage.gaussian_filter1d(timetrace, conv_std_dev)
+        except:
+            conv = np.zeros(timetrace.size)
+        try:
+            conv_deriv = np.gradient(conv)
+        except:
+            conv_deriv = np.zeros(conv.size)
+        if len(conv_deriv.nonzero()[0]) == 0:
+            return None
+        return int(conv_deriv.argmax()), int(conv_deriv.argmin())
+
     def ungated_conv_deriv(self, count_data, conv_std_dev=20.0):
         """ Detects the laser pulses in the ungated timetrace data and extracts
             them.
@@ -382,11 +398,8 @@ class BasicPulseExtractor(PulseExtractorBase):
         num_col = max_laser_length + 2 * safety_bins
         # compute from laser_start_indices and laser length the respective position of the laser
         # pulses
-        laser_pulses = np.empty((num_rows, num_col))
-        for ii in range(num_rows):
-            laser_pulses[ii][:] = count_data[
-                np.arange(laser_rising_bins[ii] + delay_bins - safety_bins,
-                          laser_rising_bins[ii] + delay_bins + safety_bins + max_laser_length)]
+        laser_start_bins = laser_rising_bins + delay_bins - safety_bins
+        laser_pulses = count_data[laser_start_bins[:, np.newaxis] + np.arange(num_col)].astype(float)
         # use the gated extraction method
         return_dict = self.gated_conv_deriv(laser_pulses, conv_std_dev)
         return return_dict
@@ -25,11 +25,14 @@ import os
 import sys
 import inspect
 import importlib
+import weakref
 import numpy as np
 import warnings
+from types import MappingProxyType
 
 from qudi.logic.pulsed.sampling_functions import SamplingFunctions
 from qudi.util.helpers import natural_sort, iter_modules_recursive
+from qudi.util.plugin_index import is_json_value
 
 
 class PulseBlockElement(object):
@@ -39,8 +42,15 @@ class PulseBlockElement(object):
     This class can build waiting times, sine waves, etc. The pulse block may
     contain many Pulse_Block_Element Objects. These objects can be displayed in
     a GUI as single rows of a Pulse_Block.
+
+    A PulseBlock does not store the elements handed over to it but their interned counterparts
+    (see PulseBlockElement.interned): frozen (immutable and hashable) instances shared by all
+    equal elements. Use PulseBlockElement.copy to get an editable copy of a frozen element.
     """
 
+    # Flyweight table of frozen elements. Entries vanish with the last PulseBlock using them.
+    _intern_table = weakref.WeakValueDictionary()
+
     def __init__(self, init_length_s=10e-9, increment_s=0, pulse_function=None, digital_high=None, laser_on=False):
         """
         The constructor for a Pulse_Block_Element needs to have:
@@ -69,17 +79,23 @@ class PulseBlockElement(object):
         if pulse_function is None:
             self.pulse_function = dict()
         else:
-            self.pulse_function = pulse_function
+            self.pulse_function = dict(pulse_function)
         if digital_high is None:
             self.digital_high = dict()
         else:
-            self.digital_high = digital_high
+            self.digital_high = dict(digital_high)
 
         # determine set of used digital and analog channels
         self.analog_channels = set(self.pulse_function)
         self.digital_channels = set(self.digital_high)
         self.channel_set = self.analog_channels.union(self.digital_channels)
 
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen', False):
+            raise AttributeError('PulseBlockElement is frozen. Use PulseBlockElement.copy() to get '
+                                 'an editable copy.')
+        super().__setattr__(name, value)
+
     def __repr__(self):
         repr_str = 'PulseBlockElement(init_length_s={0}, increment_s={1}, laser_on={2}, pulse_function='.format(
             self.init_length_s, self.increment_s, self.laser_on)
@@ -114,17 +130,99 @@ class PulseBlockElement(object):
             return False
         if set(self.digital_high.items()) != set(other.digital_high.items()):
             return False
-        for chnl, func in self.pulse_function:
+        for chnl, func in self.pulse_function.items():
             if func != other.pulse_function[chnl]:
                 return False
         return True
 
+    def __hash__(self):
+        key_hash = self.__dict__.get('_hash')
+        if key_hash is None:
+            return hash(self._get_key())
+        return key_hash
+
+    def __copy__(self):
+        return self if self.frozen else self.copy()
+
+    def __deepcopy__(self, memo):
+        return self if self.frozen else self.copy()
+
+    def __reduce__(self):
+        args = (self.init_length_s, self.increment_s, dict(self.pulse_function),
+                dict(self.digital_high), self.laser_on)
+        if self.frozen:
+            return _interned_element, args
+        return PulseBlockElement, args
+
+    @property
+    def frozen(self):
+        """ Frozen elements can not be changed, see PulseBlockElement.interned. """
+        return self.__dict__.get('_frozen', False)
+
+    def copy(self):
+        """ Returns an editable (not frozen) copy of this element, including copies of the sampling
+        function instances.
+
+        @return PulseBlockElement: the copy
+        """
+        return PulseBlockElement(
+            init_length_s=self.init_length_s,
+            increment_s=self.increment_s,
+            pulse_function={chnl: copy.deepcopy(func) for chnl, func in self.pulse_function.items()},
+            digital_high=self.digital_high,
+            laser_on=self.laser_on)
+
+    def interned(self):
+        """ Returns the frozen element equal to this element from the table of interned elements.
+        The element is frozen and added to the table if it has not been interned before.
+        This element itself is not altered and stays editable.
+
+        @return PulseBlockElement: the frozen element shared by all equal elements
+        """
+        if self.frozen:
+            return self
+        try:
+            element = self._intern_table.get(self._get_key())
+        except TypeError:
+            # unhashable sampling function parameters, do not share this element
+            return self.copy()._freeze()
+        if element is None:
+            # the key of the table entry must refer to the sampling functions of the frozen copy
+            element = self.copy()._freeze()
+            self._intern_table[element._key] = element
+        return element
+
+    def _get_key(self):
+        key = self.__dict__.get('_key')
+        if key is None:
+            key = (float(self.init_length_s),
+                   float(self.increment_s),
+                   bool(self.laser_on),
+                   tuple(sorted((chnl, bool(state)) for chnl, state in self.digital_high.items())),
+                   tuple(sorted(self.pulse_function.items())))
+        return key
+
+    def _freeze(self):
+        key = self._get_key()
+        self.pulse_function = MappingProxyType(self.pulse_function)
+        self.digital_high = MappingProxyType(self.digital_high)
+        self.analog_channels = frozenset(self.analog_channels)
+        self.digital_channels = frozenset(self.digital_channels)
+        self.channel_set = frozenset(self.channel_set)
+        self._key = key
+        try:
+            self._hash = hash(key)
+        except TypeError:
+            pass
+        self._frozen = True
+        return self
+
     def get_dict_representation(self):
         dict_repr = dict()
         dict_repr['init_length_s'] = self.init_length_s
         dict_repr['increment_s'] = self.increment_s
         dict_repr['laser_on'] = self.laser_on
-        dict_repr['digital_high'] = self.digital_high
+        dict_repr['digital_high'] = dict(self.digital_high)
         dict_repr['pulse_function'] = dict()
         for chnl, func in self.pulse_function.items():
             dict_repr['pulse_function'][chnl] = func.get_dict_representation()
@@ -138,11 +236,25 @@ class PulseBlockElement(object):
         return PulseBlockElement(**element_dict)
 
 
+def _interned_element(*args):
+    """ Unpickles frozen PulseBlockElements into interned ones. """
+    return PulseBlockElement(*args).interned()
+
+
 class PulseBlock(object):
     """
     Collection of Pulse_Block_Elements which is called a Pulse_Block.
+
+    The element list holds interned (frozen) PulseBlockElements and must only be changed by the
+    methods of PulseBlock, which keep init_length_s and increment_s up to date. Copies of a
+    PulseBlock share the element list until one of them is changed.
     """
 
+    # True if the element list is shared with a copy of this PulseBlock (copy-on-write)
+    _list_shared = False
+    # Cached element columns, see get_element_columns
+    _columns = None
+
     def __init__(self, name, element_list=None):
         """
         The constructor for a Pulse_Block needs to have:
@@ -152,7 +264,10 @@ class PulseBlock(object):
                                   Pulse_Block, e.g. [Pulse_Block_Element, Pulse_Block_Element, ...]
         """
         self.name = name
-        self.element_list = list() if element_list is None else element_list
+        if element_list is None:
+            self.element_list = list()
+        else:
+            self.element_list = [element.interned() for element in element_list]
         self.init_length_s = 0.0
         self.increment_s = 0.0
         self.analog_channels = set()
@@ -189,7 +304,7 @@ class PulseBlock(object):
                 raise TypeError('PulseBlock element list entries must be of type PulseBlockElement,'
                                 ' not {0}'.format(type(value)))
             if not self.channel_set:
-                self.channel_set = value.channel_set.copy()
+                self.channel_set = set(value.channel_set)
                 self.analog_channels = {chnl for chnl in self.channel_set if chnl.startswith('a')}
                 self.digital_channels = {chnl for chnl in self.channel_set if chnl.startswith('d')}
             elif value.channel_set != self.channel_set:
@@ -201,6 +316,7 @@ class PulseBlock(object):
             self.increment_s -= self.element_list[key].increment_s
             self.init_length_s += value.init_length_s
             self.increment_s += value.increment_s
+            value = value.interned()
         elif isinstance(key, slice):
             add_length = 0
             add_increment = 0
@@ -209,7 +325,7 @@ class PulseBlock(object):
                     raise TypeError('PulseBlock element list entries must be of type '
                                     'PulseBlockElement, not {0}'.format(type(value)))
                 if not self.channel_set:
-                    self.channel_set = element.channel_set.copy()
+                    self.channel_set = set(element.channel_set)
                     self.analog_channels = {chnl for chnl in self.channel_set if
                                             chnl.startswith('a')}
                     self.digital_channels = {chnl for chnl in self.channel_set if
@@ -229,9 +345,10 @@ class PulseBlock(object):
 
             self.init_length_s += add_length
             self.increment_s += add_increment
+            value = [element.interned() for element in value]
         else:
             raise TypeError('PulseBlock indices must be int or slice, not {0}'.format(type(key)))
-        self.element_list[key] = copy.deepcopy(value)
+        self._get_writable_element_list()[key] = value
         return
 
     def __delitem__(self, key):
@@ -246,7 +363,7 @@ class PulseBlock(object):
         for element in items_to_delete:
             self.init_length_s -= element.init_length_s
             self.increment_s -= element.increment_s
-        del self.element_list[key]
+        del self._get_writable_element_list()[key]
         if len(self.element_list) == 0:
             self.init_length_s = 0.0
             self.increment_s = 0.0
@@ -275,6 +392,7 @@ class PulseBlock(object):
         which are attached in the element_list.
         """
         # the Pulse_Block parameters
+        self._columns = None
         self.init_length_s = 0.0
         self.increment_s = 0.0
         self.channel_set = set()
@@ -284,7 +402,7 @@ class PulseBlock(object):
             self.increment_s += elem.increment_s
 
             if not self.channel_set:
-                self.channel_set = elem.channel_set
+                self.channel_set = set(elem.channel_set)
             elif self.channel_set != elem.channel_set:
                 raise ValueError('Usage of different sets of analog and digital channels in the '
                                  'same PulseBlock is prohibited.\nPulseBlock creation failed!\n'
@@ -301,7 +419,7 @@ class PulseBlock(object):
         if position is None:
             self.init_length_s -= self.element_list[-1].init_length_s
             self.increment_s -= self.element_list[-1].increment_s
-            return self.element_list.pop()
+            return self._get_writable_element_list().pop()
 
         if not isinstance(position, int):
             raise TypeError('PulseBlock.pop position argument expects integer, not {0}'
@@ -315,7 +433,7 @@ class PulseBlock(object):
 
         self.init_length_s -= self.element_list[position].init_length_s
         self.increment_s -= self.element_list[position].increment_s
-        return self.element_list.pop(position)
+        return self._get_writable_element_list().pop(position)
 
     def insert(self, position, element):
         """ Insert a PulseBlockElement at the given position. The old element at this position and
@@ -335,7 +453,7 @@ class PulseBlock(object):
             raise IndexError('PulseBlock element list index out of range')
 
         if not self.channel_set:
-            self.channel_set = element.channel_set.copy()
+            self.channel_set = set(element.channel_set)
             self.analog_channels = {chnl for chnl in self.channel_set if chnl.startswith('a')}
             self.digital_channels = {chnl for chnl in self.channel_set if chnl.startswith('d')}
         elif element.channel_set != self.channel_set:
@@ -346,7 +464,7 @@ class PulseBlock(object):
         self.init_length_s += element.init_length_s
         self.increment_s += element.increment_s
 
-        self.element_list.insert(position, copy.deepcopy(element))
+        self._get_writable_element_list().insert(position, element.interned())
         return
 
     def append(self, element):
@@ -361,7 +479,9 @@ class PulseBlock(object):
         return
 
     def clear(self):
-        del self.element_list[:]
+        self.element_list = list()
+        self._list_shared = False
+        self._columns = None
         self.init_length_s = 0.0
         self.increment_s = 0.0
         self.analog_channels = set()
@@ -370,9 +490,73 @@ class PulseBlock(object):
         return
 
     def reverse(self):
-        self.element_list.reverse()
+        self._get_writable_element_list().reverse()
         return
 
+    def _get_writable_element_list(self):
+        """ Returns the element list after copying it if it is shared with a copy of this block.
+        """
+        self._columns = None
+        if self._list_shared:
+            self.element_list = list(self.element_list)
+            self._list_shared = False
+        return self.element_list
+
+    def get_element_columns(self):
+        """ Returns the parameters of all elements in this block as read-only arrays. The arrays
+        are cached until the block is changed.
+
+        @return dict: 'init_length_s' and 'increment_s' (float arrays), 'laser_on' (bool array) and
+                      'digital_high' (dict with a bool array for each digital channel)
+        """
+        if self._columns is None:
+            columns = {
+                'init_length_s': np.array([elem.init_length_s for elem in self.element_list],
+                                          dtype='float64'),
+                'increment_s': np.array([elem.increment_s for elem in self.element_list],
+                                        dtype='float64'),
+                'laser_on': np.array([bool(elem.laser_on) for elem in self.element_list],
+                                     dtype=bool),
+                'digital_high': {
+                    chnl: np.array([bool(elem.digital_high[chnl]) for elem in self.element_list],
+                                   dtype=bool) for chnl in self.digital_channels}
+            }
+            for array in (columns['init_length_s'], columns['increment_s'], columns['laser_on'],
+                          *columns['digital_high'].values()):
+                array.flags.writeable = False
+            self._columns = columns
+        return self._columns
+
+    def __copy__(self):
+        new_block = type(self).__new__(type(self))
+        new_block.__dict__.update(self.__dict__)
+        new_block.analog_channels = set(self.analog_channels)
+        new_block.digital_channels = set(self.digital_channels)
+        new_block.channel_set = set(self.channel_set)
+        new_block._list_shared = self._list_shared = True
+        return new_block
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_columns', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # PulseBlocks serialized before interning was introduced hold editable elements
+        self.element_list = [element.interned() for element in self.element_list]
+        self._list_shared = False
+
+    def __deepcopy__(self, memo):
+        # The interned elements are immutable, so the element list is shared copy-on-write
+        new_block = self.__copy__()
+        memo[id(self)] = new_block
+        for attr, value in self.__dict__.items():
+            if attr not in ('element_list', 'analog_channels', 'digital_channels', 'channel_set',
+                            '_columns'):
+                setattr(new_block, attr, copy.deepcopy(value, memo))
+        return new_block
+
     def get_dict_representation(self):
         dict_repr = dict()
         dict_repr['name'] = self.name
@@ -1535,9 +1719,17 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
 
     """
 
-    def __init__(self, sequencegeneratorlogic):
+    def __init__(self, sequencegeneratorlogic, plugin_index=None):
+        """
+        @param SequenceGeneratorLogic sequencegeneratorlogic: the logic module to generate for
+        @param PluginIndex plugin_index: optional index of already discovered generate methods.
+                                         Unchanged generator modules are imported on the first
+                                         call of one of their generate methods only.
+        """
         # Initialize base class
         super().__init__(sequencegeneratorlogic)
+        self._sequencegeneratorlogic = sequencegeneratorlogic
+        self._plugin_index = plugin_index
 
         # dictionary containing references to all generation methods imported from generator class
         # modules. The keys are the method names excluding the prefix "generate_".
@@ -1545,6 +1737,9 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
         # nested dictionary with keys being the generation method names and values being a
         # dictionary containing all keyword arguments as keys with their default value
         self._generate_method_parameters = dict()
+        # generator instances created on first use of a lazily imported generate method. The keys
+        # are tuples of module and class name.
+        self._lazy_generator_instances = dict()
 
         # Import predefined generator modules
         # Import default namespace "qudi.logic.pulsed.predefined_generate_methods"
@@ -1555,12 +1750,12 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
 
         # Import predefined generator modules and get a list of generator classes
         generator_classes = list()
+        lazy_methods = dict()
         for mod_finder in iter_modules_recursive(_default_generator_ns.__path__,
                                                  _default_generator_ns.__name__ + '.'):
             try:
                 generator_classes.extend(
-                    [cls for _, cls in inspect.getmembers(importlib.import_module(mod_finder.name),
-                                                          self.is_generator_class)]
+                    self.__import_generators(mod_finder.name, lazy_methods, reload=False)
                 )
             except:
                 self.log.exception(
@@ -1572,9 +1767,13 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
         if isinstance(sequencegeneratorlogic.predefined_methods_import_path, (tuple, list, set)):
             for path in sequencegeneratorlogic.predefined_methods_import_path:
                 try:
-                    generator_classes.extend(self.__import_external_generators(path=path))
+                    generator_classes.extend(
+                        self.__import_external_generators(path=path, lazy_methods=lazy_methods)
+                    )
                 except:
                     self.log.exception(f'Unable to import predefined generator from "{path}":')
+        if self._plugin_index is not None:
+            self._plugin_index.save()
 
         # create an instance of each class and put them in a temporary list
         generator_instances = [cls(sequencegeneratorlogic) for cls in generator_classes]
@@ -1582,6 +1781,9 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
 
         # add references to all generate methods in each instance to a dict
         self.__populate_method_dict(instance_list=generator_instances)
+        # add the generate methods of modules not imported yet, imported methods take precedence
+        for method_name, method in lazy_methods.items():
+            self._generate_methods.setdefault(method_name, method)
 
         # populate parameters dictionary from generate method signatures
         self.__populate_parameter_dict()
@@ -1594,12 +1796,13 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
     def predefined_method_parameters(self):
         return self._generate_method_parameters.copy()
 
-    def __import_external_generators(self, path):
+    def __import_external_generators(self, path, lazy_methods):
         """ Helper method to import all modules from given directory path.
         Find all classes in those modules that inherit exclusively from PredefinedGeneratorBase
         class and return a list of them.
 
         @param str path: Path to import modules from
+        @param dict lazy_methods: dict to add the generate methods of indexed modules to
         @return list: A list of imported valid generator classes
         """
         class_list = list()
@@ -1615,15 +1818,76 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
 
         # Go through all modules and create instances of each class found.
         for module_name in module_list:
-            # import module
-            mod = importlib.import_module('{0}'.format(module_name))
-            importlib.reload(mod)
-            # get all generator class references defined in the module
-            tmp_list = [m[1] for m in inspect.getmembers(mod, self.is_generator_class)]
-            # append to class_list
-            class_list.extend(tmp_list)
+            class_list.extend(self.__import_generators(module_name, lazy_methods, reload=True))
         return class_list
 
+    def __import_generators(self, module_name, lazy_methods, reload):
+        """ Helper method to get the generator classes of a module.
+        If the module is listed in the plugin index and contains no PredefinedGeneratorPlugin, its
+        generate methods are added to lazy_methods instead and the module is not imported.
+
+        @param str module_name: full name of the module
+        @param dict lazy_methods: dict to add the generate methods of indexed modules to
+        @param bool reload: reload the module (if it has changed in case of an index)
+        @return list: A list of imported valid generator classes
+        """
+        if self._plugin_index is not None:
+            generators = self._plugin_index.lookup(module_name,
+                                                   scan=self._scan_generator_module,
+                                                   reload=reload)
+            if generators is not None and not any(g['plugin'] for g in generators.values()):
+                for class_name, generator in generators.items():
+                    for method_name, parameters in generator['methods'].items():
+                        lazy_methods[method_name] = _LazyGenerateMethod(
+                            self, module_name, class_name, method_name, parameters)
+                return list()
+        mod = importlib.import_module(module_name)
+        if reload and self._plugin_index is None:
+            mod = importlib.reload(mod)
+        # get all generator class references defined in the module
+        return [cls for _, cls in inspect.getmembers(mod, self.is_generator_class)]
+
+    @classmethod
+    def _scan_generator_module(cls, mod):
+        """ Get the generate method signatures of all generator classes in a module for a
+        PluginIndex.
+
+        @param module mod: imported module to scan
+        @return dict: generator classes with their generate method parameters (lists of name,
+                      default value and if it has a default) and a flag if the class is a plugin.
+                      None if a signature can not be stored in the index.
+        """
+        generators = dict()
+        for class_name, generator_class in inspect.getmembers(mod, cls.is_generator_class):
+            methods = dict()
+            for method_name, method in inspect.getmembers(generator_class, inspect.isfunction):
+                if not method_name.startswith('generate_'):
+                    continue
+                parameters = list()
+                for name, param in list(inspect.signature(method).parameters.items())[1:]:
+                    if param.kind is not param.POSITIONAL_OR_KEYWORD or not is_json_value(
+                            None if param.default is param.empty else param.default):
+                        return None
+                    parameters.append([name,
+                                       None if param.default is param.empty else param.default,
+                                       param.default is not param.empty])
+                methods[method_name[9:]] = parameters
+            generators[class_name] = {'plugin': hasattr(generator_class, 'activate_plugin'),
+                                      'methods': methods}
+        return generators
+
+    def _get_lazy_generate_method(self, module_name, class_name, method_name):
+        """ Import the module of a lazily discovered generate method on first use and return the
+        method of the (shared) generator instance.
+        """
+        key = (module_name, class_name)
+        if key not in self._lazy_generator_instances:
+            generator_class = getattr(importlib.import_module(module_name), class_name)
+            instance = generator_class(self._sequencegeneratorlogic)
+            self._lazy_generator_instances[key] = instance
+            self._generator_instances.append(instance)
+        return getattr(self._lazy_generator_instances[key], 'generate_' + method_name)
+
     def __populate_method_dict(self, instance_list):
         """
         Helper method to populate the dictionaries containing all references to callable generate
@@ -1669,6 +1933,30 @@ class PulseObjectGenerator(PredefinedGeneratorBase):
         [gen.activate_plugin() for gen in self._generator_instances if hasattr(gen, 'activate_plugin')]
 
 
+class _LazyGenerateMethod:
+    """
+    Stand-in for a generate method of a generator module that has not been imported yet. The
+    signature is known from the PluginIndex, the module is imported on the first call.
+    """
+
+    def __init__(self, generator, module_name, class_name, method_name, parameters):
+        self._generator = generator
+        self._location = (module_name, class_name, method_name)
+        self.__name__ = 'generate_' + method_name
+        self.__signature__ = inspect.Signature([
+            inspect.Parameter(name,
+                              inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                              default=default if has_default else inspect.Parameter.empty)
+            for name, default, has_default in parameters
+        ])
+
+    def __call__(self, *args, **kwargs):
+        return self._generator._get_lazy_generate_method(*self._location)(*args, **kwargs)
+
+    def __repr__(self):
+        return '<lazy generate method {2} of {0}.{1}>'.format(*self._location)
+
+
 class PredefinedGeneratorPlugin():
     """
     PredefinedGeneratorPlugin is a PredefinedGenerator that can run code after the PulseObjectGenerator
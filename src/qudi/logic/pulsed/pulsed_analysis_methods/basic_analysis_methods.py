@@ -56,34 +56,30 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
+        # sum up the data in the normalization and signal windows of all laser pulses
+        reference_sum, reference_var, reference_bins = self.window_sums(laser_data,
+                                                                        norm_start_bin,
+                                                                        norm_end_bin)
+        signal_sum, signal_var, signal_bins = self.window_sums(laser_data,
+                                                               signal_start_bin,
+                                                               signal_end_bin)
+        reference_mean = reference_sum / reference_bins if reference_bins != 0 else np.zeros(
+            num_of_lasers)
+        signal_mean = signal_sum / signal_bins if signal_bins != 0 else np.zeros(num_of_lasers)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
             # Calculate normalized signal while avoiding division by zero
-            if reference_mean > 0 and signal_mean >= 0:
-                signal_data[ii] = signal_mean / reference_mean
-            else:
-                signal_data[ii] = 0.0
-
+            signal_data = np.where((reference_mean > 0) & (signal_mean >= 0),
+                                   signal_mean / reference_mean,
+                                   0.0)
             # Calculate measurement error while avoiding division by zero
-            if reference_sum > 0 and signal_sum > 0:
-                # calculate with respect to gaussian error 'evolution'
-                error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
-            else:
-                error_data[ii] = 0.0
+            # calculate with respect to gaussian error 'evolution'
+            error_data = np.where(
+                (reference_sum > 0) & (signal_sum > 0),
+                signal_data * np.sqrt(signal_var / signal_sum / signal_sum +
+                                      reference_var / reference_sum / reference_sum),
+                0.0
+            )
 
         return signal_data, error_data
 
@@ -106,23 +102,13 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
+        # calculate the sum of the data in the signal window of all laser pulses
+        signal, signal_var, _ = self.window_sums(laser_data, signal_start_bin, signal_end_bin)
 
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # Avoid numpy C type variables overflow and NaN values
+        valid = signal >= 0
+        signal_data = np.where(valid, signal, 0.0)
+        error_data = np.where(valid, np.sqrt(np.where(valid, signal_var, 0.0)), 0.0)
 
         return signal_data, error_data
 
@@ -146,24 +132,18 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the mean of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].mean()
-            signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # calculate the mean of the data in the signal window of all laser pulses
+        signal_sum, signal_var, signal_bins = self.window_sums(laser_data,
+                                                               signal_start_bin,
+                                                               signal_end_bin)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            signal = signal_sum / signal_bins
+            signal_error = np.sqrt(signal_var) / (signal_end_bin - signal_start_bin)
+
+        # Avoid numpy C type variables overflow and NaN values
+        valid = signal >= 0
+        signal_data = np.where(valid, signal, 0.0)
+        error_data = np.where(valid, signal_error, 0.0)
 
         return signal_data, error_data
 
@@ -214,25 +194,28 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            signal_data[ii] = signal_mean - reference_mean
-
-            # calculate with respect to gaussian error 'evolution'
-            error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+        # sum up the data in the background and signal windows of all laser pulses
+        reference_sum, reference_var, reference_bins = self.window_sums(laser_data,
+                                                                        norm_start_bin,
+                                                                        norm_end_bin)
+        signal_sum, signal_var, signal_bins = self.window_sums(laser_data,
+                                                               signal_start_bin,
+                                                               signal_end_bin)
+        reference_mean = reference_sum / reference_bins if reference_bins != 0 else np.zeros(
+            num_of_lasers)
+        signal_mean = signal_sum / signal_bins if signal_bins != 0 else np.zeros(num_of_lasers)
+
+        signal_data = signal_mean - reference_mean
+
+        # calculate with respect to gaussian error 'evolution'. An empty window gives an infinite
+        # relative error (NaN for a zero signal), like 1 / abs(sum) did for Poisson data.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            signal_rel_var = np.where(signal_sum != 0,
+                                      signal_var / signal_sum / np.abs(signal_sum),
+                                      np.inf)
+            reference_rel_var = np.where(reference_sum != 0,
+                                         reference_var / reference_sum / np.abs(reference_sum),
+                                         np.inf)
+            error_data = signal_data * np.sqrt(signal_rel_var + reference_rel_var)
 
         return signal_data, error_data
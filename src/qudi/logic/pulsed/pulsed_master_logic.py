@@ -77,6 +77,7 @@ class PulsedMasterLogic(LogicBase):
 
     # signals for master module (i.e. GUI) coming from PulsedMeasurementLogic
     sigMeasurementDataUpdated = QtCore.Signal()
+    sigAltDataUpdated = QtCore.Signal()
     sigTimerUpdated = QtCore.Signal(float, int, float)
     sigFitUpdated = QtCore.Signal(str, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
@@ -172,6 +173,8 @@ class PulsedMasterLogic(LogicBase):
         # Connect signals coming from PulsedMeasurementLogic
         self.pulsedmeasurementlogic().sigMeasurementDataUpdated.connect(
             self.sigMeasurementDataUpdated, QtCore.Qt.QueuedConnection)
+        self.pulsedmeasurementlogic().sigAltDataUpdated.connect(
+            self.sigAltDataUpdated, QtCore.Qt.QueuedConnection)
         self.pulsedmeasurementlogic().sigTimerUpdated.connect(
             self.sigTimerUpdated, QtCore.Qt.QueuedConnection)
         self.pulsedmeasurementlogic().sigFitUpdated.connect(
@@ -273,6 +276,7 @@ class PulsedMasterLogic(LogicBase):
         self.sigManuallyPullData.disconnect()
         # Disconnect signals coming from PulsedMeasurementLogic
         self.pulsedmeasurementlogic().sigMeasurementDataUpdated.disconnect()
+        self.pulsedmeasurementlogic().sigAltDataUpdated.disconnect()
         self.pulsedmeasurementlogic().sigTimerUpdated.disconnect()
         self.pulsedmeasurementlogic().sigFitUpdated.disconnect()
         self.pulsedmeasurementlogic().sigMeasurementStatusUpdated.disconnect()
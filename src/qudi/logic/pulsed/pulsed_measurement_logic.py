@@ -32,6 +32,7 @@ from qudi.core.statusvariable import StatusVar
 from qudi.core.module import LogicBase
 from qudi.util.mutex import Mutex
 from qudi.util.network import netobtain
+from qudi.util.histogram_transfer import HistogramDeltaDecoder
 from qudi.util.datafitting import FitConfigurationsModel, FitContainer
 from qudi.util.math import compute_ft
 from qudi.util.datastorage import TextDataStorage, CsvDataStorage, NpyDataStorage
@@ -52,6 +53,62 @@ def _data_storage_from_cfg_option(cfg_str):
     raise ValueError('Invalid ConfigOption value to specify data storage type.')
 
 
+def _alt_data_array(signal_data, alternative_data_type, ft_settings):
+    """
+    Compute the alternative data (e.g. fourier transform) of a signal data array.
+
+    @param numpy.ndarray signal_data: signal data, first row holding the controlled variable
+    @param str alternative_data_type: 'Delta', 'FFT' or None
+    @param dict ft_settings: keyword arguments zeropad_num, window, base_corr and psd of compute_ft
+
+    @return numpy.ndarray: alternative data, first row holding the x-axis
+    """
+    if alternative_data_type == 'Delta' and len(signal_data) == 3:
+        alt_data = np.empty((2, signal_data.shape[1]), dtype=float)
+        alt_data[0] = signal_data[0]
+        alt_data[1] = signal_data[1] - signal_data[2]
+    elif alternative_data_type == 'FFT' and signal_data.shape[1] >= 2:
+        fft_x, fft_y = compute_ft(x_val=signal_data[0], y_val=signal_data[1], **ft_settings)
+        alt_data = np.empty((len(signal_data), len(fft_x)), dtype=float)
+        alt_data[0] = fft_x
+        alt_data[1] = fft_y
+        for dim in range(2, len(signal_data)):
+            alt_data[dim] = compute_ft(x_val=signal_data[0], y_val=signal_data[dim],
+                                       **ft_settings)[1]
+    else:
+        alt_data = np.zeros(signal_data.shape, dtype=float)
+        alt_data[0] = signal_data[0]
+    return alt_data
+
+
+class AlternativeDataWorker(QtCore.QObject):
+    """ Helper class computing the fourier transform of the signal data in a separate thread.
+
+    Only the latest request is served. Requests superseded before the worker picked them up are
+    skipped, so the worker never falls behind the analysis loop.
+    """
+
+    def __init__(self, parentclass):
+        super().__init__()
+
+        # remember the reference to the parent class to access functions and settings
+        self._parentclass = parentclass
+
+    @QtCore.Slot()
+    def compute(self):
+        request = self._parentclass._take_alt_data_request()
+        if request is None:
+            return
+        generation, signal_data, alternative_data_type, ft_settings = request
+        alt_data = None
+        try:
+            alt_data = _alt_data_array(signal_data, alternative_data_type, ft_settings)
+        except:
+            self._parentclass.log.exception('Error while computing the alternative data:')
+        finally:
+            self._parentclass._publish_alt_data(generation, alt_data, from_worker=True)
+
+
 class PulsedMeasurementLogic(LogicBase):
     """
     This is the Logic class for the control of pulsed measurements.
@@ -64,6 +121,8 @@ class PulsedMeasurementLogic(LogicBase):
             raw_data_save_type: 'text'
             #additional_extraction_path: # optional
             #additional_analysis_path:   # optional
+            #empirical_analysis_errors: False  # optional, error bars from the scatter between ticks
+            #analysis_history_length: 0  # optional, number of per tick signals kept for diagnostics
         connect:
             fastcounter: 'fast_counter_dummy'
             pulsegenerator: 'pulser_dummy'
@@ -84,6 +143,12 @@ class PulsedMeasurementLogic(LogicBase):
                                              default='text',
                                              constructor=_data_storage_from_cfg_option)
     _save_thumbnails = ConfigOption(name='save_thumbnails', default=True)
+    # Optional streaming statistics of the analysis. If empirical_analysis_errors is True, the
+    # measurement error of analysis methods built on window sums is estimated from the scatter of
+    # the counts added between the analysis ticks instead of Poisson statistics.
+    empirical_analysis_errors = ConfigOption(name='empirical_analysis_errors', default=False)
+    # Number of analysis ticks to keep the signal of the newly added counts for (0 to disable)
+    analysis_history_length = ConfigOption(name='analysis_history_length', default=0)
 
     # status variables
     # ext. microwave settings
@@ -132,6 +197,7 @@ class PulsedMeasurementLogic(LogicBase):
 
     # notification signals for master module (i.e. GUI)
     sigMeasurementDataUpdated = QtCore.Signal()
+    sigAltDataUpdated = QtCore.Signal()
     sigTimerUpdated = QtCore.Signal(float, int, float)
     sigFitUpdated = QtCore.Signal(str, object, bool)
     sigMeasurementStatusUpdated = QtCore.Signal(bool, bool)
@@ -145,6 +211,7 @@ class PulsedMeasurementLogic(LogicBase):
     # Internal signals
     sigStartTimer = QtCore.Signal()
     sigStopTimer = QtCore.Signal()
+    _sigComputeAltData = QtCore.Signal()
 
     __default_fit_configs = (
         {'name': 'Gaussian Dip',
@@ -227,13 +294,29 @@ class PulsedMeasurementLogic(LogicBase):
 
         # measurement data
         self.signal_data = np.empty((2, 0), dtype=float)
-        self.signal_alt_data = np.empty((2, 0), dtype=float)
+        self._signal_alt_data = np.empty((2, 0), dtype=float)
         self.measurement_error = np.empty((2, 0), dtype=float)
         self.laser_data = np.zeros((10, 20), dtype='int64')
         self.raw_data = np.zeros((10, 20), dtype='int64')
 
         self._saved_raw_data = dict()  # temporary saved raw data
         self._recalled_raw_data_tag = None  # the currently recalled raw data dict key
+        # rebuilds the timetraces of fast counters transferring differences
+        self._fast_counter_decoder = HistogramDeltaDecoder()
+        # memory-mapped timetrace of fast counters supporting it (attached locally)
+        self._histogram_buffer = None
+        self._histogram_buffer_sequence = None  # (path, sequence number) of the last histogram
+        self._histogram_buffer_failed_path = None  # path of a buffer that could not be attached
+
+        # alternative data computation. The generation counts the signal updates, the published
+        # generation is the one self._signal_alt_data belongs to.
+        self._alt_data_lock = Mutex()
+        self._alt_data_generation = 0
+        self._alt_data_published_generation = 0
+        self._alt_data_request = None
+        self._alt_data_busy = False
+        self._alt_data_thread = None
+        self._alt_data_worker = None
 
         # Paused measurement flag
         self.__is_paused = False
@@ -290,6 +373,13 @@ class PulsedMeasurementLogic(LogicBase):
                                         power=self.__microwave_power,
                                         use_ext_microwave=True)
 
+        # create an independent thread for the fourier transform of the signal
+        self._alt_data_thread = QtCore.QThread()
+        self._alt_data_worker = AlternativeDataWorker(self)
+        self._alt_data_worker.moveToThread(self._alt_data_thread)
+        self._sigComputeAltData.connect(self._alt_data_worker.compute, QtCore.Qt.QueuedConnection)
+        self._alt_data_thread.start()
+
         # initialize arrays for the measurement data
         self._initialize_data_arrays()
 
@@ -309,6 +399,9 @@ class PulsedMeasurementLogic(LogicBase):
         self.__analysis_timer.timeout.disconnect()
         self.sigStartTimer.disconnect()
         self.sigStopTimer.disconnect()
+        self._sigComputeAltData.disconnect()
+        self._alt_data_thread.quit()
+        self._alt_data_thread.wait()
         return
 
     @extraction_parameters.representer
@@ -460,6 +553,15 @@ class PulsedMeasurementLogic(LogicBase):
     def elapsed_sweeps(self):
         return self.__elapsed_sweeps
 
+    @property
+    def analysis_signal_history(self):
+        """
+        Signal of the counts added during each of the last analysis ticks.
+
+        @return list: tuples (elapsed sweeps, signal array) in chronological order
+        """
+        return self._pulseanalyzer.signal_history
+
     @property
     def elapsed_time(self):
         return self.__elapsed_time
@@ -713,6 +815,21 @@ class PulsedMeasurementLogic(LogicBase):
             self.set_timer_interval(value)
         return
 
+    @property
+    def signal_alt_data(self):
+        """
+        Alternative data (e.g. fourier transform) of the signal data. It is computed only when
+        requested. While the fourier transform of the latest signal is still being computed in
+        the background, the previous result is returned without waiting.
+
+        @return numpy.ndarray: alternative data, first row holding the x-axis
+        """
+        with self._alt_data_lock:
+            if (self._alt_data_published_generation == self._alt_data_generation or
+                    self._alt_data_request is not None or self._alt_data_busy):
+                return self._signal_alt_data
+        return self._get_current_alt_data()
+
     @property
     def alternative_data_type(self):
         return str(self._alternative_data_type)
@@ -778,6 +895,8 @@ class PulsedMeasurementLogic(LogicBase):
         # Use threadlock to update settings during a running measurement
         with self._threadlock:
             self._pulseanalyzer.analysis_settings = settings_dict
+            # analyse the current timetrace again with the new settings
+            self._histogram_buffer_sequence = None
             self.sigAnalysisSettingsUpdated.emit(self.analysis_settings)
         return
 
@@ -803,6 +922,8 @@ class PulsedMeasurementLogic(LogicBase):
         # Use threadlock to update settings during a running measurement
         with self._threadlock:
             self._pulseextractor.extraction_settings = settings_dict
+            # extract the laser pulses of the current timetrace again with the new settings
+            self._histogram_buffer_sequence = None
             self.sigExtractionSettingsUpdated.emit(self.extraction_settings)
         return
 
@@ -858,6 +979,8 @@ class PulsedMeasurementLogic(LogicBase):
 
         # Perform sanity checks on settings
         self._measurement_settings_sanity_check()
+        # analyse the current timetrace again, e.g. with new laser_ignore_list or alternating
+        self._histogram_buffer_sequence = None
 
         # emit update signal for master (GUI or other logic module)
         self.sigMeasurementSettingsUpdated.emit(self.measurement_settings)
@@ -906,6 +1029,7 @@ class PulsedMeasurementLogic(LogicBase):
 
                 # initialize data arrays
                 self._initialize_data_arrays()
+                self._histogram_buffer_sequence = None
 
                 # recall stashed raw data
                 if stashed_raw_data_tag in self._saved_raw_data:
@@ -1094,6 +1218,8 @@ class PulsedMeasurementLogic(LogicBase):
         """ Analyse and display the data
         """
         if self.module_state() == 'locked':
+            # analyse also if no new sweeps arrived since the last analysis
+            self._histogram_buffer_sequence = None
             self._pulsed_analysis_loop()
         return
 
@@ -1111,7 +1237,7 @@ class PulsedMeasurementLogic(LogicBase):
         @return result_object: the lmfit result object
         """
         container = self.alt_fc if use_alternative_data else self.fc
-        data = self.signal_alt_data if use_alternative_data else self.signal_data
+        data = self._get_current_alt_data() if use_alternative_data else self.signal_data
         try:
             config, result = container.fit_data(fit_config, data[0], data[1])
             if result:
@@ -1222,7 +1348,11 @@ class PulsedMeasurementLogic(LogicBase):
             if self.module_state() == 'locked':
                 # Update elapsed time
 
-                self._extract_laser_pulses()
+                if not self._extract_laser_pulses():
+                    # no new sweeps since the last analysis, only the timer is updated
+                    self.sigTimerUpdated.emit(self.__elapsed_time, self.__elapsed_sweeps,
+                                              self.__timer_interval)
+                    return
 
                 tmp_signal, tmp_error = self._analyze_laser_pulses()
 
@@ -1266,15 +1396,19 @@ class PulsedMeasurementLogic(LogicBase):
 
     def _extract_laser_pulses(self):
         # Get counter raw data (including recalled raw data from previous measurement)
+        last_sequence = self._histogram_buffer_sequence
         fc_data, info_dict = self._get_raw_data()
-        self.raw_data = fc_data
+        # the timer keeps running even if no new sweeps have arrived
         self.__elapsed_sweeps = info_dict['elapsed_sweeps']
         self.__elapsed_time = info_dict['elapsed_time']
+        if last_sequence is not None and last_sequence == self._histogram_buffer_sequence:
+            return False
+        self.raw_data = fc_data
 
         # extract laser pulses from raw data
         return_dict = self._pulseextractor.extract_laser_pulses(self.raw_data)
         self.laser_data = return_dict['laser_counts_arr']
-        return
+        return True
 
     def _analyze_laser_pulses(self):
         # analyze pulses and get data points for signal array. Also check if extraction
@@ -1295,7 +1429,11 @@ class PulsedMeasurementLogic(LogicBase):
                                                  info_dict with keys 'elapsed_sweeps' and 'elapsed_time'
         """
         # get raw data from fast counter
-        fc_data = self._fastcounter().get_data_trace()
+        fc_data = self._get_histogram_buffer_data()
+        if fc_data is None:
+            fc_data = self._get_data_trace_delta()
+        if fc_data is None:
+            fc_data = self._fastcounter().get_data_trace()
         if type(fc_data) == tuple and len(fc_data) == 2:  # if the hardware implement the new version of the interface
             fc_data, info_dict = fc_data
         else:
@@ -1334,6 +1472,70 @@ class PulsedMeasurementLogic(LogicBase):
 
         return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
 
+    def _get_histogram_buffer_data(self):
+        """
+        Get a consistent copy of the timetrace from fast counters accumulating into a memory-mapped
+        HistogramBuffer. The buffer is attached once and reused as long as its path stays the same.
+        The copy is not changed by the hardware, so it can be analysed and kept as raw data.
+        Buffers of fast counters on another computer can not be attached, then the timetrace is
+        transferred as usual.
+
+        @return tuple(numpy.ndarray, dict): timetrace and info_dict as returned by get_data_trace
+                                            or None if not supported
+        """
+        fastcounter = self._fastcounter()
+        buffer = None
+        if hasattr(fastcounter, 'get_histogram_buffer'):
+            buffer = fastcounter.get_histogram_buffer()
+        if buffer is None:
+            self._histogram_buffer = None
+            self._histogram_buffer_sequence = None
+            return None
+        if self._histogram_buffer is None or self._histogram_buffer.path != buffer.path:
+            path = buffer.path
+            if path == self._histogram_buffer_failed_path:
+                return None
+            # attaches to the file of remote buffers instead of copying the timetrace
+            try:
+                self._histogram_buffer = netobtain(buffer)
+            except (OSError, ValueError):
+                self.log.debug(f'Unable to attach to histogram buffer "{path}" of the fast '
+                               f'counter. Transferring the timetrace instead.')
+                self._histogram_buffer = None
+                self._histogram_buffer_sequence = None
+                self._histogram_buffer_failed_path = path
+                return None
+        fc_data, info_dict = self._histogram_buffer.snapshot()
+        if info_dict['sequence'] % 2 == 0:
+            # unchanged sequence numbers tell the analysis loop that no new sweeps arrived
+            self._histogram_buffer_sequence = (self._histogram_buffer.path, info_dict['sequence'])
+        else:
+            self._histogram_buffer_sequence = None
+        return fc_data, {'elapsed_sweeps': info_dict['elapsed_sweeps'],
+                         'elapsed_time': info_dict['elapsed_time']}
+
+    def _get_data_trace_delta(self):
+        """
+        Get the timetrace from fast counters transferring differences to the previous timetrace
+        (e.g. FastCounterDeltaInterfuse running remotely).
+
+        @return tuple(numpy.ndarray, dict): timetrace and info_dict as returned by
+                                            get_data_trace or None if not supported
+        """
+        fastcounter = self._fastcounter()
+        if not hasattr(fastcounter, 'get_data_trace_delta'):
+            return None
+        packet, elapsed_sweeps, elapsed_time = fastcounter.get_data_trace_delta(
+            self._fast_counter_decoder.sequence)
+        try:
+            fc_data = self._fast_counter_decoder.decode(packet)
+        except ValueError:
+            # out of sync, e.g. after a restart of the remote module. Request a full timetrace.
+            self._fast_counter_decoder.reset()
+            packet, elapsed_sweeps, elapsed_time = fastcounter.get_data_trace_delta(None)
+            fc_data = self._fast_counter_decoder.decode(packet)
+        return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
+
     def _initialize_data_arrays(self):
         """
         Initializing the signal, error, laser and raw data arrays.
@@ -1344,8 +1546,13 @@ class PulsedMeasurementLogic(LogicBase):
         self.signal_data = np.zeros((signal_dim, len(self._controlled_variable)), dtype=float)
         self.signal_data[0] = self._controlled_variable
 
-        self.signal_alt_data = np.zeros((signal_dim, len(self._controlled_variable)), dtype=float)
-        self.signal_alt_data[0] = self._controlled_variable
+        with self._alt_data_lock:
+            self._alt_data_generation += 1
+            self._alt_data_published_generation = self._alt_data_generation
+            self._alt_data_request = None
+            self._signal_alt_data = np.zeros((signal_dim, len(self._controlled_variable)),
+                                             dtype=float)
+            self._signal_alt_data[0] = self._controlled_variable
 
         self.measurement_error = np.zeros((signal_dim, len(self._controlled_variable)), dtype=float)
         self.measurement_error[0] = self._controlled_variable
@@ -1359,6 +1566,9 @@ class PulsedMeasurementLogic(LogicBase):
         else:
             self.raw_data = np.zeros(number_of_bins, dtype='int64')
 
+        # restart the streaming statistics of the analysis
+        self._pulseanalyzer.reset_statistics()
+
         self.sigMeasurementDataUpdated.emit()
         return
 
@@ -1667,12 +1877,13 @@ class PulsedMeasurementLogic(LogicBase):
 
         # handle the save of the alternative data plot
         if self._alternative_data_type and self._alternative_data_type != 'None':
+            signal_alt_data = self._get_current_alt_data()
 
             # scale the x_axis for plotting
-            max_val = np.max(self.signal_alt_data[0])
+            max_val = np.max(signal_alt_data[0])
             scaled_float = ScaledFloat(max_val)
             x_axis_prefix = scaled_float.scale
-            x_axis_ft_scaled = self.signal_alt_data[0] / scaled_float.scale_val
+            x_axis_ft_scaled = signal_alt_data[0] / scaled_float.scale_val
 
             # since no ft units are provided, make a small work around:
             if self._alternative_data_type == 'FFT':
@@ -1699,11 +1910,11 @@ class PulsedMeasurementLogic(LogicBase):
 
                 ft_label = '{0} of data traces'.format(self._alternative_data_type)
 
-            ax2.plot(x_axis_ft_scaled, self.signal_alt_data[1],
+            ax2.plot(x_axis_ft_scaled, signal_alt_data[1],
                      linestyle=':', linewidth=0.5, color=colors[0],
                      label=ft_label)
-            if self._alternating and len(self.signal_alt_data) > 2:
-                ax2.plot(x_axis_ft_scaled, self.signal_alt_data[2],
+            if self._alternating and len(signal_alt_data) > 2:
+                ax2.plot(x_axis_ft_scaled, signal_alt_data[2],
                          linestyle=':', linewidth=0.5, color=colors[3],
                          label=ft_label.replace('1', '2'))
 
@@ -1738,30 +1949,73 @@ class PulsedMeasurementLogic(LogicBase):
 
     def _compute_alt_data(self):
         """
-        Performing transformations on the measurement data (e.g. fourier transform).
-        """
-        if self._alternative_data_type == 'Delta' and len(self.signal_data) == 3:
-            self.signal_alt_data = np.empty((2, self.signal_data.shape[1]), dtype=float)
-            self.signal_alt_data[0] = self.signal_data[0]
-            self.signal_alt_data[1] = self.signal_data[1] - self.signal_data[2]
-        elif self._alternative_data_type == 'FFT' and self.signal_data.shape[1] >= 2:
-            fft_x, fft_y = compute_ft(x_val=self.signal_data[0],
-                                      y_val=self.signal_data[1],
-                                      zeropad_num=self.zeropad,
-                                      window=self.window,
-                                      base_corr=self.base_corr,
-                                      psd=self.psd)
-            self.signal_alt_data = np.empty((len(self.signal_data), len(fft_x)), dtype=float)
-            self.signal_alt_data[0] = fft_x
-            self.signal_alt_data[1] = fft_y
-            for dim in range(2, len(self.signal_data)):
-                dummy, self.signal_alt_data[dim] = compute_ft(x_val=self.signal_data[0],
-                                                              y_val=self.signal_data[dim],
-                                                              zeropad_num=self.zeropad,
-                                                              window=self.window,
-                                                              base_corr=self.base_corr,
-                                                              psd=self.psd)
-        else:
-            self.signal_alt_data = np.zeros(self.signal_data.shape, dtype=float)
-            self.signal_alt_data[0] = self.signal_data[0]
+        Request the transformation of the measurement data (e.g. fourier transform) after the
+        signal data has changed. Fourier transforms are handed to the worker thread, all other
+        transformations are computed lazily when signal_alt_data is read.
+        """
+        with self._alt_data_lock:
+            self._alt_data_generation += 1
+            if self._alternative_data_type != 'FFT' or self.signal_data.shape[1] < 2:
+                self._alt_data_request = None
+                return
+            request_pending = self._alt_data_request is not None
+            self._alt_data_request = (self._alt_data_generation,
+                                      self.signal_data.copy(),
+                                      self._alternative_data_type,
+                                      self._get_ft_settings())
+        if not request_pending:
+            self._sigComputeAltData.emit()
+        return
+
+    def _get_ft_settings(self):
+        return {'zeropad_num': self.zeropad,
+                'window': self.window,
+                'base_corr': self.base_corr,
+                'psd': self.psd}
+
+    def _get_current_alt_data(self):
+        """
+        Get the alternative data of the current signal data. Computes it in the calling thread if
+        no up to date result is available yet.
+
+        @return numpy.ndarray: alternative data, first row holding the x-axis
+        """
+        with self._alt_data_lock:
+            generation = self._alt_data_generation
+            if self._alt_data_published_generation == generation:
+                return self._signal_alt_data
+            signal_data = self.signal_data.copy()
+            alternative_data_type = self._alternative_data_type
+        alt_data = _alt_data_array(signal_data, alternative_data_type, self._get_ft_settings())
+        self._publish_alt_data(generation, alt_data)
+        return alt_data
+
+    def _take_alt_data_request(self):
+        """
+        Called by the worker thread to take over the latest request for alternative data.
+        """
+        with self._alt_data_lock:
+            request = self._alt_data_request
+            self._alt_data_request = None
+            self._alt_data_busy = request is not None
+            return request
+
+    def _publish_alt_data(self, generation, alt_data, from_worker=False):
+        """
+        Store alternative data unless a result for newer signal data has been stored already.
+        Results of the worker thread are announced with sigAltDataUpdated.
+
+        @param int generation: signal data generation the alternative data was computed from
+        @param numpy.ndarray alt_data: alternative data, None if the computation failed
+        @param bool from_worker: flag indicating if the worker thread computed the data
+        """
+        with self._alt_data_lock:
+            if from_worker:
+                self._alt_data_busy = False
+            if alt_data is None or generation <= self._alt_data_published_generation:
+                return
+            self._signal_alt_data = alt_data
+            self._alt_data_published_generation = generation
+        if from_worker:
+            self.sigAltDataUpdated.emit()
         return
@@ -32,7 +32,10 @@ class Idle(SamplingBase):
         pass
 
     @staticmethod
-    def get_samples(time_array):
+    def get_samples(time_array, out=None):
+        if out is not None:
+            out.fill(0)
+            return out
         samples_arr = np.zeros(len(time_array))
         return samples_arr
 
@@ -56,7 +59,10 @@ class DC(SamplingBase):
         samples_arr = np.zeros(len(time_array)) + voltage
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            out.fill(self.voltage)
+            return out
         samples_arr = self._get_dc(time_array, self.voltage)
         return samples_arr
 
@@ -90,8 +96,10 @@ class Sin(SamplingBase):
         samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         phase_rad = np.pi * self.phase / 180
+        if out is not None:
+            return self._sine_into(out, time_array, self.amplitude, self.frequency, phase_rad)
         samples_arr = self._get_sine(time_array, self.amplitude, self.frequency, phase_rad)
         return samples_arr
 
@@ -143,7 +151,9 @@ class DoubleSinSum(SamplingBase):
         samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            return self._sines_into(out, time_array)
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         samples_arr = self._get_sine(time_array, self.amplitude_1, self.frequency_1, phase_rad)
@@ -153,6 +163,15 @@ class DoubleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def _sines_into(self, out, time_array):
+        self._sine_into(out, time_array, self.amplitude_1, self.frequency_1,
+                        np.pi * self.phase_1 / 180)
+        sine_arr = np.empty_like(out)
+        self._sine_into(sine_arr, time_array, self.amplitude_2, self.frequency_2,
+                        np.pi * self.phase_2 / 180)
+        out += sine_arr
+        return out
+
 
 class DoubleSinProduct(SamplingBase):
     """
@@ -201,7 +220,9 @@ class DoubleSinProduct(SamplingBase):
         samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            return self._sines_into(out, time_array)
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         samples_arr = self._get_sine(time_array, self.amplitude_1, self.frequency_1, phase_rad)
@@ -211,6 +232,15 @@ class DoubleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def _sines_into(self, out, time_array):
+        self._sine_into(out, time_array, self.amplitude_1, self.frequency_1,
+                        np.pi * self.phase_1 / 180)
+        sine_arr = np.empty_like(out)
+        self._sine_into(sine_arr, time_array, self.amplitude_2, self.frequency_2,
+                        np.pi * self.phase_2 / 180)
+        out *= sine_arr
+        return out
+
 
 class TripleSinSum(SamplingBase):
     """
@@ -277,7 +307,9 @@ class TripleSinSum(SamplingBase):
         samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            return self._sines_into(out, time_array)
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         samples_arr = self._get_sine(time_array, self.amplitude_1, self.frequency_1, phase_rad)
@@ -291,6 +323,18 @@ class TripleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def _sines_into(self, out, time_array):
+        self._sine_into(out, time_array, self.amplitude_1, self.frequency_1,
+                        np.pi * self.phase_1 / 180)
+        sine_arr = np.empty_like(out)
+        self._sine_into(sine_arr, time_array, self.amplitude_2, self.frequency_2,
+                        np.pi * self.phase_2 / 180)
+        out += sine_arr
+        self._sine_into(sine_arr, time_array, self.amplitude_3, self.frequency_3,
+                        np.pi * self.phase_3 / 180)
+        out += sine_arr
+        return out
+
 
 class TripleSinProduct(SamplingBase):
     """
@@ -357,7 +401,9 @@ class TripleSinProduct(SamplingBase):
         samples_arr = amplitude * np.sin(2 * np.pi * frequency * time_array + phase)
         return samples_arr
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            return self._sines_into(out, time_array)
         # First sine wave
         phase_rad = np.pi * self.phase_1 / 180
         samples_arr = self._get_sine(time_array, self.amplitude_1, self.frequency_1, phase_rad)
@@ -371,6 +417,18 @@ class TripleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def _sines_into(self, out, time_array):
+        self._sine_into(out, time_array, self.amplitude_1, self.frequency_1,
+                        np.pi * self.phase_1 / 180)
+        sine_arr = np.empty_like(out)
+        self._sine_into(sine_arr, time_array, self.amplitude_2, self.frequency_2,
+                        np.pi * self.phase_2 / 180)
+        out *= sine_arr
+        self._sine_into(sine_arr, time_array, self.amplitude_3, self.frequency_3,
+                        np.pi * self.phase_3 / 180)
+        out *= sine_arr
+        return out
+
 
 class Chirp(SamplingBase):
     """
@@ -404,10 +462,21 @@ class Chirp(SamplingBase):
             self.stop_freq = stop_freq
         return
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
         phase_rad = np.deg2rad(self.phase)
         freq_diff = self.stop_freq - self.start_freq
         time_diff = time_array[-1] - time_array[0]
+        if out is not None:
+            t_start = time_array[0]
+
+            def chirp_phase(t):
+                return 2 * np.pi * t * (self.start_freq + freq_diff * (
+                    t - t_start) / time_diff / 2) + phase_rad
+
+            self._phase_into(out, time_array, chirp_phase)
+            np.sin(out, out=out)
+            out *= self.amplitude
+            return out
         samples_arr = self.amplitude * np.sin(2 * np.pi * time_array * (
                     self.start_freq + freq_diff * (
                         time_array - time_array[0]) / time_diff / 2) + phase_rad)
@@ -456,11 +525,18 @@ class AllenEberlyChirp(SamplingBase):
             self.tau_pulse = tau_pulse
         return
 
-    def get_samples(self, time_array):
+    def get_samples(self, time_array, out=None):
+        if out is not None:
+            # The sech envelope and log(cosh) phase are evaluated in float64 block by block
+            return self._evaluate_into(out, time_array,
+                                       lambda t: self._get_samples(t, time_array[0],
+                                                                   time_array[-1]))
+        return self._get_samples(time_array, time_array[0], time_array[-1])
+
+    def _get_samples(self, time_array, t_start, t_stop):
         phase_rad = np.deg2rad(self.phase)  # initial phase
         freq_range_max = self.stop_freq - self.start_freq  # frequency range
-        t_start = time_array[0]  # start time of the pulse
-        pulse_duration = time_array[-1] - time_array[0]  # pulse duration
+        pulse_duration = t_stop - t_start  # pulse duration
         freq_center = (self.stop_freq + self.start_freq) / 2  # central frequency
         tau_run = self.tau_pulse  # tau to use for the sample generation, tau_pulse = truncation_ratio * pulse_duration
         # tau_run characterizes the pulse shape, which is sech((t - mu)/tau_run) when mu is the center of the pulse
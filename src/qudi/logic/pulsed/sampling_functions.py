@@ -26,10 +26,12 @@ import sys
 import inspect
 import copy
 import logging
+import functools
 import numpy as np
 from enum import Enum, EnumMeta
 
 from qudi.util.helpers import iter_modules_recursive
+from qudi.util.plugin_index import is_json_value
 
 ##############################################################
 # Helper class for everything that need dynamical decoupling #
@@ -102,9 +104,16 @@ class DDMethods(Enum):
 class SamplingBase:
     """
     Base class for all sampling functions
+
+    Sampling functions implement "get_samples(time_array, out=None)". Without out the samples are
+    returned as float64 array. If a preallocated (float32) array out is given, the samples are
+    written into it: phases are evaluated in float64 and reduced to one period block by block
+    (_phase_into), only the per-sample trigonometry runs in the dtype of out.
     """
     params = dict()
     log = logging.getLogger(__name__)
+    # number of samples per block for the float64 parts of the evaluation into out
+    block_size = 2 ** 16
 
     def __repr__(self):
         kwargs = []
@@ -127,15 +136,88 @@ class SamplingBase:
     def __eq__(self, other):
         if not isinstance(other, SamplingBase):
             return False
-        hash_list = [type(self).__name__]
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        key_list = [type(self).__name__]
         for param in self.params:
-            hash_list.append(getattr(self, param))
-        hash_self = hash(tuple(hash_list))
-        hash_list = [type(other).__name__]
-        for param in other.params:
-            hash_list.append(getattr(other, param))
-        hash_other = hash(tuple(hash_list))
-        return hash_self == hash_other
+            key_list.append(getattr(self, param))
+        return tuple(key_list)
+
+    def sample_into(self, time_array, out):
+        """ Write the samples for time_array into the preallocated array out.
+
+        Sampling functions with a get_samples method not accepting out (e.g. from additional
+        sampling function paths) are evaluated in float64 and cast into out.
+
+        @param numpy.ndarray time_array: float64 array of sample times in seconds
+        @param numpy.ndarray out: array of the same length to write the samples to
+
+        @return numpy.ndarray: out
+        """
+        if _accepts_out(type(self)):
+            return self.get_samples(time_array, out=out)
+        out[:] = self.get_samples(time_array)
+        return out
+
+    @classmethod
+    def _evaluate_into(cls, out, time_array, function):
+        """ Evaluate function (float64) block by block and store the results in out.
+
+        @param numpy.ndarray out: array to write the results to
+        @param numpy.ndarray time_array: float64 array of sample times in seconds
+        @param callable function: function of a time array slice returning float64 values
+
+        @return numpy.ndarray: out
+        """
+        for start in range(0, len(out), cls.block_size):
+            stop = start + cls.block_size
+            out[start:stop] = function(time_array[start:stop])
+        return out
+
+    @classmethod
+    def _phase_into(cls, out, time_array, phase_function):
+        """ Evaluate phase_function (float64) block by block, reduce the phases to [0, 2*pi) and
+        store them in out. Large phases (rotating frame) keep their float64 precision this way.
+
+        @param numpy.ndarray out: array to write the reduced phases to
+        @param numpy.ndarray time_array: float64 array of sample times in seconds
+        @param callable phase_function: function of a time array slice returning float64 phases in rad
+
+        @return numpy.ndarray: out
+        """
+        periods = np.empty(min(len(out), cls.block_size))
+        for start in range(0, len(out), cls.block_size):
+            phase = phase_function(time_array[start:start + cls.block_size])
+            block_periods = periods[:len(phase)]
+            # phase - 2*pi*floor(phase / (2*pi)) is considerably faster than np.remainder
+            np.multiply(phase, 1 / (2 * np.pi), out=block_periods)
+            np.floor(block_periods, out=block_periods)
+            block_periods *= 2 * np.pi
+            np.subtract(phase, block_periods, out=out[start:start + len(phase)])
+        return out
+
+    @classmethod
+    def _sine_into(cls, out, time_array, amplitude, frequency, phase):
+        """ amplitude * sin(2*pi*frequency*time_array + phase) with the phase evaluated in float64
+        and the sine in the dtype of out.
+
+        @param numpy.ndarray out: array to write the samples to
+        @param numpy.ndarray time_array: float64 array of sample times in seconds
+        @param float amplitude: amplitude of the sine
+        @param float frequency: frequency in Hz
+        @param float phase: phase in rad
+
+        @return numpy.ndarray: out
+        """
+        angular_frequency = 2 * np.pi * frequency
+        cls._phase_into(out, time_array, lambda t: angular_frequency * t + phase)
+        np.sin(out, out=out)
+        out *= amplitude
+        return out
 
     def get_dict_representation(self):
         dict_repr = dict()
@@ -146,6 +228,15 @@ class SamplingBase:
         return dict_repr
 
 
+@functools.lru_cache(maxsize=None)
+def _accepts_out(sampling_class):
+    """ Check if the get_samples method of a sampling function class accepts the out argument. """
+    try:
+        return 'out' in inspect.signature(sampling_class.get_samples).parameters
+    except (TypeError, ValueError):
+        return False
+
+
 class SamplingFunctions:
     """
 
@@ -153,7 +244,17 @@ class SamplingFunctions:
     parameters = dict()
 
     @classmethod
-    def import_sampling_functions(cls, path_list):
+    def import_sampling_functions(cls, path_list, plugin_index=None):
+        """ Collect all sampling function classes from the default namespace
+        "qudi.logic.pulsed.sampling_function_defs" and the additional directories in path_list.
+
+        If a PluginIndex is given, the sampling functions and their parameters are taken from the
+        index for all unchanged modules. These modules are imported on first use of one of their
+        sampling functions only.
+
+        @param list path_list: additional directories to import sampling functions from
+        @param PluginIndex plugin_index: optional index of already discovered sampling functions
+        """
         module_names = list()
 
         # Import from default namespace "qudi.logic.pulsed.sampling_function_defs"
@@ -184,14 +285,20 @@ class SamplingFunctions:
         # Go through all modules and get all sampling function classes.
         param_dict = dict()
         for module_name in module_names:
+            if plugin_index is not None:
+                indexed_params = plugin_index.lookup(
+                    module_name,
+                    scan=lambda mod: cls._scan_sampling_functions(cls._reload_module(mod)))
+                if indexed_params is not None:
+                    for name, params in indexed_params.items():
+                        setattr(cls, name, cls.__get_lazy_sf_method(module_name, name))
+                        param_dict[name] = {
+                            param: dict(param_def, type=cls._param_types[param_def['type']])
+                            for param, param_def in params.items()
+                        }
+                    continue
             # import module
-            mod = importlib.import_module(module_name)
-            # Delete all remaining references to sampling functions.
-            # This is neccessary if you have removed a sampling function class.
-            for attr in cls.parameters:
-                if hasattr(mod, attr):
-                    delattr(mod, attr)
-            importlib.reload(mod)
+            mod = cls._reload_module(importlib.import_module(module_name))
             # get all sampling function class references defined in the module
             for name, ref in inspect.getmembers(mod, cls.is_sampling_function_class):
                 setattr(cls, name, cls.__get_sf_method(ref))
@@ -203,6 +310,47 @@ class SamplingFunctions:
                 delattr(cls, func)
 
         cls.parameters = param_dict
+        if plugin_index is not None:
+            plugin_index.save()
+
+    # parameter types of sampling functions that can be stored in a PluginIndex
+    _param_types = {'float': float, 'int': int, 'str': str, 'bool': bool}
+
+    @classmethod
+    def _reload_module(cls, mod):
+        """ Reload a sampling function module after deleting all remaining references to sampling
+        functions. This is neccessary if you have removed a sampling function class.
+        """
+        for attr in cls.parameters:
+            if hasattr(mod, attr):
+                delattr(mod, attr)
+        return importlib.reload(mod)
+
+    @classmethod
+    def _scan_sampling_functions(cls, mod):
+        """ Get the parameter definitions of all sampling function classes in a module for a
+        PluginIndex.
+
+        @param module mod: imported module to scan
+        @return dict: parameter definitions with type names per sampling function or None if a
+                      parameter definition can not be stored in the index
+        """
+        functions = dict()
+        for name, ref in inspect.getmembers(mod, cls.is_sampling_function_class):
+            functions[name] = dict()
+            for param, param_def in ref.params.items():
+                type_names = [n for n, t in cls._param_types.items() if t is param_def.get('type')]
+                if not type_names or not all(is_json_value(v) for k, v in param_def.items()
+                                             if k != 'type'):
+                    return None
+                functions[name][param] = dict(param_def, type=type_names[0])
+        return functions
+
+    @staticmethod
+    def __get_lazy_sf_method(module_name, sf_name):
+        def sf_method(*args, **kwargs):
+            return getattr(importlib.import_module(module_name), sf_name)(*args, **kwargs)
+        return sf_method
 
     @staticmethod
     def __get_sf_method(sf_ref):
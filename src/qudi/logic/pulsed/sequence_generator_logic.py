@@ -28,20 +28,23 @@ import copy
 import traceback
 import datetime
 import re
+from collections import OrderedDict
 
 from PySide2 import QtCore
 from qudi.core.statusvariable import StatusVar
 from qudi.core.connector import Connector
 from qudi.core.configoption import ConfigOption
-from qudi.util.paths import get_home_dir
+from qudi.util.paths import get_home_dir, get_appdata_dir
 from qudi.util.helpers import natural_sort
 from qudi.util.network import netobtain
 from qudi.core.module import LogicBase
 from qudi.logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
 from qudi.logic.pulsed.pulse_objects import PulseObjectGenerator, PulseBlockElement
 from qudi.logic.pulsed.sampling_functions import SamplingFunctions
-from qudi.interface.pulser_interface import SequenceOption
+from qudi.logic.pulsed.upload_planner import UploadPlanner
+from qudi.interface.pulser_interface import SequenceOption, RunLengthWaveform
 from qudi.util.benchmark import BenchmarkTool
+from qudi.util.plugin_index import PluginIndex
 
 
 class SequenceGeneratorLogic(LogicBase):
@@ -66,6 +69,8 @@ class SequenceGeneratorLogic(LogicBase):
         #     additional_predefined_methods_path: # optional
         #     additional_sampling_functions_path: # optional
         #     assets_storage_path: # optional
+        #     sampling_dtype_policy: 'native' # optional, 'native' (float32) or 'float64'
+        #     plugin_index_path: # optional, empty to always import all plugin modules
         connect:
             pulsegenerator: 'pulser_dummy'
     """
@@ -85,8 +90,20 @@ class SequenceGeneratorLogic(LogicBase):
     _sampling_functions_import_path = ConfigOption(name='additional_sampling_functions_path',
                                                    default=None,
                                                    missing='nothing')
+    # Index of discovered sampling functions and predefined methods. Plugin modules listed in the
+    # index are only imported on first use.
+    _plugin_index_path = ConfigOption(name='plugin_index_path',
+                                      default=os.path.join(get_appdata_dir(),
+                                                           'pulsed_plugin_index.json'),
+                                      missing='nothing')
     _info_on_estimated_upload_time = ConfigOption(name='info_on_estimated_upload_time', default=60, missing='nothing')
     _disable_bench_prompt = ConfigOption(name='disable_benchmark_prompt', default=False, missing='nothing')
+    # 'native': sampling functions write directly into the float32 sample arrays (phases in float64)
+    # 'float64': sampling functions are evaluated in float64 and down-converted afterwards
+    _sampling_dtype_policy = ConfigOption(name='sampling_dtype_policy',
+                                          default='native',
+                                          missing='nothing',
+                                          checker=lambda x: x in ('native', 'float64'))
 
     # status vars
     # Global parameters describing the channel usage and common parameters used during pulsed object
@@ -115,6 +132,8 @@ class SequenceGeneratorLogic(LogicBase):
     _benchmark_write_state = StatusVar(representer=_benchmark_write.save, constructor=_benchmark_write.load_from_dict)
     _benchmark_load = BenchmarkTool()
     _benchmark_load_state = StatusVar(representer=_benchmark_load.save, constructor=_benchmark_load.load_from_dict)
+    # Saved benchmark states of all pulse generators connected so far. Keys are the module names.
+    _pulser_benchmarks = StatusVar(name='pulser_benchmarks', default=None)
 
     # define signals
     sigBlockDictUpdated = QtCore.Signal(dict)
@@ -147,10 +166,16 @@ class SequenceGeneratorLogic(LogicBase):
         self.__flags = set()
         # upload speed from benchmark
         self.__upload_speed = np.nan
+        # Plans chunk sizes and batched uploads from the benchmarks
+        self._upload_planner = None
 
         # A flag indicating if sampling of a sequence is in progress
         self.__sequence_generation_in_progress = False
 
+        # Results of analyze_block_ensemble for the most recently analyzed ensemble contents
+        self._ensemble_info_cache = OrderedDict()
+        self._ensemble_info_cache_size = 16
+
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
         self._pog = None
 
@@ -200,7 +225,8 @@ class SequenceGeneratorLogic(LogicBase):
             else:
                 self.log.error('ConfigOption additional_sampling_functions_path needs to either be a string or '
                                'a list of strings.')
-        SamplingFunctions.import_sampling_functions(sf_path_list)
+        plugin_index = PluginIndex(self._plugin_index_path) if self._plugin_index_path else None
+        SamplingFunctions.import_sampling_functions(sf_path_list, plugin_index=plugin_index)
 
         # Read back settings from device and update instance variables accordingly
         self._read_settings_from_device()
@@ -214,17 +240,40 @@ class SequenceGeneratorLogic(LogicBase):
         self._update_sequences_from_file()
 
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
-        self._pog = PulseObjectGenerator(sequencegeneratorlogic=self)
+        self._pog = PulseObjectGenerator(sequencegeneratorlogic=self, plugin_index=plugin_index)
         self._pog.activate_plugins()
 
+        # Restore the benchmarks of the connected pulse generator. The benchmark states restored
+        # from the status variables belong to the last connected pulse generator.
+        if self._pulser_benchmarks is None:
+            self._pulser_benchmarks = dict()
+        saved_benchmarks = self._pulser_benchmarks.get(self._pulser_key)
+        if saved_benchmarks is not None:
+            self._benchmark_write.load_from_dict(saved_dict=saved_benchmarks['write'])
+            self._benchmark_load.load_from_dict(saved_dict=saved_benchmarks['load'])
+        elif self._pulser_benchmarks:
+            self._benchmark_write.reset()
+            self._benchmark_load.reset()
+        self._upload_planner = UploadPlanner(self._benchmark_write, self._benchmark_load)
+
         self.__sequence_generation_in_progress = False
         return
 
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        self._pulser_benchmarks[self._pulser_key] = {'write': self._benchmark_write.save(),
+                                                     'load': self._benchmark_load.save()}
         return
 
+    @property
+    def _pulser_key(self):
+        pulser = self.pulsegenerator()
+        try:
+            return pulser.module_name
+        except AttributeError:
+            return type(pulser).__name__
+
     # @_saved_pulse_blocks.constructor
     # def _restore_saved_blocks(self, block_list):
     #     return_block_dict = dict()
@@ -311,6 +360,10 @@ class SequenceGeneratorLogic(LogicBase):
     def pulse_generator_constraints(self):
         return self.pulsegenerator().get_constraints()
 
+    @property
+    def upload_planner(self):
+        return self._upload_planner
+
     @property
     def sampled_waveforms(self):
         return netobtain(self.pulsegenerator().get_waveform_names())
@@ -517,7 +570,8 @@ class SequenceGeneratorLogic(LogicBase):
                 self.log.error('Can´t load a waveform, because pulser running. Switch off the pulser and try again.')
                 return -1
 
-            t_est_upload = self._benchmark_load.estimate_time(ensemble.sampling_information['number_of_samples'])
+            number_of_samples = ensemble.sampling_information['number_of_samples']
+            t_est_upload = self._benchmark_load.estimate_time(number_of_samples)
             if t_est_upload > self._info_on_estimated_upload_time:
                 now = datetime.datetime.now()
                 self.log.info("Estimated finish of loading for long waveform:"
@@ -527,7 +581,9 @@ class SequenceGeneratorLogic(LogicBase):
             # Actually load the waveforms to the generic channels
             start_time = time.perf_counter()
             self.pulsegenerator().load_waveform(ensemble.sampling_information['waveforms'])
-            self._benchmark_load.add_benchmark(time.perf_counter() - start_time, ensemble.sampling_information['number_of_samples'])
+            t_upload = time.perf_counter() - start_time
+            self._report_upload('load', number_of_samples, t_est_upload, t_upload)
+            self._benchmark_load.add_benchmark(t_upload, number_of_samples)
         else:
             self.log.error('Loading of PulseBlockEnsemble "{0}" failed.\n'
                            'It has not been generated yet.'.format(ensemble.name))
@@ -1261,6 +1317,10 @@ class SequenceGeneratorLogic(LogicBase):
         PulseBlocks are actually present in saved blocks and the channel activation matches the
         current pulse settings.
 
+        The results for the most recently analyzed ensemble contents are memoized, so repeated
+        calls for an unchanged ensemble (e.g. before sampling, upload and measurement settings
+        updates) are cheap. The returned arrays are read-only.
+
         @param ensemble: A PulseBlockEnsemble object (see logic.pulse_objects.py) or the name of one
         @return: number_of_samples (int): The total number of samples in a Waveform provided the
                                               current sample_rate and PulseBlockEnsemble object.
@@ -1291,94 +1351,97 @@ class SequenceGeneratorLogic(LogicBase):
         laser_channel = self.generation_parameters['gate_channel'] if self.generation_parameters[
             'gate_channel'] else self.generation_parameters['laser_channel']
 
-        # memorize the digital channel state of the previous element
-        tmp_digital_high = dict()
-        # memorize the laser_on flag of the previous element (in case of non-digital laser channel)
-        tmp_laser_on = False
-        # Set of used analog and digital channels
-        digital_channels = set()
-        analog_channels = set()
-        # check for active channels and initialize tmp_digital_high/tmp_laser_on with the state of
-        # the very last element in the ensemble
-        if len(ensemble) > 0:
-            block = self.get_block(ensemble[0][0])
-            digital_channels = block.digital_channels
-            analog_channels = block.analog_channels
-            block = self.get_block(ensemble[-1][0])
-            if len(block) > 0:
-                tmp_digital_high = block[-1].digital_high.copy()
-                tmp_laser_on = block[-1].laser_on
-            else:
-                tmp_digital_high = {chnl: False for chnl in digital_channels}
-                tmp_laser_on = False
-
-        # dicts containing the bins where the digital channels are rising/falling
-        digital_rising_bins = {chnl: list() for chnl in digital_channels}
-        digital_falling_bins = {chnl: list() for chnl in digital_channels}
-        laser_rising_bins = list()
-        laser_falling_bins = list()
-
-        # Array to store the length in bins for all elements including repetitions in the order
-        # they are occuring in the waveform later on.
-        elements_length_bins = list()
-
-        # variables to keep track of the current timeframe
-        current_end_time = 0.0
-        current_start_bin = 0
-
-        # Loop through all blocks in the ensemble
-        for block_name, reps in ensemble:
-            # Get the stored PulseBlock instance
-            block = self.get_block(block_name)
-
-            # Iterate over all repetitions of the current block
-            for rep_no in range(reps + 1):
-                # Iterate over the Block_Elements inside the current block
-                for element in block:
-                    # save bin position if a transition from low to high or vice versa has occurred
-                    # in a digital channel
-                    if tmp_digital_high != element.digital_high:
-                        for chnl, state in element.digital_high.items():
-                            if not tmp_digital_high[chnl] and state:
-                                digital_rising_bins[chnl].append(current_start_bin)
-                            elif tmp_digital_high[chnl] and not state:
-                                digital_falling_bins[chnl].append(current_start_bin)
-                        tmp_digital_high = element.digital_high.copy()
-
-                    if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
-                        if not tmp_laser_on and element.laser_on:
-                            laser_rising_bins.append(current_start_bin)
-                        else:
-                            laser_falling_bins.append(current_start_bin)
-                        tmp_laser_on = element.laser_on
-
-                    # Calculate length of the current element with current repetition count in sec
-                    # and add this to the ideal end time for the sequence up until this point.
-                    current_end_time += element.init_length_s + rep_no * element.increment_s
-
-                    # Nearest possible match including the discretization in bins
-                    current_end_bin = int(np.rint(current_end_time * self.__sample_rate))
+        # Look up the result of an earlier call for an ensemble with the same content
+        blocks = [(self.get_block(block_name), reps) for block_name, reps in ensemble]
+        try:
+            cache_key = (self.__sample_rate, laser_channel,
+                         tuple((tuple(block.element_list), reps) for block, reps in blocks))
+            info_dict = self._ensemble_info_cache.pop(cache_key, None)
+        except TypeError:
+            # unhashable sampling function parameters
+            cache_key = info_dict = None
+        if info_dict is None:
+            info_dict = self._analyze_ensemble_blocks(blocks, laser_channel)
+        if cache_key is not None:
+            self._ensemble_info_cache[cache_key] = info_dict
+            while len(self._ensemble_info_cache) > self._ensemble_info_cache_size:
+                self._ensemble_info_cache.popitem(last=False)
+
+        return_dict = info_dict.copy()
+        return_dict['digital_rising_bins'] = info_dict['digital_rising_bins'].copy()
+        return_dict['digital_falling_bins'] = info_dict['digital_falling_bins'].copy()
+        return_dict['generation_parameters'] = self.generation_parameters.copy()
+        return return_dict
 
-                    # append current element length in discrete bins to temporary array
-                    elements_length_bins.append(current_end_bin - current_start_bin)
+    def _analyze_ensemble_blocks(self, blocks, laser_channel):
+        """ Vectorized analysis of the (PulseBlock, repetitions) tuples of an ensemble, see
+        analyze_block_ensemble.
 
-                    # advance bin offset for next element
-                    current_start_bin = current_end_bin
+        The element columns of all blocks are expanded into one row per element including
+        repetitions. The digital channel states and the laser_on flag are packed into one integer
+        mask per element, so that all transitions are found by comparing each mask with the one of
+        the previous element.
 
-        elements_length_bins = np.array(elements_length_bins, dtype='int64')
+        @param list blocks: list of (PulseBlock, repetitions) tuples in the order of the ensemble
+        @param str laser_channel: descriptor of the laser (or gate) channel
 
-        # convert rising/falling indices to numpy.ndarrays. Remove duplicates.
-        for chnl in digital_channels:
-            digital_rising_bins[chnl] = sorted(set(digital_rising_bins[chnl]))
-            digital_falling_bins[chnl] = sorted(set(digital_falling_bins[chnl]))
-            digital_rising_bins[chnl] = np.array(digital_rising_bins[chnl], dtype='int64')
-            digital_falling_bins[chnl] = np.array(digital_falling_bins[chnl], dtype='int64')
+        @return dict: analyze_block_ensemble results without generation_parameters
+        """
+        # Set of used analog and digital channels
+        digital_channels = set()
+        analog_channels = set()
+        if len(blocks) > 0:
+            digital_channels = blocks[0][0].digital_channels
+            analog_channels = blocks[0][0].analog_channels
+        channel_order = natural_sort(digital_channels)
+        # bit of the laser_on flag (in case of non-digital laser channel)
+        laser_bit = np.uint64(1) << np.uint64(len(channel_order))
+
+        # Expand all elements including repetitions
+        length_list = list()
+        mask_list = list()
+        for block, reps in blocks:
+            columns = block.get_element_columns()
+            mask = columns['laser_on'].astype(np.uint64) * laser_bit
+            for bit, chnl in enumerate(channel_order):
+                # empty blocks do not have any channel columns
+                if chnl in columns['digital_high']:
+                    mask |= columns['digital_high'][chnl].astype(np.uint64) << np.uint64(bit)
+            rep_no = np.arange(reps + 1, dtype='float64')[:, np.newaxis]
+            length_list.append(
+                (columns['init_length_s'] + rep_no * columns['increment_s']).ravel())
+            mask_list.append(np.tile(mask, reps + 1))
+        element_lengths = np.concatenate(length_list) if length_list else np.empty(0)
+        element_masks = np.concatenate(mask_list) if mask_list else np.empty(0, dtype=np.uint64)
+
+        # Ideal end time of each element and the nearest possible match in discrete bins.
+        # np.cumsum accumulates in the same order as a running sum over all elements.
+        end_times = np.cumsum(element_lengths)
+        end_bins = np.rint(end_times * self.__sample_rate).astype('int64')
+        elements_length_bins = np.diff(end_bins, prepend=0)
+        start_bins = end_bins - elements_length_bins
+
+        # The channel states before the first element are the states of the very last element
+        # (all low if the last block is empty)
+        previous_masks = np.roll(element_masks, 1)
+        if previous_masks.size > 0 and len(blocks[-1][0]) == 0:
+            previous_masks[0] = 0
+        rising_masks = element_masks & ~previous_masks
+        falling_masks = previous_masks & ~element_masks
+
+        # rising/falling bins of each channel. np.unique removes duplicates (zero length elements).
+        digital_rising_bins = dict()
+        digital_falling_bins = dict()
+        for bit, chnl in enumerate(channel_order):
+            bit_mask = np.uint64(1) << np.uint64(bit)
+            digital_rising_bins[chnl] = np.unique(start_bins[(rising_masks & bit_mask) != 0])
+            digital_falling_bins[chnl] = np.unique(start_bins[(falling_masks & bit_mask) != 0])
         if laser_channel.startswith('d'):
             laser_rising_bins = digital_rising_bins[laser_channel]
             laser_falling_bins = digital_falling_bins[laser_channel]
         else:
-            laser_rising_bins = np.array(sorted(set(laser_rising_bins)), dtype='int64')
-            laser_falling_bins = np.array(sorted(set(laser_falling_bins)), dtype='int64')
+            laser_rising_bins = np.unique(start_bins[(rising_masks & laser_bit) != 0])
+            laser_falling_bins = np.unique(start_bins[(falling_masks & laser_bit) != 0])
 
         return_dict = dict()
         return_dict['number_of_samples'] = np.sum(elements_length_bins)
@@ -1389,10 +1452,13 @@ class SequenceGeneratorLogic(LogicBase):
         return_dict['analog_channels'] = analog_channels
         return_dict['digital_channels'] = digital_channels
         return_dict['channel_set'] = analog_channels.union(digital_channels)
-        return_dict['generation_parameters'] = self.generation_parameters.copy()
-        return_dict['ideal_length'] = current_end_time
+        return_dict['ideal_length'] = float(end_times[-1]) if end_times.size > 0 else 0.0
         return_dict['laser_rising_bins'] = laser_rising_bins
         return_dict['laser_falling_bins'] = laser_falling_bins
+        # The arrays are shared by all results returned for this ensemble content
+        for array in (elements_length_bins, laser_rising_bins, laser_falling_bins,
+                      *digital_rising_bins.values(), *digital_falling_bins.values()):
+            array.flags.writeable = False
         return return_dict
 
     def analyze_sequence(self, sequence):
@@ -1681,10 +1747,12 @@ class SequenceGeneratorLogic(LogicBase):
         This method is creating the actual samples (voltages and logic states) for each time step
         of the analog and digital channels specified in the PulseBlockEnsemble.
         Therefore it iterates through all blocks, repetitions and elements of the ensemble and
-        calculates the exact voltages (float64) according to the specified math_function. The
-        samples are later on stored inside a float32 array.
-        So each element is calculated with high precision (float64) and then down-converted to
-        float32 to be stored.
+        calculates the exact voltages according to the specified math_function. The samples are
+        stored inside a float32 array.
+        With the default sampling_dtype_policy "native" each sampling function writes directly into
+        the float32 array. Phases are calculated with high precision (float64) and only the
+        per-sample trigonometry runs in float32. With "float64" each element is calculated
+        entirely in float64 and then down-converted to float32 to be stored.
 
         To preserve the rotating frame, an offset counter is used to indicate the absolute time
         within the ensemble. All calculations are done with time bins (dtype=int) to avoid rounding
@@ -1786,10 +1854,17 @@ class SequenceGeneratorLogic(LogicBase):
         bytes_per_ensemble = bytes_per_sample * ensemble_info['number_of_samples']
 
         # Determine the size of the sample arrays to be written as a whole.
-        if bytes_per_ensemble <= self._overhead_bytes or self._overhead_bytes == 0:
-            array_length = ensemble_info['number_of_samples']
+        if self._upload_planner is None:
+            if bytes_per_ensemble <= self._overhead_bytes or self._overhead_bytes == 0:
+                array_length = ensemble_info['number_of_samples']
+            else:
+                array_length = self._overhead_bytes // bytes_per_sample
         else:
-            array_length = self._overhead_bytes // bytes_per_sample
+            array_length = self._upload_planner.chunk_length(
+                ensemble_info['number_of_samples'],
+                bytes_per_sample,
+                max_bytes=self._overhead_bytes,
+                granularity=granularity)
 
         n_max_samples = self.pulsegenerator().get_constraints().waveform_length.max
         if n_max_samples > 0. and ensemble_info['number_of_samples'] > n_max_samples:
@@ -1801,6 +1876,92 @@ class SequenceGeneratorLogic(LogicBase):
             self.sigSampleEnsembleComplete.emit(None)
             return -1, list(), dict()
 
+        t_est_upload = self._benchmark_write.estimate_time(ensemble_info['number_of_samples'])
+        if t_est_upload > self._info_on_estimated_upload_time:
+            now = datetime.datetime.now()
+            self.log.info("Estimated finish of writing for long waveform:"
+                          " {0:%Y-%m-%d %H:%M:%S} ({1:d} s)".format(
+                (now + datetime.timedelta(0, t_est_upload)), int(t_est_upload)))
+
+        # Pass the ensemble as run-length encoded waveform if the pulse generator supports it.
+        # No sample arrays are allocated in that case.
+        if self.pulse_generator_constraints.run_length_waveforms:
+            waveform, offset_bin = self._create_run_length_waveform(ensemble,
+                                                                    ensemble_info,
+                                                                    offset_bin)
+            written_samples, wfm_list = self.pulsegenerator().write_run_length_waveform(
+                name=waveform_name,
+                waveform=waveform)
+            written_waveforms = set(netobtain(wfm_list))
+            if written_samples != ensemble_info['number_of_samples']:
+                self.log.error('Sampling of ensemble "{0}" failed. Write to device was '
+                               'unsuccessful.\nThe number of actually written samples ({1:d}) '
+                               'does not match the number of samples in the run-length encoded '
+                               'waveform ({2:d}).'.format(ensemble.name,
+                                                         written_samples,
+                                                         ensemble_info['number_of_samples']))
+                if not self.__sequence_generation_in_progress:
+                    self.module_state.unlock()
+                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+                self.sigSampleEnsembleComplete.emit(None)
+                return -1, list(), dict()
+        else:
+            offset_bin, written_waveforms = self._write_sampled_ensemble(ensemble,
+                                                                         ensemble_info,
+                                                                         waveform_name,
+                                                                         array_length,
+                                                                         offset_bin)
+            if offset_bin < 0:
+                return -1, list(), dict()
+
+        # Save sampling related parameters to the sampling_information container within the
+        # PulseBlockEnsemble.
+        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
+        # and not by a sequence nametag
+        if waveform_name == ensemble.name:
+            ensemble.sampling_information = dict()
+            ensemble.sampling_information.update(ensemble_info)
+            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
+            self.save_ensemble(ensemble)
+
+        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} sec'
+                      ''.format(ensemble.name, int(np.rint(time.time() - start_time))))
+        self.log.debug('Estimated {:.3f} s from current estimated write speed {:.2f} MSa/s'
+                       ' from {} benchmarks'.format(
+            self._benchmark_write.estimate_time(ensemble_info['number_of_samples']),
+            self._benchmark_write.estimate_speed() / 1e6,
+            self._benchmark_write.n_benchmarks))
+
+        t_upload = time.time() - start_time
+        self._report_upload('write', ensemble_info['number_of_samples'], t_est_upload, t_upload)
+        self._benchmark_write.add_benchmark(t_upload, ensemble_info['number_of_samples'])
+
+        if ensemble_info['number_of_samples'] == 0:
+            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
+                             ''.format(ensemble.name))
+        if not self.__sequence_generation_in_progress:
+            self.module_state.unlock()
+        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+        self.sigSampleEnsembleComplete.emit(ensemble)
+        return offset_bin, natural_sort(written_waveforms), ensemble_info
+
+    def _write_sampled_ensemble(self, ensemble, ensemble_info, waveform_name, array_length,
+                                offset_bin=0):
+        """ Sample a PulseBlockEnsemble into sample arrays of length array_length and write them
+        chunk by chunk to the pulse generator. Assumes the ensemble has already been analyzed.
+        On failure the module is unlocked and sigSampleEnsembleComplete is emitted.
+
+        @param PulseBlockEnsemble ensemble: the ensemble to sample
+        @param dict ensemble_info: information about the ensemble returned by
+                                   analyze_block_ensemble
+        @param str waveform_name: name of the waveform on the device (without channel suffix)
+        @param int array_length: number of samples to write at once
+        @param int offset_bin: time offset in bins of the first sample (rotating frame)
+
+        @return (int, set): the offset_bin after the last sample (-1 on failure) and the set of
+                            written waveform names
+        """
         # Allocate the sample arrays that are used for a single write command
         analog_samples = dict()
         digital_samples = dict()
@@ -1817,14 +1978,7 @@ class SequenceGeneratorLogic(LogicBase):
             if not self.__sequence_generation_in_progress:
                 self.module_state.unlock()
             self.sigSampleEnsembleComplete.emit(None)
-            return -1, list(), dict()
-
-        t_est_upload = self._benchmark_write.estimate_time(ensemble_info['number_of_samples'])
-        if t_est_upload > self._info_on_estimated_upload_time:
-            now = datetime.datetime.now()
-            self.log.info("Estimated finish of writing for long waveform:"
-                          " {0:%Y-%m-%d %H:%M:%S} ({1:d} s)".format(
-                (now + datetime.timedelta(0, t_est_upload)), int(t_est_upload)))
+            return -1, set()
 
         # integer to keep track of the sampls already processed
         processed_samples = 0
@@ -1834,6 +1988,8 @@ class SequenceGeneratorLogic(LogicBase):
         element_count = 0
         # set of written waveform names on the device
         written_waveforms = set()
+        # Write the samples directly into the float32 arrays
+        native_dtype = self._sampling_dtype_policy == 'native'
         # Iterate over all blocks within the PulseBlockEnsemble object
         for block_name, reps in ensemble.block_list:
             block = self.get_block(block_name)
@@ -1862,9 +2018,15 @@ class SequenceGeneratorLogic(LogicBase):
                             digital_samples[chnl][array_write_index:array_write_index + samples_to_add] = digital_high[
                                 chnl]
                         for chnl in pulse_function:
-                            analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
-                                                                                                             chnl].get_samples(
-                                time_arr) / (self.__analog_levels[0][chnl] / 2)
+                            if native_dtype:
+                                chunk = analog_samples[chnl][
+                                        array_write_index:array_write_index + samples_to_add]
+                                pulse_function[chnl].sample_into(time_arr, chunk)
+                                chunk /= self.__analog_levels[0][chnl] / 2
+                            else:
+                                analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
+                                                                                                                 chnl].get_samples(
+                                    time_arr) / (self.__analog_levels[0][chnl] / 2)
 
                         # Free memory
                         if pulse_function:
@@ -1906,7 +2068,7 @@ class SequenceGeneratorLogic(LogicBase):
                                     self.module_state.unlock()
                                 self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
                                 self.sigSampleEnsembleComplete.emit(None)
-                                return -1, list(), dict()
+                                return -1, set()
 
                             # Reset array write start pointer
                             array_write_index = 0
@@ -1925,36 +2087,51 @@ class SequenceGeneratorLogic(LogicBase):
 
                     # Increment element index
                     element_count += 1
+        return offset_bin, written_waveforms
 
-        # Save sampling related parameters to the sampling_information container within the
-        # PulseBlockEnsemble.
-        # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
-        # and not by a sequence nametag
-        if waveform_name == ensemble.name:
-            ensemble.sampling_information = dict()
-            ensemble.sampling_information.update(ensemble_info)
-            ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
-            ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
-            self.save_ensemble(ensemble)
+    def _create_run_length_waveform(self, ensemble, ensemble_info, offset_bin=0):
+        """ Create a run-length encoded waveform with one run per PulseBlockElement (incl.
+        repetitions) of a PulseBlockEnsemble. Assumes the ensemble has already been analyzed.
 
-        self.log.info('Time needed for sampling and writing PulseBlockEnsemble {0} to device: {1} sec'
-                      ''.format(ensemble.name, int(np.rint(time.time() - start_time))))
-        self.log.debug('Estimated {:.3f} s from current estimated write speed {:.2f} MSa/s'
-                       ' from {} benchmarks'.format(
-            self._benchmark_write.estimate_time(ensemble_info['number_of_samples']),
-            self._benchmark_write.estimate_speed() / 1e6,
-            self._benchmark_write.n_benchmarks))
+        @param PulseBlockEnsemble ensemble: the ensemble to encode
+        @param dict ensemble_info: information about the ensemble returned by
+                                   analyze_block_ensemble
+        @param int offset_bin: time offset in bins of the first sample (rotating frame)
 
-        self._benchmark_write.add_benchmark(time.time() - start_time, ensemble_info['number_of_samples'])
+        @return (RunLengthWaveform, int): the encoded waveform and the offset_bin after the last
+                                          sample
+        """
+        run_lengths = ensemble_info['elements_length_bins']
+        number_of_runs = len(run_lengths)
+        digital_states = {chnl: np.zeros(number_of_runs, dtype=bool)
+                          for chnl in ensemble_info['digital_channels']}
+        analog_functions = {chnl: list() for chnl in ensemble_info['analog_channels']}
+        time_offset_bins = np.empty(number_of_runs, dtype='int64')
 
-        if ensemble_info['number_of_samples'] == 0:
-            self.log.warning('Empty waveform (0 samples) created from PulseBlockEnsemble "{0}".'
-                             ''.format(ensemble.name))
-        if not self.__sequence_generation_in_progress:
-            self.module_state.unlock()
-        self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-        self.sigSampleEnsembleComplete.emit(ensemble)
-        return offset_bin, natural_sort(written_waveforms), ensemble_info
+        element_count = 0
+        for block_name, reps in ensemble.block_list:
+            block = self.get_block(block_name)
+            for rep_no in range(reps + 1):
+                for element in block.element_list:
+                    for chnl, state in element.digital_high.items():
+                        digital_states[chnl][element_count] = state
+                    for chnl, functions in analog_functions.items():
+                        functions.append(element.pulse_function.get(chnl))
+                    time_offset_bins[element_count] = offset_bin
+                    # if the rotating frame should be preserved (default) increment the offset
+                    # counter for the time array.
+                    if ensemble.rotating_frame:
+                        offset_bin += run_lengths[element_count]
+                    element_count += 1
+
+        waveform = RunLengthWaveform(
+            run_lengths=run_lengths,
+            sample_rate=self.__sample_rate,
+            digital_states=digital_states,
+            analog_functions=analog_functions,
+            analog_scale={chnl: self.__analog_levels[0][chnl] / 2 for chnl in analog_functions},
+            time_offset_bins=time_offset_bins)
+        return waveform, int(offset_bin)
 
     @QtCore.Slot(str)
     def sample_pulse_sequence(self, sequence):
@@ -2336,6 +2513,80 @@ class SequenceGeneratorLogic(LogicBase):
         if ignore: return True
         return is_valid
 
+    def sample_ensemble_batch(self, name, ensemble_names):
+        """ Uploads several PulseBlockEnsembles to be played back one after another.
+
+        The upload planner decides from the pulse generator benchmarks whether the ensembles are
+        combined into a single PulseBlockEnsemble or uploaded as PulseSequence with one step per
+        ensemble (reusing waveforms already present on the device). The combined
+        PulseBlockEnsemble/PulseSequence is saved under the given name and sampled.
+
+        @param str name: name of the combined PulseBlockEnsemble or PulseSequence
+        @param list ensemble_names: names of the saved PulseBlockEnsembles in order of playback
+
+        @return dict: upload plan with keys 'mode' ('ensemble' or 'sequence') and the predicted
+                      upload 'times' (s) per possible mode. Empty dict if sampling failed.
+        """
+        ensembles = [self.get_ensemble(ensemble_name) for ensemble_name in ensemble_names]
+        if not ensembles or any(ensemble is None for ensemble in ensembles):
+            self.log.error('Unable to sample ensemble batch "{0}". Not all PulseBlockEnsembles '
+                           'found in saved ensembles.'.format(name))
+            return dict()
+
+        constraints = self.pulse_generator_constraints
+        if constraints.sequence_option == SequenceOption.NON:
+            sequence_steps = 0
+        else:
+            sequence_steps = constraints.sequence_steps.max
+        ready_waveforms = set(self.sampled_waveforms)
+        batch = list()
+        for ensemble in ensembles:
+            info = ensemble.sampling_information
+            is_uploaded = bool(info) and \
+                info['pulse_generator_settings'] == self.pulse_generator_settings and \
+                ready_waveforms.issuperset(info['waveforms'])
+            batch.append((ensemble.name,
+                          self.analyze_block_ensemble(ensemble)['number_of_samples'],
+                          is_uploaded))
+        plan = self._upload_planner.plan_batch(batch,
+                                               granularity=constraints.waveform_length.step,
+                                               min_length=constraints.waveform_length.min,
+                                               max_length=constraints.waveform_length.max,
+                                               sequence_steps=sequence_steps)
+        self.log.debug('Upload plan of ensemble batch "{0}": {1}'.format(name, plan))
+
+        if plan['mode'] == 'sequence':
+            sequence = PulseSequence(name=name,
+                                     ensemble_list=[(ensemble.name, dict()) for ensemble in ensembles],
+                                     rotating_frame=False)
+            self.save_sequence(sequence)
+            self.sample_pulse_sequence(sequence)
+            if not sequence.sampling_information:
+                return dict()
+        else:
+            block_list = list()
+            for ensemble in ensembles:
+                block_list.extend(ensemble.block_list)
+            ensemble = PulseBlockEnsemble(
+                name=name,
+                block_list=block_list,
+                rotating_frame=all(ens.rotating_frame for ens in ensembles))
+            self.save_ensemble(ensemble)
+            if self.sample_pulse_block_ensemble(ensemble)[0] < 0:
+                return dict()
+        return plan
+
+    def _report_upload(self, task, number_of_samples, predicted, actual):
+        """ Log the predicted vs. actual time of an upload task and record it in the planner.
+        """
+        if self._upload_planner is None:
+            return
+        deviation = self._upload_planner.report(task, number_of_samples, predicted, actual)
+        if not np.isnan(deviation):
+            self.log.debug('Upload {0} of {1:d} samples took {2:.3f} s (predicted {3:.3f} s, '
+                           'deviation {4:+.1%})'.format(task, int(number_of_samples), actual,
+                                                        predicted, deviation))
+
     def get_speed_write_load(self):
         """
         Get the estimated speed of the pulse generator for writing and loading a waveform.
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the upload planner of the sequence generator logic.
+
+The planner uses the write and load benchmarks (linear models of time vs. number of samples) of the
+currently connected pulse generator to choose the size of the sample chunks written to the device,
+to decide whether several PulseBlockEnsembles are uploaded as one combined waveform or as a
+sequence and to compare the predicted with the actual upload times.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+from collections import deque
+
+
+class UploadPlanner:
+    """
+    Plans uploads to the pulse generator from the write and load BenchmarkTool instances.
+
+    The write benchmark models the time to sample and write a waveform as t = t0 + a * n with the
+    number of samples n. Every separately written waveform costs the constant overhead t0.
+    Benchmarks without a positive overhead (e.g. all benchmarks with the same number of samples)
+    give no plan.
+    """
+
+    # Write overheads below this time in s are treated as a degenerate benchmark fit
+    min_write_overhead = 1e-6
+
+    def __init__(self, write_benchmark, load_benchmark, n_save_reports=100):
+        """
+        @param BenchmarkTool write_benchmark: benchmark of sampling and writing waveforms
+        @param BenchmarkTool load_benchmark: benchmark of loading waveforms
+        @param int n_save_reports: number of predicted vs. actual upload time reports to keep
+        """
+        self.write_benchmark = write_benchmark
+        self.load_benchmark = load_benchmark
+        self._reports = deque(maxlen=n_save_reports)
+
+    @property
+    def reports(self):
+        """
+        @return list: dicts with keys 'task', 'number_of_samples', 'predicted' and 'actual'
+        """
+        return list(self._reports)
+
+    @property
+    def has_plan(self):
+        """
+        @return bool: True if the write and load benchmarks are sane and the write benchmark fit
+                      is not degenerate
+        """
+        if not (self.write_benchmark.sanity and self.load_benchmark.sanity):
+            return False
+        overhead = self.write_benchmark.estimate_overhead()
+        speed = self.write_benchmark.estimate_speed()
+        return (np.isfinite(overhead) and overhead >= self.min_write_overhead and
+                np.isfinite(speed) and speed > 0)
+
+    def chunk_length(self, number_of_samples, bytes_per_sample, max_bytes=0, granularity=1):
+        """
+        Number of samples to write per chunk.
+
+        All samples are written at once, unless max_bytes (memory limit, 0 for none) requires
+        smaller chunks. The chunks are then sized evenly, so that the last chunk is not much smaller
+        than the others.
+
+        @param int number_of_samples: total number of samples of the waveform
+        @param int bytes_per_sample: bytes of all channels of one sample
+        @param int max_bytes: maximum number of bytes per chunk, 0 for no limit
+        @param int granularity: chunk lengths are multiples of the granularity (if possible)
+
+        @return int: number of samples per chunk
+        """
+        number_of_samples = int(number_of_samples)
+        granularity = max(int(granularity), 1)
+        if number_of_samples <= 0:
+            return number_of_samples
+        if not (max_bytes > 0 and bytes_per_sample > 0):
+            return number_of_samples
+        length = max(int(max_bytes) // int(bytes_per_sample), 1)
+        if length >= number_of_samples:
+            return number_of_samples
+
+        # distribute the samples evenly over the chunks
+        number_of_chunks = -(-number_of_samples // length)
+        length = -(-number_of_samples // number_of_chunks)
+        if length > granularity:
+            length = -(-length // granularity) * granularity
+        return min(length, number_of_samples)
+
+    def predict_upload(self, number_of_samples, number_of_writes=1):
+        """
+        Predicted time to write and load a waveform.
+
+        @param int number_of_samples: number of samples to write and load
+        @param int number_of_writes: number of separate waveforms written
+
+        @return float: time in s, np.nan without a plan (see has_plan)
+        """
+        if not self.has_plan:
+            return np.nan
+        return (self._predict_write(number_of_samples, number_of_writes) +
+                self.load_benchmark.estimate_time(number_of_samples))
+
+    def _predict_write(self, number_of_samples, number_of_writes):
+        if number_of_writes < 1:
+            return 0.
+        return (self.write_benchmark.estimate_time(number_of_samples) +
+                (number_of_writes - 1) * self.write_benchmark.estimate_overhead())
+
+    def plan_batch(self, ensembles, granularity=1, min_length=1, max_length=0, sequence_steps=0):
+        """
+        Decide how to upload several PulseBlockEnsembles played back one after another.
+
+        'ensemble': the ensembles are concatenated and written as a single waveform.
+        'sequence': every ensemble not present on the device is written as waveform and a sequence
+                    with one step per ensemble plays them back.
+
+        @param list ensembles: tuples of (name, number_of_samples, is_uploaded)
+        @param int granularity: waveform length granularity of the device
+        @param int min_length: minimum waveform length of the device
+        @param int max_length: maximum waveform length of the device, 0 for no limit
+        @param int sequence_steps: maximum number of sequence steps, 0 if sequences are unsupported
+
+        @return dict: 'mode', and the predicted 'times' (s) per possible mode
+        """
+        granularity = max(int(granularity), 1)
+
+        def padded(length):
+            length = max(int(length), int(min_length))
+            return -(-length // granularity) * granularity
+
+        total_samples = padded(sum(n for _, n, _ in ensembles))
+        if 0 < max_length < total_samples:
+            times = {'ensemble': np.inf}
+        else:
+            times = {'ensemble': self.predict_upload(total_samples)}
+        if 0 < len(ensembles) <= sequence_steps:
+            waveforms = dict()
+            for name, number_of_samples, is_uploaded in ensembles:
+                waveforms[name] = (padded(number_of_samples), is_uploaded)
+            new_waveforms = [n for n, is_uploaded in waveforms.values() if not is_uploaded]
+            if self.has_plan:
+                times['sequence'] = (
+                    self._predict_write(sum(new_waveforms), len(new_waveforms)) +
+                    self.load_benchmark.estimate_time(sum(n for n, _ in waveforms.values())))
+            else:
+                times['sequence'] = np.nan
+
+        if 'sequence' not in times:
+            mode = 'ensemble'
+        elif np.isnan(times['sequence']):
+            # without benchmarks avoid writing ensembles present on the device again
+            mode = 'sequence' if any(uploaded for _, _, uploaded in ensembles) or \
+                np.isinf(times['ensemble']) else 'ensemble'
+        else:
+            mode = min(times, key=times.get)
+        return {'mode': mode, 'times': times}
+
+    def report(self, task, number_of_samples, predicted, actual):
+        """
+        Record the predicted and actual time of an upload task.
+
+        @param str task: name of the task, e.g. 'write' or 'load'
+        @param int number_of_samples: number of samples of the task
+        @param float predicted: predicted time in s (negative or np.nan if unknown)
+        @param float actual: actual time in s
+
+        @return float: relative deviation (actual - predicted) / predicted, np.nan if unknown
+        """
+        self._reports.append({'task': task,
+                              'number_of_samples': int(number_of_samples),
+                              'predicted': float(predicted),
+                              'actual': float(actual)})
+        if not predicted > 0:
+            return np.nan
+        return (actual - predicted) / predicted
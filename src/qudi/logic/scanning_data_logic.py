@@ -21,9 +21,13 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 
+import os
+import shutil
 import datetime
+import uuid
 
 import numpy as np
+from dataclasses import replace
 from functools import reduce
 import operator
 from typing import List, Optional, Tuple, Dict, Set, Union
@@ -39,11 +43,135 @@ from qudi.core.configoption import ConfigOption
 from qudi.core.statusvariable import StatusVar
 from qudi.util.datastorage import TextDataStorage
 from qudi.util.units import ScaledFloat
+from qudi.util.paths import get_appdata_dir
 
 from qudi.interface.scanning_probe_interface import ScanData, ScanImage
 from qudi.logic.scanning_probe_logic import ScanningProbeLogic
 
 
+class ScanHistoryStore:
+    """
+    Scan history kept out-of-band in a directory with one sub-directory of .npy files per entry.
+    Only a small metadata index (scan settings, units, scanner target, ...) is held in memory and
+    the data arrays are memory-mapped (copy-on-write) when an entry is loaded.
+
+    The index is a list of dicts with the keys "id", "data" and "back_data". "data" and
+    "back_data" hold ScanData.to_dict() representations without the data arrays.
+    """
+
+    _array_kinds = ('data', 'position_data')
+
+    def __init__(self, root_dir: str, index: Optional[List[Dict]] = None):
+        self.root_dir = root_dir
+        self.index = list() if index is None else index
+        self._axes_index: Dict[Tuple[str, ...], int] = dict()
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._rebuild_axes_index()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @staticmethod
+    def entry_axes(entry: Dict) -> Tuple[str, ...]:
+        return tuple(entry['data']['settings']['axes'])
+
+    def append(self, data: ScanData, back_data: Optional[ScanData] = None) -> None:
+        """ Write the data arrays of a new entry to disk and add its metadata to the index.
+
+        @param ScanData data: forward scan data
+        @param ScanData back_data: optional backward scan data
+        """
+        entry_id = uuid.uuid4().hex
+        path = os.path.join(self.root_dir, entry_id)
+        os.makedirs(path)
+        entry = {'id': entry_id,
+                 'data': self.__save_scan_data(data, path, 'forward'),
+                 'back_data': None if back_data is None else self.__save_scan_data(back_data,
+                                                                                   path,
+                                                                                   'backward')}
+        self.index.append(entry)
+        self._axes_index[self.entry_axes(entry)] = len(self.index) - 1
+
+    def pop(self, index: int = 0) -> None:
+        """ Remove an entry from the index and delete its data from disk.
+
+        @param int index: history index of the entry to remove
+        """
+        entry = self.index.pop(index)
+        shutil.rmtree(os.path.join(self.root_dir, entry['id']), ignore_errors=True)
+        self._rebuild_axes_index()
+
+    def load(self, index: int) -> Tuple[ScanData, Optional[ScanData]]:
+        """ Reconstruct the scan data of an entry with memory-mapped data arrays.
+
+        @param int index: history index of the entry to load
+
+        @return tuple: forward scan data and (optional) backward scan data
+        """
+        entry = self.index[index]
+        path = os.path.join(self.root_dir, entry['id'])
+        data = self.__load_scan_data(entry['data'], path, 'forward')
+        if entry['back_data'] is None:
+            back_data = None
+        else:
+            back_data = self.__load_scan_data(entry['back_data'], path, 'backward')
+        return data, back_data
+
+    def last_index(self, scan_axes: Tuple[str, ...]) -> Optional[int]:
+        """ History index of the most recent entry for given scan axes or None if there is none.
+        """
+        return self._axes_index.get(tuple(scan_axes), None)
+
+    def axes_with_entries(self) -> Set[Tuple[str, ...]]:
+        return set(self._axes_index)
+
+    def drop_invalid(self, scan_axes_avail: Set[str]) -> bool:
+        """ Remove all entries with missing data files or scanner axes not in <scan_axes_avail>.
+        Also deletes data directories not referenced by any entry.
+
+        @return bool: True if any entry has been removed
+        """
+        valid = list()
+        for entry in self.index:
+            data_axs = set(entry['data']['scanner_target_at_start'])
+            if data_axs <= scan_axes_avail and os.path.isdir(os.path.join(self.root_dir, entry['id'])):
+                valid.append(entry)
+        dropped = len(valid) != len(self.index)
+        self.index[:] = valid
+        referenced = {entry['id'] for entry in self.index}
+        for name in os.listdir(self.root_dir):
+            if name not in referenced:
+                shutil.rmtree(os.path.join(self.root_dir, name), ignore_errors=True)
+        self._rebuild_axes_index()
+        return dropped
+
+    def _rebuild_axes_index(self) -> None:
+        self._axes_index = {self.entry_axes(entry): ii for ii, entry in enumerate(self.index)}
+
+    def __save_scan_data(self, scan_data: ScanData, path: str, prefix: str) -> Dict:
+        arrays = {'data': scan_data._data, 'position_data': scan_data._position_data}
+        for kind in self._array_kinds:
+            for ii, arr in enumerate(arrays[kind] or tuple()):
+                np.save(os.path.join(path, f'{prefix}_{kind}_{ii:d}.npy'), arr)
+        meta = replace(scan_data, _data=None, _position_data=None).to_dict()
+        meta['number_of_arrays'] = {kind: len(arrays[kind] or tuple()) for kind in self._array_kinds}
+        return meta
+
+    def __load_scan_data(self, meta: Dict, path: str, prefix: str) -> ScanData:
+        meta = meta.copy()
+        number_of_arrays = meta.pop('number_of_arrays')
+        scan_data = ScanData.from_dict(meta)
+        arrays = dict()
+        for kind in self._array_kinds:
+            arrays[kind] = tuple(
+                np.load(os.path.join(path, f'{prefix}_{kind}_{ii:d}.npy'), mmap_mode='c')
+                for ii in range(number_of_arrays[kind])
+            ) or None
+        scan_data._data = arrays['data']
+        scan_data._position_data = arrays['position_data']
+        return scan_data
+
+
 class ScanningDataLogic(LogicBase):
     """
     Todo: add some info about this module
@@ -68,8 +196,9 @@ class ScanningDataLogic(LogicBase):
     _save_back_scan_data: bool = ConfigOption(name='save_back_scan_data', default=False)
 
     # status variables
-    # both forward and backward scan data are retained
-    _scan_history: List[Tuple[ScanData, Optional[ScanData]]] = StatusVar(name='scan_history', default=list())
+    # metadata index of the history entries. Forward and backward scan data are retained in the
+    # out-of-band ScanHistoryStore.
+    _scan_history: List[Dict] = StatusVar(name='scan_history', default=list())
 
     # signals
     sigHistoryScanDataRestored = QtCore.Signal(ScanData, ScanData, int)
@@ -82,11 +211,17 @@ class ScanningDataLogic(LogicBase):
 
         self._curr_history_index = 0
         self._logic_id = None
+        self._history_store: Optional[ScanHistoryStore] = None
         return
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
+        self._history_store = ScanHistoryStore(self._history_dir, self._scan_history)
+        scan_axes_avail = {ax.name for ax in self._scan_logic().scanner_axes.values()}
+        if self._history_store.drop_invalid(scan_axes_avail):
+            self.log.warning("Deleted scan history entries containing an incompatible scan axes configuration "
+                             "or missing data files.")
         self._shrink_history()
         if self._scan_history:
             self._restore_from_history_index(-1)
@@ -100,42 +235,29 @@ class ScanningDataLogic(LogicBase):
         """
         self._scan_logic().sigNewScanDataForHistory.disconnect(self._append_to_history)
 
-    @_scan_history.representer
-    def __scan_history_to_dicts(self, history: List[Tuple[ScanData, Optional[ScanData]]])\
-            -> List[Tuple[Dict, Optional[Dict]]]:
-        history_dicts = []
-        for data, back_data in history:
-            data_dict = data.to_dict()
-            back_data_dict = back_data.to_dict() if back_data is not None else None
-            history_dicts.append((data_dict, back_data_dict))
-        return history_dicts
+    @property
+    def _history_dir(self) -> str:
+        return os.path.join(get_appdata_dir(create_missing=True), f'scan_history-{self.module_name}')
 
     @_scan_history.constructor
-    def __scan_history_from_dicts(self, history_dicts: List[List[Optional[Dict]]])\
-            -> List[Tuple[ScanData, Optional[ScanData]]]:
-        history = []
-
-        scan_axes = self._scan_logic().scanner_axes
-        scan_axes_avail = [ax.name for ax in scan_axes.values()]
-
-        data_dropped = False
+    def __scan_history_from_dicts(self, history_dicts: List[Union[Dict, List[Optional[Dict]]]]) -> List[Dict]:
+        # Convert history saved as full ScanData dicts by previous versions into the out-of-band store
         try:
-            for data_dict, back_data_dict in history_dicts:
-                data = ScanData.from_dict(data_dict)
-                back_data = ScanData.from_dict(back_data_dict) if back_data_dict is not None else None
-                data_axs = data.scanner_target_at_start.keys()
-                if not (set(data_axs) <= set(scan_axes_avail)):
-                    data_dropped = True
-                    continue
-
-                history.append((data, back_data))
+            if not any(isinstance(entry, (list, tuple)) for entry in history_dicts):
+                return list(history_dicts)
+            store = ScanHistoryStore(self._history_dir)
+            for entry in history_dicts:
+                if isinstance(entry, dict):
+                    store.index.append(entry)
+                else:
+                    data_dict, back_data_dict = entry
+                    data = ScanData.from_dict(data_dict)
+                    back_data = ScanData.from_dict(back_data_dict) if back_data_dict is not None else None
+                    store.append(data, back_data)
+            return store.index
         except Exception as e:
             self.log.warning("Unable to load scan history. Deleting scan history.", exc_info=e)
-
-        if data_dropped:
-            self.log.warning("Deleted scan history entries containing an incompatible scan axes configuration.")
-            
-        return history
+            return list()
 
     def get_last_history_entry(self, scan_axes: Optional[Tuple[str, ...]] = None)\
             -> Tuple[Optional[ScanData], Optional[ScanData]]:
@@ -145,23 +267,16 @@ class ScanningDataLogic(LogicBase):
         @return tuple: most recent scan data and back scan data
         """
         with self._thread_lock:
-            if scan_axes is None:
-                if self._scan_history:
-                    return self._scan_history[-1]
-                else:
-                    # history is empty
-                    return None, None
+            index = self._get_last_history_entry_index(scan_axes)
+            if index is not None:
+                return self._history_store.load(index)
             else:
-                index = self._get_last_history_entry_index(scan_axes)
-                if index is not None:
-                    return self._scan_history[index]
-                else:
-                    # no scan saved in history for these axes
-                    return None, None
+                # no scan saved in history (for these axes)
+                return None, None
 
     def get_axes_with_history_entry(self) -> Set[Tuple[str, ...]]:
         """Get all axes with at least one history entry."""
-        return {data.settings.axes for data, _ in self._scan_history}
+        return self._history_store.axes_with_entries()
 
     def restore_from_history(self, scan_axes: Optional[Tuple[str, ...]] = None, set_target: bool = True):
         """Restore the latest entry in history for specified scan axes."""
@@ -198,8 +313,8 @@ class ScanningDataLogic(LogicBase):
             index = self._abs_index(index)
 
             try:
-                data, back_data = self._scan_history[index]
-            except IndexError:
+                data, back_data = self._history_store.load(index)
+            except (IndexError, OSError):
                 self.log.exception('Unable to restore scan history with index "{0}"'.format(index))
                 return
 
@@ -214,23 +329,23 @@ class ScanningDataLogic(LogicBase):
         @return int: index
         """
         with self._thread_lock:
-            if scan_axes is None and self._scan_history:
-                return -1
-            for i in range(len(self._scan_history) - 1, -1, -1):
-                data, _ = self._scan_history[i]
-                if data.settings.axes == scan_axes:
-                    return i
+            if scan_axes is None:
+                return -1 if self._scan_history else None
+            return self._history_store.last_index(scan_axes)
 
     def _append_to_history(self, data: ScanData, back_data: Optional[ScanData]):
         with self._thread_lock:
-            self._scan_history.append((data, back_data))
+            try:
+                self._history_store.append(data, back_data)
+            except OSError:
+                self.log.exception('Unable to write scan data to history store.')
             self._shrink_history()
             self._curr_history_index = len(self._scan_history) - 1
             self.sigHistoryScanDataRestored.emit(data, back_data, True)
 
     def _shrink_history(self):
         while len(self._scan_history) > self._max_history_length:
-            self._scan_history.pop(0)
+            self._history_store.pop(0)
 
     def _abs_index(self, index):
         if index < 0:
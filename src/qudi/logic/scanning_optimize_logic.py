@@ -35,6 +35,7 @@ from qudi.util.mutex import RecursiveMutex, Mutex
 from qudi.core.connector import Connector
 from qudi.core.statusvariable import StatusVar
 from qudi.util.fit_models.gaussian import Gaussian2D, Gaussian
+from qudi.util.peak_estimators import estimate_gaussian_peak_1d, estimate_gaussian_peak_2d
 from qudi.core.configoption import ConfigOption
 
 
@@ -47,6 +48,9 @@ class ScanningOptimizeLogic(LogicBase):
 
     scanning_optimize_logic:
         module.Class: 'scanning_optimize_logic.ScanningOptimizeLogic'
+        options:
+            fast_peak_estimation: True  # optional, try closed-form estimates before fitting
+            peak_estimation_min_snr: 10  # optional, fit data with lower signal-to-noise ratio
         connect:
             scan_logic: scanning_probe_logic
 
@@ -55,6 +59,10 @@ class ScanningOptimizeLogic(LogicBase):
     # declare connectors
     _scan_logic = Connector(name='scan_logic', interface='ScanningProbeLogic')
 
+    # config options
+    _fast_peak_estimation: bool = ConfigOption(name='fast_peak_estimation', default=True)
+    _peak_estimation_min_snr: float = ConfigOption(name='peak_estimation_min_snr', default=10.)
+
     # status variables
     # not configuring the back scan parameters is represented by empty dictionaries
 
@@ -404,6 +412,17 @@ class ScanningOptimizeLogic(LogicBase):
                 self.sigOptimizeStateChanged.emit(False, dict(), None)
 
     def _get_pos_from_2d_gauss_fit(self, xy, data):
+        if self._fast_peak_estimation:
+            estimate = estimate_gaussian_peak_2d(xy[0][:, 0], xy[1][0, :], data.reshape(xy[0].shape),
+                                                 min_snr=self._peak_estimation_min_snr)
+            if estimate is not None:
+                self.log.debug(f'2D peak position from "{estimate.method}" estimate.')
+                return (
+                    (estimate.best_values['center_x'], estimate.best_values['center_y']),
+                    estimate.best_fit,
+                    estimate,
+                )
+
         model = Gaussian2D()
 
         try:
@@ -423,6 +442,12 @@ class ScanningOptimizeLogic(LogicBase):
         )
 
     def _get_pos_from_1d_gauss_fit(self, x, data):
+        if self._fast_peak_estimation:
+            estimate = estimate_gaussian_peak_1d(x, data, min_snr=self._peak_estimation_min_snr)
+            if estimate is not None:
+                self.log.debug(f'1D peak position from "{estimate.method}" estimate.')
+                return (estimate.best_values['center'],), estimate.best_fit, estimate
+
         model = Gaussian()
 
         try:
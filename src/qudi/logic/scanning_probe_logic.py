@@ -75,6 +75,8 @@ class ScanningProbeLogic(LogicBase):
 
     # signals
     sigScanStateChanged = QtCore.Signal(bool, ScanData, ScanData, UUID)
+    # Lines acquired since the last poll of a running scan. Emitted in between sigScanStateChanged.
+    sigScanDataSlabUpdated = QtCore.Signal(object, UUID)
     sigNewScanDataForHistory = QtCore.Signal(ScanData, ScanData)
     sigScannerTargetChanged = QtCore.Signal(dict, object)
     sigScanSettingsChanged = QtCore.Signal()
@@ -89,6 +91,7 @@ class ScanningProbeLogic(LogicBase):
         self.__scan_poll_timer = None
         self.__scan_poll_interval = 0
         self.__scan_stop_requested = True
+        self.__slab_line_start = 0
         self._curr_caller_id = self.module_uuid
         self._save_to_hist = True
         self._tilt_corr_transform = None
@@ -116,6 +119,7 @@ class ScanningProbeLogic(LogicBase):
 
         self.__scan_poll_interval = 0
         self.__scan_stop_requested = True
+        self.__slab_line_start = 0
         self._curr_caller_id = self.module_uuid
 
         self.__scan_poll_timer = QtCore.QTimer()
@@ -600,6 +604,7 @@ class ScanningProbeLogic(LogicBase):
 
             self.log.debug(f'Successfully configured scanner and logic scan poll timer: {t_poll_ms} ms')
             self.__scan_poll_timer.setInterval(t_poll_ms)
+            self.__slab_line_start = 0
 
             try:
                 self._scanner().start_scan()
@@ -639,8 +644,14 @@ class ScanningProbeLogic(LogicBase):
                 if self._scanner().module_state() == 'idle':
                     self.stop_scan()
                     return
-                # TODO Added the following line as a quick test; Maybe look at it with more caution if correct
-                self.sigScanStateChanged.emit(True, self.scan_data, self.back_scan_data, self._curr_caller_id)
+                # Only emit the lines acquired since the last poll. The last emitted line may have
+                # been incomplete, so it is requested again.
+                slab = self._scanner().get_scan_data_slab(self.__slab_line_start)
+                if slab is None:
+                    self.sigScanStateChanged.emit(True, self.scan_data, self.back_scan_data, self._curr_caller_id)
+                elif slab.line_stop > slab.line_start:
+                    self.__slab_line_start = max(self.__slab_line_start, slab.line_stop - 1)
+                    self.sigScanDataSlabUpdated.emit(slab, self._curr_caller_id)
 
                 # Queue next call to this slot
                 self.__scan_poll_timer.start()
@@ -20,12 +20,16 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 from PySide2 import QtCore
+import os
+import queue
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 import traceback
 
 from qudi.core.connector import Connector
+from qudi.core.configoption import ConfigOption
 from qudi.core.statusvariable import StatusVar
 from qudi.util.mutex import Mutex
 from qudi.util.network import netobtain
@@ -34,6 +38,57 @@ from qudi.util.datastorage import TextDataStorage
 from qudi.util.datafitting import FitContainer, FitConfigurationsModel
 
 
+class SpectrumAcquisitionWorker(QtCore.QObject):
+    """ Helper class running continuous spectrum acquisition in a separate thread.
+
+    Raw frames are handed over to the logic through a bounded queue, so the next exposure runs
+    while the logic thread transfers and accumulates the previous frame. Frames and the finished
+    signal carry the generation of the acquisition run, so a run that was stopped and immediately
+    restarted can not interfere with the new run.
+    """
+
+    # signal to notify the parent class about new frames in the frame queue
+    sig_frames_available = QtCore.Signal()
+    sig_finished = QtCore.Signal(int)
+
+    def __init__(self, parentclass, frame_queue):
+        super().__init__()
+
+        # remember the reference to the parent class to access functions and settings
+        self._parentclass = parentclass
+        self._frame_queue = frame_queue
+
+    def run(self, differential, max_frames, generation):
+        """ Record frames until stopped by the parent class, a new acquisition was started or
+        max_frames is reached.
+
+        @param bool differential: record an additional frame with modulation off for each frame
+        @param int max_frames: number of frames to record, 0 for infinite
+        @param int generation: generation of the acquisition run
+        """
+        frames = 0
+        try:
+            while self._is_current(generation) and (not max_frames or frames < max_frames):
+                frame = self._parentclass._record_frame(differential)
+                # block until the logic has room for another frame (double buffering)
+                while self._is_current(generation):
+                    try:
+                        self._frame_queue.put((generation, frame), timeout=0.1)
+                    except queue.Full:
+                        continue
+                    self.sig_frames_available.emit()
+                    break
+                frames += 1
+        except:
+            self._parentclass.log.exception('Error during continuous spectrum acquisition:')
+        finally:
+            self.sig_finished.emit(generation)
+
+    def _is_current(self, generation):
+        return (not self._parentclass._stop_acquisition and
+                self._parentclass._acquisition_generation == generation)
+
+
 class SpectrometerLogic(LogicBase):
     """This logic module gathers data from the spectrometer.
 
@@ -41,6 +96,8 @@ class SpectrometerLogic(LogicBase):
 
     spectrumlogic:
         module.Class: 'spectrometer_logic.SpectrometerLogic'
+        options:
+            frame_stack_size: 0 # optional, number of single frames kept in a memory-mapped stack
         connect:
             spectrometer: 'myspectrometer'
             modulation_device: 'my_odmr'
@@ -50,6 +107,9 @@ class SpectrometerLogic(LogicBase):
     spectrometer = Connector(interface='SpectrometerInterface')
     modulation_device = Connector(interface='ModulationInterface', optional=True)
 
+    # declare config options
+    _frame_stack_size = ConfigOption(name='frame_stack_size', default=0, missing='nothing')
+
     # declare status variables
     _spectrum = StatusVar(name='spectrum', default=[None, None])
     _background = StatusVar(name='background', default=None)
@@ -66,6 +126,7 @@ class SpectrometerLogic(LogicBase):
     # Internal signals
     _sig_get_spectrum = QtCore.Signal(bool, bool, bool)
     _sig_get_background = QtCore.Signal(bool, bool)
+    _sig_start_worker = QtCore.Signal(bool, int, int)
 
     # External signals eg for GUI module
     sig_data_updated = QtCore.Signal()
@@ -93,9 +154,20 @@ class SpectrometerLogic(LogicBase):
         self._repetitions_background = 0
         self._stop_acquisition = False
         self._acquisition_running = False
+        self._acquisition_generation = 0
         self._fit_results = None
         self._fit_method = ''
 
+        self._acquisition_target = 'spectrum'
+        self._acquisition_start_time = 0.
+        self._acquired_frames = 0
+        self._frame_queue = queue.Queue(maxsize=2)
+        self._frame_stack = None
+        self._frame_stack_index = 0
+        self._frame_stack_count = 0
+        self._worker_thread = None
+        self._worker = None
+
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
@@ -107,11 +179,28 @@ class SpectrometerLogic(LogicBase):
         self._sig_get_spectrum.connect(self.get_spectrum, QtCore.Qt.QueuedConnection)
         self._sig_get_background.connect(self.get_background, QtCore.Qt.QueuedConnection)
 
+        # create an independent thread for continuous acquisition
+        self._worker_thread = QtCore.QThread()
+        self._worker = SpectrumAcquisitionWorker(self, self._frame_queue)
+        self._worker.moveToThread(self._worker_thread)
+        self._sig_start_worker.connect(self._worker.run, QtCore.Qt.QueuedConnection)
+        self._worker.sig_frames_available.connect(self._process_frames,
+                                                  QtCore.Qt.QueuedConnection)
+        self._worker.sig_finished.connect(self._acquisition_finished, QtCore.Qt.QueuedConnection)
+        self._worker_thread.start()
+
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        self._stop_acquisition = True
+        self._worker_thread.quit()
+        self._worker_thread.wait()
+        self._sig_start_worker.disconnect()
+        self._worker.sig_frames_available.disconnect()
+        self._worker.sig_finished.disconnect()
         self._sig_get_spectrum.disconnect()
         self._sig_get_background.disconnect()
+        self._frame_stack = None
         self._fit_config = self._fit_config_model.dump_configs()
 
     def stop(self):
@@ -129,46 +218,25 @@ class SpectrometerLogic(LogicBase):
             self.constant_acquisition = bool(constant_acquisition)
         if differential_spectrum is not None:
             self.differential_spectrum = bool(differential_spectrum)
-        self._stop_acquisition = False
+        self._new_acquisition()
 
         if reset:
             self._spectrum = [None, None]
             self._wavelength = None
             self._repetitions_spectrum = 0
+            self._reset_frame_stack()
 
+        self._acquisition_target = 'spectrum'
         self._acquisition_running = True
         self.sig_state_updated.emit()
 
-        if self.differential_spectrum_available and self._differential_spectrum:
-            self.modulation_device().modulation_on()
+        differential = self.differential_spectrum_available and self._differential_spectrum
+        if self._constant_acquisition:
+            remaining = self.max_repetitions - self._repetitions_spectrum
+            return self._start_continuous_acquisition(differential, remaining)
 
-        # get data from the spectrometer
-        data = np.array(netobtain(self.spectrometer().record_spectrum()))
-        with self._lock:
-            if self._spectrum[0] is None:
-                self._spectrum[0] = data[1, :]
-            else:
-                self._spectrum[0] += data[1, :]
-
-            self._wavelength = data[0, :]
-            self._repetitions_spectrum += 1
-
-        if self.differential_spectrum_available and self._differential_spectrum:
-            self.modulation_device().modulation_off()
-            data = np.array(netobtain(self.spectrometer().record_spectrum()))
-            with self._lock:
-                if self._spectrum[1] is None:
-                    self._spectrum[1] = data[1, :]
-                else:
-                    self._spectrum[1] += data[1, :]
-        else:
-            with self._lock:
-                self._spectrum[1] = None
+        self._accumulate_frame(self._record_frame(differential))
         self.sig_data_updated.emit()
-
-        if self._constant_acquisition and not self._stop_acquisition \
-                and (not self.max_repetitions or self._repetitions_spectrum < self.max_repetitions):
-            return self.run_get_spectrum(reset=False)
         self._acquisition_running = False
         self.fit_region = self._fit_region
         self.sig_state_updated.emit()
@@ -182,35 +250,159 @@ class SpectrometerLogic(LogicBase):
     def get_background(self, constant_acquisition=None, reset=True):
         if constant_acquisition is not None:
             self.constant_acquisition = bool(constant_acquisition)
-        self._stop_acquisition = False
+        self._new_acquisition()
 
         if reset:
             self._background = None
             self._wavelength = None
             self._repetitions_background = 0
 
+        self._acquisition_target = 'background'
         self._acquisition_running = True
         self.sig_state_updated.emit()
 
-        # get data from the spectrometer
-        data = np.array(netobtain(self.spectrometer().record_spectrum()))
-        with self._lock:
-            if self._background is None:
-                self._background = data[1, :]
-            else:
-                self._background += data[1, :]
+        if self._constant_acquisition:
+            remaining = self.max_repetitions - self._repetitions_background
+            return self._start_continuous_acquisition(False, remaining)
 
-            self._wavelength = data[0, :]
-            self._repetitions_background += 1
+        self._accumulate_frame(self._record_frame(False))
         self.sig_data_updated.emit()
-
-        if self._constant_acquisition and not self._stop_acquisition\
-                and (not self.max_repetitions or self._repetitions_background < self.max_repetitions):
-            return self.run_get_background(reset=False)
         self._acquisition_running = False
         self.sig_state_updated.emit()
         return self.background
 
+    def _new_acquisition(self):
+        """ Start a new acquisition generation. A worker still running for a previous (stopped)
+        acquisition ends after its current frame, and its frames and finished signal are ignored.
+        """
+        self._acquisition_generation += 1
+        self._stop_acquisition = False
+
+    def _start_continuous_acquisition(self, differential, remaining):
+        """ Start the acquisition worker. Frames are accumulated in _process_frames.
+        """
+        if self.max_repetitions and remaining <= 0:
+            self._acquisition_finished()
+            return None
+        self._acquired_frames = 0
+        self._acquisition_start_time = time.perf_counter()
+        self._sig_start_worker.emit(differential, remaining if self.max_repetitions else 0,
+                                    self._acquisition_generation)
+        return None
+
+    def _record_frame(self, differential):
+        """ Record a single raw frame (and the modulation off frame if differential). Called from
+        the acquisition worker thread during continuous acquisition.
+
+        @return tuple: raw spectrometer data with modulation on and off (None if not differential)
+        """
+        if differential:
+            self.modulation_device().modulation_on()
+        data_on = self.spectrometer().record_spectrum()
+        data_off = None
+        if differential:
+            self.modulation_device().modulation_off()
+            data_off = self.spectrometer().record_spectrum()
+        return data_on, data_off
+
+    def _accumulate_frame(self, frame):
+        """ Transfer a raw frame and add it to the running sums of the current acquisition target.
+        """
+        data_on, data_off = frame
+        data = np.asarray(netobtain(data_on))
+        if data_off is not None:
+            data_off = np.asarray(netobtain(data_off))[1, :]
+        with self._lock:
+            self._wavelength = data[0, :]
+            if self._acquisition_target == 'background':
+                self._background = self._add_to_sum(self._background, data[1, :])
+                self._repetitions_background += 1
+                return
+            self._spectrum[0] = self._add_to_sum(self._spectrum[0], data[1, :])
+            if data_off is None:
+                self._spectrum[1] = None
+            else:
+                self._spectrum[1] = self._add_to_sum(self._spectrum[1], data_off)
+            self._repetitions_spectrum += 1
+            self._store_frame(data[1, :])
+
+    @staticmethod
+    def _add_to_sum(running_sum, data):
+        """ Add data to a preallocated running sum array. Allocates the array if necessary.
+        """
+        if running_sum is None or running_sum.shape != data.shape:
+            return data.astype(np.float64)
+        np.add(running_sum, data, out=running_sum)
+        return running_sum
+
+    def _process_frames(self):
+        """ Accumulate all frames of the current acquisition handed over by the acquisition
+        worker. Frames of a previous acquisition are discarded.
+        """
+        processed = 0
+        while True:
+            try:
+                generation, frame = self._frame_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._acquisition_generation:
+                continue
+            self._accumulate_frame(frame)
+            processed += 1
+        if processed:
+            self._acquired_frames += processed
+            self.sig_data_updated.emit()
+
+    def _acquisition_finished(self, generation=None):
+        self._process_frames()
+        if generation is not None and generation != self._acquisition_generation:
+            # worker of a previous acquisition, the current one is still running
+            return
+        if self._acquired_frames:
+            elapsed = time.perf_counter() - self._acquisition_start_time
+            self.log.debug(f'Continuous acquisition of {self._acquired_frames} frames took '
+                           f'{elapsed:.3f} s ({self._acquired_frames / elapsed:.2f} acquisitions/s).')
+        self._acquisition_running = False
+        if self._acquisition_target == 'spectrum':
+            self.fit_region = self._fit_region
+        self.sig_state_updated.emit()
+
+    def _reset_frame_stack(self):
+        self._frame_stack_index = 0
+        self._frame_stack_count = 0
+
+    def _store_frame(self, data):
+        """ Store a single spectrum frame in the memory-mapped ring buffer stack (if enabled).
+        """
+        if self._frame_stack_size <= 0:
+            return
+        if self._frame_stack is None or self._frame_stack.shape[1] != data.shape[0]:
+            os.makedirs(self.module_default_data_dir, exist_ok=True)
+            self._frame_stack = np.lib.format.open_memmap(
+                os.path.join(self.module_default_data_dir, 'spectrum_frame_stack.npy'),
+                mode='w+',
+                dtype=np.float64,
+                shape=(int(self._frame_stack_size), data.shape[0])
+            )
+            self._reset_frame_stack()
+        self._frame_stack[self._frame_stack_index] = data
+        self._frame_stack_index = (self._frame_stack_index + 1) % self._frame_stack.shape[0]
+        self._frame_stack_count = min(self._frame_stack_count + 1, self._frame_stack.shape[0])
+
+    @property
+    def frame_stack(self):
+        """ Single spectrum frames of the current acquisition in chronological order, e.g. for
+        cosmic ray filtering. Only the last frame_stack_size frames are kept.
+
+        @return numpy.ndarray: 2D array (frames, pixels) or None if disabled
+        """
+        if self._frame_stack is None:
+            return None
+        with self._lock:
+            if self._frame_stack_count < self._frame_stack.shape[0]:
+                return np.array(self._frame_stack[:self._frame_stack_count])
+            return np.roll(self._frame_stack, -self._frame_stack_index, axis=0)
+
     @property
     def acquisition_running(self):
         return self._acquisition_running
@@ -33,9 +33,18 @@ class BenchmarkTool(object):
     can be supplied (by querying the task). Eg. created samples vs the time needed to generate them.
     Based on the gathered data, a speed value [quantity/time] or a time prediction
     for a given quantity is obtained.
+    Data points deviating by more than outlier_threshold robust standard deviations (median
+    absolute deviation) from a first fit are rejected before the final fit.
+    The tool can be persisted across sessions with save/load_from_dict (e.g. as StatusVar).
     """
-    def __init__(self, n_save_datapoints=20):
+    def __init__(self, n_save_datapoints=20, outlier_threshold=3.5):
+        """
+        :param n_save_datapoints: size of the rolling buffer of non-persistent data points
+        :param outlier_threshold: rejection threshold in robust standard deviations, None to keep
+                                  all data points
+        """
         self._n_save_datapoints = n_save_datapoints
+        self._outlier_threshold = outlier_threshold
         # data point: a tuple of (time [s], 'quantity')
         self._datapoints = deque(maxlen=n_save_datapoints)  # fifo-like
         self._datapoints_fixed = list()
@@ -93,6 +102,31 @@ class BenchmarkTool(object):
 
         return -1
 
+    def estimate_time_interval(self, y, confidence=0.95):
+        """
+        Estimate the time needed to perform a task of given 'quantity' together with the prediction
+        interval of a single task.
+        :param y: quantity
+        :param confidence: confidence level of the prediction interval
+        :return: (time, lower bound, upper bound) in s. Bounds are np.nan if there are not enough
+                 data points (at least 3 with 2 different quantities).
+        """
+        a, t0, _ = self._get_speed_fit()
+        t_est = t0 + a * y
+        data = self._get_inlier_data()
+        if data is None or len(data) < 3 or len(np.unique(data[:, 1])) < 2:
+            return t_est, np.nan, np.nan
+
+        # prediction interval of the linear regression
+        n = len(data)
+        y_mean = np.mean(data[:, 1])
+        sxx = np.sum((data[:, 1] - y_mean) ** 2)
+        residuals = data[:, 0] - (t0 + a * data[:, 1])
+        s = np.sqrt(np.sum(residuals ** 2) / (n - 2))
+        t_crit = scipy.stats.t.ppf(0.5 + confidence / 2, n - 2)
+        half_width = t_crit * s * np.sqrt(1 + 1 / n + (y - y_mean) ** 2 / sxx)
+        return t_est, t_est - half_width, t_est + half_width
+
     def estimate_speed(self, check_sanity=True):
         """
         Estimate the speed value from the gathered data.
@@ -106,6 +140,19 @@ class BenchmarkTool(object):
 
         return np.nan
 
+    def estimate_overhead(self, check_sanity=True):
+        """
+        Estimate the constant time needed per task, independent of the 'quantity'.
+        :param check_sanity: if 'True' will check sanity of the estimation
+        :return: time (s), np.nan if sanity check fails
+        """
+        _, t0, _ = self._get_speed_fit()
+
+        if self.sanity or not check_sanity:
+            return t0
+
+        return np.nan
+
     def save(self, obj=None, value=None):
         # function signature needs to fulfill the StatusVar logic
 
@@ -118,26 +165,55 @@ class BenchmarkTool(object):
     def load_from_dict(self, obj=None, saved_dict=None):
 
         if saved_dict != None:
+            saved_dict = dict(saved_dict)
             saved_dict['_datapoints'] = deque(saved_dict['_datapoints'], maxlen=self._n_save_datapoints)
 
             self.__dict__.update(saved_dict)
 
+    def _get_weighted_data(self):
+        if len(self._datapoints) > len(self._datapoints_fixed):
+            # ensure rolling data has max 50:50 weight
+            return np.asarray(self._datapoints_fixed + list(self._datapoints)[-len(self._datapoints_fixed):])
+        return np.asarray(self._datapoints_fixed + list(self._datapoints))
+
+    def _get_inlier_data(self):
+        """
+        Data points used for the fit (weighted data without outliers).
+        :return: array of (time, quantity) rows or None if a linear fit is not possible
+        """
+        data = self._get_weighted_data()
+        if len(data) < 2 or len(np.unique(data[:, 1])) < 2:
+            return None
+        if self._outlier_threshold is None or len(data) < 4:
+            return data
+        try:
+            a, t0, _, _, _ = scipy.stats.linregress(data[:, 1], data[:, 0])
+        except Exception:
+            return data
+        # modified z-score of the residuals with the median absolute deviation
+        residuals = data[:, 0] - (t0 + a * data[:, 1])
+        deviation = np.abs(residuals - np.median(residuals))
+        mad = np.median(deviation)
+        if mad == 0:
+            return data
+        inliers = data[deviation <= self._outlier_threshold * 1.4826 * mad]
+        if len(np.unique(inliers[:, 1])) < 2:
+            return data
+        return inliers
+
     def _get_speed_fit(self):
 
         # linear fit t= a*y + t0 over all data with t: time, y: benchmark quantitiy
         all_data = np.asarray(self._datapoints_fixed + list(self._datapoints))
 
-        if len(self._datapoints) > len(self._datapoints_fixed):
-            # ensure rolling data has max 50:50 weight
-            weighted_data = np.asarray(self._datapoints_fixed + list(self._datapoints)[-len(self._datapoints_fixed):])
-        else:
-            weighted_data = all_data
-
         if len(all_data) < 1:
             return np.nan, np.nan, np.nan
         if len(np.unique(all_data[:,1])) == 1:
             # fit needs at least 2 different datapoints in y
             return np.average(all_data[:,0])/all_data[0,1], 0, np.nan
+        weighted_data = self._get_inlier_data()
+        if weighted_data is None:
+            weighted_data = self._get_weighted_data()
         try:
             a, t0, _, _, da = scipy.stats.linregress(weighted_data[:, 1], weighted_data[:, 0])
         except Exception:
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a dispatcher running fits of qudi fit models in a process pool.
+
+Fits are identified by a key (e.g. channel and range of a measurement). Each fit is started from
+the parameters of the previous fit with the same key and configuration (warm start) instead of
+estimating them again. A fit is skipped if the data changed less than a relative threshold since
+the last fit with the same key, or while a fit with the same key is still running.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['FitDispatcher', 'fit_model', 'relative_change']
+
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Hashable, Mapping, Optional
+
+import numpy as np
+
+
+def fit_model(model, estimator: Optional[str], custom_parameters: Optional[Mapping[str, Any]],
+              x: np.ndarray, data: np.ndarray, warm_parameters=None):
+    """ Fit a qudi fit model to data like FitContainer.fit_data. Runs in the worker processes,
+    which can not use the FitContainer of the logic (a QObject).
+
+    @param FitModelBase model: model instance to fit
+    @param str estimator: name of the estimator of the model, None for the default parameters
+    @param dict custom_parameters: lmfit.Parameter objects by name overriding the estimate
+    @param numpy.ndarray x: x values of the data
+    @param numpy.ndarray data: data to fit
+    @param lmfit.Parameters warm_parameters: start parameters (e.g. the previous fit result)
+                                             instead of the estimate. Custom parameters keep
+                                             their bounds and fixed values.
+
+    @return lmfit.model.ModelResult: fit result with the additional attribute high_res_best_fit
+    """
+    if warm_parameters is None:
+        parameters = model.make_params() if estimator is None else \
+            model.estimators[estimator](data, x)
+        if custom_parameters is not None:
+            for name, param in custom_parameters.items():
+                parameters[name] = param
+    else:
+        parameters = warm_parameters.copy()
+        if custom_parameters is not None:
+            for name, param in custom_parameters.items():
+                parameters[name].set(min=param.min, max=param.max, vary=param.vary,
+                                     expr=param.expr)
+                if not param.vary:
+                    parameters[name].set(value=param.value)
+    result = model.fit(data, parameters, x=x)
+    if warm_parameters is not None and not result.success:
+        # the previous result was a bad start (e.g. the data changed completely)
+        return fit_model(model, estimator, custom_parameters, x, data)
+    high_res_x = np.linspace(x[0], x[-1], len(x) * 10)
+    result.high_res_best_fit = (high_res_x, model.eval(**result.best_values, x=high_res_x))
+    return result
+
+
+def relative_change(old: np.ndarray, new: np.ndarray) -> float:
+    """ Norm of the difference of two data arrays relative to the norm of the old data around its
+    mean. A constant offset (e.g. the fluorescence background of ODMR spectra) does not lower the
+    relative change.
+
+    @return float: relative change, np.inf if the arrays can not be compared
+    """
+    if old.shape != new.shape:
+        return np.inf
+    norm = np.linalg.norm(old - np.mean(old))
+    change = np.linalg.norm(new - old)
+    if norm == 0:
+        return 0. if change == 0 else np.inf
+    return float(change / norm)
+
+
+class FitDispatcher:
+    """
+    Runs fits in a process pool and keeps the last data and result per key for warm starts.
+
+    Usage example:
+
+        dispatcher = FitDispatcher(max_workers=4, change_threshold=1e-3)
+        future = dispatcher.submit(('APD counts', 0), 'Lorentzian Dip', model, 'Dip', None, x, y)
+        if future is not None:
+            future.add_done_callback(lambda f: print(f.result().best_values))
+
+    With max_workers=0 the fits are run in the calling thread and the returned futures are done.
+    Worker processes are started with the "spawn" method, since forking a process running Qt
+    threads is not safe.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, change_threshold: float = 0.):
+        """
+        @param int max_workers: number of worker processes, None for the number of CPUs, 0 to fit
+                                in the calling thread
+        @param float change_threshold: minimum relative change of the data since the last fit
+                                       of the same key (see relative_change)
+        """
+        self.change_threshold = float(change_threshold)
+        self._executor = None if max_workers == 0 else ProcessPoolExecutor(
+            max_workers, mp_context=multiprocessing.get_context('spawn'))
+        self._lock = threading.Lock()
+        self._last_fits = dict()  # key: (fit_config, x, data, parameters)
+        self._pending = dict()  # key: Future
+
+    @property
+    def pending(self) -> Dict[Hashable, Future]:
+        with self._lock:
+            return self._pending.copy()
+
+    def submit(self, key: Hashable, fit_config: str, model, estimator: Optional[str],
+               custom_parameters: Optional[Mapping[str, Any]], x: np.ndarray, data: np.ndarray,
+               force: Optional[bool] = False,
+               warm_start: Optional[bool] = True) -> Optional[Future]:
+        """ Submit a fit of data with the given key.
+
+        @param key: identifier of the fitted data, e.g. (channel, range_index)
+        @param str fit_config: name of the fit configuration, fits are only warm-started from
+                               results of the same configuration
+        @param FitModelBase model: model instance to fit
+        @param str estimator: name of the estimator of the model
+        @param dict custom_parameters: custom parameters of the fit configuration
+        @param numpy.ndarray x: x values of the data
+        @param numpy.ndarray data: data to fit
+        @param bool force: fit even if the data did not change enough or a fit with the same key
+                           is running (its result is not used for warm starts then)
+        @param bool warm_start: start from the last fit result of the key (if any) instead of the
+                                estimator
+
+        @return Future: future of the lmfit.model.ModelResult, None if the fit was skipped
+        """
+        x = np.array(x, dtype=float)
+        data = np.array(data, dtype=float)
+        with self._lock:
+            if key in self._pending and not force:
+                return None
+            warm_parameters = None
+            last_fit = self._last_fits.get(key)
+            if last_fit is not None and last_fit[0] == fit_config and \
+                    np.array_equal(last_fit[1], x):
+                if not force and relative_change(last_fit[2], data) < self.change_threshold:
+                    return None
+                if warm_start:
+                    warm_parameters = last_fit[3]
+            if self._executor is None:
+                future = Future()
+                try:
+                    future.set_result(fit_model(model, estimator, custom_parameters, x, data,
+                                                warm_parameters))
+                except Exception as err:
+                    future.set_exception(err)
+            else:
+                future = self._executor.submit(fit_model, model, estimator, custom_parameters, x,
+                                               data, warm_parameters)
+            self._pending[key] = future
+        future.add_done_callback(
+            lambda f: self._fit_done(f, key, fit_config, x, data)
+        )
+        return future
+
+    def _fit_done(self, future: Future, key: Hashable, fit_config: str, x: np.ndarray,
+                  data: np.ndarray) -> None:
+        with self._lock:
+            if self._pending.get(key) is not future:
+                # reset meanwhile
+                return
+            del self._pending[key]
+            if not future.cancelled() and future.exception() is None:
+                self._last_fits[key] = (fit_config, x, data, future.result().params)
+
+    def record(self, key: Hashable, fit_config: str, x: np.ndarray, data: np.ndarray,
+               result) -> None:
+        """ Use a fit result obtained outside of the dispatcher (e.g. a fit in the calling thread
+        with a FitContainer) for the following warm starts of the key. Results of pending fits of
+        the key are not used for warm starts any more.
+
+        @param key: identifier of the fitted data, e.g. (channel, range_index)
+        @param str fit_config: name of the fit configuration
+        @param numpy.ndarray x: x values of the data
+        @param numpy.ndarray data: fitted data
+        @param lmfit.model.ModelResult result: fit result
+        """
+        with self._lock:
+            self._pending.pop(key, None)
+            self._last_fits[key] = (fit_config, np.array(x, dtype=float),
+                                    np.array(data, dtype=float), result.params)
+
+    def reset(self, key: Optional[Hashable] = None) -> None:
+        """ Forget the last fits (and pending fits) of a key or of all keys. Running fits are not
+        interrupted, but their results are not used for warm starts.
+        """
+        with self._lock:
+            if key is None:
+                self._last_fits.clear()
+                self._pending.clear()
+            else:
+                self._last_fits.pop(key, None)
+                self._pending.pop(key, None)
+
+    def shutdown(self, wait: Optional[bool] = False) -> None:
+        """ Shut down the worker processes. Pending fits are cancelled if possible. """
+        self.reset()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
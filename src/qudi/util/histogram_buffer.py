@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a memory-mapped buffer for accumulating count histograms (e.g. fast counter
+timetraces) shared between the acquiring hardware module and its readers.
+
+The hardware allocates the buffer once per configuration and accumulates counts into it in place.
+Readers get numpy views of the histogram together with the header (sweep counter, elapsed time and
+a sequence number) without copying the data. The buffer is backed by a file, so readers in other
+processes on the same computer can attach to it by path (also when the buffer is pickled, e.g.
+obtained through RPyC).
+
+Header layout (8 x 64 bit):
+    0: version
+    1: sequence number, odd while the histogram is written (seqlock)
+    2: elapsed sweeps (-1 if unknown)
+    3: elapsed time in s (float64, NaN if unknown)
+    4: number of dimensions of the histogram
+    5, 6: shape of the histogram (unused dimensions are 1)
+    7: reserved
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['HistogramBuffer']
+
+import os
+import atexit
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+_HEADER_LENGTH = 8
+_VERSION = 1
+
+# Buffer files that could not be deleted on close because they were still mapped (Windows).
+# Deleting them is retried whenever a buffer is created or closed and at exit.
+_pending_removals = set()
+
+
+def _remove_pending_files() -> None:
+    for path in list(_pending_removals):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        _pending_removals.discard(path)
+
+
+atexit.register(_remove_pending_files)
+
+
+class HistogramBuffer:
+    """
+    Memory-mapped int64 histogram with a header holding sweep counter, elapsed time and a sequence
+    number that is incremented before and after each write.
+
+    Usage example (hardware side):
+
+        buffer = HistogramBuffer.create((number_of_gates, number_of_bins))
+        with buffer.writing(elapsed_sweeps=sweeps, elapsed_time=elapsed) as histogram:
+            histogram += new_counts
+
+    Usage example (reader side):
+
+        histogram, info_dict = buffer.read()
+    """
+
+    def __init__(self, path: str, owner: Optional[bool] = False):
+        """ Attach to an existing buffer file. Use HistogramBuffer.create to create a new buffer.
+
+        @param str path: path of the buffer file
+        @param bool owner: delete the buffer file on close
+        """
+        self._path = path
+        self._owner = owner
+        self._memmap = np.memmap(path, dtype='int64', mode='r+')
+        self._header = self._memmap[:_HEADER_LENGTH]
+        if self._header[0] != _VERSION:
+            raise ValueError(f'Unsupported histogram buffer version in "{path}".')
+        ndim = int(self._header[4])
+        shape = tuple(int(n) for n in self._header[5:5 + ndim])
+        self._histogram = self._memmap[_HEADER_LENGTH:].reshape(shape)
+
+    @classmethod
+    def create(cls, shape, directory: Optional[str] = None) -> 'HistogramBuffer':
+        """ Create a new zeroed buffer file.
+
+        @param tuple shape: shape of the histogram (1D or 2D)
+        @param str directory: directory of the buffer file. Defaults to the temp directory.
+
+        @return HistogramBuffer: the new buffer, deleting its file on close
+        """
+        shape = (int(shape),) if np.isscalar(shape) else tuple(int(n) for n in shape)
+        if not 1 <= len(shape) <= 2:
+            raise ValueError('Histogram buffers need to be 1D or 2D.')
+        _remove_pending_files()
+        fd, path = tempfile.mkstemp(prefix='qudi_histogram_', suffix='.bin', dir=directory)
+        os.close(fd)
+        memmap = np.memmap(path, dtype='int64', mode='w+',
+                           shape=(_HEADER_LENGTH + int(np.prod(shape)),))
+        memmap[:_HEADER_LENGTH] = (_VERSION, 0, -1, 0, len(shape), shape[0],
+                                   shape[1] if len(shape) > 1 else 1, 0)
+        memmap[:_HEADER_LENGTH].view('float64')[3] = np.nan
+        memmap.flush()
+        del memmap
+        return cls(path, owner=True)
+
+    def __reduce__(self):
+        # Readers in other processes attach to the file instead of copying the histogram
+        return self.__class__, (self._path, False)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._histogram.shape
+
+    @property
+    def histogram(self) -> np.ndarray:
+        """ View of the histogram. It changes while the hardware is accumulating counts. """
+        return self._histogram
+
+    @property
+    def sequence(self) -> int:
+        return int(self._header[1])
+
+    @property
+    def elapsed_sweeps(self) -> Optional[int]:
+        sweeps = int(self._header[2])
+        return None if sweeps < 0 else sweeps
+
+    @property
+    def elapsed_time(self) -> Optional[float]:
+        elapsed_time = float(self._header.view('float64')[3])
+        return None if np.isnan(elapsed_time) else elapsed_time
+
+    @contextmanager
+    def writing(self, elapsed_sweeps: Optional[int] = None,
+                elapsed_time: Optional[float] = None) -> Iterator[np.ndarray]:
+        """ Context manager for the hardware to write into the histogram. The sequence number is
+        odd while writing. Sweeps and time are updated at the end.
+
+        @param int elapsed_sweeps: new number of elapsed sweeps (None to keep it)
+        @param float elapsed_time: new elapsed time in s (None to keep it)
+
+        @return numpy.ndarray: the histogram to write into
+        """
+        self._header[1] += 1
+        try:
+            yield self._histogram
+        finally:
+            if elapsed_sweeps is not None:
+                self._header[2] = elapsed_sweeps
+            if elapsed_time is not None:
+                self._header.view('float64')[3] = elapsed_time
+            self._header[1] += 1
+
+    def set_elapsed_time(self, elapsed_time: float) -> None:
+        """ Update the elapsed time without writing into the histogram. The sequence number is not
+        changed, so readers still see the histogram as unchanged.
+
+        @param float elapsed_time: new elapsed time in s
+        """
+        self._header.view('float64')[3] = elapsed_time
+
+    def clear(self) -> None:
+        """ Set the histogram to zero and reset sweeps and time. """
+        with self.writing():
+            self._histogram[...] = 0
+            self._header[2] = -1
+            self._header.view('float64')[3] = np.nan
+
+    def read(self) -> Tuple[np.ndarray, Dict[str, Optional[float]]]:
+        """ Histogram view and header information without copying.
+
+        @return tuple(numpy.ndarray, dict): histogram view and info_dict with the keys
+                                            'elapsed_sweeps', 'elapsed_time' and 'sequence'
+        """
+        return self._histogram, {'elapsed_sweeps': self.elapsed_sweeps,
+                                 'elapsed_time': self.elapsed_time,
+                                 'sequence': self.sequence}
+
+    def snapshot(self, retries: Optional[int] = 10) -> Tuple[np.ndarray, Dict[str, Optional[float]]]:
+        """ Consistent copy of the histogram and header information. The copy is repeated if the
+        histogram has been written meanwhile.
+
+        @param int retries: maximum number of repetitions
+
+        @return tuple(numpy.ndarray, dict): copy of the histogram and info_dict as in read
+        """
+        for _ in range(retries):
+            sequence = self.sequence
+            if sequence % 2 == 0:
+                histogram, info_dict = self._histogram.copy(), self.read()[1]
+                if info_dict['sequence'] == sequence:
+                    return histogram, info_dict
+        return self._histogram.copy(), self.read()[1]
+
+    def close(self) -> None:
+        """ Release this reference to the buffer. The owner deletes the buffer file, the memory
+        stays valid for existing views. Files still mapped (Windows) are deleted later on, as soon
+        as possible.
+        """
+        self._memmap.flush()
+        if self._owner:
+            self._owner = False
+            _pending_removals.add(self._path)
+        _remove_pending_files()
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains an encoder/decoder pair to transfer accumulating count histograms (e.g. fast
+counter timetraces) as compressed differences to the previously transferred state.
+
+A histogram accumulated over many sweeps changes only by the counts acquired since the last
+transfer. The encoder keeps the last transferred histogram and sends one of:
+    'none':   nothing changed
+    'sparse': compressed int32 indices and int32 increments of the changed bins
+    'dense':  compressed int32 differences of all bins
+    'full':   the compressed int64 histogram, if the decoder state is unknown or the differences
+              do not fit into int32
+Packets are tuples of immutable builtins so that they are transferred by value through RPyC.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['HistogramDeltaEncoder', 'HistogramDeltaDecoder', 'available_compressions']
+
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def _zlib_codec(level: int) -> Tuple[Callable, Callable]:
+    return (lambda data: zlib.compress(data, level if level is not None else 1)), zlib.decompress
+
+
+def _lz4_codec(level: int) -> Tuple[Callable, Callable]:
+    import lz4.frame
+    return (lambda data: lz4.frame.compress(data, compression_level=level or 0)), \
+        lz4.frame.decompress
+
+
+def _zstd_codec(level: int) -> Tuple[Callable, Callable]:
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=level if level is not None else 1)
+    decompressor = zstandard.ZstdDecompressor()
+    return compressor.compress, decompressor.decompress
+
+
+def _no_codec(level: int) -> Tuple[Callable, Callable]:
+    return bytes, bytes
+
+
+_CODECS: Dict[str, Callable] = {
+    'none': _no_codec,
+    'zlib': _zlib_codec,
+    'lz4': _lz4_codec,
+    'zstd': _zstd_codec,
+}
+
+
+def available_compressions() -> Tuple[str, ...]:
+    """ Names of the compressions usable in this environment. lz4 and zstd need the optional
+    packages "lz4" and "zstandard".
+    """
+    available = list()
+    for name, factory in _CODECS.items():
+        try:
+            factory(None)
+        except ImportError:
+            continue
+        available.append(name)
+    return tuple(available)
+
+
+def _get_codec(name: str, level: Optional[int] = None) -> Tuple[Callable, Callable]:
+    try:
+        factory = _CODECS[name]
+    except KeyError:
+        raise ValueError(f'Unknown compression "{name}". Valid compressions are '
+                         f'{tuple(_CODECS)}.') from None
+    return factory(level)
+
+
+class HistogramDeltaEncoder:
+    """ Sender side: encodes histograms as differences to the previously encoded one.
+
+    @param str compression: one of 'none', 'zlib', 'lz4' or 'zstd'
+    @param int level: compression level, None for a fast default
+    @param float sparse_fraction: maximum fraction of changed bins to send sparse packets
+    """
+
+    def __init__(self, compression: str = 'zlib', level: Optional[int] = None,
+                 sparse_fraction: float = 0.125):
+        self.compression = compression
+        self.sparse_fraction = sparse_fraction
+        self._compress, _ = _get_codec(compression, level)
+        self._last_data = None
+        self._sequence = 0
+
+    @property
+    def sequence(self) -> int:
+        """ Sequence number of the last encoded packet. """
+        return self._sequence
+
+    def reset(self) -> None:
+        """ Forget the last transferred state. The next packet will be a full one. """
+        self._last_data = None
+
+    def encode(self, data: np.ndarray, decoder_sequence: Optional[int] = None) -> tuple:
+        """ Encode a histogram relative to the last encoded one.
+
+        @param numpy.ndarray data: integer histogram of any shape
+        @param int decoder_sequence: sequence number of the last packet the decoder has applied.
+                                     A full packet is sent if it does not match the last encoded
+                                     packet, e.g. after a restart of the decoder.
+
+        @return tuple: packet (sequence, base sequence, encoding, shape, compression, payload)
+        """
+        data = np.ascontiguousarray(data, dtype='int64')
+        base = self._sequence
+        last = self._last_data
+        self._sequence += 1
+        self._last_data = data.copy()
+        if last is None or last.shape != data.shape or decoder_sequence != base:
+            return self._packet(-1, 'full', data.shape, data)
+
+        diff = (data - last).ravel()
+        changed = np.flatnonzero(diff)
+        if changed.size == 0:
+            return (self._sequence, base, 'none', data.shape, self.compression, b'')
+        if diff[changed].min() < np.iinfo('int32').min or \
+                diff[changed].max() > np.iinfo('int32').max:
+            return self._packet(-1, 'full', data.shape, data)
+        if changed.size <= self.sparse_fraction * diff.size:
+            payload = np.concatenate((changed.astype('int32'), diff[changed].astype('int32')))
+            return self._packet(base, 'sparse', data.shape, payload)
+        return self._packet(base, 'dense', data.shape, diff.astype('int32'))
+
+    def _packet(self, base: int, encoding: str, shape: tuple, array: np.ndarray) -> tuple:
+        return (self._sequence, base, encoding, tuple(int(n) for n in shape), self.compression,
+                self._compress(array.tobytes()))
+
+
+class HistogramDeltaDecoder:
+    """ Receiver side: rebuilds the full histograms from the packets of a HistogramDeltaEncoder.
+    """
+
+    def __init__(self):
+        self._data = None
+        self._sequence = None
+        self._decompress = dict()
+
+    @property
+    def sequence(self) -> Optional[int]:
+        """ Sequence number of the last applied packet (None before the first one). Hand it to
+        HistogramDeltaEncoder.encode to receive differences.
+        """
+        return self._sequence
+
+    def reset(self) -> None:
+        self._data = None
+        self._sequence = None
+
+    def decode(self, packet: tuple) -> np.ndarray:
+        """ Apply a packet and return the full histogram.
+
+        @param tuple packet: packet created by HistogramDeltaEncoder.encode
+
+        @return numpy.ndarray: reconstructed histogram (int64, owned by the caller)
+        """
+        sequence, base, encoding, shape, compression, payload = packet
+        shape = tuple(shape)
+        if encoding != 'full' and (base != self._sequence or self._data is None or
+                                   self._data.shape != shape):
+            raise ValueError(f'Packet {sequence:d} is based on packet {base:d}, but the last '
+                             f'applied packet is {self._sequence}.')
+        if encoding == 'full':
+            self._data = np.frombuffer(self.__decompress(compression, payload),
+                                       dtype='int64').reshape(shape).copy()
+        elif encoding == 'sparse':
+            buffer = np.frombuffer(self.__decompress(compression, payload), dtype='int32')
+            changed = buffer[:buffer.size // 2]
+            self._data.ravel()[changed] += buffer[buffer.size // 2:]
+        elif encoding == 'dense':
+            self._data += np.frombuffer(self.__decompress(compression, payload),
+                                        dtype='int32').reshape(shape)
+        elif encoding != 'none':
+            raise ValueError(f'Unknown packet encoding "{encoding}".')
+        self._sequence = sequence
+        return self._data.copy()
+
+    def __decompress(self, compression: str, payload: bytes) -> bytes:
+        decompress = self._decompress.get(compression)
+        if decompress is None:
+            decompress = _get_codec(compression)[1]
+            self._decompress[compression] = decompress
+        return decompress(payload)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains closed-form estimators for the position of a single Gaussian peak in 1D and
+2D scan data. They are meant to replace full model fits in time critical loops (e.g. periodic
+refocusing) and report whether their result can be trusted, so callers can fall back to a fit.
+
+The estimators are tried in order of increasing cost:
+    1. moments: centroid and second moment of the offset corrected data
+    2. parabola: 3-point parabola interpolation of the logarithm around the maximum
+    3. linearised: weighted linear least squares on the logarithm (Caruana's algorithm with the
+       iterative weights proposed by Guo)
+The first estimate whose residual around the peak is compatible with the noise level of the data
+is returned.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['PeakEstimate', 'estimate_noise', 'estimate_gaussian_peak_1d',
+           'estimate_gaussian_peak_2d']
+
+from dataclasses import dataclass
+from typing import Dict, Optional, NamedTuple, Sequence, Callable
+
+import numpy as np
+
+
+class _Parameter(NamedTuple):
+    value: float
+
+
+@dataclass(frozen=True)
+class PeakEstimate:
+    """ Result of a closed-form Gaussian peak estimate. Mimics the parts of an lmfit ModelResult
+    used by the optimizer (best_values, best_fit and params[<name>].value).
+
+    Parameter names follow the qudi Gaussian (offset, amplitude, center, sigma) and Gaussian2D
+    (offset, amplitude, center_x, center_y, sigma_x, sigma_y, theta) fit models.
+    """
+    method: str
+    best_values: Dict[str, float]
+    best_fit: np.ndarray
+    residual_rms: float
+    noise: float
+
+    @property
+    def params(self) -> Dict[str, _Parameter]:
+        return {name: _Parameter(value) for name, value in self.best_values.items()}
+
+    @property
+    def snr(self) -> float:
+        return self.best_values['amplitude'] / self.noise
+
+
+def estimate_noise(data: np.ndarray) -> float:
+    """ Estimate the standard deviation of white noise on smooth data from the median absolute
+    value of the second differences along the first axis.
+
+    @param numpy.ndarray data: 1D or 2D data array
+
+    @return float: noise standard deviation estimate
+    """
+    second_diff = np.diff(data, n=2, axis=0)
+    if second_diff.size == 0:
+        return 0.
+    # var(y[i-1] - 2 y[i] + y[i+1]) = 6 var(y) and MAD = 0.6745 std for normal distributions
+    return float(np.median(np.abs(second_diff)) / (0.6745 * np.sqrt(6)))
+
+
+def _border_offset(data: np.ndarray) -> float:
+    """ Median of the outermost 10% of samples (at least one) on each side of each axis. """
+    width = [max(1, n // 10) for n in data.shape]
+    border = np.ones(data.shape, dtype=bool)
+    border[tuple(slice(w, n - w) for w, n in zip(width, data.shape))] = False
+    return float(np.median(data[border]))
+
+
+def _smoothed_peak(data: np.ndarray) -> float:
+    """ Maximum of the data after a 3-sample moving average along each axis. Unlike the plain
+    maximum it is barely inflated by noise.
+    """
+    kernel = np.ones(3) / 3
+    for dim in range(data.ndim):
+        data = np.apply_along_axis(np.convolve, dim, data, kernel, mode='valid')
+    return float(data.max())
+
+
+def _gaussian(axes: Sequence[np.ndarray], offset: float, amplitude: float,
+              centers: Sequence[float], sigmas: Sequence[float]) -> np.ndarray:
+    """ Axis-aligned n-dimensional Gaussian on the grid spanned by the 1D <axes>. """
+    exponent = 0
+    for dim, (ax, center, sigma) in enumerate(zip(axes, centers, sigmas)):
+        shape = [1] * len(axes)
+        shape[dim] = ax.size
+        exponent = exponent + ((ax.reshape(shape) - center) / sigma) ** 2
+    return offset + amplitude * np.exp(-exponent / 2)
+
+
+def _moments(axes, data, offset):
+    weights = np.clip(data - offset, 0, None)
+    total = weights.sum()
+    if total <= 0:
+        return None
+    centers, sigmas = list(), list()
+    for dim, ax in enumerate(axes):
+        marginal = weights.sum(axis=tuple(d for d in range(data.ndim) if d != dim))
+        center = np.dot(marginal, ax) / total
+        centers.append(center)
+        sigmas.append(np.sqrt(np.dot(marginal, (ax - center) ** 2) / total))
+    return data.max() - offset, centers, sigmas
+
+
+def _parabola(axes, data, offset):
+    peak_index = np.unravel_index(np.argmax(data), data.shape)
+    log_peak = list()
+    centers, sigmas = list(), list()
+    for dim, ax in enumerate(axes):
+        index = peak_index[dim]
+        if not 0 < index < ax.size - 1:
+            return None
+        neighbours = list(peak_index)
+        neighbours[dim] = slice(index - 1, index + 2)
+        values = data[tuple(neighbours)] - offset
+        if np.any(values <= 0):
+            return None
+        l0, l1, l2 = np.log(values)
+        curvature = l0 - 2 * l1 + l2
+        if curvature >= 0:
+            return None
+        step = ax[index + 1] - ax[index]
+        shift = (l0 - l2) / (2 * curvature)
+        centers.append(ax[index] + shift * step)
+        sigmas.append(abs(step) * np.sqrt(-1 / curvature))
+        log_peak.append(l1 - (l2 - l0) ** 2 / (8 * curvature))
+    return np.exp(np.mean(log_peak)), centers, sigmas
+
+
+def _linearised(axes, data, offset, iterations=2):
+    values = data - offset
+    mask = values > 0
+    if np.count_nonzero(mask) <= 2 * len(axes) + 1:
+        return None
+    # Center and scale the coordinates for a well conditioned design matrix
+    origins = [ax.mean() for ax in axes]
+    scales = [np.ptp(ax) / 2 or 1. for ax in axes]
+    grids = np.meshgrid(*[(ax - o) / s for ax, o, s in zip(axes, origins, scales)], indexing='ij')
+    coords = [grid[mask] for grid in grids]
+    design = np.column_stack([np.ones(coords[0].size)] + coords + [c ** 2 for c in coords])
+    log_values = np.log(values[mask])
+    weights = values[mask]
+    for _ in range(iterations):
+        solution = np.linalg.lstsq(design * weights[:, np.newaxis], log_values * weights,
+                                   rcond=None)[0]
+        linear = solution[1:1 + len(axes)]
+        quadratic = solution[1 + len(axes):]
+        if np.any(quadratic >= 0):
+            return None
+        # Guo: re-weight with the current model instead of the noisy data
+        weights = np.exp(design @ solution)
+    centers = [o - s * b / (2 * c) for o, s, b, c in zip(origins, scales, linear, quadratic)]
+    sigmas = [s * np.sqrt(-1 / (2 * c)) for s, c in zip(scales, quadratic)]
+    amplitude = np.exp(solution[0] - np.sum(linear ** 2 / (4 * quadratic)))
+    return amplitude, centers, sigmas
+
+
+_ESTIMATORS: Dict[str, Callable] = {
+    'moments': _moments,
+    'parabola': _parabola,
+    'linearised': _linearised,
+}
+
+
+def _estimate_gaussian_peak(axes: Sequence[np.ndarray], data: np.ndarray,
+                            residual_tolerance: float, min_snr: float) -> Optional[PeakEstimate]:
+    axes = [np.asarray(ax, dtype=float) for ax in axes]
+    data = np.asarray(data, dtype=float)
+    if data.shape != tuple(ax.size for ax in axes) or data.size < 3 ** len(axes):
+        return None
+    if not np.all(np.isfinite(data)):
+        return None
+    offset = _border_offset(data)
+    # floor avoids rejecting noise free (simulated) data due to rounding errors
+    noise = max(estimate_noise(data), 1e-9 * np.ptp(data))
+    if _smoothed_peak(data) - offset < min_snr * noise:
+        # Signal too weak to be located reliably without a proper fit
+        return None
+    for method, estimator in _ESTIMATORS.items():
+        with np.errstate(all='ignore'):
+            estimate = estimator(axes, data, offset)
+        if estimate is None:
+            continue
+        amplitude, centers, sigmas = estimate
+        if not np.all(np.isfinite([amplitude, *centers, *sigmas])) or min(sigmas) <= 0:
+            continue
+        if not all(ax.min() <= center <= ax.max() for ax, center in zip(axes, centers)):
+            continue
+        best_fit = _gaussian(axes, offset, amplitude, centers, sigmas)
+        # Judge the residual within 2 sigma of the peak only. Elsewhere it is dominated by noise
+        # and would hide a misplaced peak.
+        peak_region = best_fit - offset > amplitude * np.exp(-2)
+        if np.count_nonzero(peak_region) < 2 * len(axes) + 1:
+            continue
+        residual_rms = float(np.sqrt(np.mean((data - best_fit)[peak_region] ** 2)))
+        # reduced chi-square of pure noise has a standard deviation of sqrt(2 / N)
+        max_chi2 = 1 + residual_tolerance * np.sqrt(2 / np.count_nonzero(peak_region))
+        if (residual_rms / noise) ** 2 > max_chi2:
+            continue
+        if len(axes) == 1:
+            best_values = {'offset': offset, 'amplitude': amplitude, 'center': centers[0],
+                           'sigma': sigmas[0]}
+        else:
+            best_values = {'offset': offset, 'amplitude': amplitude, 'center_x': centers[0],
+                           'center_y': centers[1], 'sigma_x': sigmas[0], 'sigma_y': sigmas[1],
+                           'theta': 0.}
+        best_values = {name: float(value) for name, value in best_values.items()}
+        return PeakEstimate(method=method, best_values=best_values, best_fit=best_fit,
+                            residual_rms=residual_rms, noise=noise)
+    return None
+
+
+def estimate_gaussian_peak_1d(x: np.ndarray, data: np.ndarray, residual_tolerance: float = 2.,
+                              min_snr: float = 10.) -> Optional[PeakEstimate]:
+    """ Estimate a Gaussian peak in 1D data without fitting.
+
+    @param numpy.ndarray x: equidistant sample positions
+    @param numpy.ndarray data: data values at the sample positions
+    @param float residual_tolerance: allowed excess of the reduced chi-square around the peak in
+                                     units of its standard deviation for pure noise
+    @param float min_snr: minimum ratio of the peak amplitude and the noise
+
+    @return PeakEstimate: first estimate passing the residual test or None if none passed
+    """
+    return _estimate_gaussian_peak((x,), data, residual_tolerance, min_snr)
+
+
+def estimate_gaussian_peak_2d(x: np.ndarray, y: np.ndarray, data: np.ndarray,
+                              residual_tolerance: float = 2.,
+                              min_snr: float = 10.) -> Optional[PeakEstimate]:
+    """ Estimate an axis-aligned 2D Gaussian peak in image data without fitting.
+
+    @param numpy.ndarray x: equidistant sample positions of the first axis
+    @param numpy.ndarray y: equidistant sample positions of the second axis
+    @param numpy.ndarray data: image of shape (len(x), len(y))
+    @param float residual_tolerance: allowed excess of the reduced chi-square around the peak in
+                                     units of its standard deviation for pure noise
+    @param float min_snr: minimum ratio of the peak amplitude and the noise
+
+    @return PeakEstimate: first estimate passing the residual test or None if none passed
+    """
+    return _estimate_gaussian_peak((x, y), data, residual_tolerance, min_snr)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a small persistent index of plugins (e.g. sampling functions or predefined
+generate methods) discovered in python modules.
+
+Discovering plugins requires importing every module and introspecting its classes. The index
+stores the JSON serializable result of this introspection per module together with the
+modification time and size of the module file and of the files of all modules it depends on
+(e.g. helper modules defining base classes or default values). As long as none of these files has
+changed, the plugins of a module are known without importing it, so that the module is only
+imported on first use.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['PluginIndex', 'is_json_value']
+
+import os
+import sys
+import ast
+import json
+import inspect
+import sysconfig
+import importlib
+import importlib.util
+from logging import getLogger
+from typing import Any, Callable, Optional
+
+_logger = getLogger(__name__)
+
+
+def is_json_value(value: Any) -> bool:
+    """ Check if a value survives a JSON round trip unchanged (including its type).
+
+    @param value: value to check
+    @return bool: True if value is None, bool, int, float or str
+    """
+    return value is None or type(value) in (bool, int, float, str)
+
+
+class PluginIndex:
+    """
+    Persistent JSON index of the plugins found in python modules.
+
+    Each module entry contains the modification time and size of the module file and of the files of
+    its dependencies and the entries returned by the scan function of the caller. Use lookup to get
+    the entries of a module, which imports and scans the module only if it is not indexed or if the
+    module or one of its dependencies has changed since.
+
+    Dependencies are all modules imported by the module source and the modules defining the classes
+    and functions in its namespace (including base classes). Dependencies in the same top-level
+    package or directory as the module are followed recursively. Standard library modules are
+    ignored.
+
+    Usage example:
+
+        index = PluginIndex('plugin_index.json')
+        entries = index.lookup('my_package.my_plugins', scan=lambda module: {...})
+        index.save()
+    """
+    _version = 2
+
+    def __init__(self, file_path: str):
+        """
+        @param str file_path: path of the JSON index file. It is created by save if missing.
+        """
+        self.file_path = file_path
+        self._modules = dict()
+        self._changed = False
+        # file keys already determined, shared by all modules depending on the same file
+        self._file_keys = dict()
+        try:
+            with open(file_path, 'r') as file:
+                index = json.load(file)
+            if index.get('version') == self._version:
+                self._modules = index['modules']
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError):
+            _logger.warning(f'Unable to read plugin index "{file_path}". Rebuilding index.')
+
+    @staticmethod
+    def module_file(module_name: str) -> Optional[str]:
+        """ Find the file of a module without importing it (parent packages are imported).
+
+        @param str module_name: full name of the module
+        @return str: path of the module file or None if it can not be found
+        """
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            return None
+        if spec is None or not spec.has_location:
+            return None
+        return spec.origin
+
+    def lookup(self, module_name: str, scan: Callable[[Any], Any],
+               reload: Optional[bool] = False) -> Any:
+        """ Return the indexed entries of a module. If the module is not indexed or has changed,
+        it is imported (and reloaded if requested and already imported) and scanned.
+
+        @param str module_name: full name of the module
+        @param callable scan: function of the imported module returning JSON serializable entries
+                              (or None if the module can not be indexed)
+        @param bool reload: reload the module if it has been imported before and changed
+
+        @return object: entries returned by scan for the current version of the module file
+        """
+        key = self._file_key(self.module_file(module_name))
+        entry = self._modules.get(module_name)
+        if key is not None and entry is not None and entry['key'] == key and all(
+                self._file_key(dependency[0], cached=True) == dependency
+                for dependency in entry['dependencies']):
+            return entry['entries']
+
+        was_imported = module_name in sys.modules
+        module = importlib.import_module(module_name)
+        if reload and was_imported:
+            module = importlib.reload(module)
+        entries = scan(module)
+        if key is not None:
+            try:
+                json.dumps(entries, allow_nan=True)
+            except (TypeError, ValueError):
+                entries = None
+            dependencies = [self._file_key(path) for path in self._dependency_files(module)]
+            self._modules[module_name] = {'key': key,
+                                          'dependencies': [d for d in dependencies if d],
+                                          'entries': entries}
+            self._changed = True
+        return entries
+
+    def _file_key(self, file_path: Optional[str], cached: Optional[bool] = False) -> Optional[list]:
+        """ Get the path, modification time and size of a file.
+
+        @param str file_path: path of the file
+        @param bool cached: use the key determined before for this file, if any
+        @return list: [path, modification time in ns, size] or None if the file does not exist
+        """
+        if cached and file_path in self._file_keys:
+            return self._file_keys[file_path]
+        try:
+            stat = os.stat(file_path)
+            key = [file_path, stat.st_mtime_ns, stat.st_size]
+        except (TypeError, OSError):
+            key = None
+        self._file_keys[file_path] = key
+        return key
+
+    @classmethod
+    def _dependency_files(cls, module: Any) -> list:
+        """ Find the files of the modules an imported module depends on.
+
+        Dependencies in the same top-level package or directory as the module (i.e. its helper
+        modules) are followed recursively, all others (e.g. numpy) are only recorded.
+
+        @param module module: imported module
+        @return list: sorted file paths of the dependencies excluding the module itself
+        """
+        top_level = module.__name__.split('.')[0]
+        directory = os.path.dirname(getattr(module, '__file__', None) or '')
+        stdlib = tuple(os.path.normcase(os.path.abspath(sysconfig.get_path(name)))
+                       for name in ('stdlib', 'platstdlib'))
+        files = set()
+        visited = {module.__name__}
+        pending = [module]
+        while pending:
+            for dependency in cls._direct_dependencies(pending.pop()):
+                if dependency.__name__ in visited:
+                    continue
+                visited.add(dependency.__name__)
+                file_path = getattr(dependency, '__file__', None)
+                if file_path is None or os.path.normcase(
+                        os.path.abspath(file_path)).startswith(stdlib):
+                    continue
+                files.add(file_path)
+                if dependency.__name__.split('.')[0] == top_level or \
+                        os.path.dirname(file_path) == directory:
+                    pending.append(dependency)
+        files.discard(getattr(module, '__file__', None))
+        return sorted(files)
+
+    @staticmethod
+    def _direct_dependencies(module: Any) -> list:
+        """ Get the imported modules a module directly depends on.
+
+        @param module module: imported module
+        @return list: modules imported in the module source or defining objects in its namespace
+        """
+        names = set()
+        try:
+            tree = ast.parse(inspect.getsource(module))
+        except (OSError, TypeError, SyntaxError):
+            tree = None
+        if tree is not None:
+            package = module.__package__ if module.__package__ is not None else ''
+            for node in ast.walk(tree):
+                if isinstance(node, ast.Import):
+                    for alias in node.names:
+                        parts = alias.name.split('.')
+                        names.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+                elif isinstance(node, ast.ImportFrom):
+                    try:
+                        base = importlib.util.resolve_name(
+                            '.' * node.level + (node.module or ''), package)
+                    except (ImportError, ValueError):
+                        continue
+                    names.add(base)
+                    names.update(f'{base}.{alias.name}' for alias in node.names)
+        for obj in vars(module).values():
+            if inspect.ismodule(obj):
+                names.add(obj.__name__)
+            elif inspect.isclass(obj):
+                names.update(getattr(cls, '__module__', None) for cls in obj.__mro__)
+            elif inspect.isfunction(obj):
+                names.add(obj.__module__)
+        return [sys.modules[name] for name in names if name in sys.modules]
+
+    def save(self) -> None:
+        """ Write the index file if any module entry has changed. """
+        if not self._changed:
+            return
+        tmp_path = self.file_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            with open(tmp_path, 'w') as file:
+                json.dump({'version': self._version, 'modules': self._modules}, file)
+            os.replace(tmp_path, self.file_path)
+            self._changed = False
+        except OSError:
+            _logger.warning(f'Unable to write plugin index "{self.file_path}".')
+
+    def clear(self) -> None:
+        """ Remove all module entries. """
+        self._modules = dict()
+        self._changed = True
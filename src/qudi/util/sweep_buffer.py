@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a preallocated buffer for the raw data of repeated sweeps over several ranges
+(e.g. the frequency ranges of an ODMR scan) and several data channels.
+
+All sweeps are stored in a single 3D array (lines x channels x points) holding the points of all
+ranges of a sweep next to each other. Lines are written from the end of the array towards its
+start, so the stored lines are always a contiguous view with the newest line first and adding a
+line does not move the old ones. The per-range slices are computed once and applied to the whole
+array, so channels and ranges are views instead of separate arrays.
+
+The array grows by doubling up to an optional memory limit. When the limit is reached, the oldest
+lines are discarded. The mean over all sweeps is kept as running sum and stays exact also for
+discarded lines.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+__all__ = ['SweepBuffer']
+
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SweepBuffer:
+    """
+    Preallocated lines x channels x points array of sweeps with per-range views.
+
+    Usage example:
+
+        buffer = SweepBuffer(('APD counts', 'Photodiode'), (100, 50), lines=1000,
+                             max_bytes=1e9)
+        buffer.add_line([apd_counts, photodiode])
+        signal = buffer.split(buffer.mean())  # {channel: [range_0, range_1]}
+        raw = buffer.split(buffer.data)  # {channel: [points x lines, ...]}, newest line first
+    """
+
+    def __init__(self, channels: Sequence[str], range_sizes: Sequence[int],
+                 lines: Optional[int] = 1, max_bytes: Optional[float] = None):
+        """
+        @param iterable channels: names of the data channels
+        @param iterable range_sizes: number of points of each range in a sweep
+        @param int lines: number of lines to allocate initially
+        @param float max_bytes: memory limit of the line array, running sum and counts in bytes,
+                                None for no limit
+        """
+        self._channels = tuple(channels)
+        self._range_slices = list()
+        start = 0
+        for size in range_sizes:
+            self._range_slices.append(slice(start, start + int(size)))
+            start += int(size)
+        self._points = start
+
+        line_bytes = max(1, len(self._channels) * self._points * np.dtype(float).itemsize)
+        if max_bytes is None:
+            self._max_lines = None
+            self._max_stored_lines = None
+        else:
+            # running sum and finite value counts take one line each
+            self._max_lines = int(max_bytes // line_bytes) - 2
+            if self._max_lines < 2:
+                raise ValueError(f'Memory limit of {max_bytes:.0f} bytes too small for 2 sweeps '
+                                 f'and the running sum of {line_bytes:d} bytes each.')
+            # Margin of free lines to move the kept lines only every few lines at the limit
+            self._max_stored_lines = self._max_lines - max(1, self._max_lines // 8)
+        lines = max(1, int(lines))
+        if self._max_lines is not None:
+            lines = min(lines, self._max_lines)
+
+        self._buffer = np.empty((lines, len(self._channels), self._points))
+        self._start = lines
+        self._lines = 0
+        self._sweeps = 0
+        self._sum = np.zeros((len(self._channels), self._points))
+        self._counts = np.zeros((len(self._channels), self._points), dtype=np.int64)
+
+    @property
+    def channels(self) -> Tuple[str, ...]:
+        return self._channels
+
+    @property
+    def range_slices(self) -> List[slice]:
+        return self._range_slices.copy()
+
+    @property
+    def points(self) -> int:
+        """ Number of points of all ranges of a sweep """
+        return self._points
+
+    @property
+    def lines(self) -> int:
+        """ Number of stored lines """
+        return self._lines
+
+    @property
+    def sweeps(self) -> int:
+        """ Number of added lines, including discarded lines """
+        return self._sweeps
+
+    @property
+    def max_lines(self) -> Optional[int]:
+        """ Maximum number of stored lines due to the memory limit, None for no limit """
+        return self._max_stored_lines
+
+    @property
+    def nbytes(self) -> int:
+        """ Memory allocated for lines, running sum and counts in bytes """
+        return self._buffer.nbytes + self._sum.nbytes + self._counts.nbytes
+
+    @property
+    def data(self) -> np.ndarray:
+        """ View of the stored lines (lines x channels x points), newest line first """
+        return self._buffer[self._start:self._start + self._lines]
+
+    def add_line(self, line_data) -> None:
+        """ Add the data of one sweep. Missing points at the end of a channel are NaN.
+
+        @param line_data: channels x points array or sequence of the channel data in the order of
+                          channels
+        """
+        if self._start == 0:
+            self._make_room()
+        self._start -= 1
+        line = self._buffer[self._start]
+        if isinstance(line_data, np.ndarray) and line_data.shape == line.shape:
+            line[...] = line_data
+        else:
+            for channel_line, data in zip(line, line_data):
+                size = min(len(data), self._points)
+                channel_line[:size] = data[:size]
+                channel_line[size:] = np.nan
+        finite = np.isfinite(line)
+        np.add(self._sum, line, out=self._sum, where=finite)
+        self._counts += finite
+        self._sweeps += 1
+        self._lines += 1
+        if self._max_stored_lines is not None:
+            self._lines = min(self._lines, self._max_stored_lines)
+
+    def _make_room(self) -> None:
+        """ Move the stored lines to the end of a larger array, or of the same array if the
+        memory limit is reached (discarding the oldest lines).
+        """
+        allocated = self._buffer.shape[0]
+        if self._max_lines is None or allocated < self._max_lines:
+            new_lines = 2 * allocated
+            if self._max_lines is not None:
+                new_lines = min(new_lines, self._max_lines)
+            buffer = np.empty((new_lines,) + self._buffer.shape[1:])
+            buffer[new_lines - self._lines:] = self.data
+            self._buffer = buffer
+            self._start = new_lines - self._lines
+        else:
+            keep = min(self._lines, self._max_stored_lines - 1)
+            self._buffer[allocated - keep:] = self._buffer[:keep]
+            self._start = allocated - keep
+            self._lines = keep
+
+    def mean(self, lines: Optional[int] = 0) -> np.ndarray:
+        """ Mean of the finite values of the newest lines as channels x points array.
+
+        @param int lines: number of newest lines to average, 0 for all sweeps. If there are less
+                          lines stored, all stored lines are averaged.
+
+        @return numpy.ndarray: mean (zeros before the first sweep, NaN for points without finite
+                               values)
+        """
+        if self._sweeps == 0:
+            return np.zeros_like(self._sum)
+        if 0 < lines < self._sweeps:
+            with warnings.catch_warnings():
+                # all-NaN points give NaN
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                return np.nanmean(self.data[:lines], axis=0)
+        return np.divide(self._sum, self._counts, out=np.full_like(self._sum, np.nan),
+                         where=self._counts > 0)
+
+    def split(self, data: np.ndarray) -> Dict[str, List[np.ndarray]]:
+        """ Views of each channel and range of data.
+
+        @param numpy.ndarray data: channels x points array (e.g. mean) or lines x channels x points
+                                   array (e.g. data)
+
+        @return dict: list of range views by channel name. Ranges of 3D data are points x lines
+                      views.
+        """
+        if data.ndim == 2:
+            return {ch: [data[ii, sl] for sl in self._range_slices]
+                    for ii, ch in enumerate(self._channels)}
+        return {ch: [data[:, ii, sl].T for sl in self._range_slices]
+                for ii, ch in enumerate(self._channels)}
@@ -36,6 +36,28 @@ from qudi.util.yaml import yaml_load
 CONFIG = os.path.join(os.getcwd(),'tests/test.cfg')
 
 
+def pytest_addoption(parser):
+    parser.addoption('--run-benchmarks', action='store_true', default=False,
+                     help='run the timing comparisons marked with "benchmark"')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers',
+                            'benchmark: timing comparison, only run with --run-benchmarks')
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Timing comparisons depend on the load of the machine, so they are opt-in.
+    """
+    if config.getoption('--run-benchmarks'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='timing comparison, use --run-benchmarks to run')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 @pytest.fixture(scope="module")
 def qt_app():
     """
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains benchmarks of the auto-alignment logic against the step motor dummy with a
+simulated coupling efficiency landscape.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+import pytest
+
+import qudi.hardware.local.step_motor_dummy as step_motor_dummy
+import qudi.logic.local.autoalignment as autoalignment
+import qudi.logic.local.newfocus8752_logic as newfocus8752_logic
+
+COUPLING_CENTER = [150, -100, 80, 120, -300]
+COUPLING_WIDTH = [150, 150, 150, 150, 450]
+TARGET = 0.95
+
+
+class StepMotorStandIn(step_motor_dummy.StepMotor):
+    """ Step motor dummy bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('StepMotorStandIn')
+
+    def __init__(self, velocity):
+        self._number_of_channels = 5
+        self._velocity = velocity
+        self._coupling_center = COUPLING_CENTER
+        self._coupling_width = COUPLING_WIDTH
+        self._coupling_correlation = 0.6
+        self._noise = 0.005
+        self.on_activate()
+
+
+class PicomotorStandIn:
+    """ Maps the picomotor axes of the NF8752 logic onto the step motor dummy channels.
+    """
+    axis_codes = {'x1': 1, 'y1': 2, 'z': 3, 'x2': 4, 'y2': 5}
+    channels = {'x1': 0, 'y1': 1, 'x2': 2, 'y2': 3, 'z': 4}
+
+    def __init__(self, motor):
+        self.motor = motor
+
+    def move_rel(self, steps, axis, vel=100, acc=500, go=True):
+        self.motor.move_rel(self.channels[axis], int(steps))
+
+
+class PowerMeterStandIn:
+    """ Reads the simulated coupling efficiency of the step motor dummy.
+    """
+
+    def __init__(self, motor):
+        self.motor = motor
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def get_power(self):
+        return self.motor.get_coupling_efficiency()
+
+
+class AutoAlignmentStandIn(autoalignment.autoalignmentLogic):
+    """ Auto-alignment logic bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('AutoAlignmentStandIn')
+
+    def __init__(self, motor, concurrent_moves=True):
+        self.pmc = lambda: PicomotorStandIn(motor)
+        self.thorlabspm1 = lambda: PowerMeterStandIn(motor)
+        self._time_series_logic_con = lambda: None
+        self._concurrent_moves = concurrent_moves
+        self._evaluation_cache_lifetime = 60
+        self._settling_time = 0
+        # the dummy has no backlash
+        self._backlash_factors = {'x1': 1, 'y1': 1, 'x2': 1, 'y2': 1, 'z': 1}
+        self.on_activate()
+        self.num_samples = 1
+
+
+class TCPClientStandIn:
+    """ Records the lines sent to the picomotor controller. Sending takes some time, so commands
+    of concurrent threads would interleave without locking.
+    """
+
+    def __init__(self):
+        self.lines = list()
+
+    def start_command(self):
+        pass
+
+    def send_byte(self, line):
+        time.sleep(0.001)
+        self.lines.append(line.strip())
+
+
+class NF8752StandIn(newfocus8752_logic.NF8752Logic):
+    """ NF8752 logic bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('NF8752StandIn')
+
+    def __init__(self):
+        self.tcpclient = TCPClientStandIn
+        self.on_activate()
+
+
+@pytest.fixture
+def logic_factory():
+    logics = list()
+
+    def create(velocity, concurrent_moves=True):
+        logic = AutoAlignmentStandIn(StepMotorStandIn(velocity), concurrent_moves)
+        logics.append(logic)
+        return logic
+
+    yield create
+    for logic in logics:
+        logic.on_deactivate()
+
+
+def _move_through_positions(logic_factory, concurrent):
+    """ Move through fixed random positions and return the duration of the moves """
+    positions = np.random.default_rng(0).integers(-100, 100, (5, 5)).tolist()
+    logic = logic_factory(velocity=5000, concurrent_moves=concurrent)
+    start = time.perf_counter()
+    for position in positions:
+        logic.move_motors_abs(position)
+    duration = time.perf_counter() - start
+    np.testing.assert_array_equal(logic._pmc.motor.get_pos(), positions[-1])
+    return duration
+
+
+def test_concurrent_moves(logic_factory):
+    """
+    Moves on the two picomotor drivers reach the same positions with and without concurrency.
+    """
+    for concurrent in (False, True):
+        _move_through_positions(logic_factory, concurrent)
+
+
+@pytest.mark.benchmark
+def test_concurrent_moves_duration(logic_factory):
+    """
+    Moves on the two picomotor drivers run at the same time.
+    """
+    durations = {concurrent: _move_through_positions(logic_factory, concurrent)
+                 for concurrent in (False, True)}
+    print('Auto-alignment moves: {0:.2f} s sequential, {1:.2f} s concurrent'
+          ''.format(durations[False], durations[True]))
+    assert durations[True] < durations[False]
+
+
+def test_concurrent_picomotor_commands():
+    """
+    Commands of moves on different drivers sent from several threads are not interleaved.
+    """
+    controller = NF8752StandIn()
+    threads = [threading.Thread(target=controller.move_rel, args=(10, axis, 2000))
+               for axis in ('x1', 'y1', 'x2', 'y2')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lines = controller._tcpclient.lines
+    assert len(lines) == 4 * 6
+    for index in range(0, len(lines), 6):
+        channel, _, _, _, _, move = lines[index:index + 6]
+        driver = channel.split()[1].split('=')[0]
+        assert lines[index + 1:index + 5] == [f'typ {driver} 0', f'ACC {driver} ' + channel[-1] +
+                                              '=500', f'VEL {driver} ' + channel[-1] + '=2000',
+                                              'mon']
+        assert move == f'rel {driver}=10 g'
+
+
+def test_settling_time(logic_factory):
+    """
+    The power meter is read out after the settling time following a move.
+    """
+    logic = logic_factory(velocity=1e6)
+    logic._settling_time = 0.05
+    logic.move_motors_abs([10, 0, 0, 0, 0])
+    assert time.perf_counter() - logic._last_move_time >= 0.05
+
+
+def test_evaluation_cache(logic_factory):
+    """
+    Revisited positions are not measured again.
+    """
+    logic = logic_factory(velocity=1e6)
+    positions = [[0, 0, 0, 0, 0], [10, 0, 0, 0, 0], [0, 0, 0, 0, 0.2]]
+    outputs = logic.evaluate_positions(positions)
+    assert logic.evaluation_count == 2
+    assert outputs[0] == outputs[2]
+
+
+def test_surrogate_versus_simplex(logic_factory):
+    """
+    Compares the number of read outs the downhill simplex and the surrogate model optimizer need
+    to reach 95% coupling efficiency starting from the home position.
+    """
+    np.random.seed(1)
+    simplex_logic = logic_factory(velocity=1e6)
+    range_ = {k: v / 5 for k, v in simplex_logic.full_simplex_range.items()}
+    simplex, outputs = simplex_logic.randomize_initial_simplex(range_)
+    while outputs[-1] < TARGET and simplex_logic.evaluation_count < 500:
+        simplex, outputs = simplex_logic.downhill_simplex(simplex, outputs)
+    simplex_evaluations = simplex_logic.evaluation_count
+
+    surrogate_logic = logic_factory(velocity=1e6)
+    surrogate_logic.define_home()
+    position, output = surrogate_logic.optimize_surrogate(max_evaluations=100)
+    surrogate_evaluations = surrogate_logic.evaluation_count
+
+    print('Auto-alignment read outs to reach {0:.0%} coupling: downhill simplex {1:d} '
+          '({2:.3f}), surrogate {3:d} ({4:.3f})'.format(TARGET, simplex_evaluations, outputs[-1],
+                                                        surrogate_evaluations, output))
+    assert output >= TARGET
+    np.testing.assert_allclose(position, COUPLING_CENTER, atol=50)
+    assert surrogate_evaluations < simplex_evaluations
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains upload tests for the Tektronix AWG70k hardware module against a local FTP
+server stand-in and a fake SCPI endpoint.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import logging
+import threading
+import ftplib
+import numpy as np
+import pytest
+
+pyftpdlib = pytest.importorskip('pyftpdlib')
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+import qudi.hardware.awg.tektronix_awg70k as awg70k_module
+
+SAMPLE_RATE = 25e9
+NUMBER_OF_SAMPLES = 2 ** 22
+CHUNK_SIZE = 2 ** 20
+
+
+class FakeSCPIEndpoint:
+    """
+    Minimal stand-in for the pyvisa resource of an AWG70k. It keeps track of the workspace
+    waveforms loaded via MMEM:OPEN.
+    """
+
+    def __init__(self, load_time=0.05):
+        self.timeout = 30000
+        self.load_time = load_time
+        self.waveforms = set()
+        self.commands = list()
+
+    def write(self, command):
+        self.commands.append(command)
+        if command.startswith('MMEM:OPEN'):
+            time.sleep(self.load_time)
+            path = command.split('"')[1]
+            self.waveforms.add(os.path.splitext(path.replace('\\', '/').rsplit('/', 1)[-1])[0])
+        elif command.startswith('WLIS:WAV:DEL'):
+            self.waveforms.discard(command.split('"')[1])
+        return len(command)
+
+    def query(self, question):
+        self.commands.append(question)
+        if question == 'WLIS:LIST?':
+            return ','.join(sorted(self.waveforms))
+        if question == 'WLIS:WAV:LMIN?':
+            return '1'
+        if question == 'CLOCK:SRATE?':
+            return str(SAMPLE_RATE)
+        if question == '*OPC?':
+            return '1'
+        raise ValueError('Unknown query "{0}"'.format(question))
+
+
+class AWG70KStandIn(awg70k_module.AWG70K):
+    """ AWG70K bypassing the qudi module machinery and the channel activation queries.
+    """
+    log = logging.getLogger('AWG70KStandIn')
+
+    def __init__(self, work_dir, scpi, channels):
+        self._tmp_work_dir = work_dir
+        self._ftp_dir = 'C:\\inetpub\\ftproot'
+        self._ip_address = '127.0.0.1'
+        self._username = 'anonymous'
+        self._password = 'anonymous@'
+        self._ftp_upload_workers = 4
+        self._ftp_block_size = 1048576
+        self.ftp_working_dir = 'waves'
+        self.awg = scpi
+        self._AWG70K__wfmx_write_offsets = dict()
+        self._AWG70K__scpi_lock = threading.Lock()
+        self._channels = channels
+
+    def get_active_channels(self, ch=None):
+        return {chnl: True for chnl in self._channels}
+
+
+@pytest.fixture
+def ftp_server(tmp_path, monkeypatch):
+    """
+    Fixture for a local anonymous FTP server with write permissions serving a "waves" directory.
+    """
+    ftp_root = tmp_path / 'ftproot'
+    (ftp_root / 'waves').mkdir(parents=True)
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(str(ftp_root), perm='elradfmwMT')
+    handler = type('Handler', (FTPHandler,), {'authorizer': authorizer})
+    server = ThreadedFTPServer(('127.0.0.1', 0), handler)
+    port = server.address[1]
+    thread = threading.Thread(target=server.serve_forever, kwargs={'timeout': 0.1}, daemon=True)
+    thread.start()
+
+    def connect(host):
+        ftp = ftplib.FTP()
+        ftp.connect(host, port)
+        return ftp
+
+    monkeypatch.setattr(awg70k_module, 'FTP', connect)
+    yield ftp_root / 'waves'
+    server.close_all()
+    thread.join(timeout=5)
+
+
+def _generate_samples(channels, number_of_samples):
+    rng = np.random.default_rng(42)
+    analog = {ch: rng.uniform(-1, 1, number_of_samples).astype('float32')
+              for ch in channels if ch.startswith('a')}
+    digital = {ch: rng.integers(0, 2, number_of_samples).astype(bool)
+               for ch in channels if ch.startswith('d')}
+    return analog, digital
+
+
+@pytest.mark.parametrize('chunk_size', [NUMBER_OF_SAMPLES, CHUNK_SIZE])
+def test_write_waveform_upload(tmp_path, ftp_server, chunk_size):
+    """
+    Writes a two channel waveform with markers in chunks, uploads it to the FTP stand-in and checks
+    the resulting WFMX files byte by byte. Prints the end-to-end upload throughput.
+    """
+    channels = ('a_ch1', 'a_ch2', 'd_ch1', 'd_ch2', 'd_ch3', 'd_ch4')
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    scpi = FakeSCPIEndpoint()
+    awg = AWG70KStandIn(str(work_dir), scpi, channels)
+    analog, digital = _generate_samples(channels, NUMBER_OF_SAMPLES)
+    expected_markers = {
+        1: (digital['d_ch2'].astype('uint8') << 1) + digital['d_ch1'],
+        2: (digital['d_ch4'].astype('uint8') << 1) + digital['d_ch3']
+    }
+
+    start = time.perf_counter()
+    for offset in range(0, NUMBER_OF_SAMPLES, chunk_size):
+        stop = offset + chunk_size
+        written, waveforms = awg.write_waveform(
+            name='bench',
+            analog_samples={ch: arr[offset:stop] for ch, arr in analog.items()},
+            digital_samples={ch: arr[offset:stop].copy() for ch, arr in digital.items()},
+            is_first_chunk=offset == 0,
+            is_last_chunk=stop >= NUMBER_OF_SAMPLES,
+            total_number_of_samples=NUMBER_OF_SAMPLES
+        )
+        assert written == chunk_size
+    elapsed = time.perf_counter() - start
+
+    assert waveforms == ['bench_ch1', 'bench_ch2']
+    assert scpi.waveforms == {'bench_ch1', 'bench_ch2'}
+    total_bytes = 0
+    for ch_num in (1, 2):
+        content = (ftp_server / 'bench_ch{0:d}.wfmx'.format(ch_num)).read_bytes()
+        total_bytes += len(content)
+        header_length = len(content) - 5 * NUMBER_OF_SAMPLES
+        assert int(content[18:27]) == header_length
+        analog_part = np.frombuffer(content, dtype='float32', count=NUMBER_OF_SAMPLES,
+                                    offset=header_length)
+        marker_part = np.frombuffer(content, dtype='uint8',
+                                    offset=header_length + 4 * NUMBER_OF_SAMPLES)
+        np.testing.assert_array_equal(analog_part, analog['a_ch{0:d}'.format(ch_num)])
+        np.testing.assert_array_equal(marker_part, expected_markers[ch_num])
+    print('AWG70k write/upload/load throughput (chunk size {0:d}): {1:.1f} MB/s'
+          ''.format(chunk_size, total_bytes / elapsed / 1e6))
+
+
+def test_load_while_encoding(tmp_path, ftp_server):
+    """
+    The first channel is loaded into the workspace while the second channel is still encoded.
+    """
+    channels = ('a_ch1', 'a_ch2', 'd_ch1', 'd_ch3')
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    events = list()
+
+    class LoggingSCPIEndpoint(FakeSCPIEndpoint):
+        def write(self, command):
+            if command.startswith('MMEM:OPEN'):
+                path = command.split('"')[1].replace('\\', '/')
+                events.append('loaded ' + os.path.splitext(path.rsplit('/', 1)[-1])[0])
+            return super().write(command)
+
+    class SlowEncodingAWG(AWG70KStandIn):
+        def _write_wfmx(self, filename, *args, **kwargs):
+            if filename.endswith('ch2'):
+                # give the upload of the first channel time to finish
+                time.sleep(1)
+            result = super()._write_wfmx(filename, *args, **kwargs)
+            events.append('encoded ' + filename)
+            return result
+
+    scpi = LoggingSCPIEndpoint(load_time=0)
+    awg = SlowEncodingAWG(str(work_dir), scpi, channels)
+    analog, digital = _generate_samples(channels, 2 ** 16)
+    written, waveforms = awg.write_waveform(name='pipe',
+                                            analog_samples=analog,
+                                            digital_samples=digital,
+                                            is_first_chunk=True,
+                                            is_last_chunk=True,
+                                            total_number_of_samples=2 ** 16)
+    assert written == 2 ** 16
+    assert scpi.waveforms == {'pipe_ch1', 'pipe_ch2'}
+    assert events == ['encoded pipe_ch1', 'loaded pipe_ch1', 'encoded pipe_ch2', 'loaded pipe_ch2']
+
+
+def test_missing_first_chunk(tmp_path):
+    """
+    Appending to a waveform whose first chunk has not been written fails.
+    """
+    channels = ('a_ch1', 'd_ch1')
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    scpi = FakeSCPIEndpoint()
+    awg = AWG70KStandIn(str(work_dir), scpi, channels)
+    analog, digital = _generate_samples(channels, 1000)
+    written, waveforms = awg.write_waveform(name='orphan',
+                                            analog_samples=analog,
+                                            digital_samples=digital,
+                                            is_first_chunk=False,
+                                            is_last_chunk=True,
+                                            total_number_of_samples=2000)
+    assert written == -1
+    assert waveforms == []
+    assert not scpi.waveforms
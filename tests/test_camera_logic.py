@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for the video acquisition of the camera logic with the camera dummy
+running at a high simulated frame rate.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+from qudi.interface.camera_interface import CameraInterface
+
+MODULE = 'camera_logic'
+EXPOSURE = 1e-3
+RESOLUTION = (128, 96)
+DURATION = 2
+
+
+@pytest.fixture(scope='module')
+def module(qudi_instance, qt_app):
+    """
+    Fixture that returns the activated camera logic instance.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(MODULE)
+    yield module_manager.modules[MODULE].instance
+    module_manager.deactivate_module(MODULE)
+
+
+def _wait(qt_app, duration):
+    stop = time.perf_counter() + duration
+    while time.perf_counter() < stop:
+        qt_app.processEvents()
+        time.sleep(0.001)
+
+
+def test_video_frame_counters(module, qt_app):
+    """
+    Records a video at 1000 frames per second while the display is throttled. All frames have to
+    reach the ring buffer, but only the latest ones are sent to the GUI.
+    """
+    camera = module._camera()
+    camera._resolution = RESOLUTION
+    module.set_exposure(EXPOSURE)
+    displayed = list()
+    module.sigFrameChanged.connect(displayed.append)
+    try:
+        module.toggle_video(True)
+        start = time.perf_counter()
+        _wait(qt_app, DURATION)
+        module.toggle_video(False)
+        elapsed = time.perf_counter() - start
+        while module.module_state() != 'idle':
+            _wait(qt_app, 0.01)
+    finally:
+        module.sigFrameChanged.disconnect(displayed.append)
+
+    counters = module.frame_counters
+    print('Camera video: {0[acquired]:d} frames acquired, {0[displayed]:d} displayed, '
+          '{0[missed]:d} missed in {1:.2f} s'.format(counters, elapsed))
+    assert counters['missed'] == 0
+    assert counters['acquired'] >= 0.8 * DURATION / EXPOSURE
+    assert 0 < counters['displayed'] <= module._max_display_rate * elapsed + 2
+    assert counters['displayed'] == len(displayed)
+    assert displayed[-1].shape == RESOLUTION[::-1]
+    assert module.frame_buffer.shape == (module._frame_buffer_size, *RESOLUTION[::-1])
+
+
+class BufferlessCamera:
+    """ Camera stand-in without frame buffer using the default get_new_frames. """
+    get_new_frames = CameraInterface.get_new_frames
+
+    def __init__(self):
+        self.image = np.zeros(RESOLUTION[::-1])
+
+    def get_acquired_data(self):
+        return self.image.copy()
+
+
+def test_default_new_frames():
+    """
+    Cameras without frame buffer return each acquired image only once.
+    """
+    camera = BufferlessCamera()
+    frames, missed = camera.get_new_frames()
+    assert frames.shape == (1, *RESOLUTION[::-1]) and missed == 0
+    frames, missed = camera.get_new_frames()
+    assert frames.shape == (0, *RESOLUTION[::-1]) and missed == 0
+    camera.image = np.ones(RESOLUTION[::-1])
+    frames, _ = camera.get_new_frames()
+    assert len(frames) == 1 and (frames[0] == 1).all()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests and a benchmark for the vectorized and memoized analysis of
+PulseBlockEnsembles in the sequence generator logic.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+from qudi.logic.pulsed.sampling_functions import SamplingFunctions
+from qudi.logic.pulsed.pulse_objects import PulseBlockElement, PulseBlock, PulseBlockEnsemble
+
+MODULE = 'sequence_generator_logic'
+
+
+@pytest.fixture(scope='module')
+def module(qudi_instance):
+    """
+    Fixture that returns the activated sequence generator logic instance.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(MODULE)
+    yield module_manager.modules[MODULE].instance
+    module_manager.deactivate_module(MODULE)
+
+
+def _loop_analyze_block_ensemble(module, ensemble, laser_channel):
+    """ Element by element loop of analyze_block_ensemble before vectorization. """
+    sample_rate = module.pulse_generator_settings['sample_rate']
+    digital_channels = module.get_block(ensemble[0][0]).digital_channels
+    last_block = module.get_block(ensemble[-1][0])
+    tmp_digital_high = last_block[-1].digital_high.copy()
+    tmp_laser_on = last_block[-1].laser_on
+    digital_rising_bins = {chnl: list() for chnl in digital_channels}
+    laser_rising_bins = list()
+    elements_length_bins = list()
+    current_end_time = 0.0
+    current_start_bin = 0
+    for block_name, reps in ensemble:
+        block = module.get_block(block_name)
+        for rep_no in range(reps + 1):
+            for element in block:
+                if tmp_digital_high != element.digital_high:
+                    for chnl, state in element.digital_high.items():
+                        if not tmp_digital_high[chnl] and state:
+                            digital_rising_bins[chnl].append(current_start_bin)
+                    tmp_digital_high = element.digital_high.copy()
+                if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
+                    if not tmp_laser_on and element.laser_on:
+                        laser_rising_bins.append(current_start_bin)
+                    tmp_laser_on = element.laser_on
+                current_end_time += element.init_length_s + rep_no * element.increment_s
+                current_end_bin = int(np.rint(current_end_time * sample_rate))
+                elements_length_bins.append(current_end_bin - current_start_bin)
+                current_start_bin = current_end_bin
+    digital_rising_bins = {chnl: np.array(sorted(set(bins)), dtype='int64')
+                           for chnl, bins in digital_rising_bins.items()}
+    if laser_channel.startswith('d'):
+        laser_rising_bins = digital_rising_bins[laser_channel]
+    return (np.array(elements_length_bins, dtype='int64'), digital_rising_bins,
+            np.array(sorted(set(laser_rising_bins)), dtype='int64'), current_end_time)
+
+
+def _element(rng, length, increment=0.0):
+    return PulseBlockElement(
+        init_length_s=length,
+        increment_s=increment,
+        pulse_function={'a_ch1': SamplingFunctions.Idle()},
+        digital_high={'d_ch1': bool(rng.integers(2)), 'd_ch2': bool(rng.integers(2))},
+        laser_on=bool(rng.integers(2)))
+
+
+@pytest.fixture(scope='module')
+def ensembles(module):
+    """
+    Saves random ensembles with 10^3 to 10^6 elements including repetitions and returns them.
+    """
+    rng = np.random.default_rng(0)
+    created = dict()
+    for exponent in range(3, 7):
+        blocks = list()
+        for ii, (number_of_elements, reps) in enumerate([(100, 10 ** (exponent - 2) - 1), (7, 0)]):
+            block = PulseBlock(name='analysis_{0:d}_{1:d}'.format(exponent, ii))
+            for _ in range(number_of_elements):
+                block.append(_element(rng, length=rng.uniform(0, 1e-6),
+                                      increment=rng.choice([0, 1.3e-9])))
+            module.save_block(block)
+            blocks.append((block.name, reps))
+        ensemble = PulseBlockEnsemble(name='analysis_{0:d}'.format(exponent), block_list=blocks)
+        created[10 ** exponent + 7] = ensemble
+    yield created
+    for ensemble in created.values():
+        for block_name, _ in ensemble:
+            module.delete_block(block_name)
+
+
+@pytest.mark.parametrize('gate_channel, laser_channel', [('d_ch2', 'd_ch1'), ('', 'a_ch1')])
+def test_analysis_matches_loop(module, ensembles, monkeypatch, gate_channel, laser_channel):
+    """
+    The vectorized analysis returns exactly the results of the former element by element loop,
+    for a digital and an analog (laser_on flag) laser channel.
+    """
+    monkeypatch.setitem(module._generation_parameters, 'gate_channel', gate_channel)
+    monkeypatch.setitem(module._generation_parameters, 'laser_channel', laser_channel)
+    ensemble = ensembles[10 ** 4 + 7]
+    info = module.analyze_block_ensemble(ensemble)
+    lengths, rising, laser_rising, ideal_length = _loop_analyze_block_ensemble(
+        module, ensemble, gate_channel if gate_channel else laser_channel)
+    np.testing.assert_array_equal(info['elements_length_bins'], lengths)
+    assert info['number_of_elements'] == len(lengths)
+    assert info['number_of_samples'] == lengths.sum()
+    assert info['ideal_length'] == ideal_length
+    for chnl, bins in rising.items():
+        np.testing.assert_array_equal(info['digital_rising_bins'][chnl], bins)
+    np.testing.assert_array_equal(info['laser_rising_bins'], laser_rising)
+    assert info['generation_parameters']['gate_channel'] == gate_channel
+
+    # the memoized result is returned for an unchanged ensemble only
+    assert module.analyze_block_ensemble(ensemble)['elements_length_bins'] is \
+        info['elements_length_bins']
+    block = module.get_block(ensemble[0][0])
+    block.append(block[0])
+    try:
+        assert module.analyze_block_ensemble(ensemble)['number_of_elements'] == \
+            info['number_of_elements'] + ensemble[0][1] + 1
+    finally:
+        block.pop()
+
+
+@pytest.mark.benchmark
+def test_analysis_benchmark(module, ensembles):
+    """
+    Compares the element by element loop with the vectorized analysis (first call) and the
+    memoized result (repeated call) for ensembles with 10^3 to 10^6 elements.
+    """
+    parameters = module.generation_parameters
+    laser_channel = parameters['gate_channel'] if parameters['gate_channel'] else \
+        parameters['laser_channel']
+    for number_of_elements, ensemble in ensembles.items():
+        module._ensemble_info_cache.clear()
+        durations = list()
+        for analyze in (lambda: _loop_analyze_block_ensemble(module, ensemble, laser_channel),
+                        lambda: module.analyze_block_ensemble(ensemble),
+                        lambda: module.analyze_block_ensemble(ensemble)):
+            start = time.perf_counter()
+            analyze()
+            durations.append(time.perf_counter() - start)
+        print('Ensemble analysis of {0:d} elements: loop {1:.1f} ms, vectorized {2:.1f} ms, '
+              'memoized {3:.3f} ms'.format(number_of_elements, *(t * 1e3 for t in durations)))
+        assert durations[2] < durations[0]
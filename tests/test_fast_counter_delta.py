@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests and a transfer benchmark for the delta transfer of fast counter
+timetraces through a local RPyC server.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+import pytest
+
+from qudi.util.mutex import Mutex
+from qudi.util.histogram_transfer import HistogramDeltaEncoder, HistogramDeltaDecoder
+from qudi.hardware.dummy.fast_counter_dummy import FastCounterDummy
+from qudi.hardware.interfuse.fast_counter_delta_interfuse import FastCounterDeltaInterfuse
+
+TICKS = 10
+
+
+class FastCounterDummyStandIn(FastCounterDummy):
+    """ FastCounterDummy bypassing the qudi module machinery. Every poll adds Poisson distributed
+    counts of one analysis tick to the accumulated timetrace.
+    """
+    log = logging.getLogger('FastCounterDummyStandIn')
+
+    def __init__(self, shape, counts_per_bin, seed=0):
+        self._gated = len(shape) == 2
+        self._rng = np.random.default_rng(seed)
+        self._counts_per_bin = counts_per_bin
+        self._count_data = np.zeros(shape, dtype='int64')
+        self._sweeps = 0
+
+    def get_data_trace(self):
+        self._count_data += self._rng.poisson(self._counts_per_bin, self._count_data.shape)
+        self._sweeps += 1000
+        return self._count_data.copy(), {'elapsed_sweeps': self._sweeps, 'elapsed_time': None}
+
+
+class FastCounterDeltaInterfuseStandIn(FastCounterDeltaInterfuse):
+    """ FastCounterDeltaInterfuse bypassing the qudi module machinery. """
+    log = logging.getLogger('FastCounterDeltaInterfuseStandIn')
+
+    def __init__(self, fastcounter, compression='zlib'):
+        self._fastcounter = lambda: fastcounter
+        self._encoder = HistogramDeltaEncoder(compression=compression)
+        self._thread_lock = Mutex()
+
+
+@pytest.mark.parametrize('shape, counts_per_bin', [((2 ** 20,), 0.01), ((100, 3000), 0.5)])
+def test_delta_roundtrip(shape, counts_per_bin):
+    """
+    The decoder rebuilds every timetrace exactly, also after it lost its state.
+    """
+    counter = FastCounterDummyStandIn(shape, counts_per_bin)
+    interfuse = FastCounterDeltaInterfuseStandIn(counter)
+    decoder = HistogramDeltaDecoder()
+    encodings = list()
+    for tick in range(TICKS):
+        if tick == TICKS // 2:
+            decoder.reset()
+        packet, sweeps, _ = interfuse.get_data_trace_delta(decoder.sequence)
+        encodings.append(packet[2])
+        np.testing.assert_array_equal(decoder.decode(packet), counter._count_data)
+        assert sweeps == counter._sweeps
+    assert encodings[0] == encodings[TICKS // 2] == 'full'
+    assert set(encodings) - {'full'} == {'sparse' if counts_per_bin < 0.1 else 'dense'}
+
+    # a restarted counter starts from zero again
+    counter._count_data[:] = 0
+    packet, _, _ = interfuse.get_data_trace_delta(decoder.sequence)
+    assert decoder.decode(packet).sum() == counter._count_data.sum()
+
+
+@pytest.fixture
+def rpyc_server():
+    """
+    Fixture for a local RPyC server exposing the module handed over to the returned function.
+    """
+    rpyc = pytest.importorskip('rpyc')
+    from rpyc.utils.server import ThreadedServer
+    servers = list()
+
+    def serve(module):
+        service = type('ModuleService', (rpyc.Service,), {'exposed_module': module})
+        config = {'allow_all_attrs': True, 'allow_pickle': True, 'sync_request_timeout': 60}
+        server = ThreadedServer(service(), hostname='127.0.0.1', port=0, protocol_config=config)
+        threading.Thread(target=server.start, daemon=True).start()
+        while not server.active:
+            time.sleep(0.01)
+        connection = rpyc.connect('127.0.0.1', server.port, config=config)
+        servers.append((server, connection))
+        return connection.root.module
+
+    yield serve
+    for server, connection in servers:
+        connection.close()
+        server.close()
+
+
+@pytest.mark.parametrize('shape, counts_per_bin', [((2 ** 20,), 0.01), ((100, 3000), 0.5)])
+def test_remote_delta_transfer(rpyc_server, shape, counts_per_bin):
+    """
+    Compares bytes and latency per tick of the full timetrace transfer (netobtain) with the delta
+    transfer through a local RPyC connection.
+    """
+    from qudi.util.network import netobtain
+
+    results = dict()
+    for mode in ('full', 'delta'):
+        counter = FastCounterDummyStandIn(shape, counts_per_bin)
+        remote = rpyc_server(FastCounterDeltaInterfuseStandIn(counter))
+        decoder = HistogramDeltaDecoder()
+        transferred = 0
+        start = time.perf_counter()
+        for _ in range(TICKS):
+            if mode == 'full':
+                data, _ = remote.get_data_trace()
+                data = netobtain(data)
+                transferred += data.nbytes
+            else:
+                packet, _, _ = remote.get_data_trace_delta(decoder.sequence)
+                data = decoder.decode(packet)
+                transferred += len(packet[5])
+        latency = (time.perf_counter() - start) / TICKS
+        np.testing.assert_array_equal(data, counter._count_data)
+        results[mode] = (transferred / TICKS, latency)
+    print('Fast counter transfer {0}: full {1[0]:.0f} B/tick in {1[1]:.1f} ms, '
+          'delta {2[0]:.0f} B/tick in {2[1]:.1f} ms'
+          ''.format(shape, (results['full'][0], results['full'][1] * 1e3),
+                    (results['delta'][0], results['delta'][1] * 1e3)))
+    assert results['delta'][0] < results['full'][0]
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the FastComtec MCS6 readout into persistent buffers with a stand-in
+for the DMCS6 DLL and a comparison of readouts per second with the previous readout (new uint32
+array and int64 conversion per call) at 1M-bin records.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import ctypes
+import logging
+import numpy as np
+import pytest
+
+from qudi.hardware.fastcomtec.fastcomtecmcs6 import FastComtec, AcqSettings, AcqStatus
+
+
+class FakeDMCS6:
+    """ Stand-in for the functions of DMCS6.dll used by the FastComtec module. The structures
+    passed by reference are filled like the DLL does and the histogram is copied to the pointer
+    passed to LVGetDat.
+    """
+
+    def __init__(self, number_of_bins, cycles=1):
+        self.range = number_of_bins
+        self.cycles = cycles
+        self.counts = np.zeros(number_of_bins, dtype=np.uint32)
+        self.sweeps = 0
+        self.runtime = 0.
+        self.started = 0
+        self.readouts = 0
+        self._rng = np.random.default_rng(0)
+
+    def GetSettingData(self, setting, nr):
+        setting._obj.range = self.range
+        setting._obj.bitshift = 0
+
+    def GetStatusData(self, status, nr):
+        status._obj.started = self.started
+        status._obj.stevents = self.sweeps
+        status._obj.runtime = self.runtime
+
+    def GetMCSSetting(self, bsetting, nr):
+        bsetting._obj.cycles = self.cycles
+
+    def LVGetDat(self, pointer, nr):
+        np.ctypeslib.as_array(pointer, shape=(self.range,))[:] = self.counts
+        self.readouts += 1
+
+    def Start(self, nr):
+        self.counts[:] = 0
+        self.sweeps = 0
+        self.runtime = 0.
+        self.started = 1
+        return 0
+
+    def Halt(self, nr):
+        self.started = 0
+        return 0
+
+    def Continue(self, nr):
+        self.started = 1
+        return 0
+
+    def acquire(self, sweeps):
+        self.counts += self._rng.poisson(0.01 * sweeps, self.range).astype(np.uint32)
+        self.sweeps += sweeps
+        self.runtime += sweeps * 1e-5
+
+
+class FastComtecStandIn(FastComtec):
+    """ FastComtec with the DLL stand-in, bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('FastComtecStandIn')
+
+    def __init__(self, dll, gated=False):
+        self.dll = dll
+        self.gated = gated
+        self.minimal_binwidth = 0.2e-9
+        self.stopped_or_halt = "stopped"
+        self._dll_buffer = None
+        self._dll_pointer = None
+        self._histogram_buffer = None
+        self._offset = None
+        self._offset_sweeps = 0
+        self._offset_time = 0.
+        self._last_sweeps = None
+
+
+def _previous_get_data_trace(counter):
+    """ Readout as implemented before the persistent buffers (ungated) """
+    setting = AcqSettings()
+    counter.dll.GetSettingData(ctypes.byref(setting), 0)
+    status = AcqStatus()
+    counter.dll.GetStatusData(ctypes.byref(status), 0)
+    data = np.empty((setting.range,), dtype=np.uint32)
+    counter.dll.LVGetDat(data.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32)), 0)
+    return np.int64(data), {'elapsed_sweeps': status.stevents, 'elapsed_time': status.runtime}
+
+
+def test_persistent_readout():
+    """
+    The timetrace is read into the same buffers and the card is only read out for new sweeps.
+    """
+    dll = FakeDMCS6(6400)
+    counter = FastComtecStandIn(dll)
+    counter.start_measure()
+    dll.acquire(100)
+    trace, info_dict = counter.get_data_trace()
+    assert trace.dtype == np.int64
+    np.testing.assert_array_equal(trace, dll.counts)
+    assert info_dict['elapsed_sweeps'] == 100
+    previous_trace, previous_info_dict = _previous_get_data_trace(counter)
+    np.testing.assert_array_equal(trace, previous_trace)
+    assert info_dict == previous_info_dict
+    # do not count the reference readout
+    dll.readouts -= 1
+
+    buffer = counter.get_histogram_buffer()
+    sequence = buffer.sequence
+    assert dll.readouts == 1
+    assert counter.get_data_trace()[0] is trace
+
+    # the elapsed time keeps running without new sweeps, the histogram is not read out
+    dll.runtime += 0.5
+    assert counter.get_histogram_buffer().elapsed_time == dll.runtime
+    assert buffer.sequence == sequence
+    assert dll.readouts == 1
+
+    dll.acquire(50)
+    assert counter.get_histogram_buffer() is buffer
+    assert buffer.sequence == sequence + 2
+    assert dll.readouts == 2
+    np.testing.assert_array_equal(trace, dll.counts)
+    counter.on_deactivate()
+
+
+def test_gated_pause_continue():
+    """
+    Counts of a gated measurement restarted by continue_measure are kept as running offset.
+    """
+    dll = FakeDMCS6(4 * 640, cycles=4)
+    counter = FastComtecStandIn(dll, gated=True)
+    counter.start_measure()
+    dll.acquire(100)
+    before_pause = dll.counts.astype(np.int64).reshape(4, 640)
+    counter.pause_measure()
+    assert counter.get_status() == 3
+    counter.continue_measure()
+    assert not dll.counts.any()
+    dll.acquire(30)
+
+    trace, info_dict = counter.get_data_trace()
+    assert trace.shape == (4, 640)
+    np.testing.assert_array_equal(trace, before_pause + dll.counts.reshape(4, 640))
+    assert info_dict['elapsed_sweeps'] == 130
+
+    counter.stop_measure()
+    counter.start_measure()
+    dll.acquire(10)
+    np.testing.assert_array_equal(counter.get_data_trace()[0], dll.counts.reshape(4, 640))
+    counter.on_deactivate()
+
+
+@pytest.mark.benchmark
+def test_readout_rate():
+    """
+    Compares readouts per second of 1M-bin records with the previous readout.
+    """
+    dll = FakeDMCS6(2 ** 20)
+    counter = FastComtecStandIn(dll)
+    counter.start_measure()
+    dll.acquire(10)
+    calls = 50
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        dll.sweeps += 1
+        _previous_get_data_trace(counter)
+    rate_previous = calls / (time.perf_counter() - start)
+
+    counter.get_data_trace()
+    start = time.perf_counter()
+    for _ in range(calls):
+        dll.sweeps += 1
+        counter.get_data_trace()
+    rate_persistent = calls / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        counter.get_data_trace()
+    rate_unchanged = calls / (time.perf_counter() - start)
+    print('1M bins: {0:.0f} / {1:.0f} / {2:.0f} readouts/s (previous / persistent buffers / '
+          'no new sweeps)'.format(rate_previous, rate_persistent, rate_unchanged))
+    np.testing.assert_array_equal(counter.get_data_trace()[0], dll.counts)
+    assert rate_unchanged > rate_persistent > rate_previous
+    counter.on_deactivate()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the gated convolution derivative pulse extraction and of cutting the
+laser pulses out of ungated timetraces for it.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import logging
+import numpy as np
+
+from qudi.logic.pulsed.pulse_extraction_methods.basic_extraction_methods import BasicPulseExtractor
+
+NUMBER_OF_GATES = 1000
+NUMBER_OF_BINS = 1000
+
+
+class PulsedLogicStandIn:
+    log = logging.getLogger('PulsedLogicStandIn')
+    fast_counter_settings = {'is_gated': True, 'bin_width': 1e-9}
+    sampling_information = dict()
+
+
+def _gated_counts(rng, rising=300, falling=700, counts_per_gate=5.):
+    """ Gated count data like the fast counter dummy delivers: a laser pulse with an exponential
+    decay of the fluorescence on a small background for every gate.
+    """
+    bins = np.arange(NUMBER_OF_BINS)
+    rate = np.full(NUMBER_OF_BINS, 0.02)
+    pulse = (bins >= rising) & (bins < falling)
+    rate[pulse] += 1 + 0.3 * np.exp(-(bins[pulse] - rising) / 50)
+    rate *= counts_per_gate / rate.sum() * NUMBER_OF_BINS / 10
+    return rng.poisson(rate, (NUMBER_OF_GATES, NUMBER_OF_BINS)).astype('int64')
+
+
+def test_gated_flanks():
+    """
+    The laser pulses are cut out between the steepest rising and falling flank of all gates.
+    """
+    rng = np.random.default_rng(0)
+    extractor = BasicPulseExtractor(PulsedLogicStandIn())
+    for rising, falling in ((300, 700), (302, 703), (550, 900)):
+        data = _gated_counts(rng, rising, falling)
+        result = extractor.gated_conv_deriv(data, conv_std_dev=10.)
+        assert abs(result['laser_indices_rising'] - rising) <= 5
+        assert abs(result['laser_indices_falling'] - falling) <= 5
+        np.testing.assert_array_equal(
+            result['laser_counts_arr'],
+            data[:, result['laser_indices_rising']:result['laser_indices_falling']])
+
+    # no flanks in empty data
+    data = np.zeros((NUMBER_OF_GATES, NUMBER_OF_BINS), dtype='int64')
+    result = extractor.gated_conv_deriv(data, conv_std_dev=10.)
+    assert result['laser_counts_arr'].shape == data.shape
+    assert not result['laser_counts_arr'].any()
+
+
+def test_ungated_laser_windows():
+    """
+    The laser windows cut out of an ungated timetrace equal the ones of the element by element
+    loop.
+    """
+    rng = np.random.default_rng(1)
+    logic = PulsedLogicStandIn()
+    laser_rising_bins = np.arange(20) * 3000 + 1000
+    logic.sampling_information = {'pulse_generator_settings': {'sample_rate': 1e9},
+                                  'laser_rising_bins': laser_rising_bins,
+                                  'laser_falling_bins': laser_rising_bins + 1500}
+    count_data = rng.poisson(1., 20 * 3000 + 2000)
+    extractor = BasicPulseExtractor(logic)
+    result = extractor.ungated_gated_conv_deriv(count_data, conv_std_dev=10., delay=100e-9,
+                                                safety=200e-9)
+
+    laser_pulses = np.empty((20, 1900))
+    for ii in range(20):
+        laser_pulses[ii][:] = count_data[np.arange(laser_rising_bins[ii] - 100,
+                                                   laser_rising_bins[ii] + 1800)]
+    expected = extractor.gated_conv_deriv(laser_pulses, conv_std_dev=10.)
+    assert result['laser_indices_rising'] == expected['laser_indices_rising']
+    assert result['laser_indices_falling'] == expected['laser_indices_falling']
+    np.testing.assert_array_equal(result['laser_counts_arr'], expected['laser_counts_arr'])
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the memory-mapped histogram buffer of fast counters and of the fast
+counter dummy synthesizing laser pulses into it, including a comparison of reading the timetrace
+by get_data_trace (copy) and by buffer view at a large record length.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import pickle
+import types
+import logging
+import numpy as np
+import pytest
+
+from qudi.util.histogram_buffer import HistogramBuffer
+from qudi.hardware.dummy.fast_counter_dummy import FastCounterDummy
+
+
+class FastCounterDummyStandIn(FastCounterDummy):
+    """ FastCounterDummy synthesizing laser pulses, bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('FastCounterDummyStandIn')
+
+    def __init__(self, gated=False, laser_pulses=10):
+        self._gated = gated
+        self.trace_path = None
+        self._synthesize_trace = True
+        self._laser_pulses = laser_pulses
+        self._laser_length = 3e-6
+        self._count_rate = 2e5
+        self._dark_count_rate = 1e3
+        self._sweeps_per_update = 1000
+        self.on_activate()
+
+
+@pytest.fixture
+def buffer():
+    buffer = HistogramBuffer.create((3, 100))
+    yield buffer
+    buffer.close()
+
+
+def test_views_and_sequence(buffer):
+    """
+    Readers see the written counts through views and the sequence number is odd while writing.
+    """
+    view, info_dict = buffer.read()
+    assert view.shape == (3, 100)
+    assert info_dict['elapsed_sweeps'] is None and info_dict['elapsed_time'] is None
+    assert buffer.sequence == 0
+
+    with buffer.writing(elapsed_sweeps=5, elapsed_time=0.25) as histogram:
+        assert buffer.sequence % 2 == 1
+        histogram[1, 10] += 7
+    assert buffer.sequence == 2
+    assert view[1, 10] == 7
+    assert buffer.read()[1] == {'elapsed_sweeps': 5, 'elapsed_time': 0.25, 'sequence': 2}
+
+    copy, info_dict = buffer.snapshot()
+    assert not np.shares_memory(copy, view)
+    np.testing.assert_array_equal(copy, view)
+
+    buffer.clear()
+    assert not view.any()
+    assert buffer.elapsed_sweeps is None
+
+
+def test_attach_by_pickle(buffer):
+    """
+    Pickled buffers (e.g. obtained through RPyC) attach to the same file instead of copying.
+    """
+    attached = pickle.loads(pickle.dumps(buffer))
+    assert attached.path == buffer.path
+    with buffer.writing(elapsed_sweeps=1) as histogram:
+        histogram[2, 99] = 3
+    assert attached.histogram[2, 99] == 3
+    assert attached.elapsed_sweeps == 1
+    attached.close()
+    # only the creating buffer deletes the file
+    assert os.path.exists(buffer.path)
+    path = buffer.path
+    buffer.close()
+    assert not os.path.exists(path)
+
+
+def test_dummy_synthesized_pulses():
+    """
+    The dummy accumulates equally spaced laser pulses (ungated) or one pulse per gate (gated).
+    """
+    counter = FastCounterDummyStandIn()
+    counter._sweeps_per_update = 100000
+    bin_width, _, _ = counter.configure(1e-9, 50e-6)
+    buffer = counter.get_histogram_buffer()
+    counter.statusvar = 2
+    for _ in range(3):
+        assert counter.get_histogram_buffer() is buffer
+    histogram, info_dict = buffer.read()
+    assert info_dict['elapsed_sweeps'] == 300000
+    assert info_dict['elapsed_time'] == pytest.approx(300000 * histogram.size * bin_width)
+    # 10 laser pulses of 3 us, detected as rising edges
+    bright = np.convolve(histogram, np.ones(10), mode='valid') > 100
+    assert np.count_nonzero(np.diff(bright.astype(int)) == 1) == 10
+
+    data, info_dict = counter.get_data_trace()
+    assert not np.shares_memory(data, histogram)
+    assert info_dict['elapsed_sweeps'] == 400000
+    counter.on_deactivate()
+
+    counter = FastCounterDummyStandIn(gated=True)
+    counter.configure(1e-9, 5e-6, number_of_gates=4)
+    counter.statusvar = 2
+    histogram, _ = counter.get_histogram_buffer().read()
+    assert histogram.shape == (4, counter._gate_length_bins)
+    assert (histogram[:, 1000:3000].sum(axis=1) > histogram[:, :500].sum(axis=1) * 10).all()
+    counter.on_deactivate()
+
+
+@pytest.mark.benchmark
+def test_read_throughput():
+    """
+    Compares the time per tick of reading a 10^7 bins timetrace by get_data_trace (copy) with
+    reading views of the histogram buffer.
+    """
+    counter = FastCounterDummyStandIn()
+    counter.configure(1e-9, 1e-2)
+    counter.statusvar = 2
+    assert counter._gate_length_bins == 10 ** 7
+    ticks = 5
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        data, _ = counter.get_data_trace()
+    t_copy = (time.perf_counter() - start) / ticks
+
+    buffer = counter.get_histogram_buffer()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        histogram, _ = counter.get_histogram_buffer().read()
+    t_view = (time.perf_counter() - start) / ticks
+    assert counter.get_histogram_buffer() is buffer
+
+    # reading without accumulating new sweeps
+    start = time.perf_counter()
+    for _ in range(ticks):
+        histogram, _ = buffer.read()
+    t_read = (time.perf_counter() - start) / ticks
+    print('10^7 bins per tick: get_data_trace {0:.1f} ms, buffer update + view {1:.1f} ms, '
+          'view only {2:.3f} ms'.format(t_copy * 1e3, t_view * 1e3, t_read * 1e3))
+    assert t_view < t_copy
+    assert t_read < t_copy / 100
+    counter.on_deactivate()
+
+
+def test_delete_mapped_file(monkeypatch):
+    """
+    Buffer files that can not be deleted on close (still mapped on Windows) are deleted as soon as
+    another buffer is created or closed.
+    """
+    buffer = HistogramBuffer.create(10)
+    path = buffer.path
+    remove = os.remove
+
+    def remove_mapped(file_path):
+        if file_path == path:
+            raise PermissionError('File still mapped')
+        remove(file_path)
+
+    monkeypatch.setattr(os, 'remove', remove_mapped)
+    buffer.close()
+    assert os.path.exists(path)
+    monkeypatch.setattr(os, 'remove', remove)
+    other = HistogramBuffer.create(10)
+    assert not os.path.exists(path)
+    other.close()
+    assert not os.path.exists(other.path)
+
+
+def test_logic_falls_back_for_remote_buffer(monkeypatch):
+    """
+    The pulsed measurement logic falls back to transferring the timetrace if the buffer of the
+    fast counter can not be attached, e.g. if the fast counter runs on another computer.
+    """
+    import qudi.logic.pulsed.pulsed_measurement_logic as logic_module
+
+    remote = HistogramBuffer.create(10)
+    remote_path = remote.path
+    remote.close()
+    assert not os.path.exists(remote_path)
+
+    class FastCounterStandIn:
+        calls = 0
+
+        def get_histogram_buffer(self):
+            self.calls += 1
+            return remote
+
+    fastcounter = FastCounterStandIn()
+    logic = types.SimpleNamespace(_fastcounter=lambda: fastcounter,
+                                  _histogram_buffer=None,
+                                  _histogram_buffer_sequence=None,
+                                  _histogram_buffer_failed_path=None,
+                                  log=logging.getLogger('PulsedLogicStandIn'))
+    # remote objects are pickled and attached by path
+    monkeypatch.setattr(logic_module, 'netobtain', lambda obj: pickle.loads(pickle.dumps(obj)))
+    get_data = logic_module.PulsedMeasurementLogic._get_histogram_buffer_data
+    assert get_data(logic) is None
+    assert get_data(logic) is None
+    assert fastcounter.calls == 2 and logic._histogram_buffer is None
+
+    local = HistogramBuffer.create(10)
+    remote = local
+    with local.writing(elapsed_sweeps=3) as histogram:
+        histogram += 1
+    fc_data, info_dict = get_data(logic)
+    assert fc_data.shape == (10,) and info_dict['elapsed_sweeps'] == 3
+    # the raw data is a copy, not changed by the hardware writing or clearing the buffer
+    assert not np.shares_memory(fc_data, local.histogram)
+    local.clear()
+    np.testing.assert_array_equal(fc_data, 1)
+    logic._histogram_buffer.close()
+    local.close()
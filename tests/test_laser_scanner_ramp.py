@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests comparing the voltage ramps of the laser scanner logic with the previous
+ramp generation (sums over the smoothing steps and np.vstack of the scan line).
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import logging
+import numpy as np
+import pytest
+
+from qudi.logic.laser_scanner_logic import LaserScannerLogic
+
+SCANNER_POSITION = [1e-6, 2e-6, 3e-6, 0.]
+
+
+class ScannerStandIn:
+    def get_scanner_position(self):
+        return SCANNER_POSITION
+
+
+class LaserScannerStandIn(LaserScannerLogic):
+    """ LaserScannerLogic bypassing the qudi module machinery. """
+    log = logging.getLogger('LaserScannerStandIn')
+
+    def __init__(self, clock_frequency, smoothing_steps):
+        self._clock_frequency = float(clock_frequency)
+        self._smoothing_steps = smoothing_steps
+        self._scanning_device = ScannerStandIn()
+        self._ramp_cache = dict()
+
+
+def _previous_ramp(voltage1, voltage2, speed, clock_frequency, smoothing_steps):
+    """ Ramp generation as implemented before the closed form ramp """
+    v_min = min(voltage1, voltage2)
+    v_max = max(voltage1, voltage2)
+
+    if v_min == v_max:
+        ramp = np.array([v_min, v_max])
+    else:
+        linear_v_step = speed / clock_frequency
+        smoothing_range = smoothing_steps + 1
+        v_range_of_accel = sum(
+            n * linear_v_step / smoothing_range for n in range(0, smoothing_range)
+        )
+        v_min_linear = v_min + v_range_of_accel
+        v_max_linear = v_max - v_range_of_accel
+
+        if v_min_linear > v_max_linear:
+            num_of_linear_steps = int(np.rint((v_max - v_min) / linear_v_step))
+            ramp = np.linspace(v_min, v_max, num_of_linear_steps)
+        else:
+            num_of_linear_steps = int(np.rint((v_max_linear - v_min_linear) / linear_v_step))
+            smooth_curve = np.array(
+                [sum(
+                    n * linear_v_step / smoothing_range for n in range(1, N)
+                ) for N in range(1, smoothing_range)
+                ])
+            accel_part = v_min + smooth_curve
+            decel_part = v_max - smooth_curve[::-1]
+            linear_part = np.linspace(v_min_linear, v_max_linear, num_of_linear_steps)
+            ramp = np.hstack((accel_part, linear_part, decel_part))
+
+    if voltage2 < voltage1:
+        ramp = ramp[::-1]
+
+    spatial_pos = SCANNER_POSITION
+    return np.vstack((
+        np.ones((len(ramp), )) * spatial_pos[0],
+        np.ones((len(ramp), )) * spatial_pos[1],
+        np.ones((len(ramp), )) * spatial_pos[2],
+        ramp
+    ))
+
+
+@pytest.mark.parametrize('voltage1, voltage2, speed, clock_frequency, smoothing_steps', [
+    (-10, 10, 10, 500, 10),
+    (10, -10, 10, 500, 10),
+    (-1.5, 3.25, 2, 1000, 0),
+    (0, 1, 5, 100, 1),
+    (0, 0.5, 50, 100, 20),  # too short for smoothing, linear ramp
+    (2, 2, 10, 500, 10),
+])
+def test_ramp_matches_previous(voltage1, voltage2, speed, clock_frequency, smoothing_steps):
+    """
+    The closed form ramp equals the ramp of the previous implementation.
+    """
+    logic = LaserScannerStandIn(clock_frequency, smoothing_steps)
+    scan_line = logic._generate_ramp(voltage1, voltage2, speed)
+    previous = _previous_ramp(voltage1, voltage2, speed, clock_frequency, smoothing_steps)
+    assert scan_line.shape == previous.shape
+    np.testing.assert_allclose(scan_line, previous, rtol=0, atol=1e-12)
+
+
+def test_ramp_cache():
+    """
+    Ramps are cached per parameters and regenerated if a parameter changes.
+    """
+    logic = LaserScannerStandIn(500, 10)
+    scan_line = logic._generate_ramp(-10, 10, 10)
+    assert logic._generate_ramp(-10, 10, 10) is scan_line
+    logic._smoothing_steps = 5
+    changed = logic._generate_ramp(-10, 10, 10)
+    assert changed is not scan_line
+    np.testing.assert_allclose(changed, _previous_ramp(-10, 10, 10, 500, 5), rtol=0, atol=1e-12)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains waveform transfer tests for the LeCroy scope hardware module against a local
+socket stand-in speaking the LeCroy VICP protocol.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import socket
+import struct
+import logging
+import threading
+import numpy as np
+import pytest
+
+import qudi.hardware.local.lecroy_scope as lecroy_module
+from qudi.interface.scope_interface import ScopeInterface
+from qudi.util.mutex import Mutex
+
+DATA_FLAG = 0x80
+EOI_FLAG = 0x81
+FRAME_SIZE = 2 ** 16
+VERTICAL_GAIN = 2.5e-4
+VERTICAL_OFFSET = 0.1
+
+
+class LecroyVICPStandIn:
+    """
+    Minimal stand-in for a LeCroy scope on a local socket. Serves synthetic 16-bit waveforms
+    framed like the VICP protocol of the scope and answers INSPECT? queries.
+    """
+
+    def __init__(self, waveforms, segments=1):
+        self.waveforms = waveforms
+        self.segments = segments
+        self.commands = list()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def inspect_count(self, name):
+        return sum(1 for command in self.commands if 'INSPECT?' in command and name in command)
+
+    def close(self):
+        self._server.close()
+        self._thread.join(timeout=5)
+
+    @staticmethod
+    def _frame(flag, payload):
+        return struct.pack('>B3BI', flag, 1, 0, 0, len(payload)) + payload
+
+    def _recv_exact(self, conn, length):
+        data = bytearray()
+        while len(data) < length:
+            chunk = conn.recv(length - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return bytes(data)
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        try:
+            while True:
+                length = struct.unpack('>I', self._recv_exact(conn, 8)[4:])[0]
+                command = self._recv_exact(conn, length).decode('ascii')
+                self.commands.append(command)
+                channel = command.split(':')[0]
+                if ':WF?' in command:
+                    data = self.waveforms[channel].astype('<i2').tobytes()
+                    conn.sendall(self._frame(DATA_FLAG, '{0}:WF DAT1,'.format(channel).encode()))
+                    conn.sendall(self._frame(DATA_FLAG, '#9{0:09d}'.format(len(data)).encode()))
+                    view = memoryview(data)
+                    for start in range(0, len(data), FRAME_SIZE):
+                        conn.sendall(self._frame(DATA_FLAG, view[start:start + FRAME_SIZE]))
+                    conn.sendall(self._frame(EOI_FLAG, b'\n'))
+                elif 'INSPECT?' in command:
+                    name = command.split('"')[1]
+                    if name == 'VERTUNIT':
+                        value = 'Unit Name = V'
+                    else:
+                        value = {'VERTICAL_GAIN': VERTICAL_GAIN,
+                                 'VERTICAL_OFFSET': VERTICAL_OFFSET,
+                                 'SUBARRAY_COUNT': self.segments}[name]
+                        value = '{0:<20}: {1}'.format(name, value)
+                    answer = '{0}:INSP "{1}"\n'.format(channel, value)
+                    conn.sendall(self._frame(EOI_FLAG, answer.encode('ascii')))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+
+class LecroyStandIn(lecroy_module.Lecroy):
+    """ Lecroy bypassing the qudi module machinery, connected to the local stand-in.
+    """
+    log = logging.getLogger('LecroyStandIn')
+
+    def __init__(self, port):
+        self.threadlock = Mutex()
+        self._vertical_cache = dict()
+        self._comm_format = None
+        self.s = socket.create_connection(('127.0.0.1', port))
+
+
+def _waveforms(channels, number_of_points):
+    rng = np.random.default_rng(42)
+    return {ch: rng.integers(-32768, 32768, number_of_points, dtype=np.int16) for ch in channels}
+
+
+@pytest.fixture
+def scope_factory():
+    servers = list()
+    scopes = list()
+
+    def create(waveforms, segments=1):
+        server = LecroyVICPStandIn(waveforms, segments)
+        scope = LecroyStandIn(server.port)
+        servers.append(server)
+        scopes.append(scope)
+        return scope, server
+
+    yield create
+    for scope in scopes:
+        scope.s.close()
+    for server in servers:
+        server.close()
+
+
+def test_vertical_properties_are_cached(scope_factory):
+    """
+    Gain, offset and unit are queried once per channel until a setting of that channel changes.
+    """
+    waveforms = _waveforms(('C1',), 1000)
+    scope, server = scope_factory(waveforms)
+    for _ in range(3):
+        unit, data = scope.getDataFloats('C1')
+    assert unit == 'V'
+    np.testing.assert_allclose(data, VERTICAL_GAIN * waveforms['C1'] - VERTICAL_OFFSET)
+    assert server.inspect_count('VERTICAL_GAIN') == 1
+    assert [cmd for cmd in server.commands if cmd.startswith('CFMT')] == ['CFMT DEF9,WORD,BIN']
+
+    scope.send('C1:VDIV 0.5')
+    scope.getDataFloats('C1')
+    assert server.inspect_count('VERTICAL_GAIN') == 2
+
+
+def test_segment_readout(scope_factory):
+    """
+    Reads sequence mode segments of two channels one after the other.
+    """
+    segments = 8
+    waveforms = _waveforms(('C1', 'C2'), segments * 1000)
+    scope, server = scope_factory(waveforms, segments=segments)
+    result = scope.getSegmentFloats(channels=('C1', 'C2'))
+    for channel in ('C1', 'C2'):
+        unit, data = result[channel]
+        assert data.shape == (segments, 1000)
+        np.testing.assert_allclose(data.ravel(),
+                                   VERTICAL_GAIN * waveforms[channel] - VERTICAL_OFFSET)
+
+
+def test_default_segment_readout(scope_factory):
+    """
+    Scopes without sequence mode support return every channel as a single segment.
+    """
+    waveforms = _waveforms(('C1', 'C2'), 1000)
+    scope, server = scope_factory(waveforms)
+    result = ScopeInterface.getSegmentFloats(scope, channels=('C1', 'C2'))
+    for channel in ('C1', 'C2'):
+        unit, data = result[channel]
+        assert data.shape == (1, 1000)
+        np.testing.assert_allclose(data[0], VERTICAL_GAIN * waveforms[channel] - VERTICAL_OFFSET)
+
+
+@pytest.mark.parametrize('number_of_points', [1000000, 10000000])
+def test_transfer_throughput(scope_factory, number_of_points):
+    """
+    Transfers long 16-bit traces and prints the throughput of getDataWords and getDataFloats.
+    """
+    waveforms = _waveforms(('C1',), number_of_points)
+    scope, _ = scope_factory(waveforms)
+    start = time.perf_counter()
+    words = scope.getDataWords('C1')
+    words_time = time.perf_counter() - start
+    np.testing.assert_array_equal(words, waveforms['C1'])
+
+    scope.getDataFloats('C1')
+    start = time.perf_counter()
+    scope.getDataFloats('C1')
+    floats_time = time.perf_counter() - start
+    megabytes = 2 * number_of_points / 1e6
+    print('LeCroy transfer of {0:d} points: getDataWords {1:.1f} MB/s, getDataFloats {2:.1f} MB/s'
+          ''.format(number_of_points, megabytes / words_time, megabytes / floats_time))
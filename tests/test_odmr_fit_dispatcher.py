@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the fit dispatcher used by the ODMR logic to fit several channels and
+frequency ranges in worker processes with warm starts, and a comparison of fit throughput and scan
+loop jitter with fits in the scan loop using data of the finite sampling input dummy.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import numpy as np
+import pytest
+
+from qudi.util.fit_dispatcher import FitDispatcher, fit_model
+from qudi.util.fit_models.lorentzian import Lorentzian
+from qudi.hardware.dummy.finite_sampling_input_dummy import FiniteSamplingInputDummy
+
+CHANNELS = ('APD counts', 'Photodiode', 'ch3', 'ch4')
+RANGES = 3
+POINTS = 101
+
+
+class FiniteSamplingInputDummyStandIn(FiniteSamplingInputDummy):
+    """ FiniteSamplingInputDummy simulating ODMR frames, bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('FiniteSamplingInputDummyStandIn')
+
+    def __init__(self):
+        self._active_channels = frozenset(CHANNELS)
+
+    def simulate_line(self):
+        """ One simulated ODMR sweep per frequency range """
+        lines = list()
+        for _ in range(RANGES):
+            self._FiniteSamplingInputDummy__simulate_odmr(POINTS)
+            lines.append(self._FiniteSamplingInputDummy__simulated_samples)
+        return {ch: [line[ch] for line in lines] for ch in CHANNELS}
+
+
+def _averaged_lines(number_of_lines):
+    """ Signal averaged over the lines of the dummy after each line """
+    dummy = FiniteSamplingInputDummyStandIn()
+    sums = {ch: np.zeros((RANGES, POINTS)) for ch in CHANNELS}
+    for line_index in range(number_of_lines):
+        for ch, ranges in dummy.simulate_line().items():
+            sums[ch] += ranges
+        yield {ch: sums[ch] / (line_index + 1) for ch in CHANNELS}
+
+
+def _submit_all(dispatcher, model, x, signal, force=False):
+    futures = list()
+    for ch in CHANNELS:
+        for range_index in range(RANGES):
+            future = dispatcher.submit((ch, range_index), 'Lorentzian Dip', model, 'Dip', None, x,
+                                       signal[ch][range_index], force=force)
+            if future is not None:
+                futures.append(future)
+    return futures
+
+
+def test_warm_start_and_skipping():
+    """
+    Warm-started fits need fewer evaluations and give the same result. Fits of data that did not
+    change enough and of keys with a running fit are skipped.
+    """
+    model = Lorentzian()
+    x = np.arange(POINTS, dtype=float)
+    signals = list(_averaged_lines(20))
+    cold = fit_model(model, 'Dip', None, x, signals[-1]['APD counts'][0])
+
+    dispatcher = FitDispatcher(max_workers=0, change_threshold=1e-3)
+    first = dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                              signals[-2]['APD counts'][0]).result()
+    warm = dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                             signals[-1]['APD counts'][0]).result()
+    assert warm.nfev < first.nfev
+    assert warm.best_values['center'] == pytest.approx(cold.best_values['center'], abs=0.01)
+    assert warm.high_res_best_fit[0].size == 10 * POINTS
+
+    # unchanged data
+    assert dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                             signals[-1]['APD counts'][0]) is None
+    assert dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                             signals[-1]['APD counts'][0], force=True) is not None
+    dispatcher.shutdown()
+
+    dispatcher = FitDispatcher(max_workers=1)
+    try:
+        future = dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                                   signals[0]['APD counts'][0])
+        assert dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x,
+                                 signals[1]['APD counts'][0]) is None
+        result = future.result(timeout=30)
+        # results are pickled back from the worker process
+        assert result.model.name == model.name
+        assert result.high_res_best_fit[1].size == 10 * POINTS
+    finally:
+        dispatcher.shutdown(wait=True)
+
+
+def test_manual_fits_and_record():
+    """
+    Fits without warm start begin at the estimator, also with a previous (e.g. wrong) result of
+    the key. Recorded results are used for the following warm starts.
+    """
+    model = Lorentzian()
+    x = np.arange(POINTS, dtype=float)
+    signals = list(_averaged_lines(20))
+    data = signals[-1]['APD counts'][0]
+    cold = fit_model(model, 'Dip', None, x, data)
+
+    dispatcher = FitDispatcher(max_workers=0)
+    wrong = fit_model(model, 'Dip', None, x, data)
+    wrong.params['center'].set(value=x[0])
+    dispatcher.record('key', 'Lorentzian Dip', x, signals[-2]['APD counts'][0], wrong)
+    manual = dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x, data, force=True,
+                               warm_start=False).result()
+    assert manual.nfev == cold.nfev
+    assert manual.best_values['center'] == cold.best_values['center']
+
+    dispatcher.record('key', 'Lorentzian Dip', x, signals[-2]['APD counts'][0], cold)
+    warm = dispatcher.submit('key', 'Lorentzian Dip', model, 'Dip', None, x, data).result()
+    assert warm.nfev < cold.nfev
+    dispatcher.shutdown()
+
+
+def test_throughput_and_jitter():
+    """
+    Compares the fit throughput and the scan line durations of fitting all channels and ranges in
+    the scan loop from estimates with dispatching warm-started fits to worker processes.
+    """
+    model = Lorentzian()
+    x = np.arange(POINTS, dtype=float)
+    signals = list(_averaged_lines(30))
+
+    # previous behaviour: every fit estimated from scratch in the scan loop
+    line_times = list()
+    start = time.perf_counter()
+    for signal in signals:
+        line_start = time.perf_counter()
+        for ch in CHANNELS:
+            for range_index in range(RANGES):
+                fit_model(model, 'Dip', None, x, signal[ch][range_index])
+        line_times.append(time.perf_counter() - line_start)
+    fits_per_s_loop = len(signals) * len(CHANNELS) * RANGES / (time.perf_counter() - start)
+    line_times_loop = np.array(line_times)
+
+    dispatcher = FitDispatcher(max_workers=4, change_threshold=1e-3)
+    try:
+        # start the worker processes
+        for future in _submit_all(dispatcher, model, x, signals[0], force=True):
+            future.result(timeout=30)
+        # all channels and ranges of every line
+        start = time.perf_counter()
+        for signal in signals:
+            for future in _submit_all(dispatcher, model, x, signal, force=True):
+                future.result(timeout=30)
+        fits_per_s_pool = len(signals) * len(CHANNELS) * RANGES / (time.perf_counter() - start)
+
+        dispatcher.reset()
+        line_times = list()
+        futures = list()
+        start = time.perf_counter()
+        for signal in signals:
+            line_start = time.perf_counter()
+            futures.extend(_submit_all(dispatcher, model, x, signal))
+            line_times.append(time.perf_counter() - line_start)
+            # the scan line itself takes some time
+            time.sleep(0.01)
+        results = [future.result(timeout=30) for future in futures]
+        elapsed = time.perf_counter() - start
+    finally:
+        dispatcher.shutdown(wait=True)
+    line_times_pool = np.array(line_times)
+
+    assert all(result.success for result in results)
+    print('{0:d} channels x {1:d} ranges: {2:.0f} / {3:.0f} fits/s (scan loop / warm-started pool), '
+          '{4:d} fits in {5:.2f} s while scanning; line time mean/max {6:.2f}/{7:.2f} ms vs. '
+          '{8:.2f}/{9:.2f} ms'.format(
+              len(CHANNELS), RANGES, fits_per_s_loop, fits_per_s_pool, len(results), elapsed,
+              1e3 * line_times_loop.mean(), 1e3 * line_times_loop.max(),
+              1e3 * line_times_pool.mean(), 1e3 * line_times_pool.max()))
+    assert np.median(line_times_pool) < np.median(line_times_loop)
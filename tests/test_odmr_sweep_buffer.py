@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the preallocated sweep buffer of the ODMR logic and a comparison of
+memory and time per scan line with the previous raw data storage (separate arrays per channel and
+range, rolled by one line per sweep, masked mean) at 10 ranges x 4 channels x 10^4 lines.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import tracemalloc
+import numpy as np
+import pytest
+
+from qudi.util.sweep_buffer import SweepBuffer
+
+CHANNELS = ('APD counts', 'Photodiode', 'ch3', 'ch4')
+
+
+def _previous_scan_line(raw_data, range_sizes, new_counts, scans_to_average=0):
+    """ Raw data update and signal calculation as implemented before the sweep buffer """
+    for ch, range_list in raw_data.items():
+        start = 0
+        for range_index, size in enumerate(range_sizes):
+            range_list[range_index] = np.roll(range_list[range_index], 1, axis=1)
+            tmp = new_counts[ch][start:start + size]
+            range_list[range_index][0:len(tmp), 0] = tmp
+            start += size
+    signal_data = dict()
+    for channel, raw_data_list in raw_data.items():
+        signal_data[channel] = list()
+        for raw in raw_data_list:
+            masked_raw_data = np.ma.masked_invalid(raw)
+            if scans_to_average > 0:
+                masked_raw_data = masked_raw_data[:, :scans_to_average]
+            signal_data[channel].append(np.mean(masked_raw_data, axis=1).compressed())
+    return signal_data
+
+
+def test_views_and_mean():
+    """
+    Lines are stored newest first, the buffer grows and channels/ranges are views.
+    """
+    buffer = SweepBuffer(CHANNELS[:2], (3, 5), lines=2)
+    lines = np.random.default_rng(0).random((5, 2, 8))
+    for line in lines:
+        buffer.add_line(list(line))
+    assert buffer.lines == buffer.sweeps == 5
+    np.testing.assert_array_equal(buffer.data, lines[::-1])
+
+    raw = buffer.split(buffer.data)
+    assert raw['Photodiode'][1].shape == (5, 5)
+    assert np.shares_memory(raw['Photodiode'][1], buffer.data)
+    np.testing.assert_array_equal(raw['Photodiode'][1][:, 0], lines[-1, 1, 3:])
+
+    signal = buffer.split(buffer.mean())
+    np.testing.assert_allclose(signal['APD counts'][0], lines[:, 0, :3].mean(axis=0))
+    np.testing.assert_allclose(buffer.mean(2), lines[-2:].mean(axis=0))
+
+    # shorter frames leave NaN
+    buffer.add_line([np.ones(8), np.ones(6)])
+    assert np.isnan(buffer.data[0, 1, 6:]).all()
+
+
+def test_memory_limit():
+    """
+    At the memory limit the oldest lines are discarded and the mean over all sweeps stays exact.
+    """
+    line_bytes = len(CHANNELS) * 30 * 8
+    buffer = SweepBuffer(CHANNELS, (10, 20), lines=1000, max_bytes=40 * line_bytes)
+    assert buffer.nbytes <= 40 * line_bytes
+    assert buffer.max_lines == 34
+    lines = np.random.default_rng(1).random((200, len(CHANNELS), 30))
+    for line in lines:
+        buffer.add_line(line)
+    assert buffer.nbytes <= 40 * line_bytes
+    assert buffer.sweeps == 200
+    assert buffer.lines == 34
+    np.testing.assert_array_equal(buffer.data, lines[::-1][:34])
+    np.testing.assert_allclose(buffer.mean(), lines.mean(axis=0))
+    np.testing.assert_allclose(buffer.mean(10), lines[-10:].mean(axis=0))
+
+    with pytest.raises(ValueError):
+        SweepBuffer(CHANNELS, (10, 20), max_bytes=3 * line_bytes)
+
+
+def test_short_lines():
+    """
+    Missing points of short lines are left out of the mean instead of making it NaN.
+    """
+    buffer = SweepBuffer(CHANNELS[:1], (4,), lines=1)
+    buffer.add_line([np.array([1., 2, 3, 4])])
+    buffer.add_line([np.array([1., 2])])
+    np.testing.assert_array_equal(buffer.mean(), [[1, 2, 3, 4]])
+    np.testing.assert_array_equal(buffer.mean(1), [[1, 2, np.nan, np.nan]])
+    buffer.add_line([np.array([3., 4, 5])])
+    np.testing.assert_array_equal(buffer.mean(), [[5 / 3, 8 / 3, 4, 4]])
+    np.testing.assert_array_equal(buffer.mean(2), [[2, 3, 5, np.nan]])
+
+
+def test_previous_signal():
+    """
+    The signal of each range equals the one of the previous raw data storage, also when averaging
+    only the latest scans.
+    """
+    range_sizes = (5, 8, 3)
+    number_of_lines = 20
+    rng = np.random.default_rng(3)
+    raw_data = {ch: [np.full((size, number_of_lines), np.nan) for size in range_sizes]
+                for ch in CHANNELS}
+    buffer = SweepBuffer(CHANNELS, range_sizes, lines=4)
+    for _ in range(number_of_lines):
+        frame = {ch: rng.poisson(1000, sum(range_sizes)).astype(float) for ch in CHANNELS}
+        buffer.add_line([frame[ch] for ch in CHANNELS])
+        for scans_to_average in (0, 3):
+            signal_previous = _previous_scan_line(
+                {ch: [raw.copy() for raw in raw_list] for ch, raw_list in raw_data.items()},
+                range_sizes, frame, scans_to_average)
+            signal = buffer.split(buffer.mean(scans_to_average))
+            for ch in CHANNELS:
+                for range_signal, range_signal_previous in zip(signal[ch], signal_previous[ch]):
+                    np.testing.assert_allclose(range_signal, range_signal_previous)
+        _previous_scan_line(raw_data, range_sizes, frame)
+
+
+@pytest.mark.benchmark
+def test_memory_and_line_latency():
+    """
+    Compares memory and time per scan line (storing a line and calculating the signal) with the
+    previous raw data storage for 10 ranges x 4 channels x 10^4 lines.
+    """
+    range_sizes = (50,) * 10
+    points = sum(range_sizes)
+    number_of_lines = 10 ** 4
+    rng = np.random.default_rng(2)
+    frame = {ch: rng.poisson(1000, points).astype(float) for ch in CHANNELS}
+
+    # previous storage with the lines estimated for the run time, measured when filled
+    tracemalloc.start()
+    raw_data = {ch: [np.full((size, number_of_lines), np.nan) for size in range_sizes]
+                for ch in CHANNELS}
+    for ch in CHANNELS:
+        for raw, sl in zip(raw_data[ch], SweepBuffer(CHANNELS, range_sizes).range_slices):
+            raw[...] = frame[ch][sl, np.newaxis]
+    tracemalloc.reset_peak()
+    times = list()
+    for _ in range(3):
+        start = time.perf_counter()
+        signal_previous = _previous_scan_line(raw_data, range_sizes, frame)
+        times.append(time.perf_counter() - start)
+    time_previous = np.median(times)
+    memory_previous = tracemalloc.get_traced_memory()[1]
+    del raw_data
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    buffer = SweepBuffer(CHANNELS, range_sizes, lines=number_of_lines, max_bytes=1e9)
+    times = np.empty(number_of_lines)
+    line = [frame[ch] for ch in CHANNELS]
+    for index in range(number_of_lines):
+        start = time.perf_counter()
+        buffer.add_line(line)
+        signal = buffer.split(buffer.mean())
+        times[index] = time.perf_counter() - start
+    memory_buffer = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    raw = buffer.split(buffer.data)
+
+    print('10 ranges x 4 channels x 10^4 lines: {0:.1f} / {1:.1f} MB peak memory, {2:.2f} / '
+          '{3:.3f} ms per line (previous / sweep buffer, max {4:.3f} ms)'.format(
+              memory_previous / 1e6, memory_buffer / 1e6, time_previous * 1e3,
+              np.median(times) * 1e3, times.max() * 1e3))
+    assert raw['ch4'][9].shape == (50, number_of_lines)
+    np.testing.assert_allclose(signal['ch3'][4], signal_previous['ch3'][4])
+    assert memory_buffer < memory_previous
+    assert np.median(times) < time_previous / 100
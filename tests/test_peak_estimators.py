@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains accuracy tests and a timing benchmark of the closed-form peak estimators used by
+the optimizer against the Gaussian model fits, on synthetic spots of the scanning probe dummy.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+from qudi.hardware.dummy.scanning_probe_dummy import ImageGenerator
+from qudi.util.fit_models.gaussian import Gaussian2D
+from qudi.util.peak_estimators import estimate_gaussian_peak_1d, estimate_gaussian_peak_2d
+
+RESOLUTION = 30
+SIGMA = 300e-9
+AMPLITUDE = 1e5
+SNRS = (3, 30, 100, 1000)
+REPETITIONS = 50
+
+
+def _spot_image(rng, snr):
+    """
+    Single spot rendered with the dummy image generator on a 2 um optimizer window plus white noise
+    and a constant background.
+    """
+    x = np.linspace(0, 2e-6, RESOLUTION)
+    y = np.linspace(0, 2e-6, RESOLUTION)
+    center = rng.uniform(0.7e-6, 1.3e-6, 2)
+    sigmas = rng.normal(SIGMA, 0.1 * SIGMA, 2)
+    grid = np.stack([g.ravel() for g in np.meshgrid(x, y, indexing='ij')], axis=1)
+    image = ImageGenerator._sum_m_gaussian_n_dim(
+        grid, center[np.newaxis, :], sigmas[np.newaxis, :], np.array([AMPLITUDE])
+    ).reshape(RESOLUTION, RESOLUTION)
+    image += 0.1 * AMPLITUDE + rng.normal(0, AMPLITUDE / snr, image.shape)
+    return x, y, image, center
+
+
+def test_noise_free_spot_is_exact():
+    """
+    The linearised estimate recovers a noise-free spot (almost) exactly.
+    """
+    x, y, image, center = _spot_image(np.random.default_rng(0), snr=np.inf)
+    estimate = estimate_gaussian_peak_2d(x, y, image)
+    assert estimate is not None
+    np.testing.assert_allclose((estimate.best_values['center_x'], estimate.best_values['center_y']),
+                               center, atol=1e-3 * SIGMA)
+    x_line = x
+    line = image[:, np.argmin(np.abs(y - center[1]))]
+    estimate = estimate_gaussian_peak_1d(x_line, line)
+    assert estimate is not None
+    assert abs(estimate.best_values['center'] - center[0]) < 1e-3 * SIGMA
+
+
+def test_weak_signal_falls_back_to_fit():
+    """
+    Spots barely above the noise are left to the model fit.
+    """
+    rng = np.random.default_rng(1)
+    for _ in range(REPETITIONS):
+        x, y, image, _ = _spot_image(rng, snr=3)
+        assert estimate_gaussian_peak_2d(x, y, image) is None
+
+
+@pytest.mark.parametrize('snr', SNRS)
+def test_accuracy_and_timing(snr):
+    """
+    Compares position errors and durations of the tiered estimate (with fit fallback) against
+    always fitting. Prints the share of accepted estimates per tier.
+    """
+    rng = np.random.default_rng(snr)
+    model = Gaussian2D()
+    methods = dict()
+    errors = {'estimate': list(), 'fit': list()}
+    durations = {'estimate': 0., 'fit': 0.}
+    for _ in range(REPETITIONS):
+        x, y, image, center = _spot_image(rng, snr)
+        xy = np.meshgrid(x, y, indexing='ij')
+
+        start = time.perf_counter()
+        fit_result = model.fit(image.ravel(), x=xy, **model.estimate_peak(image.ravel(), xy))
+        durations['fit'] += time.perf_counter() - start
+        fit_pos = (fit_result.best_values['center_x'], fit_result.best_values['center_y'])
+        errors['fit'].append(np.hypot(*(np.asarray(fit_pos) - center)))
+
+        start = time.perf_counter()
+        estimate = estimate_gaussian_peak_2d(x, y, image)
+        if estimate is None:
+            result = model.fit(image.ravel(), x=xy, **model.estimate_peak(image.ravel(), xy))
+            method = 'fit'
+        else:
+            result, method = estimate, estimate.method
+        durations['estimate'] += time.perf_counter() - start
+        methods[method] = methods.get(method, 0) + 1
+        pos = (result.best_values['center_x'], result.best_values['center_y'])
+        errors['estimate'].append(np.hypot(*(np.asarray(pos) - center)))
+
+    print('SNR {0:g}: tiers {1}'.format(snr, methods))
+    for key in ('fit', 'estimate'):
+        print('    {0:>8s}: {1:.3f} ms per spot, median error {2:.1f} nm, max error {3:.1f} nm'
+              ''.format(key, durations[key] / REPETITIONS * 1e3, np.median(errors[key]) * 1e9,
+                        np.max(errors[key]) * 1e9))
+    # The tiered estimate must not be noticeably worse than always fitting
+    assert np.median(errors['estimate']) <= 1.5 * np.median(errors['fit']) + 0.01 * SIGMA
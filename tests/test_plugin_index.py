@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for the plugin index of sampling functions and predefined generate
+methods and a benchmark of the cold and warm plugin discovery of SequenceGeneratorLogic.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import sys
+import time
+import logging
+import pytest
+
+from qudi.util.plugin_index import PluginIndex
+from qudi.logic.pulsed.sampling_functions import SamplingFunctions
+from qudi.logic.pulsed.pulse_objects import PulseObjectGenerator
+
+PLUGIN_PACKAGES = ('qudi.logic.pulsed.predefined_generate_methods.',
+                   'qudi.logic.pulsed.sampling_function_defs.')
+
+
+class SequenceGeneratorLogicStandIn:
+    """ Provides the few attributes of SequenceGeneratorLogic used by the PulseObjectGenerator. """
+    log = logging.getLogger('SequenceGeneratorLogicStandIn')
+    predefined_methods_import_path = list()
+    pulse_generator_settings = {'activation_config': ('plugin', {'a_ch1', 'd_ch1', 'd_ch2'}),
+                                'sample_rate': 1e9}
+    generation_parameters = {'laser_channel': 'd_ch1',
+                             'sync_channel': '',
+                             'gate_channel': 'd_ch2',
+                             'analog_trigger_voltage': 0.0,
+                             'laser_delay': 500e-9,
+                             'microwave_channel': 'a_ch1',
+                             'microwave_frequency': 100e6,
+                             'microwave_amplitude': 0.25,
+                             'laser_length': 3e-6,
+                             'wait_time': 1e-6,
+                             'rabi_period': 100e-9}
+
+
+@pytest.fixture
+def plugin_modules():
+    """
+    Removes the plugin modules from sys.modules (to measure their import) and restores them and the
+    sampling functions afterwards.
+    """
+    def unload():
+        for name in [name for name in sys.modules if name.startswith(PLUGIN_PACKAGES)]:
+            del sys.modules[name]
+
+    saved = {name: mod for name, mod in sys.modules.items() if name.startswith(PLUGIN_PACKAGES)}
+    yield unload
+    unload()
+    sys.modules.update(saved)
+    SamplingFunctions.import_sampling_functions(list())
+
+
+def _discover(plugin_index):
+    """ Plugin discovery performed during activation of SequenceGeneratorLogic. """
+    start = time.perf_counter()
+    SamplingFunctions.import_sampling_functions(list(), plugin_index=plugin_index)
+    generator = PulseObjectGenerator(SequenceGeneratorLogicStandIn(), plugin_index=plugin_index)
+    return generator, time.perf_counter() - start
+
+
+def test_lazy_discovery(tmp_path, plugin_modules):
+    """
+    With a valid index the plugin modules are imported on first use only and give the same
+    methods, parameters and results as the eager discovery.
+    """
+    index_path = str(tmp_path / 'plugin_index.json')
+    plugin_modules()
+    eager, _ = _discover(None)
+    eager_sf_parameters = SamplingFunctions.parameters
+    _discover(PluginIndex(index_path))
+    assert os.path.isfile(index_path)
+
+    plugin_modules()
+    lazy, _ = _discover(PluginIndex(index_path))
+    assert not any(name.startswith(PLUGIN_PACKAGES) for name in sys.modules)
+    assert SamplingFunctions.parameters == eager_sf_parameters
+    assert lazy.predefined_method_parameters == eager.predefined_method_parameters
+    assert set(lazy.predefined_generate_methods) == set(eager.predefined_generate_methods)
+
+    # first use imports the module
+    assert SamplingFunctions.Sin(amplitude=0.1).amplitude == 0.1
+    blocks, ensembles, _ = lazy.predefined_generate_methods['rabi']()
+    expected_blocks, expected_ensembles, _ = eager.predefined_generate_methods['rabi']()
+    assert blocks == expected_blocks
+    assert ensembles[0].block_list == expected_ensembles[0].block_list
+
+
+def test_changed_module_is_rescanned(tmp_path):
+    """
+    Modules are imported and scanned again if their file has changed.
+    """
+    module_path = tmp_path / 'plugin_index_test_module.py'
+    module_path.write_text('NAMES = ["a"]\n')
+    sys.path.append(str(tmp_path))
+    try:
+        index = PluginIndex(str(tmp_path / 'plugin_index.json'))
+        scan = lambda mod: list(mod.NAMES)
+        assert index.lookup('plugin_index_test_module', scan, reload=True) == ['a']
+        index.save()
+
+        module_path.write_text('NAMES = ["a", "b"]\n')
+        os.utime(module_path, ns=(0, 0))
+        index = PluginIndex(str(tmp_path / 'plugin_index.json'))
+        assert index.lookup('plugin_index_test_module', scan, reload=True) == ['a', 'b']
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop('plugin_index_test_module', None)
+
+
+def test_changed_helper_is_rescanned(tmp_path):
+    """
+    Modules are imported and scanned again if a helper module they import has changed.
+    """
+    helper_path = tmp_path / 'plugin_index_test_helper.py'
+    helper_path.write_text('NAMES = ["a"]\n')
+    (tmp_path / 'plugin_index_test_module.py').write_text(
+        'from plugin_index_test_helper import NAMES\n')
+    sys.path.append(str(tmp_path))
+    try:
+        index = PluginIndex(str(tmp_path / 'plugin_index.json'))
+        scan = lambda mod: list(mod.NAMES)
+        assert index.lookup('plugin_index_test_module', scan, reload=True) == ['a']
+        index.save()
+
+        helper_path.write_text('NAMES = ["a", "b"]\n')
+        os.utime(helper_path, ns=(0, 0))
+        sys.modules.pop('plugin_index_test_helper', None)
+        sys.modules.pop('plugin_index_test_module', None)
+        index = PluginIndex(str(tmp_path / 'plugin_index.json'))
+        assert index.lookup('plugin_index_test_module', scan, reload=True) == ['a', 'b']
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop('plugin_index_test_helper', None)
+        sys.modules.pop('plugin_index_test_module', None)
+
+
+def test_imported_methods_take_precedence(tmp_path, plugin_modules):
+    """
+    Generate methods of imported modules are not replaced by lazily discovered methods of the same
+    name.
+    """
+    (tmp_path / 'plugin_index_test_plugin.py').write_text(
+        'from qudi.logic.pulsed.pulse_objects import PredefinedGeneratorBase\n'
+        'class PluginGenerator(PredefinedGeneratorBase):\n'
+        '    def activate_plugin(self):\n'
+        '        pass\n'
+        '    def generate_rabi(self, name="plugin"):\n'
+        '        return name\n')
+    index_path = str(tmp_path / 'plugin_index.json')
+    logic = SequenceGeneratorLogicStandIn()
+    logic.predefined_methods_import_path = [str(tmp_path)]
+    try:
+        for _ in range(2):
+            plugin_modules()
+            generator = PulseObjectGenerator(logic, plugin_index=PluginIndex(index_path))
+            assert generator.predefined_generate_methods['rabi']() == 'plugin'
+            assert generator.predefined_method_parameters['rabi'] == {'name': 'plugin'}
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop('plugin_index_test_plugin', None)
+
+
+@pytest.mark.benchmark
+def test_discovery_benchmark(tmp_path, plugin_modules):
+    """
+    Compares plugin discovery without index, with a cold (empty) and a warm index.
+    """
+    index_path = str(tmp_path / 'plugin_index.json')
+    durations = dict()
+    for mode in ('no index', 'cold index', 'warm index'):
+        plugin_modules()
+        plugin_index = None if mode == 'no index' else PluginIndex(index_path)
+        durations[mode] = _discover(plugin_index)[1]
+    print('Plugin discovery: ' + ', '.join(
+        '{0} {1:.1f} ms'.format(mode, duration * 1e3) for mode, duration in durations.items()))
+    assert durations['warm index'] < durations['no index']
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for the interned PulseBlockElements and copy-on-write PulseBlocks and a
+generation benchmark of large predefined dynamical decoupling ensembles.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import copy
+import time
+import pickle
+import logging
+import tracemalloc
+import pytest
+
+from qudi.logic.pulsed.sampling_functions import SamplingFunctions
+from qudi.logic.pulsed.pulse_objects import PulseBlockElement, PulseBlock
+from qudi.logic.pulsed.predefined_generate_methods.dd_predefined_methods import \
+    DDPredefinedGenerator
+
+SamplingFunctions.import_sampling_functions(list())
+
+
+class SequenceGeneratorLogicStandIn:
+    """ Provides the few attributes of SequenceGeneratorLogic used by the predefined methods. """
+    log = logging.getLogger('SequenceGeneratorLogicStandIn')
+    pulse_generator_settings = {
+        'activation_config': ('benchmark', {'a_ch1', 'a_ch2', 'd_ch1', 'd_ch2', 'd_ch3'}),
+        'sample_rate': 1e9}
+    generation_parameters = {'laser_channel': 'd_ch1',
+                             'sync_channel': '',
+                             'gate_channel': 'd_ch2',
+                             'analog_trigger_voltage': 0.0,
+                             'laser_delay': 500e-9,
+                             'microwave_channel': 'a_ch1',
+                             'microwave_frequency': 100e6,
+                             'microwave_amplitude': 0.25,
+                             'laser_length': 3e-6,
+                             'wait_time': 1e-6,
+                             'rabi_period': 100e-9}
+
+
+def _mw_element(phase):
+    return PulseBlockElement(init_length_s=50e-9,
+                             pulse_function={'a_ch1': SamplingFunctions.Sin(amplitude=0.25,
+                                                                            frequency=100e6,
+                                                                            phase=phase)},
+                             digital_high={'d_ch1': False})
+
+
+def test_interned_elements():
+    """
+    Equal elements are stored as one frozen instance, the elements handed over stay editable and
+    are not affected by the block.
+    """
+    element = _mw_element(phase=90)
+    block = PulseBlock('block', element_list=[element])
+    block.append(_mw_element(phase=90))
+    block.append(_mw_element(phase=0))
+    assert block[0] is block[1] and block[0] is not block[2]
+    assert block[0] == element and hash(block[0]) == hash(element)
+    assert block[0].frozen and not element.frozen
+
+    with pytest.raises(AttributeError):
+        block[0].laser_on = True
+    with pytest.raises(TypeError):
+        block[0].pulse_function['a_ch1'] = SamplingFunctions.Idle()
+    element.pulse_function['a_ch1'].phase = 180
+    assert block[0].pulse_function['a_ch1'].phase == 90
+
+    edited = block[0].copy()
+    edited.laser_on = True
+    block[1] = edited
+    assert block[1].laser_on and not block[0].laser_on
+
+    # parameters with equal hashes are still distinct elements
+    assert _mw_element(phase=-1).interned() is not _mw_element(phase=-2).interned()
+
+
+def test_copy_on_write_block():
+    """
+    Copies of a block share the element list until they are changed, pickling restores interned
+    elements.
+    """
+    block = PulseBlock('block', element_list=[_mw_element(phase=0), _mw_element(phase=90)] * 10)
+    block_copy = copy.deepcopy(block)
+    assert block_copy.element_list is block.element_list
+    block_copy.pop()
+    block_copy.append(_mw_element(phase=180))
+    assert len(block) == len(block_copy) == 20
+    assert block[-1].pulse_function['a_ch1'].phase == 90
+    assert block_copy[-1].pulse_function['a_ch1'].phase == 180
+    assert block_copy.init_length_s == pytest.approx(block.init_length_s)
+
+    restored = pickle.loads(pickle.dumps(block))
+    assert restored == block
+    assert restored[0] is block[0]
+
+
+@pytest.mark.parametrize('method, kwargs', [('generate_xy8_tau', {'xy8_order': 320}),
+                                            ('generate_xy8_freq', {'xy8_order': 6})])
+def test_large_dd_ensemble_generation(method, kwargs):
+    """
+    Benchmarks generation time and memory of predefined XY8 ensembles with about 10k pulses.
+    """
+    generator = DDPredefinedGenerator(SequenceGeneratorLogicStandIn())
+    start = time.perf_counter()
+    blocks, ensembles, _ = getattr(generator, method)(num_of_points=50, **kwargs)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    blocks, ensembles, _ = getattr(generator, method)(num_of_points=50, **kwargs)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    block = blocks[0]
+    assert len(block) > 10000
+    assert block.init_length_s == pytest.approx(sum(elem.init_length_s for elem in block))
+    distinct_elements = {id(element) for element in block}
+    print('{0} with {1:d} elements ({2:d} distinct): {3:.0f} ms, {4:.2f} MB'
+          ''.format(method, len(block), len(distinct_elements), duration * 1e3, memory / 1e6))
+    assert len(distinct_elements) <= 7 + 2 * ensembles[0].measurement_information['number_of_lasers']
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests and a tick latency benchmark for the background computation of the
+alternative data (fourier transform) in the pulsed measurement logic.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+from qudi.util.math import compute_ft
+
+MODULE = 'pulsed_measurement_logic'
+
+
+@pytest.fixture(scope='module')
+def module(qudi_instance, qt_app):
+    """
+    Fixture that returns the activated pulsed measurement logic instance.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(MODULE)
+    instance = module_manager.modules[MODULE].instance
+    previous_type = instance.alternative_data_type
+    yield instance
+    instance.set_alternative_data_type(previous_type)
+    module_manager.deactivate_module(MODULE)
+
+
+def _wait_for_alt_data(module, qt_app, timeout=30):
+    stop = time.perf_counter() + timeout
+    while module._alt_data_published_generation != module._alt_data_generation:
+        assert time.perf_counter() < stop, 'Alternative data not computed in time'
+        qt_app.processEvents()
+        time.sleep(0.001)
+
+
+def _set_signal(module, number_of_points, rng):
+    x = np.arange(number_of_points) * 1e-9
+    module.signal_data = np.array([x, np.sin(2 * np.pi * 5e6 * x) + rng.normal(0, 0.1, x.size)])
+
+
+@pytest.mark.parametrize('number_of_points', [10 ** 4, 10 ** 5, 10 ** 6])
+def test_alt_data_tick_latency(module, qt_app, number_of_points):
+    """
+    Compares the time spent in the analysis thread per tick with the alternative FFT plot on and
+    off. With the plot on, the fourier transform is computed in the worker thread and eventually
+    equals the result of compute_ft.
+    """
+    rng = np.random.default_rng(0)
+    latencies = dict()
+    for alt_type in ('None', 'FFT'):
+        module.set_alternative_data_type(alt_type)
+        durations = list()
+        for _ in range(5):
+            _set_signal(module, number_of_points, rng)
+            start = time.perf_counter()
+            module._compute_alt_data()
+            module.signal_alt_data
+            durations.append(time.perf_counter() - start)
+            _wait_for_alt_data(module, qt_app)
+        latencies[alt_type] = np.median(durations)
+
+    settings = module._get_ft_settings()
+    fft_x, fft_y = compute_ft(x_val=module.signal_data[0], y_val=module.signal_data[1],
+                              zeropad_num=settings['zeropad_num'], window=settings['window'],
+                              base_corr=settings['base_corr'], psd=settings['psd'])
+    np.testing.assert_allclose(module.signal_alt_data[0], fft_x)
+    np.testing.assert_allclose(module.signal_alt_data[1], fft_y)
+    print('Pulsed tick latency at {0:d} points: alt. plot off {1:.3f} ms, FFT on {2:.3f} ms'
+          ''.format(number_of_points, latencies['None'] * 1e3, latencies['FFT'] * 1e3))
+
+
+def test_alt_data_latest_wins(module, qt_app):
+    """
+    Requests queued faster than the worker can serve them are skipped, only the latest signal is
+    transformed.
+    """
+    rng = np.random.default_rng(1)
+    module.set_alternative_data_type('FFT')
+    _wait_for_alt_data(module, qt_app)
+    for _ in range(20):
+        _set_signal(module, 10 ** 5, rng)
+        module._compute_alt_data()
+    _wait_for_alt_data(module, qt_app)
+    assert module._alt_data_request is None
+    np.testing.assert_allclose(module.signal_alt_data, module._get_current_alt_data())
+    settings = module._get_ft_settings()
+    fft_y = compute_ft(x_val=module.signal_data[0], y_val=module.signal_data[1],
+                       zeropad_num=settings['zeropad_num'], window=settings['window'],
+                       base_corr=settings['base_corr'], psd=settings['psd'])[1]
+    np.testing.assert_allclose(module.signal_alt_data[1], fft_y)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for the vectorized pulsed analysis methods and the streaming window
+statistics of the pulse analyzer.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import logging
+import numpy as np
+import pytest
+
+from qudi.logic.pulsed.pulse_analyzer import PulseAnalyzer, LaserWindowStatistics
+from qudi.logic.pulsed.pulsed_analysis_methods.basic_analysis_methods import BasicPulseAnalyzer
+
+NUMBER_OF_LASERS = 50
+LASER_LENGTH = 600
+BIN_WIDTH = 1e-9
+WINDOWS = dict(signal_start=10e-9, signal_end=210e-9, norm_start=300e-9, norm_end=500e-9)
+
+
+class PulsedLogicStandIn:
+    """ Provides the few attributes of PulsedMeasurementLogic used by the pulse analyzers. """
+    log = logging.getLogger('PulsedLogicStandIn')
+    analysis_import_path = None
+    analysis_parameters = None
+
+    def __init__(self, empirical_analysis_errors=False, analysis_history_length=0):
+        self.empirical_analysis_errors = empirical_analysis_errors
+        self.analysis_history_length = analysis_history_length
+        self.fast_counter_settings = {'bin_width': BIN_WIDTH, 'is_gated': True}
+        self.elapsed_sweeps = 0
+
+
+def _loop_mean_norm(laser_data, signal_start_bin, signal_end_bin, norm_start_bin, norm_end_bin):
+    """ Per laser pulse loop of analyse_mean_norm before vectorization. """
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        reference_sum = np.sum(laser_arr[norm_start_bin:norm_end_bin])
+        reference_mean = reference_sum / (norm_end_bin - norm_start_bin)
+        signal_sum = np.sum(laser_arr[signal_start_bin:signal_end_bin])
+        signal_mean = signal_sum / (signal_end_bin - signal_start_bin)
+        signal_data[ii] = signal_mean / reference_mean
+        error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
+    return signal_data, error_data
+
+
+def _loop_mean_reference(laser_data, signal_start_bin, signal_end_bin, norm_start_bin,
+                         norm_end_bin):
+    """ Per laser pulse loop of analyse_mean_reference before vectorization. """
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        reference_sum = np.sum(laser_arr[norm_start_bin:norm_end_bin])
+        reference_mean = reference_sum / (norm_end_bin - norm_start_bin)
+        signal_sum = np.sum(laser_arr[signal_start_bin:signal_end_bin])
+        signal_mean = signal_sum / (signal_end_bin - signal_start_bin)
+        signal_data[ii] = signal_mean - reference_mean
+        error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+    return signal_data, error_data
+
+
+def _laser_data(rng, sweeps=1):
+    rate = np.full(LASER_LENGTH, 0.05)
+    rate[:300] += 0.1 * np.exp(-np.arange(300) / 100)
+    return rng.poisson(sweeps * rate, (NUMBER_OF_LASERS, LASER_LENGTH)).astype('int64')
+
+
+def test_vectorized_methods_match_loops():
+    """
+    The vectorized analysis methods return exactly the results of the former per laser loops.
+    """
+    analyzer = BasicPulseAnalyzer(PulsedLogicStandIn())
+    laser_data = _laser_data(np.random.default_rng(0), sweeps=1000)
+    bins = (10, 210, 300, 500)
+
+    signal, error = analyzer.analyse_mean_norm(laser_data, **WINDOWS)
+    expected_signal, expected_error = _loop_mean_norm(laser_data, *bins)
+    np.testing.assert_array_equal(signal, expected_signal)
+    np.testing.assert_array_equal(error, expected_error)
+
+    signal, error = analyzer.analyse_mean_reference(laser_data, **WINDOWS)
+    expected_signal, expected_error = _loop_mean_reference(laser_data, *bins)
+    np.testing.assert_array_equal(signal, expected_signal)
+    np.testing.assert_array_equal(error, expected_error)
+
+    signal, error = analyzer.analyse_sum(laser_data, signal_start=10e-9, signal_end=210e-9)
+    np.testing.assert_array_equal(signal, laser_data[:, 10:210].sum(axis=1))
+    np.testing.assert_array_equal(error, np.sqrt(laser_data[:, 10:210].sum(axis=1)))
+
+    signal, error = analyzer.analyse_mean(laser_data, signal_start=10e-9, signal_end=210e-9)
+    np.testing.assert_array_equal(signal, laser_data[:, 10:210].mean(axis=1))
+    np.testing.assert_array_equal(error, np.sqrt(laser_data[:, 10:210].sum(axis=1)) / 200)
+
+
+def test_window_statistics_match_batch():
+    """
+    Running Welford statistics of accumulated window sums equal the weighted mean and variance of
+    the per tick increments computed in one go.
+    """
+    rng = np.random.default_rng(1)
+    statistics = LaserWindowStatistics(NUMBER_OF_LASERS)
+    sums = np.zeros(NUMBER_OF_LASERS, dtype='int64')
+    sweeps = 0
+    increments, weights = list(), list()
+    for new_sweeps in rng.integers(50, 150, 40):
+        increment = rng.poisson(3. * new_sweeps, NUMBER_OF_LASERS)
+        sums += increment
+        sweeps += new_sweeps
+        statistics.update(sums, sweeps)
+        increments.append(increment / new_sweeps)
+        weights.append(new_sweeps)
+    increments = np.array(increments)
+    weights = np.array(weights)[:, np.newaxis]
+
+    mean = np.sum(weights * increments, axis=0) / np.sum(weights)
+    variance = np.sum(weights * (increments - mean) ** 2, axis=0) / (len(weights) - 1)
+    np.testing.assert_array_equal(statistics.sums, sums)
+    np.testing.assert_allclose(statistics.mean, mean, rtol=1e-12)
+    np.testing.assert_allclose(statistics.variance, variance, rtol=1e-9)
+    # Poisson counts: variance per sweep equals the mean counts per sweep
+    assert np.median(statistics.variance / statistics.mean) == pytest.approx(1, abs=0.2)
+
+    # restart on a new measurement
+    statistics.update(sums[:10], 10)
+    assert statistics.updates == 1 and statistics.sweeps == 10
+
+
+def test_analyzer_streaming_errors_and_history():
+    """
+    With streaming statistics enabled the signal stays the same, the error bars of Poisson data
+    approach the Poisson errors and the history ring is bounded.
+    """
+    rng = np.random.default_rng(2)
+    logic = PulsedLogicStandIn(empirical_analysis_errors=True, analysis_history_length=5)
+    analyzer = PulseAnalyzer(logic)
+    analyzer.analysis_settings = dict(method='mean_norm', **WINDOWS)
+    reference = BasicPulseAnalyzer(PulsedLogicStandIn())
+
+    laser_data = np.zeros((NUMBER_OF_LASERS, LASER_LENGTH), dtype='int64')
+    for tick in range(30):
+        increment = _laser_data(rng, sweeps=100)
+        laser_data += increment
+        logic.elapsed_sweeps += 100
+        signal, error = analyzer.analyse_laser_pulses(laser_data)
+        poisson_signal, poisson_error = reference.analyse_mean_norm(laser_data, **WINDOWS)
+        np.testing.assert_array_equal(signal, poisson_signal)
+    assert np.median(error / poisson_error) == pytest.approx(1, abs=0.25)
+
+    history = analyzer.signal_history
+    assert len(history) == 5
+    assert history[-1][0] == logic.elapsed_sweeps
+    np.testing.assert_array_equal(history[-1][1], reference.analyse_mean_norm(increment,
+                                                                              **WINDOWS)[0])
+
+    analyzer.reset_statistics()
+    assert analyzer.signal_history == []
+
+
+def test_mean_reference_empty_windows():
+    """
+    Laser pulses without counts in the signal or reference window give the same infinite or NaN
+    errors as the former loop.
+    """
+    analyzer = BasicPulseAnalyzer(PulsedLogicStandIn())
+    laser_data = _laser_data(np.random.default_rng(3), sweeps=100)
+    laser_data[0, 10:210] = 0
+    laser_data[1, 300:500] = 0
+    laser_data[2, 10:210] = 0
+    laser_data[2, 300:500] = 0
+    bins = (10, 210, 300, 500)
+
+    signal, error = analyzer.analyse_mean_reference(laser_data, **WINDOWS)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected_signal, expected_error = _loop_mean_reference(laser_data, *bins)
+    np.testing.assert_array_equal(signal, expected_signal)
+    np.testing.assert_array_equal(error, expected_error)
+    assert np.isinf(error[:2]).all() and np.isnan(error[2])
+
+
+def test_analyzer_without_elapsed_sweeps():
+    """
+    If the fast counter does not report the elapsed sweeps (-1 in the logic), the statistics and
+    the history count the analysed laser data instead.
+    """
+    rng = np.random.default_rng(4)
+    logic = PulsedLogicStandIn(empirical_analysis_errors=True, analysis_history_length=5)
+    logic.elapsed_sweeps = -1
+    analyzer = PulseAnalyzer(logic)
+    analyzer.analysis_settings = dict(method='mean_norm', **WINDOWS)
+    reference = BasicPulseAnalyzer(PulsedLogicStandIn())
+
+    laser_data = np.zeros((NUMBER_OF_LASERS, LASER_LENGTH), dtype='int64')
+    for tick in range(30):
+        laser_data += _laser_data(rng, sweeps=100)
+        signal, error = analyzer.analyse_laser_pulses(laser_data)
+    poisson_signal, poisson_error = reference.analyse_mean_norm(laser_data, **WINDOWS)
+    np.testing.assert_array_equal(signal, poisson_signal)
+    assert not np.array_equal(error, poisson_error)
+    assert np.median(error / poisson_error) == pytest.approx(1, abs=0.25)
+    assert [sweeps for sweeps, _ in analyzer.signal_history] == [26, 27, 28, 29, 30]
+
+    analyzer.reset_statistics()
+    analyzer.analyse_laser_pulses(laser_data)
+    assert analyzer.signal_history[-1][0] == 1
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests for the run-length encoded waveform container of the pulser
+interface.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from qudi.interface.pulser_interface import PulserInterface, RunLengthWaveform
+
+SAMPLE_RATE = 1e9
+
+
+class Sin:
+    """ Minimal sampling function stand-in """
+    def __init__(self, frequency, amplitude):
+        self.frequency = frequency
+        self.amplitude = amplitude
+
+    def get_samples(self, time_array):
+        return self.amplitude * np.sin(2 * np.pi * self.frequency * time_array)
+
+
+@pytest.fixture
+def waveform():
+    sin = Sin(frequency=100e6, amplitude=0.25)
+    return RunLengthWaveform(
+        run_lengths=[10, 0, 25, 7, 100],
+        sample_rate=SAMPLE_RATE,
+        digital_states={'d_ch1': [True, False, False, True, True],
+                        'd_ch2': [False, False, True, True, True]},
+        analog_functions={'a_ch1': [None, sin, sin, None, sin]},
+        analog_scale={'a_ch1': 0.5}
+    )
+
+
+def _reference_samples(waveform):
+    """ Sample the waveform element by element as done in SequenceGeneratorLogic """
+    total = waveform.number_of_samples
+    analog = {chnl: np.zeros(total, dtype='float32') for chnl in waveform.analog_channels}
+    digital = {chnl: np.zeros(total, dtype=bool) for chnl in waveform.digital_channels}
+    for run, length in enumerate(waveform.run_lengths):
+        start = waveform.run_starts[run]
+        for chnl, states in waveform.digital_states.items():
+            digital[chnl][start:start + length] = states[run]
+        time_arr = (waveform.time_offset_bins[run] + np.arange(length)) / waveform.sample_rate
+        for chnl, functions in waveform.analog_functions.items():
+            if functions[run] is not None:
+                analog[chnl][start:start + length] = functions[run].get_samples(
+                    time_arr) / waveform.analog_scale[chnl]
+    return analog, digital
+
+
+def test_expand(waveform):
+    assert waveform.number_of_samples == 142
+    ref_analog, ref_digital = _reference_samples(waveform)
+    analog, digital = waveform.expand()
+    for chnl in ref_digital:
+        np.testing.assert_array_equal(digital[chnl], ref_digital[chnl])
+    for chnl in ref_analog:
+        np.testing.assert_array_equal(analog[chnl], ref_analog[chnl])
+
+
+@pytest.mark.parametrize('chunk_length', [1, 13, 35, 142, 1000])
+def test_iter_chunks(waveform, chunk_length):
+    ref_analog, ref_digital = _reference_samples(waveform)
+    chunks = list(waveform.iter_chunks(chunk_length))
+    assert chunks[0][2] and chunks[-1][3]
+    assert not any(chunk[3] for chunk in chunks[:-1])
+    for chnl in ref_digital:
+        np.testing.assert_array_equal(
+            np.concatenate([chunk[1][chnl] for chunk in chunks]), ref_digital[chnl]
+        )
+    for chnl in ref_analog:
+        np.testing.assert_array_equal(
+            np.concatenate([chunk[0][chnl] for chunk in chunks]), ref_analog[chnl]
+        )
+
+
+def test_merged_digital_runs(waveform):
+    lengths, states = waveform.merged_digital_runs()
+    np.testing.assert_array_equal(lengths, [10, 25, 107])
+    np.testing.assert_array_equal(states['d_ch1'], [True, False, True])
+    np.testing.assert_array_equal(states['d_ch2'], [False, True, True])
+
+
+def test_default_write_run_length_waveform(waveform):
+    """
+    The default implementation passes bounded chunks to write_waveform, with the digital
+    channels of each chunk run-length encoded.
+    """
+    class ChunkRecorder:
+        _run_length_chunk_samples = 40
+
+        def __init__(self):
+            self.chunks = list()
+
+        def write_waveform(self, name, analog_samples, digital_samples, is_first_chunk,
+                           is_last_chunk, total_number_of_samples):
+            assert isinstance(digital_samples, RunLengthWaveform)
+            self.chunks.append((digital_samples.number_of_samples, is_first_chunk, is_last_chunk))
+            return len(analog_samples['a_ch1']), [name]
+
+    pulser = ChunkRecorder()
+    written, waveforms = PulserInterface.write_run_length_waveform(pulser, 'wfm', waveform)
+    assert written == 142
+    assert waveforms == ['wfm']
+    assert pulser.chunks == [(40, True, False), (40, False, False), (40, False, False),
+                             (22, False, True)]
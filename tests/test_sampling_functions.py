@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains accuracy tests and a throughput benchmark for the float32 evaluation of the
+basic sampling functions into preallocated sample arrays.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+
+from qudi.logic.pulsed.sampling_functions import SamplingFunctions, SamplingBase
+
+SamplingFunctions.import_sampling_functions(list())
+
+SAMPLE_RATE = 25e9
+NUMBER_OF_SAMPLES = 2 ** 20
+
+FUNCTIONS = {
+    'Idle': dict(),
+    'DC': {'voltage': 0.3},
+    'Sin': {'amplitude': 0.5, 'frequency': 2.87e9, 'phase': 30},
+    'DoubleSinSum': {'amplitude_1': 0.25, 'frequency_1': 2.87e9, 'phase_1': 0,
+                     'amplitude_2': 0.25, 'frequency_2': 2.1e9, 'phase_2': 90},
+    'DoubleSinProduct': {'amplitude_1': 0.5, 'frequency_1': 2.87e9, 'phase_1': 0,
+                         'amplitude_2': 1, 'frequency_2': 10e6, 'phase_2': 90},
+    'TripleSinSum': {'amplitude_1': 0.2, 'frequency_1': 2.87e9, 'phase_1': 0,
+                     'amplitude_2': 0.2, 'frequency_2': 2.8e9, 'phase_2': 45,
+                     'amplitude_3': 0.2, 'frequency_3': 2.9e9, 'phase_3': 90},
+    'TripleSinProduct': {'amplitude_1': 0.5, 'frequency_1': 2.87e9, 'phase_1': 0,
+                         'amplitude_2': 1, 'frequency_2': 10e6, 'phase_2': 45,
+                         'amplitude_3': 1, 'frequency_3': 1e6, 'phase_3': 90},
+    'Chirp': {'amplitude': 0.5, 'phase': 0, 'start_freq': 2.8e9, 'stop_freq': 2.9e9},
+    'AllenEberlyChirp': {'amplitude': 0.25, 'phase': 0, 'start_freq': 2.8e9,
+                         'stop_freq': 2.9e9, 'tau_pulse': 4e-6},
+}
+
+
+def _time_array(offset_bin):
+    return (offset_bin + np.arange(NUMBER_OF_SAMPLES, dtype='float64')) / SAMPLE_RATE
+
+
+@pytest.mark.parametrize('name', FUNCTIONS)
+@pytest.mark.parametrize('offset_bin', [0, 10 ** 9])
+def test_float32_accuracy(name, offset_bin):
+    """
+    Samples written into float32 arrays deviate from the float64 reference by less than 1e-6 V,
+    also far into the rotating frame (offset of 40 ms).
+    """
+    function = getattr(SamplingFunctions, name)(**FUNCTIONS[name])
+    time_array = _time_array(offset_bin)
+    reference = function.get_samples(time_array)
+    out = np.full(NUMBER_OF_SAMPLES, np.nan, dtype='float32')
+    assert function.get_samples(time_array, out=out) is out
+    assert np.max(np.abs(out - reference)) < 1e-6
+    # float64 output arrays agree within the float64 precision of the absolute phase
+    out64 = function.sample_into(time_array, np.empty(NUMBER_OF_SAMPLES))
+    np.testing.assert_allclose(out64, reference, rtol=0, atol=1e-7)
+
+
+def test_sample_into_without_out_argument():
+    """
+    Sampling functions not accepting out are evaluated in float64 and cast into out.
+    """
+    class Ramp(SamplingBase):
+        def get_samples(self, time_array):
+            return time_array * 1e6
+
+    time_array = _time_array(0)
+    out = np.empty(NUMBER_OF_SAMPLES, dtype='float32')
+    Ramp().sample_into(time_array, out)
+    np.testing.assert_array_equal(out, (time_array * 1e6).astype('float32'))
+
+
+def test_sampling_throughput():
+    """
+    Compares samples/s of the float64 evaluation down-converted into a float32 chunk with the
+    float32 evaluation into the chunk for every basic sampling function.
+    """
+    time_array = _time_array(0)
+    chunk = np.empty(NUMBER_OF_SAMPLES, dtype='float32')
+    for name, params in FUNCTIONS.items():
+        function = getattr(SamplingFunctions, name)(**params)
+        durations = list()
+        for sample in (lambda: chunk.__setitem__(slice(None), function.get_samples(time_array)),
+                       lambda: function.sample_into(time_array, chunk)):
+            start = time.perf_counter()
+            for _ in range(5):
+                sample()
+            durations.append((time.perf_counter() - start) / 5)
+        print('{0}: float64 {1:.0f} MSa/s, float32 {2:.0f} MSa/s'.format(
+            name, *(NUMBER_OF_SAMPLES / t / 1e6 for t in durations)))
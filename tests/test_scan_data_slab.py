@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests and a GUI update benchmark for the incremental scan data slabs
+emitted while scanning.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+import pytest
+from PySide2 import QtWidgets
+
+from qudi.interface.scanning_probe_interface import ScanData, ScanDataSlab, ScanSettings
+from qudi.interface.scanning_probe_interface import ScanningProbeInterface
+
+SCANNER = 'scanner_dummy'
+CHANNEL = 'fluorescence'
+FRAME_SIZES = (128, 512, 1024)
+
+
+def _scan_data(resolution):
+    settings = ScanSettings(channels=('a', 'b'), axes=tuple('xy'[:len(resolution)]),
+                            range=((0, 1),) * len(resolution), resolution=resolution,
+                            frequency=1e3)
+    scan_data = ScanData(settings=settings, _channel_units=('c/s', 'c/s'),
+                         _channel_dtypes=('float64', 'float64'), _axis_units=('m',) * len(resolution))
+    scan_data.new_scan()
+    return scan_data
+
+
+def test_slab_round_trip():
+    """
+    Lines copied into a slab end up at the same position when written into another ScanData.
+    """
+    source = _scan_data((8, 6))
+    for ch, arr in source.data.items():
+        arr[...] = np.random.random(arr.shape)
+    target = _scan_data((8, 6))
+    slab = ScanDataSlab.from_scan_data(source, line_start=2, line_stop=4)
+    assert slab.data['a'].shape == (8, 2)
+    slab.write_into(target)
+    np.testing.assert_array_equal(target.data['a'][:, 2:4], source.data['a'][:, 2:4])
+    assert np.isnan(target.data['a'][:, :2]).all() and np.isnan(target.data['a'][:, 4:]).all()
+
+
+def test_slab_1d_covers_full_line():
+    """
+    A 1D scan consists of a single line, independent of the requested line range.
+    """
+    source = _scan_data((16,))
+    source.data['b'][...] = np.arange(16)
+    slab = ScanDataSlab.from_scan_data(source, line_start=5)
+    assert (slab.line_start, slab.line_stop) == (0, 1)
+    target = _scan_data((16,))
+    slab.write_into(target)
+    np.testing.assert_array_equal(target.data['b'], np.arange(16))
+
+
+class SlabDefaultScanner:
+    """ Scanner stand-in using the default get_scan_data_slab of ScanningProbeInterface. """
+    get_scan_data_slab = ScanningProbeInterface.get_scan_data_slab
+
+    def __init__(self, scan_data, back_scan_data=None):
+        self.scan_data = scan_data
+        self.back_scan_data = back_scan_data
+
+    def get_scan_data(self):
+        return self.scan_data
+
+    def get_back_scan_data(self):
+        return self.back_scan_data
+
+
+def test_default_slab_polls():
+    """
+    Polling a scanner without its own get_scan_data_slab like the scanning probe logic does
+    delivers every line, also lines finished in between two polls.
+    """
+    source = _scan_data((4, 10))
+    back_source = _scan_data((4, 10))
+    scanner = SlabDefaultScanner(source, back_source)
+    target = _scan_data((4, 10))
+    back_target = _scan_data((4, 10))
+    values = np.random.random((4, 10))
+    line_start = 0
+    # pixel steps at each poll, each line is scanned forward and then backward in 4 steps each
+    for steps in (0, 3, 6, 7, 13, 34, 34, 60, 80):
+        pixels = 4 * (steps // 8) + min(steps % 8, 4)
+        back_pixels = 4 * (steps // 8) + max(steps % 8 - 4, 0)
+        for arr in source.data.values():
+            arr.T.flat[:pixels] = values.T.flat[:pixels]
+        for arr in back_source.data.values():
+            arr.T.flat[:back_pixels] = values.T.flat[:back_pixels]
+        slab = scanner.get_scan_data_slab(line_start)
+        assert slab.line_start == line_start
+        assert slab.line_stop == max(line_start, -(-pixels // 4))
+        if slab.line_stop > slab.line_start:
+            line_start = max(line_start, slab.line_stop - 1)
+        slab.write_into(target, back_target)
+        np.testing.assert_array_equal(target.data['a'], source.data['a'])
+        np.testing.assert_array_equal(back_target.data['b'], back_source.data['b'])
+    assert line_start == 9
+    np.testing.assert_array_equal(target.data['a'], values)
+
+
+@pytest.fixture(scope='module')
+def scanner(qudi_instance, qt_app):
+    """
+    Fixture returning an activated scanning probe dummy instance.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(SCANNER)
+    yield module_manager.modules[SCANNER].instance
+    module_manager.deactivate_module(SCANNER)
+
+
+def _run_scan(scanner, qt_app, frame_size, use_slabs):
+    """
+    Runs a scan on the dummy, polls it like the scanning probe logic does and updates an image item
+    like the scan GUI does. Returns the per-update wall clock latencies, the consumed CPU time and
+    the final image.
+    """
+    pg = pytest.importorskip('pyqtgraph')
+    image_item = pg.ImageItem()
+    constraints = scanner.constraints
+    settings = ScanSettings(
+        channels=tuple(constraints.channels),
+        axes=('x', 'y'),
+        range=(constraints.axes['x'].position.bounds, constraints.axes['y'].position.bounds),
+        resolution=(frame_size, frame_size),
+        frequency=frame_size * 200
+    )
+    scanner.configure_scan(settings)
+    scanner.start_scan()
+    live_data = scanner.get_scan_data()
+    line_start = 0
+    latencies = list()
+    cpu_start = time.process_time()
+    while True:
+        qt_app.processEvents()
+        time.sleep(0.005)
+        running = scanner.module_state() != 'idle'
+        start = time.perf_counter()
+        if use_slabs:
+            slab = scanner.get_scan_data_slab(line_start)
+            slab.write_into(live_data)
+            line_start = max(0, slab.line_stop - 1)
+        else:
+            live_data = scanner.get_scan_data()
+        image_item.setImage(live_data.data[CHANNEL], autoLevels=False)
+        qt_app.processEvents(QtWidgets.QApplication.ExcludeUserInputEvents)
+        latencies.append(time.perf_counter() - start)
+        if not running:
+            break
+    cpu_time = time.process_time() - cpu_start
+    return np.asarray(latencies), cpu_time, live_data.data[CHANNEL]
+
+
+@pytest.mark.parametrize('frame_size', FRAME_SIZES)
+def test_gui_update_latency(scanner, qt_app, frame_size):
+    """
+    Compares full-frame against slab updates for increasing frame sizes. Prints the mean and
+    maximum update latency as well as the CPU time consumed during the scan.
+    """
+    results = dict()
+    for use_slabs in (False, True):
+        latencies, cpu_time, image = _run_scan(scanner, qt_app, frame_size, use_slabs)
+        results[use_slabs] = image
+        print('{0}x{0} {1:>5s} updates: {2:d} polls, mean {3:.2f} ms, max {4:.2f} ms, CPU {5:.2f} s'
+              ''.format(frame_size, 'slab' if use_slabs else 'full', len(latencies),
+                        latencies.mean() * 1e3, latencies.max() * 1e3, cpu_time))
+    # Both ways must end up with a completely acquired image
+    assert not np.isnan(results[True]).any()
+    assert not np.isnan(results[False]).any()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains unit tests and an activation time benchmark for the out-of-band scan history
+store of the scanning data logic.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import numpy as np
+import pytest
+from qudi.util.yaml import yaml_load, yaml_dump
+
+from qudi.interface.scanning_probe_interface import ScanData, ScanSettings
+from qudi.logic.scanning_data_logic import ScanHistoryStore
+
+RESOLUTION = (256, 256)
+HISTORY_LENGTHS = (1, 10, 50)
+
+
+def _scan_data(axes=('x', 'y'), resolution=RESOLUTION):
+    settings = ScanSettings(channels=('fluorescence', 'APD events'), axes=axes,
+                            range=((0, 1e-5),) * len(axes), resolution=resolution, frequency=1e3)
+    scan_data = ScanData(settings=settings, _channel_units=('c/s', 'count'),
+                         _channel_dtypes=('float64', 'float64'), _axis_units=('m',) * len(axes),
+                         scanner_target_at_start={'x': 0., 'y': 0., 'z': 0.})
+    scan_data.new_scan()
+    for arr in scan_data.data.values():
+        arr[...] = np.random.random(arr.shape)
+    return scan_data
+
+
+def test_store_round_trip(tmp_path):
+    """
+    Entries written to the store are reconstructed with equal data and the per-axes index
+    follows appends and pops.
+    """
+    store = ScanHistoryStore(str(tmp_path))
+    xy, xz, back = _scan_data(), _scan_data(('x', 'z'), (32, 16)), _scan_data()
+    store.append(xy, back)
+    store.append(xz)
+    assert store.last_index(('x', 'y')) == 0
+    assert store.last_index(('x', 'z')) == 1
+    assert store.last_index(('y', 'z')) is None
+    assert store.axes_with_entries() == {('x', 'y'), ('x', 'z')}
+
+    reopened = ScanHistoryStore(str(tmp_path), list(store.index))
+    data, back_data = reopened.load(0)
+    assert data.settings == xy.settings
+    np.testing.assert_array_equal(data.data['fluorescence'], xy.data['fluorescence'])
+    np.testing.assert_array_equal(back_data.data['APD events'], back.data['APD events'])
+    assert reopened.load(1)[1] is None
+
+    reopened.pop(0)
+    assert reopened.last_index(('x', 'z')) == 0
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
+def test_store_drops_invalid_entries(tmp_path):
+    """
+    Entries with unknown scanner axes and unreferenced data directories are removed.
+    """
+    store = ScanHistoryStore(str(tmp_path))
+    store.append(_scan_data(resolution=(4, 4)))
+    store.append(_scan_data(resolution=(4, 4)))
+    os.makedirs(os.path.join(str(tmp_path), 'orphan'))
+    assert not store.drop_invalid({'x', 'y', 'z'})
+    assert not os.path.exists(os.path.join(str(tmp_path), 'orphan'))
+    assert store.drop_invalid({'x', 'y'})
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize('history_length', HISTORY_LENGTHS)
+def test_activation_time(tmp_path, history_length):
+    """
+    Compares the status variable round trip of the full history (previous behaviour) against the
+    metadata index plus loading the latest entry from the store. Prints both durations.
+    """
+    history = [(_scan_data(), None) for _ in range(history_length)]
+
+    legacy_file = str(tmp_path / 'legacy.cfg')
+    start = time.perf_counter()
+    yaml_dump(legacy_file, {'scan_history': [(d.to_dict(), None) for d, _ in history]})
+    legacy_dicts = yaml_load(legacy_file)['scan_history']
+    legacy = [(ScanData.from_dict(d), None) for d, _ in legacy_dicts]
+    t_legacy = time.perf_counter() - start
+
+    store_dir = str(tmp_path / 'store')
+    store = ScanHistoryStore(store_dir)
+    for data, back_data in history:
+        store.append(data, back_data)
+    index_file = str(tmp_path / 'index.cfg')
+    start = time.perf_counter()
+    yaml_dump(index_file, {'scan_history': store.index})
+    reopened = ScanHistoryStore(store_dir, yaml_load(index_file)['scan_history'])
+    reopened.drop_invalid({'x', 'y', 'z'})
+    latest, _ = reopened.load(-1)
+    t_store = time.perf_counter() - start
+
+    np.testing.assert_array_equal(latest.data['fluorescence'], legacy[-1][0].data['fluorescence'])
+    print('scan history of {0:d} entries: status variable {1:.3f} s ({2:.1f} MB), '
+          'indexed store {3:.3f} s ({4:.3f} MB index)'
+          ''.format(history_length, t_legacy, os.path.getsize(legacy_file) / 1e6, t_store,
+                    os.path.getsize(index_file) / 1e6))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the run-length encoded digital samples passed to pulse generators and
+a comparison of memory per sample with bool sample arrays.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+import pytest
+
+from qudi.interface.pulser_interface import RunLengthWaveform
+
+DIGITAL_CHANNELS = ['d_ch{0:d}'.format(ii) for ii in range(1, 9)]
+
+
+def _random_waveform(number_of_elements, mean_length, seed=0):
+    """ Digital waveform with one run per element and random states of all channels """
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 2 * mean_length, number_of_elements)
+    states = {chnl: rng.random(number_of_elements) < 0.3 for chnl in DIGITAL_CHANNELS}
+    return RunLengthWaveform(lengths, 1e9, digital_states=states)
+
+
+def test_digital_runs():
+    """
+    The digital runs of a sample range expand to the same samples as the range of the waveform.
+    """
+    waveform = _random_waveform(200, 10)
+    _, dense = waveform.expand()
+    for start, stop in [(0, None), (17, 523), (500, 500), (1000, 5000)]:
+        runs = waveform.digital_runs(start, stop)
+        assert runs.digital_channels == waveform.digital_channels
+        assert not runs.analog_channels
+        _, digital_samples = runs.expand()
+        for chnl in DIGITAL_CHANNELS:
+            np.testing.assert_array_equal(digital_samples[chnl], dense[chnl][start:stop])
+
+    chunks = list(waveform.iter_chunks(300, expand_digital=False))
+    assert all(isinstance(chunk[1], RunLengthWaveform) for chunk in chunks)
+    for chnl in DIGITAL_CHANNELS:
+        np.testing.assert_array_equal(
+            np.concatenate([chunk[1].expand()[1][chnl] for chunk in chunks]), dense[chnl])
+
+    run_lengths, states = waveform.merged_digital_runs(['d_ch1'])
+    assert list(states) == ['d_ch1']
+    assert np.all(states['d_ch1'][1:] != states['d_ch1'][:-1])
+    np.testing.assert_array_equal(np.repeat(states['d_ch1'], run_lengths), dense['d_ch1'])
+
+
+def test_awg70k_marker_bytes():
+    """
+    Marker bytes created from run-length encoded samples equal the encoding of bool arrays.
+    """
+    pytest.importorskip('lxml')
+    from qudi.hardware.awg.tektronix_awg70k import AWG70K
+
+    waveform = _random_waveform(1000, 50)
+    _, dense = waveform.expand()
+    expected = dense['d_ch2'].view('uint8') << 1
+    expected += dense['d_ch1'].view('uint8')
+    np.testing.assert_array_equal(AWG70K._run_length_marker_bytes(waveform, 'd_ch1', 'd_ch2'),
+                                  expected)
+    single = RunLengthWaveform(waveform.run_lengths, waveform.sample_rate,
+                               digital_states={'d_ch1': waveform.digital_states['d_ch1']})
+    np.testing.assert_array_equal(AWG70K._run_length_marker_bytes(single, 'd_ch1', 'd_ch2'),
+                                  dense['d_ch1'].view('uint8'))
+
+
+def test_memory_per_sample():
+    """
+    Compares the memory per sample of 8 digital channels as bool arrays and run-length encoded.
+    """
+    for mean_length in (10, 1000, 10000):
+        waveform = _random_waveform(1000, mean_length)
+        _, dense = waveform.expand()
+        bytes_dense = sum(samples.nbytes for samples in dense.values())
+        bytes_sparse = waveform.run_lengths.nbytes + sum(
+            states.nbytes for states in waveform.digital_states.values())
+        print('{0:d} samples per element: memory {1:.3f} / {2:.5f} B/Sa (bool arrays / '
+              'run-length)'.format(mean_length, bytes_dense / waveform.number_of_samples,
+                                   bytes_sparse / waveform.number_of_samples))
+        assert bytes_sparse <= bytes_dense * 16 / mean_length
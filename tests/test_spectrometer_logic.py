@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests for the continuous acquisition of the spectrometer logic with the
+spectrometer dummy.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import pytest
+
+MODULE = 'spectrometerlogic'
+EXPOSURE = 0.02
+
+
+@pytest.fixture(scope='module')
+def module(qudi_instance, qt_app):
+    """
+    Fixture that returns the activated spectrometer logic instance.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(MODULE)
+    yield module_manager.modules[MODULE].instance
+    module_manager.deactivate_module(MODULE)
+
+
+def _wait(qt_app, duration):
+    stop = time.perf_counter() + duration
+    while time.perf_counter() < stop:
+        qt_app.processEvents()
+        time.sleep(0.001)
+
+
+def _wait_finished(module, qt_app, timeout=5):
+    stop = time.perf_counter() + timeout
+    while module.acquisition_running and time.perf_counter() < stop:
+        _wait(qt_app, 0.01)
+    assert not module.acquisition_running
+
+
+def test_continuous_acquisition(module, qt_app):
+    """
+    Records a fixed number of frames in continuous acquisition and prints the acquisition rate.
+    """
+    module.exposure_time = EXPOSURE
+    module.max_repetitions = 20
+    start = time.perf_counter()
+    module.get_spectrum(constant_acquisition=True, differential_spectrum=False)
+    _wait_finished(module, qt_app)
+    elapsed = time.perf_counter() - start
+    print('Spectrometer continuous acquisition: {0:.1f} frames/s at {1:.0f} ms exposure'.format(
+        module.repetitions / elapsed, EXPOSURE * 1e3))
+    assert module.repetitions == 20
+    assert module.spectrum.shape == (1024,)
+
+
+def test_restart_after_stop(module, qt_app):
+    """
+    Stopping an acquisition and restarting it before the worker of the stopped acquisition has
+    finished must not end the new acquisition or add frames of the stopped one.
+    """
+    module.exposure_time = EXPOSURE
+    module.max_repetitions = 0
+    module.get_spectrum(constant_acquisition=True, differential_spectrum=False)
+    _wait(qt_app, 10 * EXPOSURE)
+    assert module.acquisition_running
+
+    # let the old worker finish without handling its queued frames and finished signal
+    module.stop()
+    time.sleep(3 * EXPOSURE)
+    module.max_repetitions = 10
+    module.get_spectrum(constant_acquisition=True)
+    _wait(qt_app, 2 * EXPOSURE)
+    assert module.acquisition_running
+
+    _wait_finished(module, qt_app)
+    assert module.repetitions == 10
+    module.max_repetitions = 0
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains latency, throughput and reconnect tests for the pipelined TCP client against
+the local stand-in server of the TCP client dummy.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import pytest
+
+MODULE = 'tcp_client_dummy'
+NUMBER_OF_COMMANDS = 10000
+
+
+@pytest.fixture(scope='module')
+def module(qudi_instance):
+    """
+    Fixture that returns the activated TCP client dummy.
+    """
+    module_manager = qudi_instance.module_manager
+    module_manager.activate_module(MODULE)
+    yield module_manager.modules[MODULE].instance
+    module_manager.deactivate_module(MODULE)
+
+
+def test_pipelined_queries(module):
+    """
+    Responses of many queries in flight at once are matched to their requests.
+    """
+    futures = [module.query('PIPE{0:d}?'.format(i)) for i in range(NUMBER_OF_COMMANDS)]
+    responses = [future.result(timeout=10) for future in futures]
+    assert responses == ['PIPE{0:d}?'.format(i) for i in range(NUMBER_OF_COMMANDS)]
+    assert len({future.request_id for future in futures}) == NUMBER_OF_COMMANDS
+
+
+@pytest.mark.benchmark
+def test_latency_and_throughput(module):
+    """
+    Compares one query in flight at a time with pipelined queries. Prints the latency and the
+    throughput in commands per second.
+    """
+    start = time.perf_counter()
+    for i in range(NUMBER_OF_COMMANDS // 10):
+        assert module.query('SERIAL{0:d}?'.format(i)).result(timeout=1) == 'SERIAL{0:d}?'.format(i)
+    latency = (time.perf_counter() - start) / (NUMBER_OF_COMMANDS // 10)
+
+    start = time.perf_counter()
+    futures = [module.query('PIPE{0:d}?'.format(i)) for i in range(NUMBER_OF_COMMANDS)]
+    for future in futures:
+        future.result(timeout=10)
+    throughput = NUMBER_OF_COMMANDS / (time.perf_counter() - start)
+
+    print('TCP client: {0:.1f} us latency, {1:.0f} commands/s pipelined, {2:.0f} commands/s '
+          'serial'.format(latency * 1e6, throughput, 1 / latency))
+    assert throughput > 1 / latency
+
+
+def test_unclaimed_lines(module):
+    """
+    Lines sent with send_byte are not matched to a query and show up in receive().
+    """
+    module.start_command()
+    module.write('CMD 1').result(timeout=1)
+    module.send_byte('RAW?\r\n')
+    lines = list()
+    for _ in range(100):
+        lines.extend(module.receive())
+        if lines:
+            break
+    assert lines == ['RAW?']
+
+
+def test_long_response(module):
+    """
+    Responses longer than the configured buffer are received without reconnecting.
+    """
+    message = 'LONG{0}?'.format('x' * 10 * module._buffer)
+    assert module.query(message).result(timeout=1) == message
+    assert module.connected
+
+
+def test_reconnect(module):
+    """
+    Drops the connection on the server side. Queries sent afterwards are answered after the
+    client has reconnected.
+    """
+    module.server.drop_connections()
+    start = time.perf_counter()
+    while module.connected and time.perf_counter() - start < 1:
+        time.sleep(0.001)
+    assert not module.connected
+    assert module.query('AFTER?').result(timeout=5) == 'AFTER?'
+    assert module.connected
+
+
+def test_send_byte_raises(module):
+    """
+    send_byte blocks until the message is sent and raises if it can not be sent, so callers can
+    reconnect and retry.
+    """
+    module.disconnect()
+    try:
+        with pytest.raises(ValueError):
+            module.send_byte('LOST\r\n')
+    finally:
+        module.connect()
+    module.start_command()
+    module.send_byte('AGAIN?\r\n')
+    lines = list()
+    for _ in range(100):
+        lines.extend(module.receive())
+        if lines:
+            break
+    assert lines == ['AGAIN?']
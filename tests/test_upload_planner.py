@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains tests of the benchmark tool outlier rejection and prediction intervals and of
+the upload planner of the sequence generator logic with a dummy pulser emulating a synthetic
+transfer speed profile.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-core/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import numpy as np
+import pytest
+
+from qudi.util.benchmark import BenchmarkTool
+from qudi.logic.pulsed.upload_planner import UploadPlanner
+from qudi.hardware.dummy.pulser_dummy import PulserDummy
+
+PROFILE = {'write_overhead': 5e-3,
+           'write_speed': 1e9,
+           'load_overhead': 1e-3,
+           'load_speed': 4e9,
+           'jitter': 0.02,
+           'outlier_probability': 0.1,
+           'outlier_factor': 5}
+
+
+class PulserDummyStandIn(PulserDummy):
+    """ PulserDummy with a transfer speed profile, bypassing the qudi module machinery.
+    """
+    log = logging.getLogger('PulserDummyStandIn')
+
+    def __init__(self, profile):
+        self.transfer_speed_profile = profile
+        self.save_samples = False
+        self.activation_config = {'a_ch1', 'd_ch1'}
+        self.waveform_set = set()
+        self.current_loaded_assets = dict()
+        self._waveform_lengths = dict()
+        self._transfer_rng = np.random.default_rng(0)
+
+
+def _synthetic_benchmark(outlier_threshold):
+    rng = np.random.default_rng(1)
+    benchmark = BenchmarkTool(outlier_threshold=outlier_threshold)
+    for ii, n in enumerate(np.geomspace(1e4, 1e7, 20)):
+        t = 1e-2 + n / 1e8
+        t *= 1 + 0.01 * rng.standard_normal()
+        if ii in (5, 17):
+            t *= 10
+        benchmark.add_benchmark(t, n, is_persistent=True)
+    return benchmark
+
+
+def test_outlier_rejection_and_interval():
+    """
+    Outliers do not distort the fit and the prediction interval contains the true time.
+    """
+    robust = _synthetic_benchmark(outlier_threshold=3.5)
+    naive = _synthetic_benchmark(outlier_threshold=None)
+    assert robust.estimate_speed() == pytest.approx(1e8, rel=0.02)
+    assert robust.estimate_overhead() == pytest.approx(1e-2, rel=0.1)
+    assert abs(naive.estimate_speed() - 1e8) > abs(robust.estimate_speed() - 1e8)
+
+    t, low, high = robust.estimate_time_interval(1e6)
+    assert low < 1e-2 + 1e6 / 1e8 < high
+    assert t == pytest.approx(robust.estimate_time(1e6))
+
+    # the benchmark survives a save/load round trip (StatusVar)
+    restored = BenchmarkTool()
+    restored.load_from_dict(saved_dict=robust.save())
+    assert restored.estimate_time(1e6) == robust.estimate_time(1e6)
+
+
+@pytest.fixture
+def planner():
+    """
+    Fixture that returns an upload planner with write and load benchmarks of the dummy pulser.
+    """
+    pulser = PulserDummyStandIn(PROFILE)
+    planner = UploadPlanner(BenchmarkTool(), BenchmarkTool())
+    for n in np.geomspace(1e4, 4e6, 12).astype(int):
+        samples = {'a_ch1': np.zeros(n, dtype='float32')}
+        start = time.perf_counter()
+        pulser.write_waveform('bench', samples, dict(), True, True, n)
+        planner.write_benchmark.add_benchmark(time.perf_counter() - start, n, is_persistent=True)
+        start = time.perf_counter()
+        pulser.load_waveform(['bench_ch1'])
+        planner.load_benchmark.add_benchmark(time.perf_counter() - start, n, is_persistent=True)
+    return planner, pulser
+
+
+def test_planner_with_dummy_profile(planner):
+    """
+    Waveforms are only split into chunks by the memory limit and the predicted upload times agree
+    with the actual upload times of the dummy pulser.
+    """
+    planner, pulser = planner
+    assert planner.has_plan
+    assert planner.chunk_length(10 ** 10, 5) == 10 ** 10
+    assert planner.chunk_length(10 ** 6, 5) == 10 ** 6
+    # memory limit and even chunks with granularity
+    assert planner.chunk_length(10 ** 9, 5, max_bytes=5 * 10 ** 6, granularity=64) % 64 == 0
+    assert planner.chunk_length(10 ** 9, 5, max_bytes=5 * 10 ** 6) == 10 ** 6
+    assert planner.chunk_length(25, 5, max_bytes=50) == 9
+
+    n = 3 * 10 ** 6
+    predicted = planner.predict_upload(n)
+    start = time.perf_counter()
+    pulser.write_waveform('upload', {'a_ch1': np.zeros(n, dtype='float32')}, dict(), True, True, n)
+    pulser.load_waveform(['upload_ch1'])
+    actual = time.perf_counter() - start
+    deviation = planner.report('upload', n, predicted, actual)
+    print('Upload of {0:d} samples: predicted {1:.2f} ms, actual {2:.2f} ms'.format(
+        n, predicted * 1e3, actual * 1e3))
+    assert abs(deviation) < 0.5
+    assert planner.reports[-1]['actual'] == actual
+
+
+def test_plan_batch(planner):
+    """
+    Sequences are used to reuse uploaded ensembles and ensembles are combined to save overhead.
+    """
+    planner, _ = planner
+    reused = [('a', 10 ** 6, True), ('b', 10 ** 6, False), ('a', 10 ** 6, True)]
+    assert planner.plan_batch(reused, sequence_steps=100)['mode'] == 'sequence'
+    assert planner.plan_batch(reused, sequence_steps=0)['mode'] == 'ensemble'
+
+    small = [('small_{0:d}'.format(ii), 1000, False) for ii in range(20)]
+    plan = planner.plan_batch(small, sequence_steps=100)
+    assert plan['mode'] == 'ensemble'
+    assert plan['times']['sequence'] > plan['times']['ensemble']
+
+    # too long for a single waveform
+    assert planner.plan_batch(small, max_length=10000, sequence_steps=100)['mode'] == 'sequence'
+
+
+def test_degenerate_benchmark():
+    """
+    Benchmarks with a single number of samples fit a vanishing overhead. They give no plan and
+    waveforms are still written at once.
+    """
+    planner = UploadPlanner(BenchmarkTool(), BenchmarkTool())
+    for _ in range(5):
+        planner.write_benchmark.add_benchmark(0.05, 10 ** 6, is_persistent=True)
+        planner.load_benchmark.add_benchmark(0.01, 10 ** 6, is_persistent=True)
+    assert planner.write_benchmark.sanity
+    assert not planner.has_plan
+    assert planner.chunk_length(10 ** 7, 5) == 10 ** 7
+    assert np.isnan(planner.predict_upload(10 ** 7))
+    assert planner.plan_batch([('a', 1000, True), ('b', 1000, False)],
+                              sequence_steps=10)['mode'] == 'sequence'